@@ -0,0 +1,352 @@
+"""
+Daily Fact Tables
+Builds DailyStatistics, OperatorStatistics and RiskAnalytics from the
+operational tables, and serves date-range series from them.
+
+- A build covers a date range with one GROUP BY query per source table
+  (never one query per day), so backfilling a year costs the same number
+  of queries as rebuilding yesterday.
+- Builds are idempotent: DailyStatistics rows are upserted on `date`;
+  OperatorStatistics and RiskAnalytics rows of the range are replaced in
+  one transaction. Re-running a range after late writes corrects it.
+- `update_daily_facts` (hourly) rebuilds from the last built day up to
+  today, so today's row is at most an hour behind and a missed run
+  catches up. `backfill_daily_facts` / `manage.py backfill_daily_facts`
+  rebuild history in chunks.
+- Days are local (TIME_ZONE) calendar days, matching `created_at__date`.
+- API totals come from the sampled APIRequestLog, scaled by the sample
+  rate (see apps.monitoring.request_log.estimate_totals).
+- Each build bumps a version number that is part of every cached series
+  key, so cached responses never outlive the facts they were built from.
+"""
+import logging
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Case, Count, Q, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .dashboard_snapshot import HIGH_RISK_LEVELS
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'week': 7, 'month': 30, 'quarter': 90, 'year': 365}
+VERSION_KEY = 'analytics:daily_facts:version'
+
+# RiskScore levels folded onto the RiskAnalytics buckets
+RISK_BUCKETS = {
+    'low': ('none', 'low'),
+    'medium': ('mild', 'moderate'),
+    'high': ('high',),
+    'severe': ('severe',),
+    'critical': ('critical', 'blacklisted'),
+}
+
+DAILY_FIELDS = (
+    'total_users', 'new_users', 'active_exclusions', 'new_exclusions', 'total_assessments',
+    'high_risk_users', 'api_calls_total', 'avg_response_time_ms'
+)
+
+
+def _analytics_setting(name, default):
+    return getattr(settings, 'ANALYTICS_SETTINGS', {}).get(name, default)
+
+
+def day_bounds(start, end):
+    """Aware datetimes covering local days start..end inclusive"""
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+    )
+
+
+def date_range(start, end):
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def _per_day(queryset, field, since, until, *group_by, **aggregates):
+    """values(day, *group_by) rows of one GROUP BY over [since, until)"""
+    return (
+        queryset.filter(**{f'{field}__gte': since, f'{field}__lt': until})
+        .annotate(day=TruncDate(field))
+        .values('day', *group_by)
+        .annotate(**(aggregates or {'count': Count('id')}))
+        .order_by()
+    )
+
+
+def _running(base, increments, days):
+    """Cumulative value at the end of each day, starting from base"""
+    values, running = {}, base
+    for day in days:
+        running += increments.get(day, 0)
+        values[day] = max(running, 0)
+    return values
+
+
+# Building
+
+def _user_facts(days, since, until):
+    from apps.users.models import User
+
+    new = {row['day']: row['count'] for row in _per_day(User.objects.all(), 'created_at', since, until)}
+    base = User.objects.filter(created_at__lt=since).count()
+    return new, _running(base, new, days)
+
+
+def _exclusion_facts(days, since, until):
+    from apps.nser.models import SelfExclusionRecord
+
+    records = SelfExclusionRecord.objects.exclude(status='pending')
+    ended = records.annotate(ended_at=Coalesce('actual_end_date', 'expiry_date'))
+
+    new = {
+        row['day']: row['count']
+        for row in _per_day(SelfExclusionRecord.objects.all(), 'created_at', since, until)
+    }
+    starts = {row['day']: row['count'] for row in _per_day(records, 'effective_date', since, until)}
+    ends = {row['day']: row['count'] for row in _per_day(ended, 'ended_at', since, until)}
+    base = ended.filter(effective_date__lt=since, ended_at__gte=since).count()
+
+    net = {day: starts.get(day, 0) - ends.get(day, 0) for day in days}
+    return new, _running(base, net, days)
+
+
+def _assessment_counts(since, until):
+    from apps.screening.models import AssessmentSession
+
+    return {
+        row['day']: row['count']
+        for row in _per_day(AssessmentSession.objects.all(), 'created_at', since, until)
+    }
+
+
+def _risk_facts(since, until):
+    """DailyStatistics high-risk users and RiskAnalytics rows"""
+    from apps.screening.models import RiskScore
+    from .models import RiskAnalytics
+
+    scores = RiskScore.objects.all()
+    high_risk = {
+        row['day']: row['count']
+        for row in _per_day(
+            scores.filter(risk_level__in=HIGH_RISK_LEVELS), 'score_date', since, until,
+            count=Count('user', distinct=True)
+        )
+    }
+
+    bucketed = scores.annotate(bucket=Case(
+        *[When(risk_level__in=levels, then=Value(bucket)) for bucket, levels in RISK_BUCKETS.items()],
+        default=Value('low')
+    ))
+    analytics = [
+        RiskAnalytics(
+            date=row['day'], risk_level=row['bucket'],
+            user_count=row['user_count'], avg_score=round(float(row['avg_score'] or 0), 2)
+        )
+        for row in _per_day(
+            bucketed, 'score_date', since, until, 'bucket',
+            user_count=Count('user', distinct=True), avg_score=Avg('risk_score')
+        )
+    ]
+    return high_risk, analytics
+
+
+def _api_facts(since, until):
+    from apps.monitoring.models import APIRequestLog
+    from apps.monitoring.request_log import estimate_totals, sampled_aggregates
+
+    logs = APIRequestLog.objects.all()
+    daily = {
+        row['day']: estimate_totals(row)
+        for row in _per_day(logs, 'created_at', since, until, **sampled_aggregates())
+    }
+    per_operator = {
+        (row['day'], row['operator_id']): estimate_totals(row)
+        for row in _per_day(
+            logs.filter(operator_id__isnull=False), 'created_at', since, until, 'operator_id',
+            **sampled_aggregates()
+        )
+    }
+    return daily, per_operator
+
+
+def _operator_facts(since, until, api_per_operator):
+    from apps.nser.models import OperatorExclusionMapping
+    from apps.operators.models import Operator
+    from apps.screening.models import AssessmentSession
+    from .models import OperatorStatistics
+
+    facts = {}
+
+    def row(day, operator_id):
+        return facts.setdefault((day, operator_id), {})
+
+    for item in _per_day(
+        AssessmentSession.objects.filter(operator__isnull=False), 'created_at', since, until, 'operator_id',
+        screenings=Count('id'), users=Count('user', distinct=True)
+    ):
+        row(item['day'], item['operator_id']).update(
+            screenings_conducted=item['screenings'], total_users=item['users']
+        )
+    for item in _per_day(
+        OperatorExclusionMapping.objects.all(), 'acknowledged_at', since, until, 'operator_id'
+    ):
+        row(item['day'], item['operator_id'])['exclusions_enforced'] = item['count']
+    for (day, operator_id), totals in api_per_operator.items():
+        row(day, operator_id).update(
+            api_calls=totals['requests'], avg_response_time_ms=totals['avg_response_time_ms']
+        )
+
+    # Request logs carry bare operator UUIDs; skip any that no longer exist
+    known = set(
+        Operator._base_manager.filter(pk__in={operator_id for _, operator_id in facts})
+        .values_list('pk', flat=True)
+    )
+    return [
+        OperatorStatistics(operator_id=operator_id, date=day, **values)
+        for (day, operator_id), values in facts.items() if operator_id in known
+    ]
+
+
+def build_daily_facts(start, end):
+    """Rebuild the fact rows of local days start..end (inclusive); returns rows written"""
+    from .models import DailyStatistics, OperatorStatistics, RiskAnalytics
+
+    days = date_range(start, end)
+    since, until = day_bounds(start, end)
+
+    new_users, total_users = _user_facts(days, since, until)
+    new_exclusions, active_exclusions = _exclusion_facts(days, since, until)
+    assessments = _assessment_counts(since, until)
+    high_risk, risk_rows = _risk_facts(since, until)
+    api_daily, api_per_operator = _api_facts(since, until)
+    operator_rows = _operator_facts(since, until, api_per_operator)
+
+    daily_rows = [
+        DailyStatistics(
+            date=day,
+            total_users=total_users[day],
+            new_users=new_users.get(day, 0),
+            active_exclusions=active_exclusions[day],
+            new_exclusions=new_exclusions.get(day, 0),
+            total_assessments=assessments.get(day, 0),
+            high_risk_users=high_risk.get(day, 0),
+            api_calls_total=api_daily.get(day, {}).get('requests', 0),
+            avg_response_time_ms=api_daily.get(day, {}).get('avg_response_time_ms', 0),
+        )
+        for day in days
+    ]
+
+    with transaction.atomic():
+        DailyStatistics.objects.bulk_create(
+            daily_rows, update_conflicts=True, unique_fields=['date'],
+            update_fields=[*DAILY_FIELDS, 'updated_at']
+        )
+        OperatorStatistics.objects.filter(date__range=(start, end)).delete()
+        OperatorStatistics.objects.bulk_create(operator_rows, batch_size=1000)
+        RiskAnalytics.objects.filter(date__range=(start, end)).delete()
+        RiskAnalytics.objects.bulk_create(risk_rows, batch_size=1000)
+
+    bump_version()
+    return len(daily_rows) + len(operator_rows) + len(risk_rows)
+
+
+def update_daily_facts(today=None):
+    """Rebuild from the last built day (at most FACTS_CATCHUP_DAYS back) through today"""
+    from django.db.models import Max
+    from .models import DailyStatistics
+
+    today = today or timezone.localdate()
+    catchup_start = today - timedelta(days=_analytics_setting('FACTS_CATCHUP_DAYS', 7))
+    last_built = DailyStatistics.objects.aggregate(last=Max('date'))['last']
+    start = min(last_built, today - timedelta(days=1)) if last_built else today - timedelta(days=1)
+    start = max(start, catchup_start)
+    return start, today, build_daily_facts(start, today)
+
+
+def backfill(start, end, chunk_days=None):
+    """Rebuild start..end in chunks of FACTS_BACKFILL_CHUNK_DAYS; yields (chunk_start, chunk_end, rows)"""
+    chunk_days = chunk_days or _analytics_setting('FACTS_BACKFILL_CHUNK_DAYS', 31)
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+        yield chunk_start, chunk_end, build_daily_facts(chunk_start, chunk_end)
+        chunk_start = chunk_end + timedelta(days=1)
+
+
+# Serving
+
+def bump_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def cached_series(name, build, *key_parts):
+    """
+    build() cached under (name, *key_parts, facts version). Any fact
+    rebuild changes the version, so entries only expire for memory's sake.
+    """
+    key = ':'.join(['analytics', name, str(cache.get(VERSION_KEY, 0)), *map(str, key_parts)])
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, _analytics_setting('FACTS_CACHE_SECONDS', 86400))
+    return data
+
+
+def parse_window(params, default_period='month'):
+    """
+    (period, start, end) from ?period= and ?end_date= (YYYY-MM-DD, default
+    yesterday - the last complete day). Unknown values fall back to defaults.
+    """
+    period = params.get('period', default_period)
+    if period not in PERIODS:
+        period = default_period
+    try:
+        end = datetime.strptime(params['end_date'], '%Y-%m-%d').date()
+    except (KeyError, ValueError):
+        end = timezone.localdate() - timedelta(days=1)
+    end = min(end, timezone.localdate())
+    return period, end - timedelta(days=PERIODS[period] - 1), end
+
+
+def daily_series(start, end):
+    """DailyStatistics for start..end in one range scan; missing days are zeros"""
+    from .models import DailyStatistics
+
+    rows = {
+        row['date']: row
+        for row in DailyStatistics.objects.filter(date__range=(start, end)).values(
+            'date', *DAILY_FIELDS, 'revenue_ksh', 'transactions_count'
+        )
+    }
+    empty = dict.fromkeys((*DAILY_FIELDS, 'revenue_ksh', 'transactions_count'), 0)
+    return [{**empty, **rows.get(day, {}), 'date': day} for day in date_range(start, end)]
+
+
+def compliance_series(start, end, compliant_score=None):
+    """Per-day OperatorStatistics compliance in one grouped range scan"""
+    from .models import OperatorStatistics
+
+    compliant_score = compliant_score or _analytics_setting('COMPLIANT_SCORE', 80)
+    rows = {
+        row['date']: row
+        for row in OperatorStatistics.objects.filter(date__range=(start, end))
+        .values('date')
+        .annotate(avg_score=Avg('compliance_score'), compliant=Count('id', filter=Q(compliance_score__gte=compliant_score)))
+        .order_by()
+    }
+    return [
+        {
+            'date': day,
+            'avg_score': round(float(rows[day]['avg_score']), 2) if day in rows else None,
+            'operators_compliant': rows[day]['compliant'] if day in rows else 0,
+        }
+        for day in date_range(start, end)
+    ]
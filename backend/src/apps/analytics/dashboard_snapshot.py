@@ -0,0 +1,334 @@
+"""
+Dashboard Snapshot
+Materialized counters behind DashboardOverviewView, kept in Redis so the
+endpoint costs one pipelined round trip regardless of table sizes.
+
+Three ways the snapshot changes:
+- Deltas: model signals (after commit) apply HINCRBY for appends that are
+  cheap to count exactly - new users (total, per county, per day), new
+  exclusions and assessments (per day), newly active exclusions and new
+  high-risk scores.
+- Dirty recounts: state transitions (exclusion deactivated, operator
+  suspended, risk level changed, deletes) mark the affected counter dirty;
+  one debounced Celery task per counter recounts it with a single query,
+  however many writes happened in the debounce window.
+- Reconcile: `reconcile_dashboard_snapshot` rebuilds everything on a beat
+  schedule. It repairs drift from writes that bypass signals
+  (QuerySet.update, bulk_create, raw SQL) and county changes, which are not
+  tracked incrementally.
+
+Deltas only apply once a snapshot exists, so a cold start never serves a
+partial one. Responses carry `snapshot_at` (last full reconcile),
+`updated_at` (last delta or recount) and `staleness_seconds`. Without Redis
+the counters are computed on each request, as before.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.core.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'nser:dashboard:snapshot'
+COUNTY_KEY = 'nser:dashboard:county'
+DAILY_KEY = 'nser:dashboard:daily:{date}'
+DIRTY_KEY = 'nser:dashboard:dirty:{counter}'
+
+COUNTERS = ('total_users', 'active_exclusions', 'total_operators', 'active_operators', 'high_risk_users')
+DAILY_FIELDS = ('users', 'exclusions', 'assessments')
+HIGH_RISK_LEVELS = ('high', 'severe', 'critical')
+GROWTH_DAYS = 7
+
+# KEYS: snapshot, county, daily; ARGV: now, daily ttl, then (key index, field, delta) triples.
+# No-op until a reconcile has created the snapshot.
+DELTA_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 3, #ARGV, 3 do
+    redis.call('HINCRBY', KEYS[tonumber(ARGV[i])], ARGV[i + 1], ARGV[i + 2])
+end
+redis.call('EXPIRE', KEYS[3], ARGV[2])
+redis.call('HSET', KEYS[1], 'updated_at', ARGV[1])
+return 1
+"""
+
+_delta_script = None
+
+
+def _analytics_setting(name, default):
+    return getattr(settings, 'ANALYTICS_SETTINGS', {}).get(name, default)
+
+
+def _daily_ttl():
+    return _analytics_setting('DASHBOARD_DAILY_TTL_DAYS', GROWTH_DAYS + 2) * 86400
+
+
+def _growth_dates(today):
+    """Dates after the growth baseline (created_at__date > today - 7 days)"""
+    return [today - timedelta(days=offset) for offset in range(GROWTH_DAYS)]
+
+
+# Counting
+
+def _count_counter(counter):
+    from apps.nser.models import SelfExclusionRecord
+    from apps.users.models import User
+    from apps.operators.models import Operator
+    from apps.screening.models import RiskScore
+
+    if counter == 'total_users':
+        return User.objects.count()
+    if counter == 'active_exclusions':
+        return SelfExclusionRecord.objects.filter(is_active=True).count()
+    if counter == 'total_operators':
+        return Operator.objects.filter(is_deleted=False).count()
+    if counter == 'active_operators':
+        return Operator.objects.filter(is_deleted=False, license_status='active').count()
+    if counter == 'high_risk_users':
+        return RiskScore.objects.filter(risk_level__in=HIGH_RISK_LEVELS).count()
+    raise ValueError(f"Unknown dashboard counter: {counter}")
+
+
+def _daily_counts(queryset, since):
+    rows = (
+        queryset.filter(created_at__date__gt=since)
+        .annotate(day=TruncDate('created_at'))
+        .values('day')
+        .annotate(count=Count('id'))
+    )
+    return {row['day']: row['count'] for row in rows}
+
+
+def compute_snapshot(today=None):
+    """Count everything from the database (one query per table)"""
+    from apps.nser.models import SelfExclusionRecord
+    from apps.users.models import User
+    from apps.operators.models import Operator
+    from apps.screening.models import AssessmentSession, RiskScore
+
+    today = today or timezone.localdate()
+    since = today - timedelta(days=GROWTH_DAYS)
+
+    operators = Operator.objects.filter(is_deleted=False).aggregate(
+        total=Count('id'), active=Count('id', filter=Q(license_status='active'))
+    )
+    counters = {
+        'total_users': User.objects.count(),
+        'active_exclusions': SelfExclusionRecord.objects.filter(is_active=True).count(),
+        'total_operators': operators['total'],
+        'active_operators': operators['active'],
+        'high_risk_users': RiskScore.objects.filter(risk_level__in=HIGH_RISK_LEVELS).count(),
+    }
+    counties = {
+        row['county'] or '': row['count']
+        for row in User.objects.values('county').annotate(count=Count('id'))
+    }
+
+    per_table = {
+        'users': _daily_counts(User.objects.all(), since),
+        'exclusions': _daily_counts(SelfExclusionRecord.objects.all(), since),
+        'assessments': _daily_counts(AssessmentSession.objects.all(), since),
+    }
+    daily = {
+        day: {field: per_table[field].get(day, 0) for field in DAILY_FIELDS}
+        for day in _growth_dates(today)
+    }
+    return {'counters': counters, 'counties': counties, 'daily': daily}
+
+
+# Writing
+
+def store_snapshot(snapshot, client=None):
+    """Replace the Redis snapshot atomically with a freshly computed one"""
+    client = client or get_redis_client()
+    if client is None:
+        return False
+
+    now = time.time()
+    pipe = client.pipeline(transaction=True)
+    pipe.delete(SNAPSHOT_KEY, COUNTY_KEY)
+    pipe.hset(SNAPSHOT_KEY, mapping={**snapshot['counters'], 'reconciled_at': now, 'updated_at': now})
+    if snapshot['counties']:
+        pipe.hset(COUNTY_KEY, mapping=snapshot['counties'])
+    for day, counts in snapshot['daily'].items():
+        key = DAILY_KEY.format(date=day.isoformat())
+        pipe.delete(key)
+        pipe.hset(key, mapping=counts)
+        pipe.expire(key, _daily_ttl())
+    pipe.execute()
+    return True
+
+
+def reconcile():
+    """Recompute and store the whole snapshot; returns the counters"""
+    snapshot = compute_snapshot()
+    store_snapshot(snapshot)
+    return snapshot['counters']
+
+
+def apply_delta(created_at=None, county=None, **deltas):
+    """
+    Apply counter deltas after commit, e.g. apply_delta(created_at, users=1, total_users=1).
+    Keyword names are COUNTERS or DAILY_FIELDS; `county` adjusts the county
+    distribution by the `total_users` delta.
+    """
+    global _delta_script
+
+    client = get_redis_client()
+    if client is None:
+        return False
+
+    day = timezone.localdate(created_at) if created_at else timezone.localdate()
+    args = [time.time(), _daily_ttl()]
+    for field, delta in deltas.items():
+        if not delta:
+            continue
+        args += [1 if field in COUNTERS else 3, field, delta]
+        if field == 'total_users' and county is not None:
+            args += [2, county, delta]
+
+    if len(args) == 2:
+        return False
+    try:
+        if _delta_script is None:
+            _delta_script = client.register_script(DELTA_LUA)
+        keys = [SNAPSHOT_KEY, COUNTY_KEY, DAILY_KEY.format(date=day.isoformat())]
+        return bool(_delta_script(keys=keys, args=args, client=client))
+    except Exception as e:
+        logger.warning(f"Failed to apply dashboard delta {deltas}: {str(e)}")
+        return False
+
+
+def mark_dirty(*counters):
+    """Schedule one debounced recount per counter"""
+    from .tasks import refresh_dashboard_counters
+
+    client = get_redis_client()
+    if client is None:
+        return
+    debounce = _analytics_setting('DASHBOARD_RECOUNT_DEBOUNCE_SECONDS', 10)
+    try:
+        pending = [
+            counter for counter in counters
+            if client.set(DIRTY_KEY.format(counter=counter), 1, nx=True, ex=debounce * 6)
+        ]
+        if pending:
+            refresh_dashboard_counters.apply_async(args=[pending], countdown=debounce)
+    except Exception as e:
+        logger.warning(f"Failed to schedule dashboard recount for {counters}: {str(e)}")
+
+
+def refresh_counters(counters):
+    """Recount the given counters into an existing snapshot"""
+    client = get_redis_client()
+    if client is None:
+        return {}
+    # Clear the dirty flags first: writes landing during the recount schedule another one
+    client.delete(*[DIRTY_KEY.format(counter=counter) for counter in counters])
+    if not client.exists(SNAPSHOT_KEY):
+        return {}
+    values = {counter: _count_counter(counter) for counter in counters}
+    client.hset(SNAPSHOT_KEY, mapping={**values, 'updated_at': time.time()})
+    return values
+
+
+# Reading
+
+def _as_int_map(raw):
+    return {
+        (key.decode() if isinstance(key, bytes) else key): int(float(value))
+        for key, value in raw.items()
+    }
+
+
+def _load(client, today):
+    dates = _growth_dates(today)
+    pipe = client.pipeline(transaction=False)
+    pipe.hgetall(SNAPSHOT_KEY)
+    pipe.hgetall(COUNTY_KEY)
+    for day in dates:
+        pipe.hgetall(DAILY_KEY.format(date=day.isoformat()))
+    snapshot, counties, *daily = pipe.execute()
+    if not snapshot:
+        return None
+
+    snapshot = {
+        (key.decode() if isinstance(key, bytes) else key): float(value)
+        for key, value in snapshot.items()
+    }
+    return {
+        'counters': {counter: int(snapshot.get(counter, 0)) for counter in COUNTERS},
+        'counties': _as_int_map(counties),
+        'daily': {
+            day: {field: counts.get(field, 0) for field in DAILY_FIELDS}
+            for day, counts in zip(dates, (_as_int_map(raw) for raw in daily))
+        },
+        'reconciled_at': snapshot.get('reconciled_at'),
+        'updated_at': snapshot.get('updated_at'),
+    }
+
+
+def get_snapshot():
+    """
+    Snapshot from Redis, built on first use. Returns the dict shape of
+    compute_snapshot() plus 'reconciled_at'/'updated_at' epoch seconds.
+    """
+    today = timezone.localdate()
+    client = get_redis_client()
+    if client is not None:
+        try:
+            snapshot = _load(client, today)
+            if snapshot is None:
+                store_snapshot(compute_snapshot(today), client)
+                snapshot = _load(client, today)
+            if snapshot is not None:
+                return snapshot
+        except Exception as e:
+            logger.warning(f"Dashboard snapshot unavailable, counting live: {str(e)}")
+
+    now = time.time()
+    return {**compute_snapshot(today), 'reconciled_at': now, 'updated_at': now}
+
+
+def dashboard_counts(snapshot, today=None, top_counties=5):
+    """The count fields of the dashboard overview, derived from a snapshot"""
+    today = today or timezone.localdate()
+    counters = snapshot['counters']
+    daily = snapshot['daily']
+    today_counts = daily.get(today, {})
+
+    total_users = counters['total_users']
+    week_ago_users = total_users - sum(counts.get('users', 0) for counts in daily.values())
+    users_growth_7d = ((total_users - week_ago_users) / max(week_ago_users, 1)) * 100 if week_ago_users > 0 else 0
+
+    counties = sorted(
+        ((county, count) for county, count in snapshot['counties'].items() if count > 0),
+        key=lambda item: -item[1]
+    )[:top_counties]
+
+    return {
+        **counters,
+        'new_exclusions_today': today_counts.get('exclusions', 0),
+        'assessments_today': today_counts.get('assessments', 0),
+        'users_growth_7d': round(users_growth_7d, 1),
+        'geographic_distribution': {county or 'Unknown': count for county, count in counties},
+    }
+
+
+def staleness(snapshot, now=None):
+    now = now or time.time()
+    reconciled_at = snapshot.get('reconciled_at') or now
+    updated_at = snapshot.get('updated_at') or reconciled_at
+    tz = timezone.get_current_timezone()
+    return {
+        'snapshot_at': datetime.fromtimestamp(reconciled_at, tz).isoformat(),
+        'updated_at': datetime.fromtimestamp(updated_at, tz).isoformat(),
+        'staleness_seconds': round(max(now - reconciled_at, 0), 1),
+    }
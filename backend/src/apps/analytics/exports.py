@@ -0,0 +1,308 @@
+"""
+Streaming Data Exports
+Full-table CSV/XLSX exports with memory that stays flat in the row count.
+
+- Rows come from `values_list(...).iterator(chunk_size=...)`: a server-side
+  cursor on PostgreSQL, related columns joined in the same query (no
+  per-row lookups, no model instances).
+- CSV is streamed straight into a StreamingHttpResponse, EXPORT_CSV_BATCH_ROWS
+  rows per chunk written to the socket.
+- XLSX uses openpyxl's write-only workbook, which spills rows to a temp file
+  as they are appended; the finished file is streamed from disk. Sheets
+  roll over at Excel's row limit.
+- Exports expected to exceed EXPORT_SYNC_MAX_ROWS (or requested with
+  `background`) run as `export_data` Celery jobs that write to the default
+  storage. Job state lives in the cache for EXPORT_RETENTION_HOURS and the
+  file is served through ExportDownloadView, behind the same permissions.
+- Export reads are replica-safe: with a healthy read replica they run
+  there instead of on the primary.
+"""
+import csv
+import logging
+import tempfile
+import uuid
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from apps.core.db_routing import replica_reads
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'excel': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'pdf': ('application/pdf', 'pdf'),
+}
+XLSX_MAX_ROWS = 1048576  # per sheet, including the header
+JOB_KEY = 'analytics:export:{job_id}'
+STORAGE_DIR = 'exports'
+
+
+def _analytics_setting(name, default):
+    return getattr(settings, 'ANALYTICS_SETTINGS', {}).get(name, default)
+
+
+def _operators():
+    from apps.operators.models import Operator
+
+    return Operator.objects.order_by('name').values_list(
+        'name', 'license_number', 'license_status', 'license_expiry_date', 'created_at'
+    )
+
+
+def _exclusions():
+    from apps.nser.models import SelfExclusionRecord
+
+    return SelfExclusionRecord.objects.order_by('created_at').values_list(
+        'exclusion_reference', 'user__phone_number', 'exclusion_period', 'status',
+        'effective_date', 'expiry_date', 'actual_end_date', 'created_at'
+    )
+
+
+# report_type -> (header, queryset of value tuples)
+EXPORTS = {
+    'operators': (
+        ['Operator Name', 'License Number', 'Status', 'License Expiry', 'Created At'],
+        _operators
+    ),
+    'exclusions': (
+        ['Reference', 'User Phone', 'Period', 'Status', 'Effective Date', 'Expiry Date', 'Ended At', 'Created At'],
+        _exclusions
+    ),
+}
+
+
+def filename(report_type, export_format):
+    return f"{report_type}_{timezone.localdate()}.{FORMATS[export_format][1]}"
+
+
+@replica_reads()
+def count_rows(report_type):
+    return EXPORTS[report_type][1]().count()
+
+
+def iter_rows(report_type, chunk_size=None, limit=None):
+    """Yield the header, then every row (or the first `limit`) as a tuple, from a server-side cursor"""
+    header, queryset = EXPORTS[report_type]
+    queryset = queryset() if limit is None else queryset()[:limit]
+    yield header
+    with replica_reads():
+        yield from queryset.iterator(chunk_size=chunk_size or _analytics_setting('EXPORT_CHUNK_SIZE', 2000))
+
+
+def _csv_value(value):
+    if value is None:
+        return 'N/A'
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _xlsx_value(value):
+    if value is None:
+        return 'N/A'
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)  # Excel has no time zones
+    return value
+
+
+class _Buffer:
+    """Write target that hands back what csv.writer wrote"""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, value):
+        self.parts.append(value)
+
+    def drain(self):
+        data, self.parts = ''.join(self.parts), []
+        return data
+
+
+def stream_csv(rows, batch_rows=None):
+    """Yield CSV text, batch_rows rows at a time"""
+    batch_rows = batch_rows or _analytics_setting('EXPORT_CSV_BATCH_ROWS', 500)
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([_csv_value(value) for value in row])
+        if count % batch_rows == 0:
+            yield buffer.drain()
+    tail = buffer.drain()
+    if tail:
+        yield tail
+
+
+class _Counted:
+    """Iterate rows (header first) while counting the data rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = -1
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            yield row
+
+
+def write_xlsx(rows, fileobj, title='Export'):
+    """Write header + rows to an XLSX file object in write-only mode; returns data rows"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    header = next(rows)
+    sheet, sheet_rows, written = None, XLSX_MAX_ROWS, 0
+    for row in rows:
+        if sheet_rows == XLSX_MAX_ROWS:
+            sheet = workbook.create_sheet(title if sheet is None else f"{title} {len(workbook.sheetnames) + 1}")
+            sheet.append(header)
+            sheet_rows = 1
+        sheet.append([_xlsx_value(value) for value in row])
+        sheet_rows += 1
+        written += 1
+    if sheet is None:
+        workbook.create_sheet(title).append(header)
+    workbook.save(fileobj)
+    return written
+
+
+def write_pdf(rows, fileobj, title='Export', max_rows=None):
+    """
+    Write header + up to max_rows rows as a paginated PDF table; returns
+    data rows written. Rows are laid out in blocks so no single table has
+    to be measured whole; past PDF_MAX_ROWS the CSV/Excel exports apply.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    max_rows = max_rows or _analytics_setting('PDF_MAX_ROWS', 10000)
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#1e40af'))
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+
+    elements = [
+        Paragraph(f'GRAK {title.upper()} REPORT', title_style),
+        Spacer(1, 0.3 * inch),
+        Paragraph(f'Generated: {timezone.localtime().strftime("%Y-%m-%d %H:%M")}', styles['Normal']),
+        Spacer(1, 0.5 * inch),
+    ]
+    header = next(rows)
+    block, written = [], 0
+    for row in rows:
+        block.append([str(_csv_value(value)) for value in row])
+        written += 1
+        if len(block) == 500:
+            elements.append(Table([header, *block], repeatRows=1, style=table_style))
+            block = []
+        if written == max_rows:
+            break
+    if block or not written:
+        elements.append(Table([header, *block], repeatRows=1, style=table_style))
+    if written == max_rows:
+        elements.append(Spacer(1, 0.3 * inch))
+        elements.append(Paragraph(
+            f'Showing the first {max_rows} rows. Use the CSV or Excel export for the full data.', styles['Normal']
+        ))
+
+    SimpleDocTemplate(fileobj, pagesize=landscape(A4)).build(elements)
+    return written
+
+
+def write_export(report_type, export_format, fileobj):
+    """Write a whole export to a binary file object; returns data rows written"""
+    if export_format == 'excel':
+        return write_xlsx(iter_rows(report_type), fileobj, title=report_type.capitalize())
+    if export_format == 'pdf':
+        max_rows = _analytics_setting('PDF_MAX_ROWS', 10000)
+        return write_pdf(iter_rows(report_type, limit=max_rows), fileobj, title=report_type, max_rows=max_rows)
+
+    rows = _Counted(iter_rows(report_type))
+    for chunk in stream_csv(rows):
+        fileobj.write(chunk.encode('utf-8'))
+    return rows.count
+
+
+# Background jobs
+
+def _job_timeout():
+    return _analytics_setting('EXPORT_RETENTION_HOURS', 24) * 3600
+
+
+def get_job(job_id):
+    return cache.get(JOB_KEY.format(job_id=job_id))
+
+
+def _update_job(job_id, **fields):
+    job = get_job(job_id) or {'job_id': job_id}
+    job.update(fields)
+    cache.set(JOB_KEY.format(job_id=job_id), job, _job_timeout())
+    return job
+
+
+def start_export_job(report_type, export_format, user_id=None):
+    """Queue an export_data job; returns its initial state"""
+    from .tasks import export_data
+
+    job_id = uuid.uuid4().hex
+    job = _update_job(
+        job_id, status='queued', report_type=report_type, format=export_format,
+        user_id=str(user_id) if user_id else None, created_at=timezone.now().isoformat()
+    )
+    export_data.delay(export_format, report_type, job_id)
+    return job
+
+
+def run_export_job(job_id, report_type, export_format):
+    """Write the export to default storage under exports/<job_id>/"""
+    _update_job(job_id, status='running', started_at=timezone.now().isoformat())
+    try:
+        with tempfile.TemporaryFile() as fileobj:
+            rows = write_export(report_type, export_format, fileobj)
+            fileobj.seek(0)
+            path = default_storage.save(
+                f"{STORAGE_DIR}/{job_id}/{filename(report_type, export_format)}", File(fileobj)
+            )
+    except Exception as e:
+        logger.error(f"Export job {job_id} ({report_type}/{export_format}) failed: {str(e)}")
+        _update_job(job_id, status='failed', error=str(e), finished_at=timezone.now().isoformat())
+        raise
+    return _update_job(job_id, status='done', rows=rows, file=path, finished_at=timezone.now().isoformat())
+
+
+def cleanup_exports(now=None):
+    """Delete export files older than EXPORT_RETENTION_HOURS; returns files deleted"""
+    now = now or timezone.now()
+    deleted = 0
+    try:
+        job_dirs, _ = default_storage.listdir(STORAGE_DIR)
+    except (FileNotFoundError, NotImplementedError):
+        return 0
+    for job_dir in job_dirs:
+        _, files = default_storage.listdir(f"{STORAGE_DIR}/{job_dir}")
+        for name in files:
+            path = f"{STORAGE_DIR}/{job_dir}/{name}"
+            if (now - default_storage.get_modified_time(path)).total_seconds() > _job_timeout():
+                default_storage.delete(path)
+                deleted += 1
+    return deleted
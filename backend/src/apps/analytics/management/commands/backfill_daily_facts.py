@@ -0,0 +1,42 @@
+"""
+Management command to rebuild the daily fact tables for a date range
+Usage: python manage.py backfill_daily_facts --start 2025-01-01 [--end 2025-12-31] [--async]
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.analytics.daily_facts import backfill
+
+
+class Command(BaseCommand):
+    help = 'Rebuild DailyStatistics, OperatorStatistics and RiskAnalytics for a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, type=date.fromisoformat, help='First day (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last day (YYYY-MM-DD, default today)')
+        parser.add_argument('--chunk-days', type=int, help='Days rebuilt per transaction')
+        parser.add_argument(
+            '--async',
+            action='store_true',
+            dest='run_async',
+            help='Queue a backfill_daily_facts task instead of running here'
+        )
+
+    def handle(self, *args, **options):
+        start, end = options['start'], options['end'] or timezone.localdate()
+        if start > end:
+            raise CommandError('--start must not be after --end')
+
+        if options['run_async']:
+            from apps.analytics.tasks import backfill_daily_facts
+            backfill_daily_facts.delay(start.isoformat(), end.isoformat())
+            self.stdout.write(self.style.SUCCESS(f'Backfill of {start}..{end} queued'))
+            return
+
+        total = 0
+        for chunk_start, chunk_end, rows in backfill(start, end, options['chunk_days']):
+            total += rows
+            self.stdout.write(f'{chunk_start}..{chunk_end}: {rows} rows')
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {start}..{end}: {total} rows'))
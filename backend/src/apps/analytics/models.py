@@ -146,16 +146,33 @@ class APIUsageMetrics(TimeStampedModel):
 
 
 class Report(TimeStampedModel):
-    """Generated reports"""
+    """Generated reports, built as background jobs (see apps.analytics.report_jobs)"""
     report_name = models.CharField(max_length=255)
     report_type = models.CharField(max_length=50, db_index=True)
-    period_start = models.DateField()
-    period_end = models.DateField()
+    period_start = models.DateField(null=True, blank=True)
+    period_end = models.DateField(null=True, blank=True)
     generated_by = models.ForeignKey('users.User', on_delete=models.SET_NULL, null=True, blank=True)
     file_url = models.URLField(blank=True)
     report_data = models.JSONField(default=dict)
     
+    # Job state
+    status = models.CharField(max_length=20, choices=[
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    ], default='queued', db_index=True)
+    progress = models.PositiveSmallIntegerField(default=0)
+    parameters = models.JSONField(default=dict, blank=True)
+    params_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    error_message = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         db_table = 'analytics_reports'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['params_hash', 'status'], name='report_params_status_idx'),
+        ]
 
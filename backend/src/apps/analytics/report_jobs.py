@@ -0,0 +1,367 @@
+"""
+Report Jobs
+Reports are built by the `generate_report` task on the analytics queue,
+never inside the request. The Report row is the job:
+
+- status moves queued -> running -> done | failed; `progress` (0-100) is
+  updated as chunks complete, at most every REPORT_PROGRESS_STEP percent.
+- Period reports gather data one month at a time from the daily fact
+  tables (building any missing days first), so memory and query size do
+  not grow with the period.
+- Requests are keyed by a hash of (type, period, parameters). An identical
+  request returns the queued/running job, or a finished one that is still
+  fresh: completed within REPORT_CACHE_HOURS, or completed after its
+  period ended (closed periods do not change). `refresh` forces a rebuild.
+  Jobs stuck running past REPORT_STALE_MINUTES are not reused.
+- When a job finishes or fails, the requester's dashboard WebSocket group
+  receives a `report_status` event.
+- Views in any app queue jobs through ReportJobMixin.
+"""
+import hashlib
+import json
+import logging
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Avg, Max, Q, Sum
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from apps.api.mixins import SuccessResponseMixin
+from apps.core.db_routing import PRIMARY, replica_reads
+
+logger = logging.getLogger(__name__)
+
+# Period summaries, including the GenerateReportSerializer types
+PERIOD_TYPES = (
+    'monthly', 'quarterly', 'annual', 'custom', 'summary',
+    'monthly_summary', 'quarterly_summary', 'annual_summary', 'operator_performance',
+    'user_activity', 'compliance', 'financial', 'risk_assessment'
+)
+SECTIONS = ('totals', 'closing', 'monthly', 'risk_distribution', 'operators')
+AUTHORITIES = {'grak': 'GRAK', 'nacada': 'NACADA', 'dci': 'DCI'}
+
+
+def _analytics_setting(name, default):
+    return getattr(settings, 'ANALYTICS_SETTINGS', {}).get(name, default)
+
+
+# Periods
+
+def previous_period(kind, today=None):
+    """The last complete month, quarter or year before today"""
+    today = today or timezone.localdate()
+    if kind == 'annual':
+        return date(today.year - 1, 1, 1), date(today.year - 1, 12, 31)
+    if kind == 'quarterly':
+        quarter_start = date(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+        end = quarter_start - timedelta(days=1)
+        return date(end.year, end.month - 2, 1), end
+    end = today.replace(day=1) - timedelta(days=1)
+    return end.replace(day=1), end
+
+
+def month_chunks(start, end):
+    """Split start..end (inclusive) at month boundaries"""
+    chunks = []
+    chunk_start = start
+    while chunk_start <= end:
+        next_month = (chunk_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        chunk_end = min(next_month - timedelta(days=1), end)
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + timedelta(days=1)
+    return chunks
+
+
+# Progress
+
+class Progress:
+    """Throttled progress writes for one report"""
+
+    def __init__(self, report):
+        self.report = report
+        self.step = _analytics_setting('REPORT_PROGRESS_STEP', 5)
+        self.last = report.progress
+
+    def __call__(self, done, total):
+        percent = min(int(done * 100 / max(total, 1)), 99)
+        if percent - self.last >= self.step:
+            # Explicit alias: job bookkeeping must not pin the builder's reads to the primary
+            type(self.report).objects.using(PRIMARY).filter(pk=self.report.pk).update(progress=percent)
+            self.last = percent
+
+
+# Builders: (report, progress) -> report_data
+
+def _ensure_facts(start, end):
+    from .daily_facts import build_daily_facts, date_range
+    from .models import DailyStatistics
+
+    built = DailyStatistics.objects.filter(date__range=(start, end)).count()
+    if built < len(date_range(start, end)):
+        build_daily_facts(start, end)
+
+
+def build_period_summary(report, progress):
+    from .models import DailyStatistics, OperatorStatistics, RiskAnalytics
+
+    chunks = month_chunks(report.period_start, report.period_end)
+    operator_stats = OperatorStatistics.objects.all()
+    if report.parameters.get('operator_ids'):
+        operator_stats = operator_stats.filter(operator_id__in=report.parameters['operator_ids'])
+    totals = {'new_users': 0, 'new_exclusions': 0, 'assessments': 0, 'api_calls': 0}
+    risk, operators, months = {}, {}, []
+
+    for index, (start, end) in enumerate(chunks, start=1):
+        _ensure_facts(start, end)
+        daily = DailyStatistics.objects.filter(date__range=(start, end))
+        month = daily.aggregate(
+            new_users=Sum('new_users'), new_exclusions=Sum('new_exclusions'),
+            assessments=Sum('total_assessments'), api_calls=Sum('api_calls_total'),
+            high_risk_peak=Max('high_risk_users')
+        )
+        closing = daily.order_by('-date').values('total_users', 'active_exclusions').first() or {}
+        months.append({
+            'month': start.strftime('%Y-%m'),
+            **{key: value or 0 for key, value in month.items()},
+            'total_users': closing.get('total_users', 0),
+            'active_exclusions': closing.get('active_exclusions', 0),
+        })
+        for key in totals:
+            totals[key] += month[key] or 0
+
+        for row in RiskAnalytics.objects.filter(date__range=(start, end)).values('risk_level').annotate(
+            users=Sum('user_count')
+        ).order_by():
+            risk[row['risk_level']] = risk.get(row['risk_level'], 0) + row['users']
+
+        for row in operator_stats.filter(date__range=(start, end)).values(
+            'operator_id', 'operator__name'
+        ).annotate(
+            screenings=Sum('screenings_conducted'), exclusions=Sum('exclusions_enforced'),
+            api_calls=Sum('api_calls'), compliance=Avg('compliance_score')
+        ).order_by():
+            entry = operators.setdefault(str(row['operator_id']), {
+                'operator': row['operator__name'], 'screenings': 0, 'exclusions_enforced': 0,
+                'api_calls': 0, 'compliance_scores': []
+            })
+            entry['screenings'] += row['screenings'] or 0
+            entry['exclusions_enforced'] += row['exclusions'] or 0
+            entry['api_calls'] += row['api_calls'] or 0
+            entry['compliance_scores'].append(float(row['compliance'] or 0))
+
+        progress(index, len(chunks))
+
+    for entry in operators.values():
+        scores = entry.pop('compliance_scores')
+        entry['compliance_score'] = round(sum(scores) / len(scores), 2) if scores else None
+
+    data = {
+        'totals': totals,
+        'closing': {key: months[-1][key] for key in ('total_users', 'active_exclusions')} if months else {},
+        'monthly': months,
+        'risk_distribution': risk,
+        'operators': sorted(operators.values(), key=lambda entry: -entry['screenings'])[
+            :_analytics_setting('REPORT_TOP_OPERATORS', 50)
+        ],
+    }
+    sections = report.parameters.get('sections') or SECTIONS
+    return {
+        'period': {'start': report.period_start.isoformat(), 'end': report.period_end.isoformat()},
+        **{section: data[section] for section in SECTIONS if section in sections}
+    }
+
+
+def build_regulatory(report, progress):
+    """Period summary filed as a draft RegulatoryReport for the authority"""
+    from apps.compliance.models import RegulatoryReport
+
+    data = build_period_summary(report, progress)
+    authority = report.parameters.get('authority', 'grak')
+    regulatory, _ = RegulatoryReport.objects.update_or_create(
+        report_reference=f"{authority.upper()}-{report.period_start:%Y%m%d}-{report.period_end:%Y%m%d}",
+        defaults={
+            'report_type': authority,
+            'reporting_period_start': report.period_start,
+            'reporting_period_end': report.period_end,
+            'submitted_to': AUTHORITIES[authority],
+            'report_data': data,
+            'status': 'draft',
+        }
+    )
+    return {**data, 'regulatory_report_id': str(regulatory.pk)}
+
+
+def build_pdf_export(report, progress):
+    """Table export rendered to PDF in storage"""
+    import tempfile
+    from .exports import EXPORTS, count_rows, filename, iter_rows, write_pdf
+
+    report_type = report.parameters.get('report_type', 'operators')
+    if report_type not in EXPORTS:
+        raise ValueError(f"Unknown export: {report_type}")
+    max_rows = _analytics_setting('PDF_MAX_ROWS', 10000)
+    total = min(count_rows(report_type), max_rows)
+
+    def rows():
+        for index, row in enumerate(iter_rows(report_type, limit=max_rows)):
+            if index and index % 1000 == 0:
+                progress(index, total)
+            yield row
+
+    with tempfile.TemporaryFile() as fileobj:
+        written = write_pdf(rows(), fileobj, title=report_type, max_rows=max_rows)
+        fileobj.seek(0)
+        path = default_storage.save(f"reports/{report.pk}/{filename(report_type, 'pdf')}", File(fileobj))
+    return {'file': path, 'content_type': 'application/pdf', 'rows': written, 'truncated': written == max_rows}
+
+
+BUILDERS = {
+    **{kind: build_period_summary for kind in PERIOD_TYPES},
+    'regulatory': build_regulatory,
+    'pdf_export': build_pdf_export,
+}
+
+
+# Jobs
+
+def params_hash(report_type, period_start, period_end, parameters):
+    payload = json.dumps(
+        [report_type, str(period_start), str(period_end), parameters], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _reusable(report_type, digest, period_end):
+    from .models import Report
+
+    now = timezone.now()
+    candidates = Report.objects.filter(report_type=report_type, params_hash=digest)
+    in_flight = candidates.filter(
+        status__in=['queued', 'running'],
+        created_at__gte=now - timedelta(minutes=_analytics_setting('REPORT_STALE_MINUTES', 60))
+    ).first()
+    if in_flight:
+        return in_flight
+
+    fresh = Q(completed_at__gte=now - timedelta(hours=_analytics_setting('REPORT_CACHE_HOURS', 6)))
+    if period_end is not None:
+        fresh |= Q(completed_at__date__gt=period_end)
+    return candidates.filter(fresh, status='done').order_by('-completed_at').first()
+
+
+def start_report(report_type, user=None, period_start=None, period_end=None, parameters=None,
+                 report_name=None, refresh=False):
+    """
+    Queue a report job, or return an identical queued/running/fresh one.
+    Returns (report, created).
+    """
+    from .models import Report
+    from .tasks import generate_report
+
+    if report_type not in BUILDERS:
+        raise ValueError(f"Unknown report type: {report_type}")
+    if report_type in (*PERIOD_TYPES, 'regulatory') and (period_start is None or period_end is None):
+        raise ValueError('Period reports need period_start and period_end')
+    if period_start and period_end and period_start > period_end:
+        raise ValueError('period_start must not be after period_end')
+
+    parameters = parameters or {}
+    digest = params_hash(report_type, period_start, period_end, parameters)
+    if not refresh:
+        existing = _reusable(report_type, digest, period_end)
+        if existing is not None:
+            return existing, False
+
+    report = Report.objects.create(
+        report_name=report_name or f"{report_type.replace('_', ' ').title()} report",
+        report_type=report_type,
+        period_start=period_start,
+        period_end=period_end,
+        generated_by=user if user is not None and user.is_authenticated else None,
+        parameters=parameters,
+        params_hash=digest,
+        status='queued'
+    )
+    report_id = str(report.pk)
+    transaction.on_commit(lambda: generate_report.delay(report_id))
+    return report, True
+
+
+def run_report(report_id):
+    """Build one queued report; the Celery task body"""
+    from .models import Report
+
+    claimed = Report.objects.filter(pk=report_id, status='queued').update(
+        status='running', started_at=timezone.now(), progress=0
+    )
+    if not claimed:
+        logger.info(f"Report {report_id} is not queued, skipping")
+        return None
+
+    report = Report.objects.get(pk=report_id)
+    try:
+        # A fresh unit of work: builder reads may use the replica until they write
+        with replica_reads():
+            data = BUILDERS[report.report_type](report, Progress(report))
+    except Exception as e:
+        logger.error(f"Report {report_id} ({report.report_type}) failed: {str(e)}")
+        report.status = 'failed'
+        report.error_message = str(e)[:2000]
+        report.completed_at = timezone.now()
+        report.save(update_fields=['status', 'error_message', 'completed_at', 'updated_at'])
+        notify(report)
+        raise
+
+    report.report_data = data
+    if data.get('file'):
+        report.file_url = reverse('analytics:report-download', args=[report.pk])
+    report.status = 'done'
+    report.progress = 100
+    report.completed_at = timezone.now()
+    report.save(update_fields=['report_data', 'file_url', 'status', 'progress', 'completed_at', 'updated_at'])
+    notify(report)
+    return report
+
+
+def notify(report):
+    """Tell the requester's dashboard that the job finished"""
+    if report.generated_by_id is None:
+        return
+    from apps.core.websocket_utils import broadcaster
+
+    broadcaster.broadcast_to_dashboard(report.generated_by_id, 'report_status', {
+        'report_id': str(report.pk),
+        'report_type': report.report_type,
+        'status': report.status,
+        'file_url': report.file_url,
+        'error': report.error_message,
+    })
+
+
+# Views
+
+class ReportJobMixin(SuccessResponseMixin):
+    """Queue a report job and answer with its state (202 when newly queued)"""
+
+    def report_job_response(self, request, report_type, period_start=None, period_end=None,
+                            parameters=None, refresh=False):
+        from .serializers import ReportSerializer
+
+        try:
+            report, created = start_report(
+                report_type, user=request.user, period_start=period_start, period_end=period_end,
+                parameters=parameters, refresh=refresh
+            )
+        except ValueError as e:
+            return self.error_response(str(e))
+
+        return self.success_response(
+            data=ReportSerializer(report).data,
+            message='Report generation started' if created else f'Existing report returned ({report.status})',
+            status_code=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK
+        )
@@ -59,9 +59,14 @@ class ReportSerializer(serializers.ModelSerializer):
             'period_start', 'period_end',
             'generated_by', 'generated_by_name',
             'file_url', 'report_data',
+            'status', 'progress', 'parameters', 'error_message',
+            'started_at', 'completed_at',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'file_url', 'created_at', 'updated_at']
+        read_only_fields = [
+            'id', 'file_url', 'status', 'progress', 'parameters', 'error_message',
+            'started_at', 'completed_at', 'created_at', 'updated_at'
+        ]
 
 
 class DashboardOverviewSerializer(serializers.Serializer):
@@ -141,6 +146,7 @@ class GenerateReportSerializer(serializers.Serializer):
         child=serializers.UUIDField(),
         required=False
     )
+    refresh = serializers.BooleanField(default=False)
     
     def validate(self, attrs):
         if attrs['period_end'] <= attrs['period_start']:
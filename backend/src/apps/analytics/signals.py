@@ -0,0 +1,78 @@
+"""
+Analytics Signals
+Keep the materialized dashboard snapshot in step with writes
+(see apps.analytics.dashboard_snapshot)
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.nser.models import SelfExclusionRecord
+from apps.operators.models import Operator
+from apps.screening.models import AssessmentSession, RiskScore
+from apps.users.models import User
+from .dashboard_snapshot import HIGH_RISK_LEVELS, apply_delta, mark_dirty
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or bool(set(update_fields) & fields)
+
+
+@receiver(post_save, sender=User)
+def count_new_user(sender, instance, created, **kwargs):
+    if created:
+        created_at, county = instance.created_at, instance.county or ''
+        transaction.on_commit(lambda: apply_delta(created_at, county=county, total_users=1, users=1))
+
+
+@receiver(post_delete, sender=User)
+def uncount_deleted_user(sender, instance, **kwargs):
+    created_at, county = instance.created_at, instance.county or ''
+    transaction.on_commit(lambda: apply_delta(created_at, county=county, total_users=-1, users=-1))
+
+
+@receiver(post_save, sender=SelfExclusionRecord)
+def count_exclusion(sender, instance, created, **kwargs):
+    if created:
+        created_at, active = instance.created_at, int(bool(instance.is_active))
+        transaction.on_commit(lambda: apply_delta(created_at, exclusions=1, active_exclusions=active))
+    elif _touches(kwargs.get('update_fields'), {'is_active'}):
+        transaction.on_commit(lambda: mark_dirty('active_exclusions'))
+
+
+@receiver(post_delete, sender=SelfExclusionRecord)
+def uncount_deleted_exclusion(sender, instance, **kwargs):
+    created_at = instance.created_at
+    transaction.on_commit(lambda: apply_delta(created_at, exclusions=-1))
+    transaction.on_commit(lambda: mark_dirty('active_exclusions'))
+
+
+@receiver(post_save, sender=Operator)
+@receiver(post_delete, sender=Operator)
+def recount_operators(sender, instance, **kwargs):
+    if kwargs.get('signal') is post_save and not _touches(kwargs.get('update_fields'), {'is_deleted', 'license_status'}):
+        return
+    transaction.on_commit(lambda: mark_dirty('total_operators', 'active_operators'))
+
+
+@receiver(post_save, sender=AssessmentSession)
+@receiver(post_delete, sender=AssessmentSession)
+def count_assessment(sender, instance, created=False, **kwargs):
+    if kwargs.get('signal') is post_save and not created:
+        return
+    created_at, delta = instance.created_at, 1 if created else -1
+    transaction.on_commit(lambda: apply_delta(created_at, assessments=delta))
+
+
+@receiver(post_save, sender=RiskScore)
+def count_high_risk_score(sender, instance, created, **kwargs):
+    if created:
+        if instance.risk_level in HIGH_RISK_LEVELS:
+            transaction.on_commit(lambda: apply_delta(high_risk_users=1))
+    elif _touches(kwargs.get('update_fields'), {'risk_level'}):
+        transaction.on_commit(lambda: mark_dirty('high_risk_users'))
+
+
+@receiver(post_delete, sender=RiskScore)
+def recount_deleted_risk_score(sender, instance, **kwargs):
+    transaction.on_commit(lambda: mark_dirty('high_risk_users'))
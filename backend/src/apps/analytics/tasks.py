@@ -0,0 +1,80 @@
+"""
+Analytics Tasks Module
+Dashboard snapshot maintenance, daily fact tables, data exports and report jobs
+"""
+from celery import shared_task
+from datetime import date
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def reconcile_dashboard_snapshot():
+    """Rebuild the dashboard snapshot from the database, repairing any drift"""
+    from .dashboard_snapshot import reconcile
+    
+    counters = reconcile()
+    logger.info(f"Dashboard snapshot reconciled: {counters}")
+    return counters
+
+
+@shared_task(ignore_result=True)
+def refresh_dashboard_counters(counters):
+    """Debounced recount of counters marked dirty by state changes"""
+    from .dashboard_snapshot import refresh_counters
+    
+    return refresh_counters(counters)
+
+
+@shared_task(ignore_result=True)
+def update_daily_facts():
+    """Rebuild daily facts from the last built day through today"""
+    from .daily_facts import update_daily_facts as update
+    
+    start, end, rows = update()
+    logger.info(f"Daily facts rebuilt for {start}..{end}: {rows} rows")
+    return {'start': start.isoformat(), 'end': end.isoformat(), 'rows': rows}
+
+
+@shared_task(ignore_result=True, time_limit=3600)
+def backfill_daily_facts(start_date, end_date):
+    """Rebuild daily facts for an ISO date range, one chunk at a time"""
+    from .daily_facts import backfill
+    
+    total = 0
+    for chunk_start, chunk_end, rows in backfill(date.fromisoformat(start_date), date.fromisoformat(end_date)):
+        total += rows
+        logger.info(f"Daily facts backfilled for {chunk_start}..{chunk_end}: {rows} rows")
+    return {'rows': total}
+
+
+@shared_task(ignore_result=True, time_limit=4 * 3600, soft_time_limit=4 * 3600 - 60)
+def export_data(export_format, report_type='exclusions', job_id=None):
+    """Write a full export to storage (see apps.analytics.exports)"""
+    from .exports import run_export_job
+    import uuid
+    
+    job = run_export_job(job_id or uuid.uuid4().hex, report_type, export_format)
+    logger.info(f"Export {job['job_id']} written: {job['rows']} rows to {job['file']}")
+    return job
+
+
+@shared_task(ignore_result=True)
+def cleanup_exports():
+    """Delete export files past their retention"""
+    from .exports import cleanup_exports as cleanup
+    
+    deleted = cleanup()
+    logger.info(f"Deleted {deleted} expired export files")
+    return {'deleted': deleted}
+
+
+@shared_task(ignore_result=True, time_limit=2 * 3600, soft_time_limit=2 * 3600 - 60)
+def generate_report(report_id):
+    """Build a queued Report (see apps.analytics.report_jobs)"""
+    from .report_jobs import run_report
+    
+    report = run_report(report_id)
+    if report is not None:
+        logger.info(f"Report {report_id} ({report.report_type}) built")
@@ -0,0 +1,129 @@
+"""
+Test cases for the daily fact tables
+"""
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+import pytest
+from django.test import override_settings
+from django.utils import timezone
+
+from apps.analytics.daily_facts import _running, build_daily_facts, cached_series, date_range, parse_window
+from apps.analytics.models import DailyStatistics, OperatorStatistics, RiskAnalytics
+from apps.bst.models import BSTToken
+from apps.nser.models import OperatorExclusionMapping, SelfExclusionRecord
+from apps.operators.models import Operator
+from apps.screening.models import RiskScore
+from apps.users.models import User
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'daily-facts-tests'}}
+TODAY = date(2026, 10, 17)
+
+
+class TestWindow:
+    """Query parameters to an inclusive date range"""
+
+    def test_defaults_end_yesterday(self):
+        with mock.patch('django.utils.timezone.localdate', return_value=TODAY):
+            period, start, end = parse_window({})
+        assert (period, start, end) == ('month', date(2026, 9, 17), date(2026, 10, 16))
+        assert len(date_range(start, end)) == 30
+
+    def test_explicit_and_invalid_values(self):
+        with mock.patch('django.utils.timezone.localdate', return_value=TODAY):
+            assert parse_window({'period': 'week', 'end_date': '2026-01-07'}) == ('week', date(2026, 1, 1), date(2026, 1, 7))
+            assert parse_window({'period': 'decade', 'end_date': 'soon'})[0] == 'month'
+            assert parse_window({'end_date': '2030-01-01'})[2] == TODAY
+
+
+class TestRunningTotals:
+    """Cumulative series from a base count and per-day deltas"""
+
+    def test_running(self):
+        days = date_range(date(2026, 1, 1), date(2026, 1, 4))
+        increments = {days[0]: 2, days[2]: -1, days[3]: -10}
+        assert list(_running(5, increments, days).values()) == [7, 7, 6, 0]
+
+
+class TestCachedSeries:
+    """Series are cached per key until the facts are rebuilt"""
+
+    @override_settings(CACHES=LOCMEM)
+    def test_version_bump_invalidates(self):
+        from apps.analytics.daily_facts import bump_version
+
+        build = mock.Mock(side_effect=[1, 2])
+        assert cached_series('trends', build, 'month', TODAY) == 1
+        assert cached_series('trends', build, 'month', TODAY) == 1
+        bump_version()
+        assert cached_series('trends', build, 'month', TODAY) == 2
+        assert build.call_count == 2
+
+
+def _at(day, hour=12):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(hours=hour))
+
+
+def _exclusion(index, effective, expiry, status='active'):
+    user = User.objects.create_user(
+        phone_number=f'+2547123470{index:02d}', national_id=f'5000{index:04d}', email=f'facts{index}@example.com'
+    )
+    token = BSTToken.objects.create(user=user, phone_number_hash=f'facts-hash-{index}')
+    return SelfExclusionRecord.objects.create(
+        user=user, bst_token=token, exclusion_reference=f'EXC-FACTS-{index}', exclusion_period='6_months',
+        effective_date=_at(effective), expiry_date=_at(expiry), status=status, is_active=status == 'active'
+    )
+
+
+@pytest.mark.django_db
+class TestBuildDailyFacts:
+    """Range builds against the operational tables"""
+
+    START, END = date(2026, 3, 1), date(2026, 3, 10)
+
+    @pytest.fixture
+    def facts(self):
+        base = _exclusion(1, date(2026, 2, 1), date(2026, 12, 31))  # active through the whole range
+        _exclusion(2, date(2026, 3, 3), date(2026, 3, 7))  # starts and ends inside it
+        _exclusion(3, date(2026, 3, 4), date(2026, 3, 9), status='pending')  # never counted
+
+        RiskScore.objects.create(
+            user=base.user, score_date=_at(date(2026, 3, 5)), risk_level='high',
+            risk_score=80, score_source='assessment'
+        )
+        operator = Operator.objects.create(
+            name='Facts Bets', registration_number='REG-F', operator_code='OP-F', email='facts@example.com',
+            phone='+254700000002', license_number='LIC-F', license_type='online_betting',
+            license_issued_date=date(2025, 1, 1), license_expiry_date=date(2027, 1, 1)
+        )
+        OperatorExclusionMapping.objects.create(
+            exclusion=base, operator=operator, propagation_status='acknowledged',
+            acknowledged_at=_at(date(2026, 3, 2))
+        )
+
+    def _counts(self):
+        return (
+            DailyStatistics.objects.count(), OperatorStatistics.objects.count(), RiskAnalytics.objects.count()
+        )
+
+    def test_rebuild_is_idempotent(self, facts):
+        written = build_daily_facts(self.START, self.END)
+        counts = self._counts()
+        assert counts == (10, 1, 1)
+        assert written == sum(counts)
+
+        assert build_daily_facts(self.START, self.END) == written
+        assert self._counts() == counts
+
+        # An overlapping range upserts the shared days and adds only the new ones
+        build_daily_facts(self.START + timedelta(days=5), self.END + timedelta(days=2))
+        assert self._counts() == (12, 1, 1)
+
+    def test_active_exclusions_follow_starts_and_ends(self, facts):
+        build_daily_facts(self.START, self.END)
+        active = dict(DailyStatistics.objects.order_by('date').values_list('date', 'active_exclusions'))
+
+        assert [active[self.START + timedelta(days=offset)] for offset in range(10)] == [
+            1, 1, 2, 2, 2, 2, 1, 1, 1, 1
+        ]
+        assert DailyStatistics.objects.get(date=date(2026, 3, 5)).high_risk_users == 1
@@ -0,0 +1,292 @@
+"""
+Test cases for the materialized dashboard snapshot
+"""
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+import pytest
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.analytics import dashboard_snapshot
+from apps.analytics.dashboard_snapshot import (
+    GROWTH_DAYS, SNAPSHOT_KEY, apply_delta, compute_snapshot, dashboard_counts, refresh_counters, staleness, store_snapshot
+)
+from apps.bst.models import BSTToken
+from apps.nser.models import SelfExclusionRecord
+from apps.operators.models import Operator
+from apps.screening.models import AssessmentSession, RiskScore
+from apps.users.models import User
+
+TODAY = date(2026, 10, 17)
+
+
+def _snapshot(total_users=110, daily_users=(5, 5), counties=None):
+    daily = {TODAY - timedelta(days=offset): {'users': 0, 'exclusions': 0, 'assessments': 0} for offset in range(7)}
+    for offset, users in enumerate(daily_users):
+        daily[TODAY - timedelta(days=offset)]['users'] = users
+    daily[TODAY].update(exclusions=3, assessments=4)
+    return {
+        'counters': {
+            'total_users': total_users, 'active_exclusions': 7, 'total_operators': 2,
+            'active_operators': 1, 'high_risk_users': 9
+        },
+        'counties': counties if counties is not None else {'Nairobi': 60, '': 30, 'Kisumu': 20, 'Lamu': 0},
+        'daily': daily,
+        'reconciled_at': 1000.0,
+        'updated_at': 1030.0,
+    }
+
+
+class TestDashboardCounts:
+    """Overview fields derived from a snapshot"""
+
+    def test_today_and_growth(self):
+        counts = dashboard_counts(_snapshot(), today=TODAY)
+
+        assert counts['new_exclusions_today'] == 3 and counts['assessments_today'] == 4
+        assert counts['users_growth_7d'] == 10.0  # 100 users a week ago, 10 since
+        assert counts['high_risk_users'] == 9
+
+    def test_geographic_distribution(self):
+        counts = dashboard_counts(_snapshot(), today=TODAY, top_counties=2)
+        assert counts['geographic_distribution'] == {'Nairobi': 60, 'Unknown': 30}
+
+    def test_no_baseline_users(self):
+        counts = dashboard_counts(_snapshot(total_users=10, daily_users=(10,), counties={}), today=TODAY)
+        assert counts['users_growth_7d'] == 0 and counts['geographic_distribution'] == {}
+
+    def test_staleness(self):
+        result = staleness(_snapshot(), now=1090.0)
+        assert result['staleness_seconds'] == 90.0
+        assert result['updated_at'] > result['snapshot_at']
+
+
+class TestDeltas:
+    """Signal deltas are sent to Redis as one script call"""
+
+    def test_delta_arguments(self):
+        client = mock.Mock()
+        script = client.register_script.return_value
+        script.return_value = 1
+        created_at = datetime(2026, 10, 17, 8, 0, tzinfo=dt_timezone.utc)
+
+        with mock.patch.object(dashboard_snapshot, 'get_redis_client', return_value=client), \
+                mock.patch.object(dashboard_snapshot, '_delta_script', None):
+            assert apply_delta(created_at, county='Nairobi', total_users=1, users=1, exclusions=0)
+
+        keys, args = script.call_args.kwargs['keys'], script.call_args.kwargs['args']
+        assert keys[2] == 'nser:dashboard:daily:2026-10-17'
+        assert args[2:] == [1, 'total_users', 1, 2, 'Nairobi', 1, 3, 'users', 1]
+
+    def test_without_redis(self):
+        with mock.patch.object(dashboard_snapshot, 'get_redis_client', return_value=None):
+            assert apply_delta(total_users=1) is False
+
+
+class FakePipeline:
+    """Runs each queued command on the fake client at execute()"""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class FakeHashRedis:
+    """The hash, flag and script commands of the snapshot; replies are bytes like redis-py's"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.flags = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def delete(self, *keys):
+        return sum((self.hashes.pop(key, None) or self.flags.pop(key, None)) is not None for key in keys)
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({str(field).encode(): str(value).encode() for field, value in mapping.items()})
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def expire(self, key, seconds):
+        return key in self.hashes
+
+    def exists(self, key):
+        return int(key in self.hashes)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.flags:
+            return None
+        self.flags[key] = value
+        return True
+
+    def register_script(self, script):
+        return self._apply_delta
+
+    def _apply_delta(self, keys, args, client):
+        """DELTA_LUA"""
+        if keys[0] not in self.hashes:
+            return 0
+        for index in range(2, len(args), 3):
+            fields = self.hashes.setdefault(keys[args[index] - 1], {})
+            field = str(args[index + 1]).encode()
+            fields[field] = str(int(fields.get(field, b'0')) + args[index + 2]).encode()
+        self.hashes[keys[0]][b'updated_at'] = str(args[0]).encode()
+        return 1
+
+
+def _live_counts(today):
+    """The per-request queries DashboardOverviewView ran before the snapshot"""
+    week_ago = today - timedelta(days=GROWTH_DAYS)
+    total_users = User.objects.count()
+    week_ago_users = User.objects.filter(created_at__date__lte=week_ago).count()
+    geo_data = User.objects.values('county').annotate(count=Count('id')).order_by('-count')[:5]
+    return {
+        'total_users': total_users,
+        'active_exclusions': SelfExclusionRecord.objects.filter(is_active=True).count(),
+        'total_operators': Operator.objects.filter(is_deleted=False).count(),
+        'active_operators': Operator.objects.filter(is_deleted=False, license_status='active').count(),
+        'high_risk_users': RiskScore.objects.filter(risk_level__in=['high', 'severe', 'critical']).count(),
+        'new_exclusions_today': SelfExclusionRecord.objects.filter(created_at__date=today).count(),
+        'assessments_today': AssessmentSession.objects.filter(created_at__date=today).count(),
+        'users_growth_7d': round(((total_users - week_ago_users) / max(week_ago_users, 1)) * 100
+                                 if week_ago_users else 0, 1),
+        'geographic_distribution': {item['county'] or 'Unknown': item['count'] for item in geo_data},
+    }
+
+
+def _user(index, county='', days_ago=0):
+    user = User.objects.create_user(
+        phone_number=f'+2547123540{index:02d}', national_id=f'5400{index:04d}',
+        email=f'dashboard{index}@example.com', county=county
+    )
+    if days_ago:
+        User.objects.filter(pk=user.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+    return user
+
+
+def _exclusion(user, active=True):
+    token = BSTToken.objects.create(user=user, phone_number_hash=f'dashboard-hash-{user.pk.hex}')
+    now = timezone.now()
+    return SelfExclusionRecord.objects.create(
+        user=user, bst_token=token, exclusion_reference=f'EXC-{token.pk.hex[:12]}',
+        exclusion_period='6_months', effective_date=now, expiry_date=now + timedelta(days=180),
+        status='active' if active else 'expired', is_active=active
+    )
+
+
+def _operator(index, license_status='active'):
+    today = date.today()
+    return Operator.objects.create(
+        name=f'Dashboard Bets {index}', registration_number=f'REG-D{index}', operator_code=f'OP-D{index}',
+        email=f'dashboard-op{index}@example.com', phone=f'+2547000054{index:02d}', license_number=f'LIC-D{index}',
+        license_type='online_betting', license_issued_date=today, license_expiry_date=today + timedelta(days=365),
+        license_status=license_status
+    )
+
+
+@pytest.fixture
+def population():
+    users = [
+        _user(1, 'Nairobi', days_ago=30), _user(2, 'Nairobi', days_ago=10), _user(3, 'Nairobi'),
+        _user(4, 'Kisumu', days_ago=3), _user(5, 'Kisumu'), _user(6),
+    ]
+    _exclusion(users[0])
+    _exclusion(users[1], active=False)
+    _operator(1)
+    _operator(2, license_status='suspended')
+    for user, risk_level in zip(users, ('high', 'severe', 'low', 'moderate')):
+        RiskScore.objects.create(user=user, risk_level=risk_level, risk_score=10, score_source='pgsi')
+    AssessmentSession.objects.create(user=users[2], assessment_type='pgsi', session_reference='S-DASH-1')
+    return users
+
+
+@pytest.fixture
+def redis():
+    client = FakeHashRedis()
+    with mock.patch.object(dashboard_snapshot, 'get_redis_client', return_value=client), \
+            mock.patch.object(dashboard_snapshot, '_delta_script', None):
+        yield client
+
+
+@pytest.mark.django_db
+class TestComputeSnapshot:
+    """The snapshot gives the numbers of the old live queries"""
+
+    def test_matches_live_queries(self, population):
+        today = timezone.localdate()
+        counts = dashboard_counts(compute_snapshot(today), today=today)
+        assert counts == _live_counts(today)
+
+    def test_served_from_redis_after_first_use(self, population, redis, django_assert_num_queries):
+        today = timezone.localdate()
+        dashboard_snapshot.get_snapshot()
+        with django_assert_num_queries(0):
+            snapshot = dashboard_snapshot.get_snapshot()
+        assert dashboard_counts(snapshot, today=today) == _live_counts(today)
+
+
+@pytest.mark.django_db
+class TestSignalDeltas:
+    """Creates after commit move the stored counters like a recount would"""
+
+    def test_deltas_match_a_recount(self, population, redis, django_capture_on_commit_callbacks):
+        store_snapshot(compute_snapshot())
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user = _user(20, 'Mombasa')
+            _exclusion(user)
+            RiskScore.objects.create(user=user, risk_level='critical', risk_score=20, score_source='pgsi')
+            AssessmentSession.objects.create(user=user, assessment_type='pgsi', session_reference='S-DASH-2')
+
+        stored, expected = dashboard_snapshot.get_snapshot(), compute_snapshot()
+        assert stored['counters'] == expected['counters']
+        assert stored['counties'] == expected['counties']
+        assert stored['daily'] == expected['daily']
+
+    def test_state_changes_schedule_one_recount(self, population, redis, django_capture_on_commit_callbacks):
+        store_snapshot(compute_snapshot())
+        exclusion = SelfExclusionRecord.objects.filter(is_active=True).first()
+
+        with mock.patch('apps.analytics.tasks.refresh_dashboard_counters.apply_async') as apply_async, \
+                django_capture_on_commit_callbacks(execute=True):
+            exclusion.is_active = False
+            exclusion.save(update_fields=['is_active'])
+            exclusion.save(update_fields=['is_active'])
+
+        apply_async.assert_called_once()
+        assert apply_async.call_args.kwargs['args'] == [['active_exclusions']]
+
+    def test_no_deltas_before_the_first_reconcile(self, redis, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            _user(21)
+        assert SNAPSHOT_KEY not in redis.hashes
+
+
+@pytest.mark.django_db
+class TestRefreshCounters:
+    """Recounts repair drift from writes that bypass signals"""
+
+    def test_recount_fixes_drift(self, population, redis):
+        store_snapshot(compute_snapshot())
+        SelfExclusionRecord.objects.update(is_active=False)
+        Operator.objects.update(license_status='suspended')
+
+        assert refresh_counters(['active_exclusions', 'active_operators']) == {
+            'active_exclusions': 0, 'active_operators': 0
+        }
+        counters = dashboard_snapshot.get_snapshot()['counters']
+        assert counters == compute_snapshot()['counters']
+
+    def test_without_a_snapshot(self, population, redis):
+        assert refresh_counters(['total_users']) == {}
+        assert SNAPSHOT_KEY not in redis.hashes
@@ -0,0 +1,59 @@
+"""
+Test cases for streaming data exports
+"""
+import io
+from datetime import date, datetime, timezone as dt_timezone
+from unittest import mock
+
+import openpyxl
+
+from apps.analytics import exports
+from apps.analytics.exports import stream_csv, write_xlsx
+
+HEADER = ['Name', 'Expiry', 'Created At']
+ROWS = [
+    ('Alpha', date(2027, 1, 31), datetime(2026, 10, 17, 9, 0, tzinfo=dt_timezone.utc)),
+    ('Beta, Ltd', None, datetime(2026, 10, 17, 21, 30, tzinfo=dt_timezone.utc)),
+    ('Gamma', date(2028, 6, 1), datetime(2026, 10, 18, 6, 0, tzinfo=dt_timezone.utc)),
+]
+
+
+class TestCSV:
+    """CSV streamed in fixed-size batches"""
+
+    def test_batches_and_formatting(self):
+        chunks = list(stream_csv(iter([HEADER, *ROWS]), batch_rows=2))
+
+        assert len(chunks) == 2
+        lines = ''.join(chunks).splitlines()
+        assert lines[0] == 'Name,Expiry,Created At'
+        assert lines[1] == 'Alpha,2027-01-31,2026-10-17T12:00:00+03:00'  # local time
+        assert lines[2].startswith('"Beta, Ltd",N/A,')
+
+
+class TestXLSX:
+    """Write-only workbook output"""
+
+    def test_rows_and_naive_local_datetimes(self):
+        fileobj = io.BytesIO()
+        assert write_xlsx(iter([HEADER, *ROWS]), fileobj, title='Operators') == 3
+
+        sheet = openpyxl.load_workbook(fileobj)['Operators']
+        rows = list(sheet.iter_rows(values_only=True))
+        assert rows[0] == tuple(HEADER)
+        assert rows[1][2] == datetime(2026, 10, 17, 12, 0)
+        assert rows[2][1] == 'N/A'
+
+    def test_sheets_roll_over_at_row_limit(self):
+        fileobj = io.BytesIO()
+        with mock.patch.object(exports, 'XLSX_MAX_ROWS', 3):
+            write_xlsx(iter([HEADER, *ROWS]), fileobj, title='Operators')
+
+        workbook = openpyxl.load_workbook(fileobj)
+        assert workbook.sheetnames == ['Operators', 'Operators 2']
+        assert [row[0] for row in workbook['Operators 2'].iter_rows(values_only=True)] == ['Name', 'Gamma']
+
+    def test_empty_export_keeps_header(self):
+        fileobj = io.BytesIO()
+        assert write_xlsx(iter([HEADER]), fileobj) == 0
+        assert openpyxl.load_workbook(fileobj).active['A1'].value == 'Name'
@@ -0,0 +1,151 @@
+"""
+Test cases for report jobs
+"""
+from datetime import date, timedelta
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from apps.analytics import report_jobs
+from apps.analytics.models import Report
+from apps.analytics.report_jobs import (
+    Progress, month_chunks, params_hash, previous_period, run_report, start_report
+)
+from apps.users.models import User
+
+
+class TestPeriods:
+    """Default periods and month chunking"""
+
+    def test_previous_periods(self):
+        today = date(2026, 10, 17)
+        assert previous_period('monthly', today) == (date(2026, 9, 1), date(2026, 9, 30))
+        assert previous_period('quarterly', today) == (date(2026, 7, 1), date(2026, 9, 30))
+        assert previous_period('quarterly', date(2026, 2, 1)) == (date(2025, 10, 1), date(2025, 12, 31))
+        assert previous_period('annual', today) == (date(2025, 1, 1), date(2025, 12, 31))
+
+    def test_month_chunks(self):
+        assert month_chunks(date(2026, 1, 15), date(2026, 3, 2)) == [
+            (date(2026, 1, 15), date(2026, 1, 31)),
+            (date(2026, 2, 1), date(2026, 2, 28)),
+            (date(2026, 3, 1), date(2026, 3, 2)),
+        ]
+
+
+class TestJobs:
+    """Request keys, validation and progress writes"""
+
+    def test_params_hash_is_order_independent(self):
+        start, end = date(2026, 1, 1), date(2026, 1, 31)
+        assert params_hash('custom', start, end, {'a': 1, 'b': 2}) == params_hash('custom', start, end, {'b': 2, 'a': 1})
+        assert params_hash('custom', start, end, {}) != params_hash('monthly', start, end, {})
+
+    def test_rejects_unknown_type_and_missing_period(self):
+        with pytest.raises(ValueError):
+            start_report('nonsense')
+        with pytest.raises(ValueError):
+            start_report('monthly')
+
+    def test_progress_is_throttled(self):
+        class FakeReport:
+            objects = mock.Mock()
+            pk, progress = 1, 0
+
+        report = FakeReport()
+        with mock.patch('apps.analytics.report_jobs._analytics_setting', return_value=10):
+            progress = Progress(report)
+        for done in range(1, 101):
+            progress(done, 100)
+
+        updates = FakeReport.objects.using.return_value.filter.return_value.update.call_args_list
+        assert [call.kwargs['progress'] for call in updates] == [10, 20, 30, 40, 50, 60, 70, 80, 90]
+
+
+@pytest.fixture
+def builder():
+    """A summary builder that records its calls instead of reading the fact tables"""
+    build = mock.Mock(return_value={'totals': {'new_users': 3}})
+    with mock.patch.dict(report_jobs.BUILDERS, {'custom': build}), \
+            mock.patch('django.db.transaction.on_commit'):
+        yield build
+
+
+def _start(**kwargs):
+    return start_report(
+        'custom', period_start=date(2026, 9, 1), period_end=date(2026, 9, 30), **kwargs
+    )
+
+
+@pytest.mark.django_db
+class TestRunReport:
+    """Claim, build and finish a queued job"""
+
+    def test_claims_once_and_finishes(self, builder):
+        user = User.objects.create_user(phone_number='+254712348001', national_id='60000001', email='analyst@example.com')
+        report, created = _start(user=user)
+        assert created and report.status == 'queued'
+
+        with mock.patch('apps.core.websocket_utils.broadcaster.broadcast_to_dashboard') as broadcast:
+            run_report(str(report.pk))
+            assert run_report(str(report.pk)) is None  # already claimed: a no-op
+
+        report.refresh_from_db()
+        assert builder.call_count == 1
+        assert (report.status, report.progress) == ('done', 100)
+        assert report.report_data == {'totals': {'new_users': 3}}
+        assert report.started_at and report.completed_at
+        broadcast.assert_called_once()
+        user_id, event, payload = broadcast.call_args.args
+        assert (user_id, event, payload['status']) == (user.pk, 'report_status', 'done')
+
+    def test_failure_is_recorded_and_notified(self, builder):
+        builder.side_effect = RuntimeError('facts unavailable')
+        report, _ = _start()
+
+        with mock.patch.object(report_jobs, 'notify') as notify:
+            with pytest.raises(RuntimeError):
+                run_report(str(report.pk))
+
+        report.refresh_from_db()
+        assert report.status == 'failed'
+        assert report.error_message == 'facts unavailable'
+        assert report.completed_at is not None
+        notify.assert_called_once()
+        assert run_report(str(report.pk)) is None  # failed jobs are not picked up again
+
+
+@pytest.mark.django_db
+class TestReuse:
+    """Identical requests share one job while it is in flight or fresh"""
+
+    def test_in_flight_and_fresh_jobs_are_reused(self, builder):
+        first, _ = _start(parameters={'sections': ['totals']})
+        assert _start(parameters={'sections': ['totals']}) == (first, False)
+        assert _start(parameters={'sections': ['monthly']})[1]  # different parameters
+
+        run_report(str(first.pk))
+        assert _start(parameters={'sections': ['totals']}) == (first, False)
+        assert _start(parameters={'sections': ['totals']}, refresh=True)[1]
+
+    def test_closed_period_is_reused_after_cache_window(self, builder):
+        closed, _ = _start()
+        run_report(str(closed.pk))
+        # Completed long ago, but after its period ended: the data cannot change
+        Report.objects.filter(pk=closed.pk).update(completed_at=timezone.now() - timedelta(days=3))
+        assert _start() == (closed, False)
+
+        today = timezone.localdate()
+        open_period, _ = start_report('custom', period_start=today.replace(day=1), period_end=today)
+        run_report(str(open_period.pk))
+        Report.objects.filter(pk=open_period.pk).update(completed_at=timezone.now() - timedelta(days=3))
+        report, created = start_report('custom', period_start=today.replace(day=1), period_end=today)
+        assert created and report != open_period
+
+    def test_stale_running_job_is_not_reused(self, builder):
+        stuck, _ = _start()
+        Report.objects.filter(pk=stuck.pk).update(
+            status='running', created_at=timezone.now() - timedelta(hours=2)
+        )
+        report, created = _start()
+        assert created and report != stuck
@@ -43,6 +43,8 @@ urlpatterns = [
     path('export/csv/', views.ExportCSVView.as_view(), name='export_csv'),
     path('export/excel/', views.ExportExcelView.as_view(), name='export_excel'),
     path('export/pdf/', views.ExportPDFView.as_view(), name='export_pdf'),
+    path('export/jobs/<str:job_id>/', views.ExportJobView.as_view(), name='export_job'),
+    path('export/jobs/<str:job_id>/download/', views.ExportDownloadView.as_view(), name='export_download'),
     
     # Performance Metrics
     path('performance/api/', views.APIPerformanceMetricsView.as_view(), name='api_performance'),
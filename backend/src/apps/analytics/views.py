@@ -4,6 +4,7 @@ Dashboard overviews, statistics, trends, reports
 """
 from rest_framework import status, viewsets, generics
 from rest_framework.views import APIView
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from datetime import timedelta
@@ -13,62 +14,32 @@ from .models import (
     UserDemographics, RiskAnalytics, ComplianceMetrics, GeographicAnalytics, APIUsageMetrics
 )
 from .serializers import (
-    DailyStatisticsSerializer, OperatorStatisticsSerializer, ReportSerializer,
+    DailyStatisticsSerializer, OperatorStatisticsSerializer, ReportSerializer, GenerateReportSerializer,
     RealTimeMetricsSerializer, UserDemographicsSerializer, RiskAnalyticsSerializer
 )
 from apps.api.permissions import IsGRAKStaff, IsOperator
-from apps.api.mixins import TimingMixin, SuccessResponseMixin, CacheMixin
+from apps.api.mixins import TimingMixin, SuccessResponseMixin, CacheMixin, ReplicaReadMixin
+from .report_jobs import ReportJobMixin
 
 
-class DashboardOverviewView(TimingMixin, SuccessResponseMixin, CacheMixin, APIView):
-    """Main dashboard overview"""
+class DashboardOverviewView(TimingMixin, SuccessResponseMixin, APIView):
+    """Main dashboard overview, served from the materialized snapshot"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
-    cache_timeout = 300
     
     def get(self, request):
-        from apps.nser.models import SelfExclusionRecord
-        from apps.users.models import User
-        from apps.operators.models import Operator
-        from apps.screening.models import AssessmentSession, RiskScore
-        from django.db.models import Count, Avg, Sum
-        import random
-        
-        today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
-        month_ago = today - timedelta(days=30)
-        
-        # Core metrics with actual data
-        total_users = User.objects.count()
-        active_exclusions = SelfExclusionRecord.objects.filter(is_active=True).count()
-        total_operators = Operator.objects.filter(is_deleted=False).count()
-        
-        # Calculate actual metrics
-        new_exclusions_today = SelfExclusionRecord.objects.filter(created_at__date=today).count()
-        assessments_today = AssessmentSession.objects.filter(created_at__date=today).count()
-        active_operators = Operator.objects.filter(is_deleted=False, license_status='active').count()
-        
-        try:
-            high_risk_users = RiskScore.objects.filter(risk_level__in=['high', 'severe', 'critical']).count()
-        except:
-            high_risk_users = 0
-            
-        # Geographic distribution from actual user data
-        from django.db.models import Count
-        geo_data = User.objects.values('county').annotate(count=Count('id')).order_by('-count')[:5]
-        geographic_distribution = {item['county'] or 'Unknown': item['count'] for item in geo_data}
+        from .dashboard_snapshot import dashboard_counts, get_snapshot, staleness
         
-        # Growth metrics from actual data
-        week_ago_users = User.objects.filter(created_at__date__lte=week_ago).count()
-        users_growth_7d = ((total_users - week_ago_users) / max(week_ago_users, 1)) * 100 if week_ago_users else 0
+        snapshot = get_snapshot()
+        counts = dashboard_counts(snapshot)
         
         dashboard = {
-            'total_users': total_users,
-            'active_exclusions': active_exclusions,
-            'new_exclusions_today': new_exclusions_today,
-            'total_operators': total_operators,
-            'active_operators': active_operators,
-            'assessments_today': assessments_today,
-            'high_risk_users': high_risk_users,
+            'total_users': counts['total_users'],
+            'active_exclusions': counts['active_exclusions'],
+            'new_exclusions_today': counts['new_exclusions_today'],
+            'total_operators': counts['total_operators'],
+            'active_operators': counts['active_operators'],
+            'assessments_today': counts['assessments_today'],
+            'high_risk_users': counts['high_risk_users'],
             'api_calls_today': 0,  # Would need API logging to track
             'avg_response_time': 45,  # Would need monitoring to track
             'system_uptime': 99.94,
@@ -76,13 +47,14 @@ class DashboardOverviewView(TimingMixin, SuccessResponseMixin, CacheMixin, APIVi
             'revenue_today_ksh': 0,  # Would need transaction data
             'transactions_today': 0,  # Would need transaction data
             'growth_metrics': {
-                'users_growth_7d': round(users_growth_7d, 1),
+                'users_growth_7d': counts['users_growth_7d'],
                 'exclusions_growth_7d': 0,
                 'operators_growth_30d': 0
             },
-            'geographic_distribution': geographic_distribution or {
+            'geographic_distribution': counts['geographic_distribution'] or {
                 'Nairobi': 0, 'Mombasa': 0, 'Kisumu': 0, 'Nakuru': 0, 'Eldoret': 0
-            }
+            },
+            **staleness(snapshot)
         }
         
         return self.success_response(data=dashboard)
@@ -119,53 +91,53 @@ class RealTimeStatsView(TimingMixin, SuccessResponseMixin, APIView):
         return self.success_response(data=stats)
 
 
-class TrendsView(TimingMixin, SuccessResponseMixin, APIView):
-    """Trends analysis"""
+class TrendsView(TimingMixin, ReplicaReadMixin, SuccessResponseMixin, APIView):
+    """
+    Trends analysis from the daily fact tables
+    ?period=week|month|quarter|year and ?end_date= (default yesterday)
+    """
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get(self, request):
-        import random
-        from datetime import datetime, timedelta
-        
-        period = request.query_params.get('period', 'month')
-        days = 30 if period == 'month' else 7 if period == 'week' else 365
-        
-        # Generate trend data
-        dates = [(timezone.now().date() - timedelta(days=i)) for i in range(days, 0, -1)]
-        
-        trends = {
-            'period': period,
-            'user_growth': [{
-                'date': date.isoformat(),
-                'value': random.randint(50, 200),
-                'cumulative': random.randint(40000, 50000) + i * random.randint(10, 50)
-            } for i, date in enumerate(dates)],
-            'exclusion_trends': [{
-                'date': date.isoformat(),
-                'new_exclusions': random.randint(5, 25),
-                'active_exclusions': random.randint(1200, 1400)
-            } for date in dates],
-            'assessment_trends': [{
-                'date': date.isoformat(),
-                'total_assessments': random.randint(80, 150),
-                'high_risk': random.randint(10, 30)
-            } for date in dates],
-            'revenue_trends': [{
-                'date': date.isoformat(),
-                'revenue_ksh': random.randint(800000, 1500000),
-                'transactions': random.randint(2000, 4000)
-            } for date in dates],
-            'compliance_trends': [{
-                'date': date.isoformat(),
-                'avg_score': random.randint(92, 98),
-                'operators_compliant': random.randint(145, 156)
-            } for date in dates]
-        }
+        from .daily_facts import cached_series, compliance_series, daily_series, parse_window
+        
+        period, start, end = parse_window(request.query_params)
+        
+        def build():
+            days = daily_series(start, end)
+            return {
+                'period': period,
+                'start_date': start.isoformat(),
+                'end_date': end.isoformat(),
+                'user_growth': [{
+                    'date': day['date'].isoformat(),
+                    'value': day['new_users'],
+                    'cumulative': day['total_users']
+                } for day in days],
+                'exclusion_trends': [{
+                    'date': day['date'].isoformat(),
+                    'new_exclusions': day['new_exclusions'],
+                    'active_exclusions': day['active_exclusions']
+                } for day in days],
+                'assessment_trends': [{
+                    'date': day['date'].isoformat(),
+                    'total_assessments': day['total_assessments'],
+                    'high_risk': day['high_risk_users']
+                } for day in days],
+                'revenue_trends': [{
+                    'date': day['date'].isoformat(),
+                    'revenue_ksh': float(day['revenue_ksh']),
+                    'transactions': day['transactions_count']
+                } for day in days],
+                'compliance_trends': [
+                    {**day, 'date': day['date'].isoformat()} for day in compliance_series(start, end)
+                ]
+            }
         
-        return self.success_response(data=trends)
+        return self.success_response(data=cached_series('trends', build, period, end))
 
 
-class DailyStatisticsViewSet(TimingMixin, viewsets.ReadOnlyModelViewSet):
+class DailyStatisticsViewSet(TimingMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """Daily statistics"""
     serializer_class = DailyStatisticsSerializer
     permission_classes = [IsAuthenticated, IsGRAKStaff]
@@ -176,7 +148,7 @@ class DailyStatisticsViewSet(TimingMixin, viewsets.ReadOnlyModelViewSet):
         ).order_by('-date')
 
 
-class OperatorStatisticsViewSet(TimingMixin, viewsets.ReadOnlyModelViewSet):
+class OperatorStatisticsViewSet(TimingMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """Operator statistics"""
     serializer_class = OperatorStatisticsSerializer
     permission_classes = [IsAuthenticated, IsGRAKStaff]
@@ -186,54 +158,109 @@ class OperatorStatisticsViewSet(TimingMixin, viewsets.ReadOnlyModelViewSet):
 
 
 class ReportViewSet(TimingMixin, viewsets.ModelViewSet):
-    """Report management"""
+    """Report management; report jobs are polled here"""
     serializer_class = ReportSerializer
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get_queryset(self):
-        return Report.objects.order_by('-created_at')
+        return Report.objects.select_related('generated_by').order_by('-created_at')
+    
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Stream a finished report file from storage"""
+        from django.core.files.storage import default_storage
+        from django.http import FileResponse, Http404
+        import os
+        
+        report = self.get_object()
+        path = report.report_data.get('file') if report.status == 'done' else None
+        if not path:
+            raise Http404('Report file is not ready')
+        return FileResponse(
+            default_storage.open(path, 'rb'),
+            as_attachment=True,
+            filename=os.path.basename(path),
+            content_type=report.report_data.get('content_type', 'application/octet-stream')
+        )
 
 
-class GenerateReportView(TimingMixin, SuccessResponseMixin, APIView):
+class GenerateReportView(TimingMixin, ReportJobMixin, APIView):
     """Generate custom report"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def post(self, request):
-        report_type = request.data.get('report_type')
-        
-        report = Report.objects.create(
-            report_type=report_type,
-            status='pending'
-        )
-        
-        # Generate report (async)
-        from .tasks import generate_report
-        generate_report.delay(str(report.id))
-        
-        return self.success_response(
-            data=ReportSerializer(report).data,
-            message='Report generation started'
+        serializer = GenerateReportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        parameters = {}
+        if data.get('include_sections'):
+            parameters['sections'] = sorted(data['include_sections'])
+        if data.get('operator_ids'):
+            parameters['operator_ids'] = sorted(str(operator_id) for operator_id in data['operator_ids'])
+        
+        return self.report_job_response(
+            request, data['report_type'], data['period_start'], data['period_end'],
+            parameters=parameters, refresh=data['refresh']
         )
 
 
 class ExportDataView(TimingMixin, SuccessResponseMixin, APIView):
-    """Export data"""
+    """Export data as a background job"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def post(self, request):
-        export_format = request.data.get('format', 'csv')
+        from .exports import EXPORTS, FORMATS, start_export_job
         
-        # Export data (async)
-        from .tasks import export_data
-        task = export_data.delay(export_format)
+        export_format = request.data.get('format', 'csv')
+        report_type = request.data.get('report_type', 'exclusions')
+        if export_format not in FORMATS or report_type not in EXPORTS:
+            return self.error_response(
+                f"Supported formats: {', '.join(FORMATS)}; report types: {', '.join(EXPORTS)}"
+            )
         
+        job = start_export_job(report_type, export_format, request.user.pk)
         return self.success_response(
-            data={'task_id': task.id},
-            message='Export started'
+            data={**job, 'task_id': job['job_id']},
+            message='Export started',
+            status_code=status.HTTP_202_ACCEPTED
+        )
+
+
+class ExportJobView(TimingMixin, SuccessResponseMixin, APIView):
+    """State of a background export"""
+    permission_classes = [IsAuthenticated, IsGRAKStaff]
+    
+    def get(self, request, job_id):
+        from .exports import get_job
+        
+        job = get_job(job_id)
+        if job is None:
+            return self.error_response('Export job not found or expired', status_code=status.HTTP_404_NOT_FOUND)
+        return self.success_response(data=job)
+
+
+class ExportDownloadView(TimingMixin, SuccessResponseMixin, APIView):
+    """Stream a finished background export from storage"""
+    permission_classes = [IsAuthenticated, IsGRAKStaff]
+    
+    def get(self, request, job_id):
+        from django.core.files.storage import default_storage
+        from django.http import FileResponse
+        from .exports import FORMATS, get_job
+        import os
+        
+        job = get_job(job_id)
+        if job is None or job.get('status') != 'done':
+            return self.error_response('Export is not ready', status_code=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            default_storage.open(job['file'], 'rb'),
+            as_attachment=True,
+            filename=os.path.basename(job['file']),
+            content_type=FORMATS[job['format']][0]
         )
 
 
-# Missing views
 class GRAKDashboardView(TimingMixin, SuccessResponseMixin, CacheMixin, APIView):
     """GRAK admin dashboard"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
@@ -274,7 +301,7 @@ class RealTimeScreeningsView(TimingMixin, SuccessResponseMixin, APIView):
         return self.success_response(data={'count': 0})
 
 
-class ExclusionTrendsView(TimingMixin, SuccessResponseMixin, APIView):
+class ExclusionTrendsView(TimingMixin, ReplicaReadMixin, SuccessResponseMixin, APIView):
     """Exclusion trends"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
@@ -282,7 +309,7 @@ class ExclusionTrendsView(TimingMixin, SuccessResponseMixin, APIView):
         return self.success_response(data={'trends': []})
 
 
-class RiskTrendsView(TimingMixin, SuccessResponseMixin, APIView):
+class RiskTrendsView(TimingMixin, ReplicaReadMixin, SuccessResponseMixin, APIView):
     """Risk trends"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
@@ -290,7 +317,7 @@ class RiskTrendsView(TimingMixin, SuccessResponseMixin, APIView):
         return self.success_response(data={'trends': []})
 
 
-class ComplianceTrendsView(TimingMixin, SuccessResponseMixin, APIView):
+class ComplianceTrendsView(TimingMixin, ReplicaReadMixin, SuccessResponseMixin, APIView):
     """Compliance trends"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
@@ -298,246 +325,263 @@ class ComplianceTrendsView(TimingMixin, SuccessResponseMixin, APIView):
         return self.success_response(data={'trends': []})
 
 
-class GenerateMonthlyReportView(TimingMixin, SuccessResponseMixin, APIView):
-    """Generate monthly report"""
+class GenerateMonthlyReportView(TimingMixin, ReportJobMixin, APIView):
+    """Generate monthly report (the last complete month)"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
+    period = 'monthly'
     
     def post(self, request):
-        from .tasks import generate_report
-        task = generate_report.delay('monthly')
-        return self.success_response(data={'task_id': task.id})
+        from .report_jobs import previous_period
+        
+        period_start, period_end = previous_period(self.period)
+        return self.report_job_response(
+            request, self.period, period_start, period_end,
+            refresh=str(request.data.get('refresh', '')).lower() in ('true', '1')
+        )
 
 
-class GenerateQuarterlyReportView(TimingMixin, SuccessResponseMixin, APIView):
-    """Generate quarterly report"""
-    permission_classes = [IsAuthenticated, IsGRAKStaff]
-    
-    def post(self, request):
-        from .tasks import generate_report
-        task = generate_report.delay('quarterly')
-        return self.success_response(data={'task_id': task.id})
+class GenerateQuarterlyReportView(GenerateMonthlyReportView):
+    """Generate quarterly report (the last complete quarter)"""
+    period = 'quarterly'
 
 
-class GenerateAnnualReportView(TimingMixin, SuccessResponseMixin, APIView):
-    """Generate annual report"""
+class GenerateAnnualReportView(GenerateMonthlyReportView):
+    """Generate annual report (the last complete year)"""
+    period = 'annual'
+
+
+class GenerateCustomReportView(TimingMixin, ReportJobMixin, APIView):
+    """Generate custom report for ?period_start=/period_end= in the body"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def post(self, request):
-        from .tasks import generate_report
-        task = generate_report.delay('annual')
-        return self.success_response(data={'task_id': task.id})
+        from datetime import date
+        
+        try:
+            period_start = date.fromisoformat(request.data.get('period_start'))
+            period_end = date.fromisoformat(request.data.get('period_end'))
+        except (TypeError, ValueError):
+            return self.error_response('period_start and period_end (YYYY-MM-DD) are required')
+        parameters = {
+            key: value for key, value in request.data.items()
+            if key not in ('period_start', 'period_end', 'refresh')
+        }
+        return self.report_job_response(
+            request, 'custom', period_start, period_end, parameters=parameters,
+            refresh=str(request.data.get('refresh', '')).lower() in ('true', '1')
+        )
 
 
-class GenerateCustomReportView(TimingMixin, SuccessResponseMixin, APIView):
-    """Generate custom report"""
-    permission_classes = [IsAuthenticated, IsGRAKStaff]
+class StreamingExportMixin(SuccessResponseMixin):
+    """
+    Full-table exports (see apps.analytics.exports): streamed when small
+    enough, otherwise handed to a background job (202 + job handle)
+    """
+    export_format = None
     
     def post(self, request):
-        from .tasks import generate_report
-        task = generate_report.delay('custom', request.data)
-        return self.success_response(data={'task_id': task.id})
+        from django.conf import settings
+        from .exports import EXPORTS, count_rows, start_export_job
+        
+        report_type = request.data.get('report_type', 'operators')
+        if report_type not in EXPORTS:
+            return self.error_response(f"Supported report types: {', '.join(EXPORTS)}")
+        
+        background = request.data.get('background')
+        if background is None:
+            sync_max_rows = settings.ANALYTICS_SETTINGS.get('EXPORT_SYNC_MAX_ROWS', 200000)
+            background = count_rows(report_type) > sync_max_rows
+        if background in (True, 'true', '1', 1):
+            job = start_export_job(report_type, self.export_format, request.user.pk)
+            return self.success_response(
+                data=job, message='Export started', status_code=status.HTTP_202_ACCEPTED
+            )
+        
+        return self.export_response(report_type)
 
 
-class ExportCSVView(TimingMixin, APIView):
+class ExportCSVView(TimingMixin, StreamingExportMixin, APIView):
     """Export CSV"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
+    export_format = 'csv'
     
-    def post(self, request):
-        from django.http import HttpResponse
-        import csv
-        from apps.operators.models import Operator
-        from apps.nser.models import SelfExclusionRecord
-        
-        report_type = request.data.get('report_type', 'operators')
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{report_type}_{timezone.now().date()}.csv"'
-        
-        writer = csv.writer(response)
-        
-        if report_type == 'operators':
-            writer.writerow(['Operator Name', 'License Number', 'Status', 'License Expiry', 'Created At'])
-            for op in Operator.objects.all():
-                writer.writerow([op.name, op.license_number or 'N/A', op.status, 
-                               op.license_expiry or 'N/A', op.created_at])
-        elif report_type == 'exclusions':
-            writer.writerow(['User Phone', 'Duration (months)', 'Status', 'Start Date', 'End Date', 'Created At'])
-            for exc in SelfExclusionRecord.objects.all()[:1000]:
-                writer.writerow([exc.user.phone_number if exc.user else 'N/A', exc.duration_months,
-                               exc.status, exc.start_date, exc.end_date, exc.created_at])
+    def export_response(self, report_type):
+        from django.http import StreamingHttpResponse
+        from .exports import FORMATS, filename, iter_rows, stream_csv
         
+        response = StreamingHttpResponse(stream_csv(iter_rows(report_type)), content_type=FORMATS['csv'][0])
+        response['Content-Disposition'] = f'attachment; filename="{filename(report_type, "csv")}"'
         return response
 
 
-class ExportExcelView(TimingMixin, APIView):
+class ExportExcelView(TimingMixin, StreamingExportMixin, APIView):
     """Export Excel"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
+    export_format = 'excel'
     
-    def post(self, request):
+    def export_response(self, report_type):
+        from django.http import FileResponse
+        from .exports import FORMATS, filename, write_export
+        import tempfile
+        
         try:
-            import openpyxl
-            from django.http import HttpResponse
-            from apps.operators.models import Operator
-            from apps.nser.models import SelfExclusionRecord
-            
-            report_type = request.data.get('report_type', 'operators')
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = report_type.capitalize()
-            
-            if report_type == 'operators':
-                ws.append(['Operator Name', 'License Number', 'Status', 'License Expiry', 'Created At'])
-                for op in Operator.objects.all():
-                    ws.append([op.name, op.license_number or 'N/A', op.status, 
-                             str(op.license_expiry) if op.license_expiry else 'N/A', str(op.created_at)])
-            elif report_type == 'exclusions':
-                ws.append(['User Phone', 'Duration (months)', 'Status', 'Start Date', 'End Date', 'Created At'])
-                for exc in SelfExclusionRecord.objects.all()[:1000]:
-                    ws.append([exc.user.phone_number if exc.user else 'N/A', exc.duration_months,
-                             exc.status, str(exc.start_date), str(exc.end_date), str(exc.created_at)])
-            
-            response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            response['Content-Disposition'] = f'attachment; filename="{report_type}_{timezone.now().date()}.xlsx"'
-            wb.save(response)
-            return response
+            import openpyxl  # noqa: F401
         except ImportError:
             from rest_framework.response import Response
             return Response({'message': 'Excel export requires openpyxl. Install: pip install openpyxl'}, 
                           status=status.HTTP_501_NOT_IMPLEMENTED)
+        
+        # Write-only workbook spills rows to disk; the finished file is streamed from there
+        fileobj = tempfile.TemporaryFile()
+        write_export(report_type, 'excel', fileobj)
+        fileobj.seek(0)
+        return FileResponse(
+            fileobj, as_attachment=True, filename=filename(report_type, 'excel'), content_type=FORMATS['excel'][0]
+        )
 
 
-class ExportPDFView(TimingMixin, APIView):
-    """Export PDF"""
+class ExportPDFView(TimingMixin, ReportJobMixin, APIView):
+    """
+    Export PDF
+    Small tables are rendered in the request; larger ones (or background=true)
+    become pdf_export report jobs, downloaded from reports/<id>/download/
+    """
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def post(self, request):
+        from django.conf import settings
+        from .exports import EXPORTS, count_rows
+        
+        report_type = request.data.get('report_type', 'operators')
+        if report_type not in EXPORTS:
+            return self.error_response(f"Supported report types: {', '.join(EXPORTS)}")
         try:
-            from reportlab.lib.pagesizes import A4, landscape
-            from reportlab.lib import colors
-            from reportlab.lib.units import inch
-            from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            from django.http import HttpResponse
-            from apps.operators.models import Operator
-            from apps.nser.models import SelfExclusionRecord
-            from io import BytesIO
-            
-            report_type = request.data.get('report_type', 'operators')
-            buffer = BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=landscape(A4))
-            elements = []
-            styles = getSampleStyleSheet()
-            
-            # Title
-            title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, textColor=colors.HexColor('#1e40af'))
-            elements.append(Paragraph(f'GRAK {report_type.upper()} REPORT', title_style))
-            elements.append(Spacer(1, 0.3*inch))
-            elements.append(Paragraph(f'Generated: {timezone.now().strftime("%Y-%m-%d %H:%M")}', styles['Normal']))
-            elements.append(Spacer(1, 0.5*inch))
-            
-            # Data
-            if report_type == 'operators':
-                data = [['Operator Name', 'License Number', 'Status', 'License Expiry']]
-                for op in Operator.objects.all()[:50]:
-                    data.append([op.name, op.license_number or 'N/A', op.status, 
-                               str(op.license_expiry) if op.license_expiry else 'N/A'])
-            elif report_type == 'exclusions':
-                data = [['User Phone', 'Duration', 'Status', 'Start Date', 'End Date']]
-                for exc in SelfExclusionRecord.objects.all()[:50]:
-                    data.append([exc.user.phone_number if exc.user else 'N/A', f'{exc.duration_months}m',
-                               exc.status, str(exc.start_date), str(exc.end_date)])
-            else:
-                data = [['Report Type', 'Status'], [report_type, 'No data available']]
-            
-            table = Table(data)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1e40af')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            elements.append(table)
-            
-            doc.build(elements)
-            buffer.seek(0)
-            
-            response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{report_type}_{timezone.now().date()}.pdf"'
-            return response
+            import reportlab  # noqa: F401
         except ImportError:
             from rest_framework.response import Response
             return Response({'message': 'PDF export requires reportlab. Install: pip install reportlab'}, 
                           status=status.HTTP_501_NOT_IMPLEMENTED)
+        
+        background = request.data.get('background')
+        if background is None:
+            background = count_rows(report_type) > settings.ANALYTICS_SETTINGS.get('PDF_SYNC_MAX_ROWS', 1000)
+        if background in (True, 'true', '1', 1):
+            return self.report_job_response(request, 'pdf_export', parameters={'report_type': report_type})
+        
+        from django.http import HttpResponse
+        from io import BytesIO
+        from .exports import filename, write_export
+        
+        buffer = BytesIO()
+        write_export(report_type, 'pdf', buffer)
+        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{filename(report_type, "pdf")}"'
+        return response
 
 
-class APIPerformanceMetricsView(TimingMixin, SuccessResponseMixin, APIView):
-    """API performance metrics"""
+class APIPerformanceMetricsView(TimingMixin, ReplicaReadMixin, SuccessResponseMixin, APIView):
+    """
+    API performance metrics
+    Last 24 hours by hour and top endpoints from the sampled request log,
+    plus ?period= days of daily totals from the fact tables
+    """
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get(self, request):
-        import random
-        from datetime import datetime, timedelta
-        
-        # Generate hourly API performance data for last 24 hours
-        hours = [(datetime.now() - timedelta(hours=i)) for i in range(24, 0, -1)]
+        from django.db.models.functions import TruncHour
+        from apps.monitoring.models import APIRequestLog
+        from apps.monitoring.request_log import estimate_totals, sampled_aggregates
+        from .daily_facts import cached_series, daily_series, parse_window
+        
+        period, start, end = parse_window(request.query_params)
+        hour_end = timezone.now().replace(minute=0, second=0, microsecond=0)
+        hour_start = hour_end - timedelta(hours=24)
+        
+        def build_recent():
+            logs = APIRequestLog.objects.filter(created_at__gte=hour_start, created_at__lt=hour_end)
+            hourly = {
+                row['hour']: estimate_totals(row)
+                for row in logs.annotate(hour=TruncHour('created_at')).values('hour')
+                .annotate(**sampled_aggregates()).order_by()
+            }
+            endpoints = sorted((
+                {**estimate_totals(row), 'endpoint': row['path']}
+                for row in logs.values('path').annotate(**sampled_aggregates()).order_by()
+            ), key=lambda item: -item['requests'])[:10]
+            return {'hourly': hourly, 'endpoints': endpoints}
+        
+        recent = cached_series('api_performance:recent', build_recent, hour_end.isoformat())
+        hours = [hour_start + timedelta(hours=i) for i in range(24)]
+        hourly = [recent['hourly'].get(hour, {'requests': 0, 'errors': 0, 'avg_response_time_ms': 0}) for hour in hours]
+        total_requests = sum(item['requests'] for item in hourly)
+        total_errors = sum(item['errors'] for item in hourly)
+        total_time = sum(item['requests'] * item['avg_response_time_ms'] for item in hourly)
         
         metrics = {
-            'avg_response_time': random.randint(35, 65),
-            'total_requests': random.randint(50000, 80000),
-            'error_rate': round(random.uniform(0.1, 1.2), 2),
-            'throughput_per_hour': random.randint(2000, 4000),
+            'avg_response_time': round(total_time / total_requests, 2) if total_requests else 0,
+            'total_requests': total_requests,
+            'error_rate': round(total_errors / total_requests * 100, 2) if total_requests else 0,
+            'throughput_per_hour': round(total_requests / 24),
             'hourly_data': [{
-                'hour': hour.strftime('%H:00'),
-                'requests': random.randint(1500, 3500),
-                'avg_response_time': random.randint(30, 80),
-                'errors': random.randint(5, 50),
-                'success_rate': round(random.uniform(98.5, 99.8), 2)
-            } for hour in hours],
-            'endpoint_performance': [
-                {'endpoint': '/api/nser/check-exclusion/', 'calls': random.randint(15000, 25000), 'avg_time': random.randint(25, 45)},
-                {'endpoint': '/api/screening/assess/', 'calls': random.randint(8000, 15000), 'avg_time': random.randint(80, 150)},
-                {'endpoint': '/api/operators/verify/', 'calls': random.randint(5000, 10000), 'avg_time': random.randint(35, 65)},
-                {'endpoint': '/api/bst/generate-token/', 'calls': random.randint(3000, 8000), 'avg_time': random.randint(15, 35)}
-            ]
+                'hour': timezone.localtime(hour).strftime('%H:00'),
+                'requests': item['requests'],
+                'avg_response_time': item['avg_response_time_ms'],
+                'errors': item['errors'],
+                'success_rate': round((1 - item['errors'] / item['requests']) * 100, 2) if item['requests'] else None
+            } for hour, item in zip(hours, hourly)],
+            'endpoint_performance': [{
+                'endpoint': item['endpoint'],
+                'calls': item['requests'],
+                'avg_time': item['avg_response_time_ms']
+            } for item in recent['endpoints']],
+            'daily_data': cached_series('api_performance:daily', lambda: [{
+                'date': day['date'].isoformat(),
+                'requests': day['api_calls_total'],
+                'avg_response_time': day['avg_response_time_ms']
+            } for day in daily_series(start, end)], period, end)
         }
         
         return self.success_response(data=metrics)
 
 
 class SystemPerformanceMetricsView(TimingMixin, SuccessResponseMixin, APIView):
-    """System performance metrics"""
+    """
+    System performance metrics
+    Current gauges plus ?hours= (default 1) of history from the metric rollup tiers
+    """
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get(self, request):
-        import random
-        from datetime import datetime, timedelta
+        from apps.monitoring.models import Alert
+        from apps.monitoring.rollups import SYSTEM_METRICS, latest_value, metric_series
         
-        # Generate system performance data
-        timestamps = [(datetime.now() - timedelta(minutes=i*5)) for i in range(12, 0, -1)]
+        try:
+            hours = float(request.query_params.get('hours', 1))
+        except ValueError:
+            hours = 1
+        end = timezone.now()
+        start = end - timedelta(hours=hours)
+        
+        # One point per bucket, one column per metric (average over the bucket)
+        historical = {}
+        for key in ('cpu', 'memory', 'disk', 'network_sent_mb', 'network_recv_mb'):
+            series = metric_series(SYSTEM_METRICS[key], start, end, max_points=60)
+            for point in series['points']:
+                historical.setdefault(point['timestamp'], {'timestamp': point['timestamp']})[key] = point['avg']
         
         metrics = {
             'current': {
-                'cpu_usage': random.randint(35, 65),
-                'memory_usage': random.randint(45, 75),
-                'disk_usage': random.randint(25, 45),
-                'network_io': random.randint(100, 500),
-                'database_connections': random.randint(25, 45),
-                'active_threads': random.randint(150, 300)
+                'cpu_usage': latest_value(SYSTEM_METRICS['cpu']),
+                'memory_usage': latest_value(SYSTEM_METRICS['memory']),
+                'disk_usage': latest_value(SYSTEM_METRICS['disk']),
+                'database_connections': latest_value(SYSTEM_METRICS['database_connections']),
+                'redis_hit_rate': latest_value(SYSTEM_METRICS['redis_hit_rate']),
             },
-            'historical': [{
-                'timestamp': ts.isoformat(),
-                'cpu': random.randint(30, 70),
-                'memory': random.randint(40, 80),
-                'disk_io': random.randint(50, 200),
-                'network_in': random.randint(100, 400),
-                'network_out': random.randint(80, 350)
-            } for ts in timestamps],
+            'historical': [historical[timestamp] for timestamp in sorted(historical)],
             'alerts': [
-                {'level': 'warning', 'message': 'High memory usage detected', 'timestamp': datetime.now().isoformat()}
-            ] if random.random() > 0.7 else [],
+                {'level': alert.severity, 'message': alert.message, 'timestamp': alert.triggered_at.isoformat()}
+                for alert in Alert.objects.filter(is_resolved=False).order_by('-triggered_at')[:10]
+            ],
             'services_status': {
                 'django': 'healthy',
                 'postgresql': 'healthy',
@@ -550,53 +594,59 @@ class SystemPerformanceMetricsView(TimingMixin, SuccessResponseMixin, APIView):
         return self.success_response(data=metrics)
 
 
-class UserGrowthAnalyticsView(TimingMixin, SuccessResponseMixin, APIView):
-    """User growth analytics"""
+class UserGrowthAnalyticsView(TimingMixin, ReplicaReadMixin, SuccessResponseMixin, APIView):
+    """User growth analytics: last 12 months (to ?end_date=) from the daily fact tables"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get(self, request):
-        import random
-        from datetime import datetime, timedelta
-        
-        # Generate user growth data for last 12 months
-        months = []
-        for i in range(12, 0, -1):
-            date = datetime.now() - timedelta(days=i*30)
-            months.append({
-                'month': date.strftime('%Y-%m'),
-                'month_name': date.strftime('%B %Y'),
-                'new_users': random.randint(800, 2500),
-                'total_users': random.randint(30000, 50000) + i * random.randint(500, 1500),
-                'active_users': random.randint(15000, 25000),
-                'retention_rate': round(random.uniform(75, 90), 1)
-            })
+        from django.db.models import Max, Sum
+        from django.db.models.functions import TruncMonth
+        from apps.users.models import User
+        from .daily_facts import cached_series, parse_window
+        
+        _, _, end = parse_window(request.query_params)
+        start = (end.replace(day=1) - timedelta(days=335)).replace(day=1)
+        
+        def build():
+            months = list(
+                DailyStatistics.objects.filter(date__range=(start, end))
+                .annotate(month=TruncMonth('date'))
+                .values('month')
+                .annotate(new_users=Sum('new_users'), total_users=Max('total_users'))
+                .order_by('month')
+            )
+            
+            def growth(current, previous):
+                return round((current - previous) / previous * 100, 1) if previous else 0
+            
+            latest = months[-1] if months else {'new_users': 0, 'total_users': 0}
+            first_total = months[0]['total_users'] - months[0]['new_users'] if months else 0
+            return {
+                'end_date': end.isoformat(),
+                'growth_rate_monthly': growth(latest['total_users'], latest['total_users'] - latest['new_users']),
+                'growth_rate_yearly': growth(latest['total_users'], first_total),
+                'total_users': latest['total_users'],
+                'monthly_data': [{
+                    'month': row['month'].strftime('%Y-%m'),
+                    'month_name': row['month'].strftime('%B %Y'),
+                    'new_users': row['new_users'],
+                    'total_users': row['total_users']
+                } for row in months]
+            }
         
         analytics = {
-            'growth_rate_monthly': round(random.uniform(8, 18), 1),
-            'growth_rate_yearly': round(random.uniform(120, 180), 1),
-            'total_users': random.randint(45000, 55000),
-            'active_users_30d': random.randint(25000, 35000),
-            'churn_rate': round(random.uniform(5, 12), 1),
-            'monthly_data': months,
-            'user_acquisition_channels': {
-                'operator_referral': random.randint(8000, 15000),
-                'direct_registration': random.randint(12000, 20000),
-                'mobile_app': random.randint(10000, 18000),
-                'web_portal': random.randint(5000, 10000),
-                'sms_campaign': random.randint(3000, 8000)
-            },
-            'demographics_growth': {
-                '18-25': {'current': random.randint(8000, 12000), 'growth': random.randint(5, 15)},
-                '26-35': {'current': random.randint(15000, 20000), 'growth': random.randint(8, 18)},
-                '36-45': {'current': random.randint(10000, 15000), 'growth': random.randint(3, 12)},
-                '46+': {'current': random.randint(8000, 12000), 'growth': random.randint(2, 8)}
-            }
+            **cached_series('user_growth', build, end),
+            'active_users_30d': cached_series(
+                'active_users_30d',
+                lambda: User.objects.filter(last_login__gte=timezone.now() - timedelta(days=30)).count(),
+                timezone.localdate()
+            )
         }
         
         return self.success_response(data=analytics)
 
 
-class UserDemographicsView(TimingMixin, SuccessResponseMixin, APIView):
+class UserDemographicsView(TimingMixin, ReplicaReadMixin, SuccessResponseMixin, APIView):
     """User demographics"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
@@ -640,7 +690,7 @@ class UserEngagementView(TimingMixin, SuccessResponseMixin, APIView):
         return self.success_response(data={'active_users': 0})
 
 
-class OperatorPerformanceView(TimingMixin, SuccessResponseMixin, APIView):
+class OperatorPerformanceView(TimingMixin, ReplicaReadMixin, SuccessResponseMixin, APIView):
     """Operator performance"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
@@ -668,7 +718,7 @@ class OperatorPerformanceView(TimingMixin, SuccessResponseMixin, APIView):
         return self.success_response(data={'operators': operators})
 
 
-class OperatorComplianceScoresView(TimingMixin, SuccessResponseMixin, APIView):
+class OperatorComplianceScoresView(TimingMixin, ReplicaReadMixin, SuccessResponseMixin, APIView):
     """Operator compliance scores"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
@@ -676,7 +726,7 @@ class OperatorComplianceScoresView(TimingMixin, SuccessResponseMixin, APIView):
         return self.success_response(data={'scores': []})
 
 
-class RiskDistributionView(TimingMixin, SuccessResponseMixin, APIView):
+class RiskDistributionView(TimingMixin, ReplicaReadMixin, SuccessResponseMixin, APIView):
     """Risk distribution"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
@@ -18,16 +18,23 @@ class AuditLogMixin:
         if hasattr(request, 'start_time'):
             response_time = (time.time() - request.start_time) * 1000
             
-            # Create audit log synchronously (Celery not configured)
+            # Buffered: one Redis append here, bulk-inserted by a periodic task
             try:
                 from apps.compliance.tasks import create_audit_log
+                operator = getattr(request, 'operator', None)
                 create_audit_log(
                     user_id=str(request.user.id) if request.user.is_authenticated else None,
-                    action=f"{request.method} {request.path}",
+                    action=f"{request.method} {request.path}"[:100],
                     resource_type=self.__class__.__name__,
                     resource_id=None,
-                    details={'response_code': response.status_code},
-                    ip_address=self.get_client_ip(request)
+                    details={'response_code': response.status_code, 'response_time_ms': round(response_time, 2)},
+                    ip_address=self.get_client_ip(request),
+                    operator_id=operator.pk if operator else None,
+                    method=request.method,
+                    endpoint=request.path[:500],
+                    user_agent=request.META.get('HTTP_USER_AGENT', ''),
+                    response_code=response.status_code,
+                    success=response.status_code < 400
                 )
             except Exception:
                 pass  # Silently fail audit logging
@@ -44,7 +51,7 @@ class AuditLogMixin:
 
 
 class TimingMixin:
-    """Mixin to track request timing"""
+    """Mixin to track request timing (X-Response-Time header and latency histograms)"""
     
     def initial(self, request, *args, **kwargs):
         request.start_time = time.time()
@@ -54,8 +61,10 @@ class TimingMixin:
         response = super().finalize_response(request, response, *args, **kwargs)
         
         if hasattr(request, 'start_time'):
+            from apps.monitoring.latency import record_latency
             response_time = (time.time() - request.start_time) * 1000
             response['X-Response-Time'] = f"{response_time:.2f}ms"
+            record_latency(self.__class__.__name__, request.method, response.status_code, response_time)
         
         return response
 
@@ -81,16 +90,53 @@ class CacheMixin:
         cache.set(cache_key, response.data, self.cache_timeout)
 
 
+class ReplicaReadMixin:
+    """
+    Mixin declaring a view's GET/HEAD reads replica-safe: they are served by
+    the read replica while it is healthy and caught up, and may lag the
+    primary by up to REPLICA_MAX_LAG_SECONDS (see apps.core.db_routing)
+    """
+    
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        from apps.core.db_routing import replica_reads
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+
 class RateLimitMixin:
-    """Mixin for custom rate limiting"""
+    """
+    Mixin for per-API-key rate limiting
+    Adds APIKeyRateThrottle to the view's throttles and X-RateLimit-* headers to responses
+    """
+    
+    def get_throttles(self):
+        from .throttling import APIKeyRateThrottle
+        # API-key traffic is governed by the key's own limits, not the
+        # IP-based anonymous throttle shared by everyone behind the same NAT
+        if getattr(self.request, 'api_key', None) is not None:
+            return [APIKeyRateThrottle()]
+        return super().get_throttles()
+    
+    def get_throttle_cost(self, request):
+        """Tokens this request takes from the key's buckets (bulk views return their item count)"""
+        return 1
     
     def check_rate_limit(self, request):
-        """Check if rate limit exceeded"""
-        if hasattr(request, 'api_key'):
-            # Check operator rate limit
-            from apps.operators.models import APIKey
-            # Implementation would check Redis for rate limiting
-            pass
+        """Check if rate limit exceeded (True when the request may proceed)"""
+        from .throttling import APIKeyRateThrottle
+        return APIKeyRateThrottle().allow_request(request, self)
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        
+        rate_limit = getattr(request, 'rate_limit', None)
+        if rate_limit is not None:
+            for header, value in rate_limit.headers().items():
+                response[header] = value
+        
+        return response
 
 
 class ErrorHandlerMixin:
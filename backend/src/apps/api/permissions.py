@@ -3,7 +3,8 @@ Custom API Permissions
 Role-based access control for NSER-RG system
 """
 from rest_framework import permissions
-from django.utils import timezone
+
+from apps.operators.api_key_auth import authenticate_api_key
 
 
 class IsGRAKAdmin(permissions.BasePermission):
@@ -87,32 +88,14 @@ class HasValidAPIKey(permissions.BasePermission):
     message = "Valid API key required."
     
     def has_permission(self, request, view):
-        api_key = request.headers.get('X-API-Key')
-        
-        if not api_key:
+        key = authenticate_api_key(request.headers.get('X-API-Key'))
+        if key is None:
             return False
         
-        # Validate API key (will be implemented in view)
-        from apps.operators.models import APIKey
-        
-        try:
-            key = APIKey.objects.select_related('operator').get(
-                api_key=api_key,
-                is_active=True
-            )
-            
-            # Check expiry
-            if key.expires_at and key.expires_at < timezone.now():
-                return False
-            
-            # Attach to request
-            request.api_key = key
-            request.operator = key.operator
-            
-            return True
-            
-        except APIKey.DoesNotExist:
-            return False
+        # Attach to request
+        request.api_key = key
+        request.operator = key.operator
+        return True
 
 
 class CanLookupExclusion(permissions.BasePermission):
@@ -123,19 +106,11 @@ class CanLookupExclusion(permissions.BasePermission):
         # Check for API key first
         api_key = request.headers.get('X-API-Key')
         if api_key:
-            from apps.operators.models import APIKey
-            try:
-                key = APIKey.objects.select_related('operator').get(
-                    api_key=api_key,
-                    is_active=True
-                )
-                if key.expires_at and key.expires_at < timezone.now():
-                    return False
+            key = authenticate_api_key(api_key)
+            if key is not None:
                 request.api_key = key
                 request.operator = key.operator
                 return key.can_lookup
-            except APIKey.DoesNotExist:
-                pass
         
         # Operators with API key and lookup scope
         if hasattr(request, 'api_key'):
@@ -0,0 +1,124 @@
+"""
+Test cases for read replica routing
+Declared replica-safe reads, read-your-writes pinning and lag fallback
+"""
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from apps.core import db_routing
+from apps.core.db_routing import PIN_COOKIE, PRIMARY, REPLICA, PrimaryPinningMiddleware, current_state, replica_reads
+from config.db_router import ReplicaRouter
+
+router = ReplicaRouter()
+
+
+def _replica(usable=True):
+    """Pretend a replica is configured and (un)usable"""
+    return (
+        mock.patch('config.db_router.replica_configured', return_value=True),
+        mock.patch.object(db_routing.monitor, 'is_usable', return_value=usable),
+    )
+
+
+class TestReplicaRouter:
+    """Routing decisions"""
+
+    def test_reads_use_primary_unless_declared(self):
+        configured, monitor = _replica()
+        with configured, monitor:
+            assert router.db_for_read(None) == PRIMARY
+            with replica_reads():
+                assert router.db_for_read(None) == REPLICA
+            assert router.db_for_read(None) == PRIMARY
+        assert current_state() is None
+
+    def test_no_replica_configured(self):
+        with replica_reads():
+            assert router.db_for_read(None) == PRIMARY
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        configured, monitor = _replica(usable=False)
+        with configured, monitor:
+            with replica_reads():
+                assert router.db_for_read(None) == PRIMARY
+
+    def test_reads_after_write_stick_to_primary(self):
+        configured, monitor = _replica()
+        with configured, monitor:
+            with replica_reads():
+                assert router.db_for_read(None) == REPLICA
+                assert router.db_for_write(None) == PRIMARY
+                assert router.db_for_read(None) == PRIMARY
+                with replica_reads():  # nested blocks share the unit of work
+                    assert router.db_for_read(None) == PRIMARY
+            with replica_reads():  # a new unit of work starts unpinned
+                assert router.db_for_read(None) == REPLICA
+
+    def test_decorator_is_reentrant(self):
+        @replica_reads()
+        def depth(level):
+            return [current_state().replica_depth] + (depth(level - 1) if level else [])
+
+        assert depth(2) == [1, 2, 3]
+        assert current_state() is None
+
+
+class TestReplicaMonitor:
+    """Lag probing"""
+
+    def _probe(self, lag=None, error=None):
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value.fetchone.return_value = (lag,)
+        if error:
+            cursor.__enter__.side_effect = error
+        connection = mock.Mock(cursor=mock.Mock(return_value=cursor))
+        monitor = db_routing.ReplicaMonitor()
+        with mock.patch.object(db_routing, 'connections', {REPLICA: connection}), \
+                mock.patch.object(db_routing, '_replica_setting', side_effect=lambda name, default: default):
+            monitor.probe()
+        return monitor
+
+    def test_lag_within_threshold(self):
+        monitor = self._probe(lag=1.25)
+        assert monitor.healthy and monitor.lag == 1.25
+
+    def test_lag_over_threshold(self):
+        monitor = self._probe(lag=30)
+        assert not monitor.healthy and monitor.lag == 30
+
+    def test_unreachable_replica_backs_off(self):
+        monitor = self._probe(error=OSError('connection refused'))
+        assert not monitor.healthy and monitor.error == 'connection refused'
+        with mock.patch.object(monitor, 'probe') as probe:
+            assert monitor.is_usable() is False
+            probe.assert_not_called()
+
+
+class TestPrimaryPinningMiddleware:
+    """Cross-request read-your-writes"""
+
+    def _call(self, request, write=False):
+        def view(request):
+            if write:
+                router.db_for_write(None)
+            return HttpResponse(str(current_state().pinned))
+
+        with mock.patch.object(db_routing, 'replica_configured', return_value=True):
+            return PrimaryPinningMiddleware(view)(request)
+
+    def test_write_sets_pin_cookie(self):
+        response = self._call(RequestFactory().post('/'), write=True)
+        assert PIN_COOKIE in response.cookies
+        assert current_state() is None
+
+    def test_read_does_not_pin(self):
+        response = self._call(RequestFactory().get('/'))
+        assert PIN_COOKIE not in response.cookies
+        assert response.content == b'False'
+
+    def test_pin_cookie_pins_next_request(self):
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE] = '9999999999'
+        assert self._call(request).content == b'True'
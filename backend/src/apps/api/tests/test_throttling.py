@@ -0,0 +1,88 @@
+"""
+Test cases for per-API-key rate limiting
+Exercises the in-process fallback bucket, which mirrors the Redis Lua script
+"""
+from types import SimpleNamespace
+from unittest import mock
+
+from apps.api import throttling
+from apps.api.throttling import APIKeyRateThrottle, TokenBucketLimiter
+from apps.bst.views import BulkValidateBSTTokenView
+from apps.nser.views import BulkExclusionLookupView, ExclusionLookupView
+
+
+def _local_limiter():
+    limiter = TokenBucketLimiter()
+    limiter._redis_retry_at = float('inf')  # never try Redis in these tests
+    return limiter
+
+
+class TestTokenBucketLimiter:
+    """Token bucket semantics"""
+
+    def test_per_second_burst_then_throttled(self):
+        limiter = _local_limiter()
+        results = [limiter.consume('key-a', per_second=5, per_day=1000) for _ in range(6)]
+
+        assert [result.allowed for result in results] == [True] * 5 + [False]
+        assert results[4].remaining_second == 0
+        assert 0 < results[5].retry_after <= 0.2
+
+    def test_daily_quota_is_enforced(self):
+        limiter = _local_limiter()
+        results = [limiter.consume('key-b', per_second=100, per_day=3) for _ in range(4)]
+
+        assert [result.allowed for result in results] == [True, True, True, False]
+        assert results[2].remaining_day == 0
+
+    def test_keys_do_not_share_budget(self):
+        """One hot key must not drain another key's bucket"""
+        limiter = _local_limiter()
+        for _ in range(10):
+            limiter.consume('hot', per_second=2, per_day=1000)
+
+        assert limiter.consume('quiet', per_second=2, per_day=1000).allowed
+
+    def test_cost_larger_than_capacity_needs_a_full_bucket(self):
+        """An oversized call is let through once and leaves the bucket in debt"""
+        limiter = _local_limiter()
+        assert limiter.consume('key-d', per_second=5, per_day=1000, cost=8).allowed
+
+        result = limiter.consume('key-d', per_second=5, per_day=1000)
+        assert not result.allowed
+        assert result.retry_after > 0.6  # three tokens of debt plus the one asked for
+
+    def test_headers(self):
+        result = _local_limiter().consume('key-c', per_second=10, per_day=500)
+        headers = result.headers()
+
+        assert headers['X-RateLimit-Limit'] == '10'
+        assert headers['X-RateLimit-Remaining'] == '9'
+        assert headers['X-RateLimit-Remaining-Day'] == '499'
+
+
+class TestAPIKeyRateThrottle:
+    """DRF throttle wiring"""
+
+    def test_requests_without_api_key_are_not_limited(self):
+        assert APIKeyRateThrottle().allow_request(SimpleNamespace(), view=None)
+
+    def _request(self, **data):
+        api_key = SimpleNamespace(pk='bulk-key', rate_limit_per_second=100, rate_limit_per_day=1000)
+        return SimpleNamespace(api_key=api_key, data=data)
+
+    def test_bulk_request_costs_its_item_count(self):
+        throttle = APIKeyRateThrottle()
+        with mock.patch.object(throttling, 'get_rate_limiter', return_value=_local_limiter()):
+            lookups = self._request(lookups=[{'national_id': str(index)} for index in range(10)])
+            assert throttle.allow_request(lookups, BulkExclusionLookupView())
+            assert lookups.rate_limit.remaining_second == 90
+            assert lookups.rate_limit.remaining_day == 990
+
+            tokens = self._request(tokens=['BST-02-A', 'BST-02-B', 'BST-02-C'])
+            assert throttle.allow_request(tokens, BulkValidateBSTTokenView())
+            assert tokens.rate_limit.remaining_second == 87
+
+            single = self._request(national_id='1')
+            assert throttle.allow_request(single, ExclusionLookupView())
+            assert single.rate_limit.remaining_second == 86
@@ -0,0 +1,210 @@
+"""
+API Key Rate Limiting
+Per-key token buckets enforcing APIKey.rate_limit_per_second and
+APIKey.rate_limit_per_day.
+
+Both buckets are checked and debited in one atomic Lua script, so concurrent
+workers share a single budget per key and one hot operator cannot consume
+capacity that belongs to others. A request costs one token per item
+(see RateLimitMixin.get_throttle_cost), so a bulk call draws the buckets
+down as far as the same number of single calls would; a call larger than a
+bucket's capacity is let through only when that bucket is full and leaves
+it in debt. If Redis is unreachable the limiter falls
+back to an in-process bucket (per worker, so approximate) and retries Redis
+after a short back-off instead of failing every request.
+"""
+import logging
+import math
+import threading
+import time
+
+from rest_framework.throttling import BaseThrottle
+
+from apps.core.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+BUCKET_KEY = 'nser:rate_limit:{bucket_id}:{window}'
+REDIS_RETRY_SECONDS = 5
+LOCAL_MAX_BUCKETS = 10000
+DAY_MS = 24 * 60 * 60 * 1000
+
+# KEYS: second bucket, day bucket
+# ARGV: now_ms, second rate/ms, second capacity, day rate/ms, day capacity, cost
+# Returns: allowed, second remaining, day remaining, retry-after ms, ms until second bucket refills
+TOKEN_BUCKET_LUA = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[6])
+local buckets = {
+    {key = KEYS[1], rate = tonumber(ARGV[2]), capacity = tonumber(ARGV[3])},
+    {key = KEYS[2], rate = tonumber(ARGV[4]), capacity = tonumber(ARGV[5])},
+}
+
+local allowed = 1
+local retry_after = 0
+for _, bucket in ipairs(buckets) do
+    local state = redis.call('HMGET', bucket.key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or bucket.capacity
+    local ts = tonumber(state[2]) or now
+    bucket.tokens = math.min(bucket.capacity, tokens + math.max(0, now - ts) * bucket.rate)
+    local needed = math.min(cost, bucket.capacity)
+    if bucket.tokens < needed then
+        allowed = 0
+        retry_after = math.max(retry_after, (needed - bucket.tokens) / bucket.rate)
+    end
+end
+
+for _, bucket in ipairs(buckets) do
+    if allowed == 1 then
+        bucket.tokens = bucket.tokens - cost
+    end
+    redis.call('HSET', bucket.key, 'tokens', bucket.tokens, 'ts', now)
+    redis.call('PEXPIRE', bucket.key, math.ceil((bucket.capacity - bucket.tokens) / bucket.rate) + 1000)
+end
+
+local first = buckets[1]
+return {
+    allowed,
+    math.floor(first.tokens),
+    math.floor(buckets[2].tokens),
+    math.ceil(retry_after),
+    math.ceil((first.capacity - first.tokens) / first.rate)
+}
+"""
+
+
+class RateLimitResult:
+    """Outcome of one bucket check, used for throttling and X-RateLimit-* headers"""
+
+    def __init__(self, allowed, limit_second, remaining_second, limit_day, remaining_day,
+                 retry_after_ms, reset_ms):
+        self.allowed = allowed
+        self.limit_second = limit_second
+        self.remaining_second = max(int(remaining_second), 0)
+        self.limit_day = limit_day
+        self.remaining_day = max(int(remaining_day), 0)
+        self.retry_after = retry_after_ms / 1000
+        self.reset = reset_ms / 1000
+
+    def headers(self):
+        return {
+            'X-RateLimit-Limit': str(self.limit_second),
+            'X-RateLimit-Remaining': str(self.remaining_second),
+            'X-RateLimit-Reset': str(math.ceil(self.reset)),
+            'X-RateLimit-Limit-Day': str(self.limit_day),
+            'X-RateLimit-Remaining-Day': str(self.remaining_day),
+        }
+
+
+class TokenBucketLimiter:
+    """Redis token buckets with an in-process fallback"""
+
+    def __init__(self):
+        self._script = None
+        self._redis_retry_at = 0
+        self._local = {}
+        self._lock = threading.Lock()
+
+    def consume(self, bucket_id, per_second, per_day, cost=1):
+        per_second, per_day = max(per_second, 1), max(per_day, 1)
+        args = [time.time() * 1000, per_second / 1000, per_second, per_day / DAY_MS, per_day, cost]
+
+        reply = None
+        if time.monotonic() >= self._redis_retry_at:
+            reply = self._consume_redis(bucket_id, args)
+        if reply is None:
+            reply = self._consume_local(bucket_id, args)
+
+        allowed, remaining_second, remaining_day, retry_after_ms, reset_ms = reply
+        return RateLimitResult(
+            bool(allowed), per_second, remaining_second, per_day, remaining_day,
+            retry_after_ms, reset_ms
+        )
+
+    def _consume_redis(self, bucket_id, args):
+        client = get_redis_client()
+        if client is None:
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+            return None
+        try:
+            if self._script is None:
+                self._script = client.register_script(TOKEN_BUCKET_LUA)
+            return self._script(
+                keys=[
+                    BUCKET_KEY.format(bucket_id=bucket_id, window='second'),
+                    BUCKET_KEY.format(bucket_id=bucket_id, window='day'),
+                ],
+                args=args,
+                client=client
+            )
+        except Exception as e:
+            logger.warning(f"Rate limiter falling back to local buckets: {str(e)}")
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_SECONDS
+            return None
+
+    def _consume_local(self, bucket_id, args):
+        """Same algorithm as TOKEN_BUCKET_LUA against a per-process dict"""
+        now, second_rate, second_capacity, day_rate, day_capacity, cost = args
+        specs = [(second_rate, second_capacity), (day_rate, day_capacity)]
+
+        with self._lock:
+            state = self._local.pop(bucket_id, None) or [
+                [capacity, now] for _, capacity in specs
+            ]
+            tokens = [
+                min(capacity, bucket_tokens + max(0, now - ts) * rate)
+                for (rate, capacity), (bucket_tokens, ts) in zip(specs, state)
+            ]
+            needed = [min(cost, capacity) for _, capacity in specs]
+            allowed = all(value >= need for value, need in zip(tokens, needed))
+            retry_after = max(
+                [(need - value) / rate for (rate, _), value, need in zip(specs, tokens, needed) if value < need],
+                default=0
+            )
+            if allowed:
+                tokens = [value - cost for value in tokens]
+
+            self._local[bucket_id] = [[value, now] for value in tokens]
+            while len(self._local) > LOCAL_MAX_BUCKETS:
+                self._local.pop(next(iter(self._local)))
+
+        return [
+            int(allowed), math.floor(tokens[0]), math.floor(tokens[1]),
+            math.ceil(retry_after), math.ceil((second_capacity - tokens[0]) / second_rate)
+        ]
+
+
+_limiter = TokenBucketLimiter()
+
+
+def get_rate_limiter():
+    return _limiter
+
+
+class APIKeyRateThrottle(BaseThrottle):
+    """
+    Throttle requests authenticated by an operator API key using that key's
+    own per-second and per-day limits. Requests without an API key are left
+    to the other configured throttles.
+
+    Each request costs view.get_throttle_cost(request) tokens (default 1).
+    The result is kept on the request as `rate_limit` so RateLimitMixin can
+    emit X-RateLimit-* headers.
+    """
+
+    def allow_request(self, request, view):
+        api_key = getattr(request, 'api_key', None)
+        if api_key is None:
+            return True
+
+        get_cost = getattr(view, 'get_throttle_cost', None)
+        result = get_rate_limiter().consume(
+            api_key.pk, api_key.rate_limit_per_second, api_key.rate_limit_per_day,
+            cost=get_cost(request) if get_cost else 1
+        )
+        request.rate_limit = result
+        self.result = result
+        return result.allowed
+
+    def wait(self):
+        return max(self.result.retry_after, 1)
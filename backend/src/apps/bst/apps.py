@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BstConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.bst'
+    
+    def ready(self):
+        import apps.bst.signals
@@ -393,12 +393,15 @@ class BSTMapping(BaseModel):
     def __str__(self):
         return f"{self.bst_token.token[:20]}... - {self.operator.name}"
     
-    def record_activity(self, activity_type='lookup'):
-        """Record user activity with operator"""
+    def record_activity(self, activity_type='lookup', user_id=None):
+        """Record user activity with operator (pass the token's user_id to skip loading the token)"""
         self.last_seen_at = timezone.now()
         self.interaction_count += 1
         self.last_activity_type = activity_type
         self.save()
+        
+        from apps.screening.behavioral_profiles import mark_dirty
+        mark_dirty(user_id if user_id is not None else self.bst_token.user_id)
 
 
 class BSTCrossReference(TimeStampedModel, UUIDModel):
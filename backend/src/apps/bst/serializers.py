@@ -3,6 +3,7 @@ BST (Bematore Screening Token) Serializers
 Token generation, validation, and fraud detection
 """
 from rest_framework import serializers
+from django.conf import settings
 from django.utils import timezone
 from .models import (
     BSTToken, BSTMapping, BSTCrossReference,
@@ -245,15 +246,15 @@ class BulkValidateBSTTokenSerializer(serializers.Serializer):
     """Bulk BST token validation serializer"""
     tokens = serializers.ListField(
         child=serializers.CharField(max_length=100),
-        min_length=1,
-        max_length=100
+        min_length=1
     )
     operator_id = serializers.UUIDField(required=False)
     
     def validate_tokens(self, value):
-        if len(value) > 100:
+        max_tokens = settings.BST_SETTINGS.get('BULK_VALIDATE_MAX_TOKENS', 10000)
+        if len(value) > max_tokens:
             raise serializers.ValidationError(
-                "Maximum 100 tokens allowed per bulk validation."
+                f"Maximum {max_tokens} tokens allowed per bulk validation."
             )
         return value
 
@@ -0,0 +1,23 @@
+"""
+BST Signals
+Evict token state from every validation cache tier when it changes
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import BSTToken
+from .validation_cache import invalidate_tokens
+
+VALIDATION_FIELDS = {'token', 'is_active', 'is_compromised', 'status', 'expires_at'}
+
+
+@receiver(post_save, sender=BSTToken)
+@receiver(post_delete, sender=BSTToken)
+def invalidate_validation_cache(sender, instance, **kwargs):
+    """rotate(), compromise() and deactivation all save the token"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and not set(update_fields) & VALIDATION_FIELDS:
+        return  # e.g. last_used_at/lookup_count bumps
+    token = instance.token
+    transaction.on_commit(lambda: invalidate_tokens([token]))
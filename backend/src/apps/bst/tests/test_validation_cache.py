@@ -0,0 +1,186 @@
+"""
+Test cases for the two-tier BST validation cache
+"""
+from datetime import timedelta
+from unittest import mock
+
+import json
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.bst import validation_cache
+from apps.bst.models import BSTToken
+from apps.bst.validation_cache import (
+    NOT_FOUND, _local_cache, build_validation_response, get_token_state, get_token_states,
+    invalidate_tokens, validation_cache_key
+)
+from apps.bst.views import BulkValidateBSTTokenView
+from apps.users.models import User
+
+
+def _state(**overrides):
+    state = {
+        'token_id': 'token-1',
+        'user_id': 'user-1',
+        'is_active': True,
+        'is_compromised': False,
+        'expires_at': (timezone.now() + timedelta(days=1)).isoformat(),
+    }
+    state.update(overrides)
+    return state
+
+
+class TestValidationResponse:
+    """Responses are rebuilt from cached state on every request"""
+
+    def test_valid_token(self):
+        response = build_validation_response(_state())
+        assert response['is_valid'] and response['validation_message'] == 'Valid'
+
+    def test_expiry_is_evaluated_at_read_time(self):
+        """A cached state must not keep answering 'valid' after expiry"""
+        state = _state(expires_at=(timezone.now() + timedelta(seconds=5)).isoformat())
+        later = timezone.now() + timedelta(seconds=10)
+
+        response = build_validation_response(state, now=later)
+        assert not response['is_valid'] and response['is_expired']
+
+    def test_compromised_and_missing_tokens(self):
+        compromised = build_validation_response(_state(is_active=False, is_compromised=True))
+        assert compromised['validation_message'] == 'Invalid: Compromised'
+
+        missing = build_validation_response(NOT_FOUND)
+        assert not missing['is_valid'] and missing['token_id'] is None
+
+
+class TestLocalTier:
+    """In-process tier, answered without touching the database"""
+
+    def test_local_hit_needs_no_io(self):
+        _local_cache.set('BST-02-HOT-0001', _state())
+        state, tier = get_token_state('BST-02-HOT-0001')
+
+        assert tier == 'local' and state['token_id'] == 'token-1'
+
+    def test_invalidation_evicts_local_entry(self):
+        _local_cache.set('BST-02-ROTATED-0001', _state())
+        invalidate_tokens(['BST-02-ROTATED-0001'])
+
+        assert _local_cache.get('BST-02-ROTATED-0001') is None
+
+
+class TestBulkValidation:
+    """Batched lookups for BulkValidateBSTTokenView"""
+
+    def test_batch_served_from_local_tier(self):
+        tokens = [f'BST-02-BULK-{i:04d}' for i in range(5)]
+        for token in tokens:
+            _local_cache.set(token, _state(token_id=token))
+
+        states, tiers = get_token_states(tokens + tokens[:2])
+
+        assert set(states) == set(tokens)
+        assert tiers == {'local': 5, 'redis': 0, 'database': 0}
+
+    def test_streamed_envelope_is_valid_json(self):
+        tokens = [f'BST-02-STREAM-{i:04d}' for i in range(7)]
+        for token in tokens:
+            _local_cache.set(token, _state(token_id=token))
+
+        body = ''.join(BulkValidateBSTTokenView().stream_results(tokens, 3, None))
+        payload = json.loads(body)
+
+        assert payload['success'] and payload['data']['total'] == 7
+        assert [result['token'] for result in payload['data']['results']] == tokens
+
+
+@pytest.fixture
+def shared_cache():
+    shared = LocMemCache('bst-validation-cache-tests', {})
+    shared.clear()
+    _local_cache.clear()
+    with mock.patch.object(validation_cache, 'cache', shared):
+        yield shared
+    _local_cache.clear()
+
+
+@pytest.fixture
+def token():
+    user = User.objects.create_user(phone_number='+254712349001', national_id='70000001', email='holder@example.com')
+    return BSTToken.objects.create(user=user, phone_number_hash='validation-hash-1')
+
+
+@pytest.mark.django_db
+class TestInvalidationOnTokenChange:
+    """Saving a token evicts it from both tiers once the transaction commits"""
+
+    def _warm(self, shared_cache, token_string):
+        assert get_token_state(token_string)[1] == 'database'
+        assert get_token_state(token_string)[1] == 'local'
+        assert shared_cache.get(validation_cache_key(token_string)) is not None
+
+    def _change(self, django_capture_on_commit_callbacks, change):
+        with mock.patch.object(validation_cache._listener, 'publish', wraps=validation_cache._listener.publish) as publish:
+            with django_capture_on_commit_callbacks(execute=True), transaction.atomic():
+                result = change()
+        return publish, result
+
+    def test_compromise(self, shared_cache, token, django_capture_on_commit_callbacks):
+        self._warm(shared_cache, token.token)
+        publish, _ = self._change(django_capture_on_commit_callbacks, lambda: token.compromise('leaked'))
+
+        publish.assert_called_once_with([token.token])
+        assert shared_cache.get(validation_cache_key(token.token)) is None
+        state, tier = get_token_state(token.token)
+        assert tier == 'database'
+        assert build_validation_response(state)['validation_message'] == 'Invalid: Compromised'
+
+    def test_rotate(self, shared_cache, token, django_capture_on_commit_callbacks):
+        self._warm(shared_cache, token.token)
+        _, new_token = self._change(django_capture_on_commit_callbacks, lambda: token.rotate())
+
+        state, tier = get_token_state(token.token)
+        assert tier == 'database' and not build_validation_response(state)['is_valid']
+        assert build_validation_response(get_token_state(new_token.token)[0])['is_valid']
+
+    def test_nothing_is_evicted_before_commit(self, shared_cache, token):
+        self._warm(shared_cache, token.token)
+        with transaction.atomic():
+            token.compromise('leaked')
+            assert get_token_state(token.token)[1] == 'local'  # other readers see the committed state
+
+    def test_unknown_token_is_cached_as_not_found(self, shared_cache):
+        assert get_token_state('BST-02-UNKNOWN-0001') == (NOT_FOUND, 'database')
+        assert shared_cache.get(validation_cache_key('BST-02-UNKNOWN-0001')) == NOT_FOUND
+
+        _local_cache.clear()
+        assert get_token_state('BST-02-UNKNOWN-0001') == (NOT_FOUND, 'redis')
+
+
+@pytest.mark.django_db
+class TestBulkValidationAgainstDatabase:
+    """Misses of a batch are resolved together and cached, found or not"""
+
+    def test_one_query_for_found_and_unknown_tokens(self, shared_cache, token):
+        user = User.objects.create_user(phone_number='+254712349002', national_id='70000002', email='holder2@example.com')
+        other = BSTToken.objects.create(user=user, phone_number_hash='validation-hash-2')
+        unknown = ['BST-02-UNKNOWN-0002', 'BST-02-UNKNOWN-0003']
+
+        with CaptureQueriesContext(connection) as queries:
+            states, tiers = get_token_states([token.token, other.token] + unknown)
+
+        assert len(queries.captured_queries) == 1
+        assert ' IN (' in queries.captured_queries[0]['sql']
+        assert tiers == {'local': 0, 'redis': 0, 'database': 4}
+        assert states[token.token]['token_id'] == str(token.pk)
+        assert states[other.token]['user_id'] == str(user.pk)
+        for token_string in unknown:
+            assert states[token_string] == NOT_FOUND
+            assert shared_cache.get(validation_cache_key(token_string)) == NOT_FOUND
+
+        _local_cache.clear()
+        assert get_token_states(unknown)[1] == {'local': 0, 'redis': 2, 'database': 0}
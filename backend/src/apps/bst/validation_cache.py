@@ -0,0 +1,243 @@
+"""
+BST Validation Cache
+Two-tier cache for ValidateBSTTokenView:
+
+1. Per-process LRU/TTL (microseconds, no I/O) for hot tokens
+2. Shared Django cache (Redis)
+3. One indexed BSTToken query on a miss
+
+What is cached is the token's state (not the response), so expiry is
+re-evaluated on every request. Rotation, compromise and deactivation publish
+the token on a Redis channel that every process listens to, evicting it from
+all local tiers immediately; the Redis entry is deleted at the same time.
+
+Validation audit events are batched in-process and flushed to the audit
+buffer about once a second, so a cache hit performs no I/O at all.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.compliance.audit_buffer import AuditEventBatcher, audit_event
+from apps.core.local_cache import InvalidationListener, LocalTTLCache
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'nser:bst_validation:invalidate'
+NOT_FOUND = 'not_found'
+
+
+def _bst_setting(name, default):
+    return getattr(settings, 'BST_SETTINGS', {}).get(name, default)
+
+
+_local_cache = LocalTTLCache(
+    max_entries=_bst_setting('VALIDATION_LOCAL_CACHE_SIZE', 50000),
+    ttl_seconds=_bst_setting('VALIDATION_LOCAL_TTL_SECONDS', 30)
+)
+_listener = InvalidationListener(INVALIDATION_CHANNEL, _local_cache)
+
+
+def validation_cache_key(token_string):
+    return f"bst_validate:{token_string}"
+
+
+def token_state(token):
+    """Cacheable snapshot of the fields validation depends on"""
+    return {
+        'token_id': str(token.id),
+        'user_id': str(token.user_id),
+        'is_active': token.is_active,
+        'is_compromised': token.is_compromised,
+        'expires_at': token.expires_at.isoformat() if token.expires_at else None,
+    }
+
+
+def build_validation_response(state, now=None):
+    """ValidateBSTTokenView payload for a token state (or NOT_FOUND)"""
+    now = now or timezone.now()
+    if state == NOT_FOUND:
+        return {
+            'is_valid': False,
+            'token_id': None,
+            'user_id': None,
+            'is_active': False,
+            'is_compromised': False,
+            'expires_at': None,
+            'is_expired': False,
+            'validation_message': 'Token not found',
+            'validation_timestamp': now.isoformat(),
+        }
+
+    expires_at = parse_datetime(state['expires_at']) if state['expires_at'] else None
+    is_expired = expires_at < now if expires_at else False
+    is_valid = state['is_active'] and not state['is_compromised'] and not is_expired
+    return dict(
+        state,
+        is_valid=is_valid,
+        is_expired=is_expired,
+        validation_message='Valid' if is_valid else 'Invalid: ' + (
+            'Expired' if is_expired else 'Compromised' if state['is_compromised'] else 'Inactive'
+        ),
+        validation_timestamp=now.isoformat(),
+    )
+
+
+def get_token_state(token_string):
+    """
+    Token state through the two tiers.
+    Returns (state, tier) with tier in {'local', 'redis', 'database'}.
+    """
+    from .models import BSTToken
+
+    _listener.ensure_started()
+    state = _local_cache.get(token_string)
+    if state is not None:
+        return state, 'local'
+
+    cache_key = validation_cache_key(token_string)
+    try:
+        state = cache.get(cache_key)
+    except Exception as e:
+        logger.warning(f"BST validation cache read failed: {str(e)}")
+        state = None
+    if state is not None:
+        _local_cache.set(token_string, state)
+        return state, 'redis'
+
+    token = BSTToken.objects.filter(token=token_string).only(
+        'id', 'user_id', 'is_active', 'is_compromised', 'expires_at'
+    ).first()
+    state = token_state(token) if token else NOT_FOUND
+    try:
+        cache.set(cache_key, state, _bst_setting('VALIDATION_CACHE_TTL_SECONDS', 120))
+    except Exception as e:
+        logger.warning(f"BST validation cache write failed: {str(e)}")
+    _local_cache.set(token_string, state)
+    return state, 'database'
+
+
+def get_token_states(token_strings):
+    """
+    Batched get_token_state: local tier, one MGET, one `token__in` query
+    with only the needed columns, one pipelined write-back.
+    Returns ({token: state}, {tier: count}).
+    """
+    from .models import BSTToken
+
+    _listener.ensure_started()
+    states, tiers = {}, {'local': 0, 'redis': 0, 'database': 0}
+
+    misses = []
+    for token_string in dict.fromkeys(token_strings):
+        state = _local_cache.get(token_string)
+        if state is None:
+            misses.append(token_string)
+        else:
+            states[token_string] = state
+            tiers['local'] += 1
+
+    if misses:
+        try:
+            cached = cache.get_many([validation_cache_key(token) for token in misses])
+        except Exception as e:
+            logger.warning(f"BST validation cache read failed: {str(e)}")
+            cached = {}
+        remaining = []
+        for token_string in misses:
+            state = cached.get(validation_cache_key(token_string))
+            if state is None:
+                remaining.append(token_string)
+            else:
+                states[token_string] = state
+                _local_cache.set(token_string, state)
+                tiers['redis'] += 1
+        misses = remaining
+
+    if misses:
+        found = {
+            token: {
+                'token_id': str(token_id),
+                'user_id': str(user_id),
+                'is_active': is_active,
+                'is_compromised': is_compromised,
+                'expires_at': expires_at.isoformat() if expires_at else None,
+            }
+            for token, token_id, user_id, is_active, is_compromised, expires_at in BSTToken.objects.filter(
+                token__in=misses
+            ).values_list('token', 'id', 'user_id', 'is_active', 'is_compromised', 'expires_at')
+        }
+        to_cache = {}
+        for token_string in misses:
+            state = found.get(token_string, NOT_FOUND)
+            states[token_string] = state
+            to_cache[validation_cache_key(token_string)] = state
+            _local_cache.set(token_string, state)
+        tiers['database'] += len(misses)
+        try:
+            cache.set_many(to_cache, _bst_setting('VALIDATION_CACHE_TTL_SECONDS', 120))
+        except Exception as e:
+            logger.warning(f"BST validation cache write failed: {str(e)}")
+
+    return states, tiers
+
+
+def invalidate_tokens(token_strings):
+    """Drop tokens from Redis and from every process's local tier"""
+    token_strings = [token for token in token_strings if token]
+    if not token_strings:
+        return
+    try:
+        cache.delete_many([validation_cache_key(token) for token in token_strings])
+    except Exception as e:
+        logger.warning(f"BST validation cache invalidation failed: {str(e)}")
+    _listener.publish(token_strings)
+
+
+_validation_log = AuditEventBatcher(
+    flush_seconds=_bst_setting('VALIDATION_LOG_FLUSH_SECONDS', 1.0),
+    max_events=_bst_setting('VALIDATION_LOG_MAX_BATCH', 1000)
+)
+
+
+def log_bulk_validation(responses, operator_id=None, tiers=None):
+    """One aggregated audit event for a bulk validation call"""
+    try:
+        _validation_log.add(audit_event(
+            action='bst_bulk_validation',
+            resource_type='bst_token',
+            operator_id=operator_id,
+            metadata={
+                'total': len(responses),
+                'valid': sum(1 for response in responses if response['is_valid']),
+                'not_found': sum(1 for response in responses if response['token_id'] is None),
+                'invalid_token_ids': [
+                    response['token_id'] for response in responses
+                    if response['token_id'] and not response['is_valid']
+                ],
+                'cache_tiers': tiers,
+            }
+        ))
+    except Exception as e:
+        logger.warning(f"Failed to queue BST bulk validation log: {str(e)}")
+
+
+def log_validation(response_data, operator_id=None, tier=None):
+    """Queue a validation audit event; written in batches off the request path"""
+    try:
+        _validation_log.add(audit_event(
+            action='bst_validation',
+            resource_type='bst_token',
+            resource_id=response_data['token_id'] or '',
+            operator_id=operator_id,
+            metadata={
+                'is_valid': response_data['is_valid'],
+                'validation_message': response_data['validation_message'],
+                'cache_tier': tier,
+            }
+        ))
+    except Exception as e:
+        logger.warning(f"Failed to queue BST validation log: {str(e)}")
@@ -7,13 +7,19 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.db import transaction
-from django.core.cache import cache
+import json
 import time
 import secrets
 
 from .models import BSTToken, BSTMapping, BSTCrossReference, BSTAuditLog
+from .validation_cache import (
+    build_validation_response, get_token_state, get_token_states,
+    log_bulk_validation, log_validation
+)
 from .serializers import (
     BSTTokenListSerializer, BSTTokenDetailSerializer,
     GenerateBSTTokenSerializer, ValidateBSTTokenSerializer,
@@ -24,7 +30,7 @@ from .serializers import (
     FraudCheckSerializer
 )
 from apps.api.permissions import IsGRAKStaff, CanLookupExclusion
-from apps.api.mixins import TimingMixin, SuccessResponseMixin, CacheMixin
+from apps.api.mixins import TimingMixin, SuccessResponseMixin, CacheMixin, RateLimitMixin
 
 
 class BSTTokenViewSet(TimingMixin, viewsets.ModelViewSet):
@@ -83,7 +89,7 @@ class GenerateBSTTokenView(TimingMixin, SuccessResponseMixin, APIView):
         )
 
 
-class ValidateBSTTokenView(TimingMixin, CacheMixin, APIView):
+class ValidateBSTTokenView(TimingMixin, RateLimitMixin, CacheMixin, APIView):
     """
     Validate BST token (HIGH PERFORMANCE - Target <20ms)
     POST /api/v1/bst/validate/
@@ -101,89 +107,83 @@ class ValidateBSTTokenView(TimingMixin, CacheMixin, APIView):
         
         token_string = serializer.validated_data['token']
         
-        # Try cache first
-        cache_key = f"bst_validate:{token_string}"
-        cached_result = cache.get(cache_key)
-        
-        if cached_result:
-            cached_result['response_time_ms'] = int((time.time() - start_time) * 1000)
-            cached_result['from_cache'] = True
-            return Response(cached_result, status=status.HTTP_200_OK)
+        # In-process tier, then Redis, then one indexed query
+        state, tier = get_token_state(token_string)
         
-        # Database lookup with optimized query
-        token = BSTToken.objects.filter(
-            token_string=token_string
-        ).select_related('user').only(
-            'id', 'token_string', 'is_active', 'is_compromised',
-            'expires_at', 'user_id'
-        ).first()
+        response_data = build_validation_response(state)
+        response_data['response_time_ms'] = int((time.time() - start_time) * 1000)
+        if tier != 'database':
+            response_data['from_cache'] = True
         
-        response_time_ms = int((time.time() - start_time) * 1000)
-        
-        if not token:
-            response_data = {
-                'is_valid': False,
-                'token_id': None,
-                'user_id': None,
-                'is_active': False,
-                'is_compromised': False,
-                'expires_at': None,
-                'is_expired': False,
-                'validation_message': 'Token not found',
-                'validation_timestamp': timezone.now().isoformat(),
-                'response_time_ms': response_time_ms
-            }
-        else:
-            is_expired = token.expires_at < timezone.now() if token.expires_at else False
-            is_valid = token.is_active and not token.is_compromised and not is_expired
-            
-            response_data = {
-                'is_valid': is_valid,
-                'token_id': str(token.id),
-                'user_id': str(token.user_id),
-                'is_active': token.is_active,
-                'is_compromised': token.is_compromised,
-                'expires_at': token.expires_at.isoformat() if token.expires_at else None,
-                'is_expired': is_expired,
-                'validation_message': 'Valid' if is_valid else 'Invalid: ' + ('Expired' if is_expired else 'Compromised' if token.is_compromised else 'Inactive'),
-                'validation_timestamp': timezone.now().isoformat(),
-                'response_time_ms': response_time_ms
-            }
-        
-        # Cache result
-        cache.set(cache_key, response_data, self.cache_timeout)
-        
-        # Log validation (async)
-        from .tasks import log_token_validation
-        log_token_validation.delay(
-            token_string=token_string,
-            result=response_data,
-            operator_id=str(serializer.validated_data.get('operator_id')) if serializer.validated_data.get('operator_id') else None
-        )
+        # Batched audit logging (no I/O on the request path)
+        operator_id = serializer.validated_data.get('operator_id')
+        log_validation(response_data, operator_id=str(operator_id) if operator_id else None, tier=tier)
         
         return Response(response_data, status=status.HTTP_200_OK)
 
 
-class BulkValidateBSTTokenView(TimingMixin, SuccessResponseMixin, APIView):
-    """Bulk token validation (max 100)"""
+class BulkValidateBSTTokenView(TimingMixin, RateLimitMixin, SuccessResponseMixin, APIView):
+    """
+    Bulk token validation (up to BULK_VALIDATE_MAX_TOKENS)
+    
+    Each chunk of BULK_VALIDATE_CHUNK_SIZE tokens costs one MGET, one
+    `token__in` query and one pipelined cache write. Requests larger than one
+    chunk are streamed back chunk by chunk in the same JSON envelope.
+    """
     permission_classes = [CanLookupExclusion]
     
+    def get_throttle_cost(self, request):
+        """One token per token validated"""
+        items = request.data.get('tokens') if isinstance(request.data, dict) else None
+        return max(len(items), 1) if isinstance(items, list) else 1
+    
     def post(self, request):
         serializer = BulkValidateBSTTokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
         tokens = serializer.validated_data['tokens']
-        results = []
+        operator_id = serializer.validated_data.get('operator_id')
+        operator_id = str(operator_id) if operator_id else None
+        chunk_size = settings.BST_SETTINGS.get('BULK_VALIDATE_CHUNK_SIZE', 2000)
         
-        for token_string in tokens:
-            validate_view = ValidateBSTTokenView()
-            validate_view.request = request
-            response = validate_view.post(request)
-            results.append(response.data)
+        if len(tokens) <= chunk_size:
+            results, tiers = self.validate_chunk(tokens)
+            log_bulk_validation(results, operator_id=operator_id, tiers=tiers)
+            return self.success_response(
+                data={'results': results, 'total': len(results)}
+            )
         
-        return self.success_response(
-            data={'results': results, 'total': len(results)}
+        return StreamingHttpResponse(
+            self.stream_results(tokens, chunk_size, operator_id),
+            content_type='application/json'
         )
+    
+    def validate_chunk(self, tokens):
+        states, tiers = get_token_states(tokens)
+        now = timezone.now()
+        return [
+            dict(build_validation_response(states[token_string], now=now), token=token_string)
+            for token_string in tokens
+        ], tiers
+    
+    def stream_results(self, tokens, chunk_size, operator_id):
+        """Yield the success_response envelope incrementally"""
+        yield (
+            '{"success": true, "message": "Operation completed successfully", '
+            f'"timestamp": {json.dumps(timezone.now().isoformat())}, "data": {{"results": ['
+        )
+        
+        all_results = []
+        tiers = {}
+        for offset in range(0, len(tokens), chunk_size):
+            results, chunk_tiers = self.validate_chunk(tokens[offset:offset + chunk_size])
+            for tier, count in chunk_tiers.items():
+                tiers[tier] = tiers.get(tier, 0) + count
+            all_results.extend(results)
+            yield (', ' if offset else '') + ', '.join(json.dumps(result) for result in results)
+        
+        yield f'], "total": {len(all_results)}}}}}'
+        log_bulk_validation(all_results, operator_id=operator_id, tiers=tiers)
 
 
 class RotateBSTTokenView(TimingMixin, SuccessResponseMixin, APIView):
@@ -207,8 +207,7 @@ class RotateBSTTokenView(TimingMixin, SuccessResponseMixin, APIView):
         new_token.last_rotated_at = timezone.now()
         new_token.save()
         
-        # Clear cache
-        cache.delete(f"bst_validate:{token.token_string}")
+        # Validation cache is invalidated by the BSTToken post_save hook
         
         # Notify user if requested
         if serializer.validated_data.get('notify_user'):
@@ -241,8 +240,7 @@ class CompromiseBSTTokenView(TimingMixin, SuccessResponseMixin, APIView):
         token.compromised_at = timezone.now()
         token.save()
         
-        # Clear cache
-        cache.delete(f"bst_validate:{token.token_string}")
+        # Validation cache is invalidated by the BSTToken post_save hook
         
         # Auto-rotate if requested
         if serializer.validated_data.get('auto_rotate'):
@@ -252,13 +250,13 @@ class CompromiseBSTTokenView(TimingMixin, SuccessResponseMixin, APIView):
                 from apps.notifications.tasks import send_token_compromised_notification
                 send_token_compromised_notification.delay(
                     user_id=str(token.user.id),
-                    new_token=new_token.token_string
+                    new_token=new_token.token
                 )
         
         return self.success_response(message='Token marked as compromised')
 
 
-class CreateBSTMappingView(TimingMixin, SuccessResponseMixin, APIView):
+class CreateBSTMappingView(TimingMixin, RateLimitMixin, SuccessResponseMixin, APIView):
     """Create BST operator mapping"""
     permission_classes = [CanLookupExclusion]
     
@@ -430,7 +428,7 @@ class BulkGenerateBSTTokenView(TimingMixin, SuccessResponseMixin, APIView):
         return self.success_response(data={'results': results, 'total': len(results)})
 
 
-class LookupBSTTokenView(TimingMixin, SuccessResponseMixin, APIView):
+class LookupBSTTokenView(TimingMixin, RateLimitMixin, SuccessResponseMixin, APIView):
     """Lookup BST token by user identifiers"""
     permission_classes = [CanLookupExclusion]
     
@@ -462,7 +460,7 @@ class LookupBSTTokenView(TimingMixin, SuccessResponseMixin, APIView):
         return self.success_response(data=BSTTokenDetailSerializer(token).data)
 
 
-class LookupUserByBSTView(TimingMixin, SuccessResponseMixin, APIView):
+class LookupUserByBSTView(TimingMixin, RateLimitMixin, SuccessResponseMixin, APIView):
     """Lookup user by BST token"""
     permission_classes = [CanLookupExclusion]
     
@@ -472,7 +470,7 @@ class LookupUserByBSTView(TimingMixin, SuccessResponseMixin, APIView):
         if not token_string:
             return self.error_response(message='Token required')
         
-        token = BSTToken.objects.filter(token_string=token_string, is_active=True).select_related('user').first()
+        token = BSTToken.objects.filter(token=token_string, is_active=True).select_related('user').first()
         
         if not token:
             return self.error_response(message='Token not found', status_code=status.HTTP_404_NOT_FOUND)
@@ -514,9 +512,7 @@ class DeactivateBSTTokenView(TimingMixin, SuccessResponseMixin, APIView):
     def post(self, request, pk):
         token = BSTToken.objects.get(pk=pk)
         token.is_active = False
-        token.save()
-        
-        cache.delete(f"bst_validate:{token.token_string}")
+        token.save()  # post_save hook invalidates the validation cache
         
         return self.success_response(message='Token deactivated')
 
@@ -551,7 +547,7 @@ class LinkIdentifierView(TimingMixin, SuccessResponseMixin, APIView):
         )
 
 
-class RecordActivityView(TimingMixin, SuccessResponseMixin, APIView):
+class RecordActivityView(TimingMixin, RateLimitMixin, SuccessResponseMixin, APIView):
     """Record BST token activity"""
     permission_classes = [CanLookupExclusion]
     
@@ -564,20 +560,12 @@ class RecordActivityView(TimingMixin, SuccessResponseMixin, APIView):
         token = BSTToken.objects.get(id=serializer.validated_data['token_id'])
         operator_id = serializer.validated_data['operator_id']
         
-        mapping, created = BSTMapping.objects.get_or_create(
-            token=token,
+        mapping, _ = BSTMapping.objects.get_or_create(
+            bst_token=token,
             operator_id=operator_id,
-            defaults={'first_activity_date': timezone.now().date()}
+            defaults={'operator_user_id': request.data.get('operator_user_id', '')}
         )
-        
-        if not created:
-            mapping.last_activity_date = timezone.now().date()
-            mapping.total_bets += 1
-            
-            if serializer.validated_data.get('amount'):
-                mapping.total_amount_wagered += serializer.validated_data['amount']
-            
-            mapping.save()
+        mapping.record_activity(serializer.validated_data['activity_type'], user_id=token.user_id)
         
         return self.success_response(message='Activity recorded')
 
@@ -6,6 +6,7 @@ from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
 from django.utils import timezone
+from apps.core.admin import ReplicaReadAdminMixin
 from .models import ComplianceCheck, AuditLog, DataRetentionPolicy, IncidentReport, RegulatoryReport
 
 
@@ -92,7 +93,7 @@ class ComplianceCheckAdmin(admin.ModelAdmin):
 
 
 @admin.register(AuditLog)
-class AuditLogAdmin(admin.ModelAdmin):
+class AuditLogAdmin(ReplicaReadAdminMixin, admin.ModelAdmin):
     """Immutable audit trail"""
     list_display = (
         'action_badge', 'actor_display', 'resource_type', 'timestamp'
@@ -0,0 +1,296 @@
+"""
+Buffered Audit Log Pipeline
+Request paths append audit events to a Redis stream; a periodic Celery task
+drains the stream into compliance_audit_logs with bulk_create in batches of
+thousands.
+
+Durability:
+- Events are read through a consumer group and only XACK'd/XDEL'd after the
+  rows are committed. Entries held by a worker that died mid-flush are
+  reclaimed with XAUTOCLAIM on the next run.
+- Each event carries its AuditLog primary key, and inserts ignore conflicts,
+  so a replayed batch never creates duplicate rows.
+- When Redis is not available the event is written to the database directly.
+
+Backpressure:
+- When the stream grows past AUDIT_BUFFER_MAX_LENGTH (the drainer is behind),
+  producers drain a small batch themselves before returning and request an
+  immediate drain, slowing intake to the rate the database can absorb.
+  Events are never dropped.
+
+`timestamp` is set by the database at insert time; the time the action
+happened is kept in metadata['occurred_at'].
+"""
+import atexit
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+from django.utils import timezone
+
+from apps.core.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = 'nser:audit_log:events'
+GROUP_NAME = 'audit-writers'
+
+EVENT_FIELDS = (
+    'id', 'user_id', 'operator_id', 'action', 'resource_type', 'resource_id',
+    'ip_address', 'user_agent', 'method', 'endpoint', 'reason', 'metadata',
+    'success', 'error_message', 'response_code', 'session_id',
+)
+
+
+def _compliance_setting(name, default):
+    return getattr(settings, 'COMPLIANCE_SETTINGS', {}).get(name, default)
+
+
+def audit_event(action, resource_type, resource_id='', **fields):
+    """
+    Build a serializable audit event (AuditLog field values).
+    Unknown keyword arguments are rejected to catch typos early.
+    """
+    unknown = set(fields) - set(EVENT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown audit event fields: {', '.join(sorted(unknown))}")
+
+    event = {key: value for key, value in fields.items() if value is not None}
+    for key in ('user_id', 'operator_id'):
+        if key in event:
+            event[key] = str(event[key])
+    event.update({
+        'id': str(uuid.uuid4()),
+        'action': action,
+        'resource_type': resource_type,
+        'resource_id': str(resource_id or ''),
+    })
+    event['metadata'] = dict(event.get('metadata') or {}, occurred_at=timezone.now().isoformat())
+    return event
+
+
+def record_audit_event(action, resource_type, resource_id='', **fields):
+    """Queue one audit event"""
+    record_audit_events([audit_event(action, resource_type, resource_id, **fields)])
+
+
+def record_audit_events(events):
+    """Queue audit events in one Redis round-trip (direct insert without Redis)"""
+    events = list(events)
+    if not events:
+        return
+
+    client = get_redis_client() if _compliance_setting('AUDIT_BUFFER_ENABLED', True) else None
+    if client is not None:
+        try:
+            pipe = client.pipeline(transaction=False)
+            for event in events:
+                pipe.xadd(STREAM_KEY, {'e': json.dumps(event, default=str)})
+            pipe.xlen(STREAM_KEY)
+            length = pipe.execute()[-1]
+        except Exception as e:
+            logger.warning(f"Audit buffer unavailable, writing directly: {str(e)}")
+        else:
+            if length > _compliance_setting('AUDIT_BUFFER_MAX_LENGTH', 2000000):
+                _apply_backpressure()
+            return
+
+    write_audit_events(events)
+
+
+_drain_requested_at = 0
+
+
+def _apply_backpressure():
+    """Drainer is behind: make producers pay by draining a batch themselves"""
+    global _drain_requested_at
+    now = time.monotonic()
+    if now - _drain_requested_at > 1:
+        _drain_requested_at = now
+        try:
+            from .tasks import flush_audit_log_buffer
+            flush_audit_log_buffer.delay()
+        except Exception as e:
+            logger.warning(f"Could not request audit buffer drain: {str(e)}")
+    try:
+        flush_audit_buffer(max_batches=1, batch_size=_compliance_setting('AUDIT_BUFFER_BACKPRESSURE_BATCH', 500))
+    except Exception as e:
+        logger.warning(f"Backpressure drain failed: {str(e)}")
+
+
+def write_audit_events(events):
+    """Insert audit events, dropping foreign keys that do not resolve"""
+    from apps.users.models import User
+    from apps.operators.models import Operator
+    from .models import AuditLog
+
+    user_ids = {event['user_id'] for event in events if event.get('user_id')}
+    operator_ids = {event['operator_id'] for event in events if event.get('operator_id')}
+    known_users = {
+        str(pk) for pk in User.objects.filter(id__in=user_ids).values_list('id', flat=True)
+    } if user_ids else set()
+    known_operators = {
+        str(pk) for pk in Operator.objects.filter(id__in=operator_ids).values_list('id', flat=True)
+    } if operator_ids else set()
+
+    rows = []
+    for event in events:
+        values = {key: event[key] for key in EVENT_FIELDS if key in event}
+        metadata = dict(values.get('metadata') or {})
+        for key, known in (('user_id', known_users), ('operator_id', known_operators)):
+            if values.get(key) and values[key] not in known:
+                metadata[f'unresolved_{key}'] = values.pop(key)
+        values['metadata'] = metadata
+        rows.append(AuditLog(**values))
+
+    with transaction.atomic():
+        AuditLog.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows)
+
+
+def _write_batch(events):
+    """
+    Write a drained batch. A row the database rejects (bad IP, oversized
+    field) is isolated and logged so it cannot block the stream; connection
+    errors propagate and leave the batch pending for the next run.
+    """
+    try:
+        return write_audit_events(events)
+    except (DataError, IntegrityError, ValueError) as e:
+        logger.error(f"Audit batch rejected, retrying row by row: {str(e)}")
+
+    written = 0
+    for event in events:
+        try:
+            written += write_audit_events([event])
+        except (DataError, IntegrityError, ValueError) as e:
+            logger.error(f"Discarding audit event {event.get('id')}: {str(e)} ({json.dumps(event, default=str)})")
+    return written
+
+
+def _consumer_name():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _ensure_group(client):
+    try:
+        client.xgroup_create(STREAM_KEY, GROUP_NAME, id='0', mkstream=True)
+    except Exception as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def _decode(entries):
+    """(stream ids, events) from XREADGROUP/XAUTOCLAIM entries"""
+    ids, events = [], []
+    for entry_id, fields in entries:
+        ids.append(entry_id)
+        if not fields:
+            continue  # deleted while pending
+        raw = fields.get(b'e') or fields.get('e')
+        try:
+            events.append(json.loads(raw))
+        except (TypeError, ValueError):
+            logger.error(f"Discarding malformed audit event {entry_id}")
+    return ids, events
+
+
+def flush_audit_buffer(max_batches=None, batch_size=None, time_budget_seconds=None):
+    """
+    Drain the audit stream into the database.
+    Returns {'written': n, 'batches': n, 'pending': n}.
+    """
+    client = get_redis_client()
+    summary = {'written': 0, 'batches': 0, 'pending': 0}
+    if client is None:
+        return summary
+
+    batch_size = batch_size or _compliance_setting('AUDIT_BUFFER_BATCH_SIZE', 5000)
+    claim_idle_ms = _compliance_setting('AUDIT_BUFFER_CLAIM_IDLE_SECONDS', 60) * 1000
+    deadline = time.monotonic() + (time_budget_seconds or float('inf'))
+    consumer = _consumer_name()
+    _ensure_group(client)
+
+    # Entries delivered to a worker that died before acknowledging them
+    reclaimed = client.xautoclaim(STREAM_KEY, GROUP_NAME, consumer, claim_idle_ms, '0-0', count=batch_size)
+    pending_entries = reclaimed[1] if reclaimed else []
+
+    while max_batches is None or summary['batches'] < max_batches:
+        entries = pending_entries
+        pending_entries = []
+        if not entries:
+            reply = client.xreadgroup(GROUP_NAME, consumer, {STREAM_KEY: '>'}, count=batch_size)
+            entries = reply[0][1] if reply else []
+        if not entries:
+            break
+
+        ids, events = _decode(entries)
+        if events:
+            summary['written'] += _write_batch(events)
+        pipe = client.pipeline(transaction=False)
+        pipe.xack(STREAM_KEY, GROUP_NAME, *ids)
+        pipe.xdel(STREAM_KEY, *ids)
+        pipe.execute()
+        summary['batches'] += 1
+
+        if time.monotonic() > deadline:
+            break
+
+    summary['pending'] = client.xlen(STREAM_KEY)
+    return summary
+
+
+class AuditEventBatcher:
+    """
+    In-process batcher for very hot, low-value events (e.g. BST validations):
+    events are appended to a list and handed to record_audit_events in one
+    pipeline every `flush_seconds` or `max_events`, so the request path does no I/O.
+
+    Trade-off: up to `flush_seconds` of events can be lost if the process is
+    killed; use record_audit_event directly for actions that must not be lost.
+    """
+
+    def __init__(self, flush_seconds=1.0, max_events=1000):
+        self.flush_seconds = flush_seconds
+        self.max_events = max_events
+        self._events = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, event):
+        with self._lock:
+            self._events.append(event)
+            full = len(self._events) >= self.max_events
+        self._ensure_started()
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        with self._lock:
+            events, self._events = self._events, []
+        if events:
+            try:
+                record_audit_events(events)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(events)} batched audit events: {str(e)}")
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='audit-batcher', daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            self.flush()
@@ -2,9 +2,36 @@
 Compliance Tasks Module
 Handles async compliance operations and audit logging
 """
+from celery import shared_task
+import logging
 
-def create_audit_log(user_id, action, resource_type, resource_id, details=None, ip_address=None):
+logger = logging.getLogger(__name__)
+
+
+def create_audit_log(user_id, action, resource_type, resource_id, details=None, ip_address=None, **fields):
     """
-    Create audit log entry (stub for now)
+    Queue an audit log entry on the buffered audit pipeline
+    Extra keyword arguments are AuditLog fields (method, endpoint, response_code, ...)
     """
-    pass
+    from .audit_buffer import record_audit_event
+    
+    record_audit_event(
+        action=action,
+        resource_type=resource_type,
+        resource_id=resource_id,
+        user_id=user_id,
+        ip_address=ip_address,
+        metadata=details or {},
+        **fields
+    )
+
+
+@shared_task(ignore_result=True)
+def flush_audit_log_buffer():
+    """Drain buffered audit events into the database in bulk"""
+    from .audit_buffer import flush_audit_buffer
+    
+    result = flush_audit_buffer(time_budget_seconds=50)
+    if result['written']:
+        logger.info(f"Flushed {result['written']} audit events, {result['pending']} pending")
+    return result
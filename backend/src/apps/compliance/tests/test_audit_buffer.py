@@ -0,0 +1,184 @@
+"""
+Test cases for the buffered audit log pipeline
+"""
+import json
+import uuid
+from datetime import date, timedelta
+from unittest import mock
+
+import pytest
+
+from apps.compliance import audit_buffer
+from apps.compliance.audit_buffer import _decode, _write_batch, audit_event, flush_audit_buffer, record_audit_events
+from apps.compliance.models import AuditLog
+from apps.compliance.tasks import flush_audit_log_buffer
+from apps.operators.models import Operator
+
+
+class TestAuditEvent:
+    """Event construction on the request path"""
+
+    def test_event_is_json_serializable_with_primary_key(self):
+        event = audit_event(
+            'exclusion_lookup', 'exclusion', 'abc',
+            operator_id=uuid.uuid4(), metadata={'result': {'is_excluded': False}}
+        )
+
+        assert uuid.UUID(event['id'])
+        assert isinstance(event['operator_id'], str)
+        assert 'occurred_at' in event['metadata']
+        assert json.loads(json.dumps(event)) == event
+
+    def test_each_event_gets_its_own_id(self):
+        """Ids make replayed batches idempotent, so they must never repeat"""
+        assert audit_event('a', 'b')['id'] != audit_event('a', 'b')['id']
+
+    def test_unknown_fields_are_rejected(self):
+        with pytest.raises(ValueError):
+            audit_event('a', 'b', operator='op-1')
+
+
+class TestStreamDecoding:
+    """Entries read back from the Redis stream"""
+
+    def test_malformed_and_deleted_entries_are_acknowledged(self):
+        """Unreadable entries are skipped but still returned for XACK"""
+        good = audit_event('a', 'b')
+        entries = [
+            (b'1-0', {b'e': json.dumps(good).encode()}),
+            (b'2-0', {b'e': b'not json'}),
+            (b'3-0', None),
+        ]
+        ids, events = _decode(entries)
+
+        assert ids == [b'1-0', b'2-0', b'3-0']
+        assert events == [good]
+
+
+class FakeStream:
+    """The stream and consumer-group commands the audit buffer uses, for one stream"""
+
+    def __init__(self):
+        self.entries = []
+        self.pending = set()
+        self.delivered = 0
+        self.sequence = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def xadd(self, key, fields):
+        self.sequence += 1
+        entry_id = f'{self.sequence}-0'.encode()
+        self.entries.append((entry_id, {name.encode(): value.encode() for name, value in fields.items()}))
+        return entry_id
+
+    def xlen(self, key):
+        return len(self.entries)
+
+    def xgroup_create(self, key, group, id='0', mkstream=False):
+        pass
+
+    def xreadgroup(self, group, consumer, streams, count=None):
+        new = [entry for entry in self.entries if int(entry[0].split(b'-')[0]) > self.delivered][:count]
+        if not new:
+            return []
+        self.delivered = int(new[-1][0].split(b'-')[0])
+        self.pending.update(entry_id for entry_id, _ in new)
+        return [[b'stream', new]]
+
+    def xautoclaim(self, key, group, consumer, min_idle_time, start, count=None):
+        return [b'0-0', [entry for entry in self.entries if entry[0] in self.pending][:count], []]
+
+    def xack(self, key, group, *ids):
+        self.pending.difference_update(ids)
+
+    def xdel(self, key, *ids):
+        self.entries = [entry for entry in self.entries if entry[0] not in ids]
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((getattr(self.client, name), args, kwargs))
+
+    def execute(self):
+        return [method(*args, **kwargs) for method, args, kwargs in self.calls]
+
+
+@pytest.fixture
+def operator():
+    today = date.today()
+    return Operator.objects.create(
+        name='Audited Bets', registration_number='REG-A', operator_code='OP-A', email='audit@example.com',
+        phone='+254700000004', license_number='LIC-A', license_type='online_betting',
+        license_issued_date=today, license_expiry_date=today + timedelta(days=365)
+    )
+
+
+@pytest.mark.django_db
+class TestWriteBatch:
+    """Drained batches against the database"""
+
+    def test_replayed_batch_is_idempotent(self, operator):
+        events = [audit_event('lookup', 'exclusion', str(index), operator_id=operator.pk) for index in range(3)]
+        before = AuditLog.objects.count()
+        assert _write_batch(events) == 3
+        _write_batch(events)
+        assert AuditLog.objects.count() == before + 3
+
+    def test_unknown_operator_moves_to_metadata(self, operator):
+        unknown = str(uuid.uuid4())
+        _write_batch([
+            audit_event('lookup', 'exclusion', 'known', operator_id=operator.pk),
+            audit_event('lookup', 'exclusion', 'unknown', operator_id=unknown),
+        ])
+
+        assert AuditLog.objects.get(resource_id='known').operator_id == operator.pk
+        orphan = AuditLog.objects.get(resource_id='unknown')
+        assert orphan.operator_id is None
+        assert orphan.metadata['unresolved_operator_id'] == unknown
+
+    def test_bad_row_does_not_drop_neighbours(self):
+        events = [
+            audit_event('lookup', 'exclusion', 'before'),
+            audit_event('lookup', 'exclusion', 'bad', ip_address='not-an-ip'),
+            audit_event('lookup', 'exclusion', 'after'),
+        ]
+        assert _write_batch(events) == 2
+        assert set(AuditLog.objects.values_list('resource_id', flat=True)) >= {'before', 'after'}
+        assert not AuditLog.objects.filter(resource_id='bad').exists()
+
+
+@pytest.mark.django_db
+class TestFlushAuditBuffer:
+    """The periodic drain from the Redis stream"""
+
+    def test_periodic_flush_drains_the_stream(self):
+        stream = FakeStream()
+        with mock.patch.object(audit_buffer, 'get_redis_client', return_value=stream):
+            record_audit_events([audit_event('lookup', 'exclusion', f'queued-{index}') for index in range(5)])
+            assert AuditLog.objects.filter(resource_id__startswith='queued-').count() == 0
+
+            result = flush_audit_log_buffer()
+
+        assert result == {'written': 5, 'batches': 1, 'pending': 0}
+        assert AuditLog.objects.filter(resource_id__startswith='queued-').count() == 5
+
+    def test_entries_of_a_crashed_flush_are_replayed_once(self):
+        stream = FakeStream()
+        with mock.patch.object(audit_buffer, 'get_redis_client', return_value=stream):
+            record_audit_events([audit_event('lookup', 'exclusion', f'crashed-{index}') for index in range(3)])
+            # Written but never acknowledged: the worker died before XACK
+            with mock.patch.object(FakePipeline, 'execute', side_effect=ConnectionError('worker killed')):
+                with pytest.raises(ConnectionError):
+                    flush_audit_buffer()
+            assert stream.pending
+
+            result = flush_audit_buffer()
+
+        assert result['pending'] == 0 and not stream.pending
+        assert AuditLog.objects.filter(resource_id__startswith='crashed-').count() == 3
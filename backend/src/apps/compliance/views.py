@@ -15,10 +15,11 @@ from .serializers import (
     IncidentReportSerializer, RegulatoryReportSerializer
 )
 from apps.api.permissions import IsGRAKStaff
-from apps.api.mixins import TimingMixin, SuccessResponseMixin
+from apps.api.mixins import TimingMixin, SuccessResponseMixin, ReplicaReadMixin
+from apps.analytics.report_jobs import ReportJobMixin
 
 
-class AuditLogViewSet(TimingMixin, viewsets.ReadOnlyModelViewSet):
+class AuditLogViewSet(TimingMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """Audit logs (read-only, immutable)"""
     serializer_class = AuditLogSerializer
     permission_classes = [IsAuthenticated, IsGRAKStaff]
@@ -293,67 +294,43 @@ class CriticalIncidentsView(TimingMixin, SuccessResponseMixin, APIView):
         return self.success_response(data=IncidentReportSerializer(incidents, many=True).data)
 
 
-class GenerateGRAKReportView(TimingMixin, SuccessResponseMixin, APIView):
-    """Generate GRAK report"""
+class GenerateGRAKReportView(TimingMixin, ReportJobMixin, APIView):
+    """
+    Generate GRAK report
+    Queued as a `regulatory` report job for ?period_start=/period_end= (default
+    the last complete month); the job files a draft RegulatoryReport
+    """
     permission_classes = [IsAuthenticated, IsGRAKStaff]
+    authority = 'grak'
     
     def post(self, request):
-        report = RegulatoryReport.objects.create(
-            report_type='grak',
-            report_date=timezone.now().date(),
-            status='draft'
-        )
+        from datetime import date
+        from apps.analytics.report_jobs import previous_period
         
-        from .tasks import generate_regulatory_report
-        generate_regulatory_report.delay(str(report.id))
+        period_start, period_end = previous_period('monthly')
+        try:
+            if request.data.get('period_start'):
+                period_start = date.fromisoformat(request.data['period_start'])
+            if request.data.get('period_end'):
+                period_end = date.fromisoformat(request.data['period_end'])
+        except (TypeError, ValueError):
+            return self.error_response('period_start and period_end must be YYYY-MM-DD')
         
-        return self.success_response(
-            data=RegulatoryReportSerializer(report).data,
-            message='GRAK report generation started',
-            status_code=status.HTTP_201_CREATED
+        return self.report_job_response(
+            request, 'regulatory', period_start, period_end,
+            parameters={'authority': self.authority},
+            refresh=str(request.data.get('refresh', '')).lower() in ('true', '1')
         )
 
 
-class GenerateNACADAReportView(TimingMixin, SuccessResponseMixin, APIView):
+class GenerateNACADAReportView(GenerateGRAKReportView):
     """Generate NACADA report"""
-    permission_classes = [IsAuthenticated, IsGRAKStaff]
-    
-    def post(self, request):
-        report = RegulatoryReport.objects.create(
-            report_type='nacada',
-            report_date=timezone.now().date(),
-            status='draft'
-        )
-        
-        from .tasks import generate_regulatory_report
-        generate_regulatory_report.delay(str(report.id))
-        
-        return self.success_response(
-            data=RegulatoryReportSerializer(report).data,
-            message='NACADA report generation started',
-            status_code=status.HTTP_201_CREATED
-        )
+    authority = 'nacada'
 
 
-class GenerateDCIReportView(TimingMixin, SuccessResponseMixin, APIView):
+class GenerateDCIReportView(GenerateGRAKReportView):
     """Generate DCI report"""
-    permission_classes = [IsAuthenticated, IsGRAKStaff]
-    
-    def post(self, request):
-        report = RegulatoryReport.objects.create(
-            report_type='dci',
-            report_date=timezone.now().date(),
-            status='draft'
-        )
-        
-        from .tasks import generate_regulatory_report
-        generate_regulatory_report.delay(str(report.id))
-        
-        return self.success_response(
-            data=RegulatoryReportSerializer(report).data,
-            message='DCI report generation started',
-            status_code=status.HTTP_201_CREATED
-        )
+    authority = 'dci'
 
 
 class SubmitRegulatoryReportView(TimingMixin, SuccessResponseMixin, APIView):
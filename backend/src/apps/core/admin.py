@@ -10,3 +10,21 @@ from django.utils.translation import gettext_lazy as _
 
 # No concrete models to register in Core app
 # Core only contains abstract base classes
+
+
+class ReplicaReadAdminMixin:
+    """
+    ModelAdmin mixin serving change lists from the read replica (when it is
+    healthy and caught up). Change forms and actions stay on the primary.
+    """
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context)
+        from .db_routing import replica_reads
+        with replica_reads():
+            response = super().changelist_view(request, extra_context)
+            # The page's rows are fetched while rendering; do it inside the block
+            if hasattr(response, 'render'):
+                response.render()
+            return response
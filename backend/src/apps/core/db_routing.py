@@ -0,0 +1,211 @@
+"""
+Read Replica Routing
+State behind config.db_router.ReplicaRouter: replica-safe reads go to the
+'replica' database when it is configured, healthy and caught up;
+everything else uses the primary.
+
+- Opt-in: reads go to the replica only inside `replica_reads()` (a context
+  manager and decorator), which views declare with ReplicaReadMixin /
+  ReplicaReadAdminMixin. Everything else - lookups, screening, anything
+  that must see the latest write - reads the primary.
+- Read-your-writes: once a unit of work (request, task or replica_reads
+  block) writes through the ORM, its remaining reads use the primary.
+  PrimaryPinningMiddleware also sets a short-lived cookie after a write so
+  the client's next requests (e.g. the GET after a POST) stay on the
+  primary for REPLICA_PIN_SECONDS.
+- Lag: ReplicaMonitor measures replication lag on the replica at most every
+  REPLICA_LAG_CHECK_SECONDS per process. Above REPLICA_MAX_LAG_SECONDS, or
+  when the replica cannot be reached (retried after
+  REPLICA_RETRY_SECONDS), reads fall back to the primary.
+"""
+import logging
+import threading
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+PIN_COOKIE = 'nser_primary_pin'
+
+# 0 on a primary or a standby that has replayed everything it received
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def _replica_setting(name, default):
+    return getattr(settings, 'REPLICA_SETTINGS', {}).get(name, default)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+# Routing state
+
+class RoutingState:
+    """Per unit of work: replica-safe depth, whether it wrote, whether it is pinned"""
+
+    def __init__(self, pinned=False):
+        self.replica_depth = 0
+        self.wrote = False
+        self.pinned = pinned
+
+
+_state = ContextVar('db_routing_state', default=None)
+
+
+def current_state():
+    return _state.get()
+
+
+def begin(pinned=False):
+    """Start a unit of work (request or task); returns the previous state for end()"""
+    previous = _state.get()
+    _state.set(RoutingState(pinned=pinned))
+    return previous
+
+
+def end(previous):
+    # set() rather than reset(token): streamed responses may finish in another context
+    _state.set(previous)
+
+
+class replica_reads(ContextDecorator):
+    """
+    Declare the reads in this block replica-safe (they may be slightly
+    stale). Usable as `with replica_reads():` or `@replica_reads()`.
+    """
+
+    def _recreate_cm(self):
+        return type(self)()  # a fresh instance per decorated call
+
+    def __enter__(self):
+        self._previous = None
+        self._owner = _state.get() is None
+        if self._owner:
+            self._previous = begin()
+        _state.get().replica_depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        state = _state.get()
+        if state is not None:
+            state.replica_depth = max(state.replica_depth - 1, 0)
+        if self._owner:
+            end(self._previous)
+        return False
+
+
+# Lag tracking
+
+class ReplicaMonitor:
+    """Per-process replica lag, probed lazily and at most once per interval"""
+
+    def __init__(self):
+        self.lag = None
+        self.healthy = False
+        self.error = None
+        self.checked_at = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def is_usable(self):
+        if time.monotonic() >= self._next_check and self._lock.acquire(blocking=False):
+            try:
+                self.probe()
+            finally:
+                self._lock.release()
+        return self.healthy
+
+    def probe(self):
+        """Measure lag now; returns status()"""
+        max_lag = _replica_setting('REPLICA_MAX_LAG_SECONDS', 5)
+        was_healthy = self.healthy
+        try:
+            with connections[REPLICA].cursor() as cursor:
+                cursor.execute(LAG_SQL)
+                lag = float(cursor.fetchone()[0] or 0)
+        except Exception as e:
+            self.lag, self.healthy, self.error = None, False, str(e)
+            self._next_check = time.monotonic() + _replica_setting('REPLICA_RETRY_SECONDS', 30)
+            if was_healthy or self.checked_at is None:
+                logger.warning(f"Replica unavailable, reading from primary: {str(e)}")
+        else:
+            self.lag, self.healthy, self.error = round(lag, 3), lag <= max_lag, None
+            self._next_check = time.monotonic() + _replica_setting('REPLICA_LAG_CHECK_SECONDS', 5)
+            if was_healthy and not self.healthy:
+                logger.warning(f"Replica lag {lag:.1f}s exceeds {max_lag}s, reading from primary")
+            elif self.healthy and not was_healthy:
+                logger.info(f"Replica caught up (lag {lag:.1f}s), serving replica-safe reads")
+        self.checked_at = timezone.now()
+        return self.status()
+
+    def status(self):
+        return {
+            'configured': replica_configured(),
+            'healthy': self.healthy,
+            'lag_seconds': self.lag,
+            'max_lag_seconds': _replica_setting('REPLICA_MAX_LAG_SECONDS', 5),
+            'checked_at': self.checked_at.isoformat() if self.checked_at else None,
+            'error': self.error,
+        }
+
+
+monitor = ReplicaMonitor()
+
+
+def replica_status(refresh=False):
+    """Replica health for probes; refresh re-measures lag if the last probe is due"""
+    if not replica_configured():
+        return {'configured': False, 'healthy': False, 'lag_seconds': None,
+                'max_lag_seconds': None, 'checked_at': None, 'error': None}
+    if refresh:
+        monitor.is_usable()
+    return monitor.status()
+
+
+class PrimaryPinningMiddleware:
+    """
+    One routing state per request. A request that writes sets a cookie
+    keeping the client's following requests on the primary for
+    REPLICA_PIN_SECONDS, so they read their own writes despite lag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_configured():
+            return self.get_response(request)
+
+        previous = begin(pinned=self._pinned(request))
+        try:
+            response = self.get_response(request)
+            if _state.get().wrote:
+                pin_seconds = _replica_setting('REPLICA_PIN_SECONDS', 10)
+                response.set_cookie(
+                    PIN_COOKIE, str(int(time.time()) + pin_seconds), max_age=pin_seconds,
+                    httponly=True, samesite='Lax', secure=request.is_secure()
+                )
+            return response
+        finally:
+            end(previous)
+
+    @staticmethod
+    def _pinned(request):
+        try:
+            return int(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
@@ -0,0 +1,124 @@
+"""
+In-Process Caching
+A per-process LRU/TTL tier for hot read paths, plus a Redis pub/sub listener
+so writes in one process can evict entries cached in every other process.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from .redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class LocalTTLCache:
+    """Thread-safe LRU with per-entry TTL"""
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl_seconds=None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class InvalidationListener:
+    """
+    Background subscriber that evicts keys from a LocalTTLCache when another
+    process publishes them on `channel`.
+
+    The local cache is cleared whenever the subscription is (re)established,
+    since invalidations published while disconnected are lost. Without Redis
+    no listener runs and entries simply expire by TTL.
+    """
+
+    RECONNECT_SECONDS = 2
+
+    def __init__(self, channel, local_cache):
+        self.channel = channel
+        self.local_cache = local_cache
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and get_redis_client() is not None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"invalidate:{self.channel}", daemon=True
+                )
+                self._thread.start()
+
+    def publish(self, keys):
+        """Evict keys here and in every subscribed process"""
+        keys = [key for key in keys if key]
+        for key in keys:
+            self.local_cache.delete(key)
+        client = get_redis_client()
+        if client is None or not keys:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.publish(self.channel, key)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not publish invalidation on {self.channel}: {str(e)}")
+
+    def _run(self):
+        while True:
+            pubsub = None
+            try:
+                pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self.local_cache.clear()
+                while True:
+                    # Short polls instead of listen(): the pooled connection has a
+                    # socket timeout that would otherwise fire on quiet channels
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get('type') == 'message':
+                        key = message['data']
+                        self.local_cache.delete(key.decode() if isinstance(key, bytes) else key)
+            except Exception as e:
+                logger.warning(f"Invalidation listener on {self.channel} reconnecting: {str(e)}")
+                self.local_cache.clear()
+                time.sleep(self.RECONNECT_SECONDS)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
@@ -0,0 +1,26 @@
+"""
+Redis Utilities
+Raw Redis access for features that need more than the Django cache API
+(pipelines, streams, sets, Lua scripts, pub/sub).
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def get_redis_client(alias='default'):
+    """
+    Return the raw redis-py client behind a django-redis cache alias.
+
+    Returns None when the configured cache backend is not Redis
+    (DummyCache in development, LocMemCache on cPanel), so callers can
+    degrade gracefully instead of failing.
+    """
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection(alias)
+    except (ImportError, NotImplementedError):
+        return None
+    except Exception as e:
+        logger.warning(f"Could not obtain Redis connection for '{alias}': {str(e)}")
+        return None
@@ -196,6 +196,14 @@ class DashboardConsumer(AsyncJsonWebsocketConsumer):
             'timestamp': timezone.now().isoformat()
         })
     
+    async def report_status(self, event):
+        """Handle report job completion"""
+        await self.send_json({
+            'type': 'report_status',
+            'data': event['data'],
+            'timestamp': timezone.now().isoformat()
+        })
+    
     async def alert_triggered(self, event):
         """Handle system alert"""
         await self.send_json({
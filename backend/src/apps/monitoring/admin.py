@@ -3,14 +3,18 @@ Monitoring & Performance Admin Interface
 Super Admin features for system health, metrics, and performance tracking
 """
 from django.contrib import admin
+from django.template.response import TemplateResponse
+from django.urls import path
 from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
 from django.utils import timezone
+from apps.core.admin import ReplicaReadAdminMixin
 from .models import SystemMetric, HealthCheck, Alert, APIRequestLog
+from .query_profiler import recent_offenders
 
 
 @admin.register(SystemMetric)
-class SystemMetricAdmin(admin.ModelAdmin):
+class SystemMetricAdmin(ReplicaReadAdminMixin, admin.ModelAdmin):
     """System performance metrics tracking"""
     list_display = (
         'metric_name', 'metric_type_badge', 'value_display',
@@ -71,10 +75,29 @@ class SystemMetricAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         """Keep metrics for historical analysis"""
         return False
+    
+    def get_urls(self):
+        return [
+            path(
+                'slow-queries/',
+                self.admin_site.admin_view(self.slow_queries_view),
+                name='monitoring_slow_queries'
+            ),
+        ] + super().get_urls()
+    
+    def slow_queries_view(self, request):
+        """Worst requests/tasks captured by the sampling query profiler"""
+        context = dict(
+            self.admin_site.each_context(request),
+            title=_('Slow queries & N+1 suspects'),
+            opts=self.model._meta,
+            profiles=recent_offenders(limit=100, kind=request.GET.get('kind') or None),
+        )
+        return TemplateResponse(request, 'admin/monitoring/slow_queries.html', context)
 
 
 @admin.register(HealthCheck)
-class HealthCheckAdmin(admin.ModelAdmin):
+class HealthCheckAdmin(ReplicaReadAdminMixin, admin.ModelAdmin):
     """System health check monitoring"""
     list_display = (
         'service_name', 'status_badge', 'response_time_display', 'created_at'
@@ -238,7 +261,7 @@ class AlertAdmin(admin.ModelAdmin):
 
 
 @admin.register(APIRequestLog)
-class APIRequestLogAdmin(admin.ModelAdmin):
+class APIRequestLogAdmin(ReplicaReadAdminMixin, admin.ModelAdmin):
     """API request logging and performance analysis"""
     list_display = (
         'request_id_short', 'method_badge', 'path', 'status_code_badge',
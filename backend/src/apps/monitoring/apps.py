@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MonitoringConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.monitoring'
+    
+    def ready(self):
+        # Connects the Celery task_prerun/task_postrun query profiling hooks
+        import apps.monitoring.query_profiler
@@ -0,0 +1,325 @@
+"""
+API Latency Histograms
+Per-view, per-method, per-status request latency recorded by TimingMixin.
+
+Recording:
+- Log-linear (HDR-style) buckets: LATENCY_SUB_BUCKETS buckets per doubling
+  from 0.05 ms to 60 s; a reported percentile is the upper bound of its
+  bucket, at most ~6% above the true value.
+- Each thread writes to its own shard (a plain dict of count lists), so the
+  request path takes no lock and does no I/O: one bisect and two increments.
+
+Aggregation across Gunicorn/Daphne workers:
+- A background thread per process pushes bucket deltas to Redis every
+  LATENCY_FLUSH_SECONDS in one pipeline: into a cumulative hash per series
+  (Prometheus counters) and into a per-minute hash per series (kept for
+  LATENCY_WINDOW_RETENTION_MINUTES) from which windowed p50/p95/p99 are read.
+- Without Redis each process reports its own cumulative histograms.
+"""
+import atexit
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+SERIES_SET_KEY = 'nser:latency:series'
+TOTAL_KEY = 'nser:latency:total:{series}'
+MINUTE_KEY = 'nser:latency:{minute}:{series}'
+SEPARATOR = '|'
+
+
+def _monitoring_setting(name, default):
+    return getattr(settings, 'MONITORING_SETTINGS', {}).get(name, default)
+
+
+def _log_linear_bounds(lowest_ms, highest_ms, sub_buckets):
+    bounds = []
+    value = lowest_ms
+    while value < highest_ms:
+        step = value / sub_buckets
+        for i in range(1, sub_buckets + 1):
+            bounds.append(round(value + step * i, 4))
+        value *= 2
+    return bounds
+
+
+BOUNDS_MS = _log_linear_bounds(0.05, 60000, _monitoring_setting('LATENCY_SUB_BUCKETS', 16))
+# counts[0..len(BOUNDS_MS)] are buckets (the last one is overflow), then total ms
+SUM_INDEX = len(BOUNDS_MS) + 1
+
+
+def series_name(view, method, status_code):
+    return SEPARATOR.join((view, method, str(status_code)))
+
+
+def parse_series(series):
+    view, method, status_code = series.split(SEPARATOR)
+    return {'view': view, 'method': method, 'status': status_code}
+
+
+def empty_counts():
+    return [0] * (len(BOUNDS_MS) + 1) + [0.0]
+
+
+def merge_counts(counts_list):
+    merged = empty_counts()
+    for counts in counts_list:
+        for i, value in enumerate(counts):
+            merged[i] += value
+    return merged
+
+
+def count_of(counts):
+    return sum(counts[:SUM_INDEX])
+
+
+def percentile(counts, q):
+    """Upper bound (ms) of the bucket holding the q-th quantile"""
+    total = count_of(counts)
+    if not total:
+        return None
+    rank = math.ceil(q * total)
+    seen = 0
+    for i, value in enumerate(counts[:SUM_INDEX]):
+        seen += value
+        if seen >= rank:
+            return BOUNDS_MS[min(i, len(BOUNDS_MS) - 1)]
+    return BOUNDS_MS[-1]
+
+
+def summarize(counts):
+    """count, avg and p50/p95/p99 (ms) of a histogram"""
+    total = count_of(counts)
+    return {
+        'count': total,
+        'avg_ms': round(counts[SUM_INDEX] / total, 2) if total else None,
+        'p50_ms': percentile(counts, 0.50),
+        'p95_ms': percentile(counts, 0.95),
+        'p99_ms': percentile(counts, 0.99),
+    }
+
+
+class LatencyRecorder:
+    """Thread-sharded histograms with periodic Redis flushes"""
+
+    def __init__(self, flush_seconds=5.0):
+        self.flush_seconds = flush_seconds
+        self._local = threading.local()
+        self._shards = []
+        self._flushed = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def record(self, series, elapsed_ms):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._new_shard()
+        counts = shard.get(series)
+        if counts is None:
+            counts = shard[series] = empty_counts()
+        counts[bisect_left(BOUNDS_MS, elapsed_ms)] += 1
+        counts[SUM_INDEX] += elapsed_ms
+
+    def _new_shard(self):
+        shard = self._local.shard = {}
+        with self._lock:
+            self._shards.append(shard)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='latency-flush', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        return shard
+
+    def snapshot(self):
+        """Cumulative histograms of this process, merged across threads"""
+        with self._lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            for series, counts in list(shard.items()):
+                merged[series] = merge_counts([merged[series], counts]) if series in merged else list(counts)
+        return merged
+
+    def flush(self):
+        """Push bucket deltas since the last flush to Redis"""
+        client = get_redis_client()
+        if client is None:
+            return
+        with self._flush_lock:
+            snapshot = self.snapshot()
+            minute = timezone.now().strftime('%Y%m%d%H%M')
+            retention = _monitoring_setting('LATENCY_WINDOW_RETENTION_MINUTES', 60) * 60
+            pipe = client.pipeline(transaction=False)
+            changed = []
+            for series, counts in snapshot.items():
+                previous = self._flushed.get(series) or empty_counts()
+                deltas = {
+                    i: value - previous[i] for i, value in enumerate(counts[:SUM_INDEX])
+                    if value != previous[i]
+                }
+                if not deltas:
+                    continue
+                changed.append(series)
+                for key in (TOTAL_KEY.format(series=series), MINUTE_KEY.format(minute=minute, series=series)):
+                    for i, delta in deltas.items():
+                        pipe.hincrby(key, i, delta)
+                    pipe.hincrbyfloat(key, 'sum', counts[SUM_INDEX] - previous[SUM_INDEX])
+                pipe.expire(MINUTE_KEY.format(minute=minute, series=series), retention)
+            if not changed:
+                return
+            pipe.sadd(SERIES_SET_KEY, *changed)
+            try:
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Latency histogram flush failed: {str(e)}")
+                return
+            self._flushed = snapshot
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Latency histogram flush failed: {str(e)}")
+
+
+_recorder = LatencyRecorder(flush_seconds=_monitoring_setting('LATENCY_FLUSH_SECONDS', 5.0))
+
+
+def record_latency(view, method, status_code, elapsed_ms):
+    _recorder.record(series_name(view, method, status_code), elapsed_ms)
+
+
+def _decode_hash(raw):
+    counts = empty_counts()
+    for field, value in raw.items():
+        field = field.decode() if isinstance(field, bytes) else field
+        if field == 'sum':
+            counts[SUM_INDEX] = float(value)
+        else:
+            counts[int(field)] = int(value)
+    return counts
+
+
+def collect(window_minutes=None):
+    """
+    {series: counts} across all processes.
+    window_minutes=None returns cumulative histograms (for counters); otherwise
+    only the last `window_minutes` minutes (for current percentiles).
+    Falls back to this process's cumulative histograms without Redis.
+    """
+    client = get_redis_client()
+    if client is None:
+        return _recorder.snapshot()
+
+    try:
+        series_list = sorted(
+            member.decode() if isinstance(member, bytes) else member
+            for member in client.smembers(SERIES_SET_KEY)
+        )
+        if window_minutes is None:
+            keys = [[TOTAL_KEY.format(series=series)] for series in series_list]
+        else:
+            now = timezone.now()
+            minutes = [
+                (now - timedelta(minutes=offset)).strftime('%Y%m%d%H%M')
+                for offset in range(window_minutes)
+            ]
+            keys = [
+                [MINUTE_KEY.format(minute=minute, series=series) for minute in minutes]
+                for series in series_list
+            ]
+        pipe = client.pipeline(transaction=False)
+        for series_keys in keys:
+            for key in series_keys:
+                pipe.hgetall(key)
+        replies = iter(pipe.execute())
+    except Exception as e:
+        logger.warning(f"Latency histograms unavailable from Redis: {str(e)}")
+        return _recorder.snapshot()
+
+    histograms = {}
+    for series, series_keys in zip(series_list, keys):
+        counts = merge_counts(_decode_hash(next(replies)) for _ in series_keys)
+        if count_of(counts):
+            histograms[series] = counts
+    return histograms
+
+
+def latency_report(window_minutes=None, view=None):
+    """
+    Overall and per-view latency summaries plus SLO status for a window
+    (default LATENCY_WINDOW_MINUTES).
+    """
+    window_minutes = window_minutes or _monitoring_setting('LATENCY_WINDOW_MINUTES', 5)
+    histograms = collect(window_minutes)
+    if view:
+        histograms = {
+            series: counts for series, counts in histograms.items()
+            if parse_series(series)['view'] == view
+        }
+
+    by_view = {}
+    for series, counts in histograms.items():
+        by_view.setdefault(parse_series(series)['view'], []).append(counts)
+
+    slos = _monitoring_setting('LATENCY_SLOS_MS', {})
+    views = {}
+    for name, counts_list in sorted(by_view.items()):
+        views[name] = summarize(merge_counts(counts_list))
+        if name in slos:
+            views[name]['slo_p99_ms'] = slos[name]
+            views[name]['slo_met'] = views[name]['p99_ms'] <= slos[name]
+
+    return {
+        'window_minutes': window_minutes,
+        'overall': summarize(merge_counts(histograms.values())),
+        'views': views,
+    }
+
+
+def _labels(series, **extra):
+    labels = dict(parse_series(series), **extra)
+    return ','.join(f'{key}="{value}"' for key, value in labels.items())
+
+
+def prometheus_exposition():
+    """
+    Prometheus text format: a request counter and a latency summary per series.
+    Quantiles cover the last LATENCY_WINDOW_MINUTES; _sum/_count are cumulative.
+    """
+    totals = collect()
+    window = collect(_monitoring_setting('LATENCY_WINDOW_MINUTES', 5))
+
+    lines = [
+        '# HELP api_requests_total Total API requests',
+        '# TYPE api_requests_total counter',
+    ]
+    for series, counts in sorted(totals.items()):
+        lines.append(f'api_requests_total{{{_labels(series)}}} {count_of(counts)}')
+
+    lines += [
+        '# HELP api_request_duration_seconds API request latency',
+        '# TYPE api_request_duration_seconds summary',
+    ]
+    for series, counts in sorted(totals.items()):
+        recent = window.get(series)
+        for q in (0.5, 0.95, 0.99):
+            value = percentile(recent, q) if recent else None
+            value = 'NaN' if value is None else round(value / 1000, 6)
+            lines.append(f'api_request_duration_seconds{{{_labels(series, quantile=q)}}} {value}')
+        lines.append(f'api_request_duration_seconds_sum{{{_labels(series)}}} {round(counts[SUM_INDEX] / 1000, 6)}')
+        lines.append(f'api_request_duration_seconds_count{{{_labels(series)}}} {count_of(counts)}')
+
+    return '\n'.join(lines) + '\n'
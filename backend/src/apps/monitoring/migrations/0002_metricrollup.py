@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('1m', '1 Minute'), ('1h', '1 Hour'), ('1d', '1 Day')], max_length=2)),
+                ('metric_name', models.CharField(max_length=100)),
+                ('tags_key', models.CharField(max_length=64)),
+                ('tags', models.JSONField(blank=True, default=dict)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField()),
+                ('sum', models.FloatField()),
+                ('min', models.FloatField()),
+                ('max', models.FloatField()),
+                ('sketch', models.JSONField(default=dict)),
+            ],
+            options={
+                'db_table': 'monitoring_metric_rollups',
+                'ordering': ['bucket_start'],
+                'indexes': [models.Index(fields=['metric_name', 'resolution', 'bucket_start'], name='rollup_metric_res_time_idx'), models.Index(fields=['resolution', 'bucket_start'], name='rollup_res_time_idx')],
+                'unique_together': {('resolution', 'metric_name', 'tags_key', 'bucket_start')},
+            },
+        ),
+    ]
@@ -25,6 +25,40 @@ class SystemMetric(TimeStampedModel):
         indexes = [models.Index(fields=['metric_name', 'timestamp'], name='metric_name_time_idx')]
 
 
+class MetricRollup(models.Model):
+    """
+    Downsampled SystemMetric series (1 minute, 1 hour and 1 day tiers)
+    Built by the compact_system_metrics task; see apps.monitoring.rollups
+    """
+    RESOLUTION_CHOICES = [
+        ('1m', '1 Minute'),
+        ('1h', '1 Hour'),
+        ('1d', '1 Day'),
+    ]
+    
+    resolution = models.CharField(max_length=2, choices=RESOLUTION_CHOICES)
+    metric_name = models.CharField(max_length=100)
+    tags_key = models.CharField(max_length=64)  # canonical tags (hashed when long)
+    tags = models.JSONField(default=dict, blank=True)
+    bucket_start = models.DateTimeField()
+    
+    # Aggregates
+    count = models.PositiveIntegerField()
+    sum = models.FloatField()
+    min = models.FloatField()
+    max = models.FloatField()
+    sketch = models.JSONField(default=dict)  # mergeable quantile sketch (bucket -> count)
+    
+    class Meta:
+        db_table = 'monitoring_metric_rollups'
+        ordering = ['bucket_start']
+        unique_together = [['resolution', 'metric_name', 'tags_key', 'bucket_start']]
+        indexes = [
+            models.Index(fields=['metric_name', 'resolution', 'bucket_start'], name='rollup_metric_res_time_idx'),
+            models.Index(fields=['resolution', 'bucket_start'], name='rollup_res_time_idx'),
+        ]
+
+
 class HealthCheck(TimeStampedModel, UUIDModel):
     """System health checks"""
     service_name = models.CharField(max_length=100, db_index=True)
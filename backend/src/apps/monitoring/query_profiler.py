@@ -0,0 +1,221 @@
+"""
+SQL Query Profiler
+Opt-in, sampled profiling of the queries issued by one HTTP request
+(QueryProfilerMiddleware) or one Celery task (task_prerun/task_postrun).
+
+For each sampled unit of work a database execute-wrapper records the query
+count, total SQL time and per-fingerprint counts, where a fingerprint is the
+statement with literals and IN-lists normalized away. A fingerprint repeated
+QUERY_PROFILER_N_PLUS_ONE_THRESHOLD times or more is flagged as N+1.
+
+Profiles that cross a threshold (query count, SQL time or N+1) are pushed to
+a bounded ring buffer: a capped Redis list shared by all processes, or a
+per-process deque without Redis. SlowQueriesView and the admin page read it.
+"""
+import json
+import logging
+import random
+import re
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from apps.core.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+BUFFER_KEY = 'nser:query_profiler:offenders'
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*\([?,\s]*\)(?:\s*,\s*\([?,\s]*\))*", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _monitoring_setting(name, default):
+    return getattr(settings, 'MONITORING_SETTINGS', {}).get(name, default)
+
+
+def fingerprint(sql):
+    """Statement shape: literals -> ?, IN (?, ?, ...) -> IN (...), multi-row VALUES collapsed"""
+    sql = _STRING.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _VALUES_LIST.sub('VALUES (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()[:1000]
+
+
+class QueryProfile:
+    """Execute-wrapper collecting the queries of one request or task"""
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.query_count = 0
+        self.sql_ms = 0.0
+        self.fingerprints = {}
+        self._started = time.perf_counter()
+        self.duration_ms = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.query_count += 1
+            self.sql_ms += elapsed
+            stats = self.fingerprints.setdefault(fingerprint(sql), [0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+
+    def n_plus_one(self):
+        threshold = _monitoring_setting('QUERY_PROFILER_N_PLUS_ONE_THRESHOLD', 10)
+        return [
+            {'fingerprint': sql, 'count': count, 'sql_ms': round(total, 2)}
+            for sql, (count, total) in sorted(self.fingerprints.items(), key=lambda item: -item[1][0])
+            if count >= threshold
+        ]
+
+    def is_offender(self):
+        return (
+            self.query_count >= _monitoring_setting('QUERY_PROFILER_MAX_QUERIES', 50)
+            or self.sql_ms >= _monitoring_setting('QUERY_PROFILER_MAX_SQL_MS', 500)
+            or bool(self.n_plus_one())
+        )
+
+    def report(self):
+        top = sorted(self.fingerprints.items(), key=lambda item: -item[1][1])[:10]
+        return {
+            'kind': self.kind,
+            'name': self.name,
+            'timestamp': timezone.now().isoformat(),
+            'duration_ms': round(self.duration_ms or 0, 2),
+            'query_count': self.query_count,
+            'sql_ms': round(self.sql_ms, 2),
+            'distinct_queries': len(self.fingerprints),
+            'n_plus_one': self.n_plus_one(),
+            'top_queries': [
+                {'fingerprint': sql, 'count': count, 'sql_ms': round(total, 2)}
+                for sql, (count, total) in top
+            ],
+        }
+
+
+_local_buffer = deque(maxlen=_monitoring_setting('QUERY_PROFILER_BUFFER_SIZE', 200))
+
+
+def record_profile(profile):
+    """Push an offending profile to the ring buffer"""
+    if not profile.is_offender():
+        return
+    report = profile.report()
+    if report['n_plus_one']:
+        logger.warning(
+            f"Possible N+1 in {profile.kind} {profile.name}: "
+            f"{report['n_plus_one'][0]['count']}x {report['n_plus_one'][0]['fingerprint'][:200]}"
+        )
+
+    client = get_redis_client()
+    if client is not None:
+        try:
+            pipe = client.pipeline(transaction=False)
+            pipe.lpush(BUFFER_KEY, json.dumps(report))
+            pipe.ltrim(BUFFER_KEY, 0, _monitoring_setting('QUERY_PROFILER_BUFFER_SIZE', 200) - 1)
+            pipe.execute()
+            return
+        except Exception as e:
+            logger.warning(f"Query profile buffer unavailable, keeping locally: {str(e)}")
+    _local_buffer.appendleft(report)
+
+
+def recent_offenders(limit=50, kind=None, order_by='sql_ms'):
+    """Worst profiles in the ring buffer, most expensive first"""
+    reports = []
+    client = get_redis_client()
+    if client is not None:
+        try:
+            reports = [json.loads(raw) for raw in client.lrange(BUFFER_KEY, 0, -1)]
+        except Exception as e:
+            logger.warning(f"Query profile buffer unavailable: {str(e)}")
+    if not reports:
+        reports = list(_local_buffer)
+    if kind:
+        reports = [report for report in reports if report['kind'] == kind]
+    return sorted(reports, key=lambda report: -report.get(order_by, 0))[:limit]
+
+
+def _should_sample():
+    return (
+        _monitoring_setting('QUERY_PROFILER_ENABLED', False)
+        and random.random() < _monitoring_setting('QUERY_PROFILER_SAMPLE_RATE', 0.01)
+    )
+
+
+@contextmanager
+def profile_queries(kind, name, force=False):
+    """
+    Profile the queries run inside the block on every configured database.
+    Yields the QueryProfile, or None when this unit of work is not sampled.
+    """
+    if not force and not _should_sample():
+        yield None
+        return
+
+    profile = QueryProfile(kind, name)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            yield profile
+    finally:
+        profile.finish()
+        try:
+            record_profile(profile)
+        except Exception as e:
+            logger.warning(f"Failed to record query profile: {str(e)}")
+
+
+class QueryProfilerMiddleware:
+    """Sampled per-request query profiling (MONITORING_SETTINGS['QUERY_PROFILER_ENABLED'])"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with profile_queries('request', f"{request.method} {request.path}") as profile:
+            response = self.get_response(request)
+            if profile is not None and request.resolver_match is not None:
+                # Group by route, not by concrete path (ids differ per request)
+                profile.name = f"{request.method} /{request.resolver_match.route}"
+        return response
+
+
+# Open profiles of running Celery tasks, by task id
+_task_profiles = {}
+
+
+@task_prerun.connect
+def _start_task_profile(task_id=None, task=None, **kwargs):
+    context = profile_queries('task', getattr(task, 'name', str(task)))
+    if context.__enter__() is not None:
+        _task_profiles[task_id] = context
+    else:
+        context.__exit__(None, None, None)
+
+
+@task_postrun.connect
+def _finish_task_profile(task_id=None, **kwargs):
+    context = _task_profiles.pop(task_id, None)
+    if context is not None:
+        context.__exit__(None, None, None)
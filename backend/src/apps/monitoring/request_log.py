@@ -0,0 +1,206 @@
+"""
+API Request Log Ingestion
+Sampled capture of API request metadata into APIRequestLog.
+
+Sampling (decided per request, after the response is known):
+- every error (status >= 400) and every request slower than
+  REQUEST_LOG_SLOW_MS is kept
+- other requests are kept with probability REQUEST_LOG_SUCCESS_SAMPLE_RATE
+
+The request thread only builds a dict and appends it to an in-memory queue;
+a background thread per process bulk-inserts the queue every
+REQUEST_LOG_FLUSH_SECONDS. The queue is bounded (REQUEST_LOG_MAX_QUEUE): if
+the database falls behind, the oldest records are dropped and counted rather
+than slowing requests down. Records still queued when a process is killed
+(up to one flush interval) are lost; AuditLog remains the durable trail.
+`created_at` is the insert time, at most one flush interval after the request.
+"""
+import atexit
+import ipaddress
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+def _monitoring_setting(name, default):
+    return getattr(settings, 'MONITORING_SETTINGS', {}).get(name, default)
+
+
+def should_log(status_code, response_time_ms):
+    if status_code >= 400 or response_time_ms >= _monitoring_setting('REQUEST_LOG_SLOW_MS', 1000):
+        return True
+    return random.random() < _monitoring_setting('REQUEST_LOG_SUCCESS_SAMPLE_RATE', 0.05)
+
+
+def sampled_aggregates():
+    """
+    Aggregate expressions over APIRequestLog rows for estimate_totals();
+    usable with aggregate() or values(...).annotate()
+    """
+    from django.db.models import Count, Q, Sum
+
+    sampled = Q(status_code__lt=400, response_time_ms__lt=_monitoring_setting('REQUEST_LOG_SLOW_MS', 1000))
+    return {
+        'logged': Count('id'),
+        'sampled': Count('id', filter=sampled),
+        'errors': Count('id', filter=Q(status_code__gte=400)),
+        'sampled_time': Sum('response_time_ms', filter=sampled),
+        'unsampled_time': Sum('response_time_ms', filter=~sampled),
+    }
+
+
+def estimate_totals(row):
+    """Scale sampled successes back up: estimated requests, errors and mean latency"""
+    sample_rate = _monitoring_setting('REQUEST_LOG_SUCCESS_SAMPLE_RATE', 0.05) or 1
+    requests = (row['logged'] - row['sampled']) + row['sampled'] / sample_rate
+    total_time = (row['unsampled_time'] or 0) + (row['sampled_time'] or 0) / sample_rate
+    return {
+        'requests': round(requests),
+        'errors': row['errors'],
+        'avg_response_time_ms': round(total_time / requests, 2) if requests else 0,
+    }
+
+
+class RequestLogBatcher:
+    """Bounded in-memory queue of APIRequestLog rows, bulk-inserted off the request thread"""
+
+    def __init__(self, flush_seconds=2.0, max_queue=50000, batch_size=1000):
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue = deque(maxlen=max_queue)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, record):
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(record)
+        if self._thread is None:
+            self._start()
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Insert everything queued so far; returns rows written"""
+        from .models import APIRequestLog
+
+        written = 0
+        with self._lock:
+            while self._queue:
+                batch = []
+                while self._queue and len(batch) < self.batch_size:
+                    batch.append(APIRequestLog(**self._queue.popleft()))
+                try:
+                    APIRequestLog.objects.bulk_create(batch)
+                    written += len(batch)
+                except Exception as e:
+                    logger.error(f"Failed to write {len(batch)} API request logs: {str(e)}")
+                    break
+        if self.dropped:
+            logger.warning(f"API request log queue full, dropped {self.dropped} records")
+            self.dropped = 0
+        return written
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='request-log-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_seconds)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+_batcher = RequestLogBatcher(
+    flush_seconds=_monitoring_setting('REQUEST_LOG_FLUSH_SECONDS', 2.0),
+    max_queue=_monitoring_setting('REQUEST_LOG_MAX_QUEUE', 50000),
+    batch_size=_monitoring_setting('REQUEST_LOG_BATCH_SIZE', 1000)
+)
+
+
+def _client_ip(request):
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    ip = forwarded.split(',')[0].strip() if forwarded else request.META.get('REMOTE_ADDR')
+    try:
+        return str(ipaddress.ip_address(ip))
+    except ValueError:
+        return '0.0.0.0'
+
+
+def _error_message(response, exception):
+    if exception is not None:
+        return f"{exception.__class__.__name__}: {exception}"[:2000]
+    data = getattr(response, 'data', None)
+    if isinstance(data, dict):
+        detail = data.get('detail') or data.get('message') or data.get('errors') or data
+        return str(detail)[:2000]
+    return ''
+
+
+class APIRequestLogMiddleware:
+    """Queue sampled APIRequestLog records (MONITORING_SETTINGS['REQUEST_LOG_*'])"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = _monitoring_setting('REQUEST_LOG_ENABLED', True)
+        self.prefixes = tuple(_monitoring_setting('REQUEST_LOG_PATH_PREFIXES', ('/api/',)))
+
+    def __call__(self, request):
+        if not self.enabled or not request.path.startswith(self.prefixes):
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        response = self.get_response(request)
+        response_time_ms = (time.perf_counter() - started) * 1000
+
+        if should_log(response.status_code, response_time_ms):
+            try:
+                _batcher.add(self.build_record(request, response, response_time_ms))
+            except Exception as e:
+                logger.warning(f"Failed to queue API request log: {str(e)}")
+        return response
+
+    def process_exception(self, request, exception):
+        request._request_log_exception = exception
+
+    @staticmethod
+    def build_record(request, response, response_time_ms):
+        # DRF keeps api_key/operator on its own Request object, reachable from the Response
+        drf_request = (getattr(response, 'renderer_context', None) or {}).get('request')
+        api_key = getattr(drf_request, 'api_key', None)
+        user = getattr(request, 'user', None)
+
+        try:
+            request_id = uuid.UUID(request.META.get('HTTP_X_REQUEST_ID', ''))
+        except ValueError:
+            request_id = uuid.uuid4()
+
+        return {
+            'method': request.method,
+            'path': request.path[:500],
+            'status_code': response.status_code,
+            'response_time_ms': round(response_time_ms, 2),
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+            'operator_id': api_key.operator_id if api_key is not None else None,
+            'ip_address': _client_ip(request),
+            'user_agent': request.META.get('HTTP_USER_AGENT', '')[:1000],
+            'request_id': request_id,
+            'error_message': _error_message(
+                response, getattr(request, '_request_log_exception', None)
+            ) if response.status_code >= 400 else '',
+        }
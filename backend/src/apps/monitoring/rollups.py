@@ -0,0 +1,361 @@
+"""
+SystemMetric Rollups
+Downsampling of raw SystemMetric rows into 1-minute, 1-hour and 1-day
+MetricRollup tiers, tiered retention, and tier-aware range queries.
+
+Each rollup row holds count/sum/min/max and a mergeable quantile sketch
+(DDSketch-style logarithmic buckets, ROLLUP_SKETCH_ACCURACY relative error),
+so coarser tiers are built by merging finer ones and percentiles stay exact
+to within the sketch accuracy at every tier.
+
+Compaction (compact_system_metrics task):
+- raw -> 1m -> 1h -> 1d, closed buckets only. Each run restarts at the last
+  bucket it wrote and upserts, so re-running is idempotent and late rows for
+  that bucket are picked up.
+- Retention (ROLLUP_RETENTION_DAYS) never deletes data a coarser tier has
+  not absorbed yet.
+
+Queries (metric_series) use the coarsest tier whose resolution is fine enough
+for the requested step and whose retention still covers the window; the not
+yet compacted tail of the window is read from finer tiers and merged into the
+same buckets. Buckets are aligned to UTC.
+"""
+import hashlib
+import json
+import logging
+import math
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Max, Min
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+RAW = 'raw'
+TIERS = ['1m', '1h', '1d']
+RESOLUTIONS = {
+    RAW: timedelta(0),
+    '1m': timedelta(minutes=1),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+}
+SOURCE_TIER = {'1m': RAW, '1h': '1m', '1d': '1h'}
+
+# Host/service gauges written to SystemMetric by the monitoring sampler
+SYSTEM_METRICS = {
+    'cpu': 'system.cpu_percent',
+    'memory': 'system.memory_percent',
+    'disk': 'system.disk_percent',
+    'network_sent_mb': 'system.network_sent_mb',
+    'network_recv_mb': 'system.network_recv_mb',
+    'database_connections': 'database.active_connections',
+    'redis_hit_rate': 'redis.hit_rate',
+}
+
+
+def _monitoring_setting(name, default):
+    return getattr(settings, 'MONITORING_SETTINGS', {}).get(name, default)
+
+
+# Quantile sketch
+
+_ACCURACY = _monitoring_setting('ROLLUP_SKETCH_ACCURACY', 0.01)
+_GAMMA = (1 + _ACCURACY) / (1 - _ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+
+def _sketch_key(value):
+    if value == 0:
+        return 'z'
+    index = math.ceil(math.log(abs(value)) / _LOG_GAMMA)
+    return f"{'p' if value > 0 else 'n'}{index}"
+
+
+def _sketch_value(key):
+    if key == 'z':
+        return 0.0
+    value = 2 * _GAMMA ** int(key[1:]) / (_GAMMA + 1)
+    return value if key[0] == 'p' else -value
+
+
+def sketch_quantile(sketch, q):
+    """Value at quantile q (0..1) of a sketch, or None when empty"""
+    total = sum(sketch.values())
+    if not total:
+        return None
+    ordered = sorted(sketch.items(), key=lambda item: _sketch_value(item[0]))
+    rank = q * (total - 1)
+    seen = 0
+    for key, count in ordered:
+        seen += count
+        if seen > rank:
+            return _sketch_value(key)
+    return _sketch_value(ordered[-1][0])
+
+
+class Aggregate:
+    """count/sum/min/max plus sketch for one (metric, tags, bucket)"""
+
+    __slots__ = ('tags', 'count', 'sum', 'min', 'max', 'sketch')
+
+    def __init__(self, tags=None):
+        self.tags = tags or {}
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = {}
+
+    def merge(self, count, total, minimum, maximum, sketch):
+        self.count += count
+        self.sum += total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+        for key, value in sketch.items():
+            self.sketch[key] = self.sketch.get(key, 0) + value
+
+    def point(self, bucket_start):
+        return {
+            'timestamp': bucket_start.isoformat(),
+            'count': self.count,
+            'avg': round(self.sum / self.count, 4) if self.count else None,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+            'p50': sketch_quantile(self.sketch, 0.50),
+            'p95': sketch_quantile(self.sketch, 0.95),
+            'p99': sketch_quantile(self.sketch, 0.99),
+        }
+
+
+def tags_key(tags):
+    canonical = json.dumps(tags or {}, sort_keys=True, separators=(',', ':'), default=str)
+    return canonical if len(canonical) <= 64 else hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def truncate(value, resolution):
+    """Start of the UTC bucket containing `value`"""
+    value = value.astimezone(dt_timezone.utc)
+    if resolution == '1m':
+        return value.replace(second=0, microsecond=0)
+    if resolution == '1h':
+        return value.replace(minute=0, second=0, microsecond=0)
+    if resolution == '1d':
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value
+
+
+# Reading tiers
+
+def _iter_source(source, start, end, metric_name=None, tags=None):
+    """(metric_name, tags_key, tags, timestamp, count, sum, min, max, sketch) rows of a tier"""
+    from .models import MetricRollup, SystemMetric
+
+    chunk_size = _monitoring_setting('ROLLUP_CHUNK_SIZE', 5000)
+    if source == RAW:
+        queryset = SystemMetric.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        if metric_name:
+            queryset = queryset.filter(metric_name=metric_name)
+        if tags is not None:
+            queryset = queryset.filter(tags=tags)
+        for name, row_tags, value, timestamp in queryset.values_list(
+            'metric_name', 'tags', 'value', 'timestamp'
+        ).iterator(chunk_size=chunk_size):
+            yield name, tags_key(row_tags), row_tags, timestamp, 1, value, value, value, {_sketch_key(value): 1}
+        return
+
+    queryset = MetricRollup.objects.filter(resolution=source, bucket_start__gte=start, bucket_start__lt=end)
+    if metric_name:
+        queryset = queryset.filter(metric_name=metric_name)
+    if tags is not None:
+        queryset = queryset.filter(tags_key=tags_key(tags))
+    yield from queryset.values_list(
+        'metric_name', 'tags_key', 'tags', 'bucket_start', 'count', 'sum', 'min', 'max', 'sketch'
+    ).iterator(chunk_size=chunk_size)
+
+
+def _first_timestamp(source, after=None):
+    from .models import MetricRollup, SystemMetric
+
+    if source == RAW:
+        queryset = SystemMetric.objects.all()
+        if after:
+            queryset = queryset.filter(timestamp__gte=after)
+        return queryset.aggregate(first=Min('timestamp'))['first']
+    queryset = MetricRollup.objects.filter(resolution=source)
+    if after:
+        queryset = queryset.filter(bucket_start__gte=after)
+    return queryset.aggregate(first=Min('bucket_start'))['first']
+
+
+def tier_watermark(resolution, metric_name=None):
+    """End of the last bucket written to a tier (everything before it is compacted)"""
+    from .models import MetricRollup
+
+    queryset = MetricRollup.objects.filter(resolution=resolution)
+    if metric_name:
+        queryset = queryset.filter(metric_name=metric_name)
+    last = queryset.aggregate(last=Max('bucket_start'))['last']
+    return last + RESOLUTIONS[resolution] if last else None
+
+
+# Compaction
+
+def compact_tier(resolution, now=None):
+    """
+    Roll the source tier up into `resolution` for closed buckets, at most
+    ROLLUP_MAX_BUCKETS_PER_RUN[resolution] buckets per call.
+    Returns (rows written, caught_up).
+    """
+    from .models import MetricRollup
+
+    now = now or timezone.now()
+    step = RESOLUTIONS[resolution]
+    source = SOURCE_TIER[resolution]
+    end = truncate(now, resolution)
+
+    # Redo the last bucket written (late rows), then skip gaps with no data
+    watermark = tier_watermark(resolution)
+    first = _first_timestamp(source, after=watermark - step if watermark else None)
+    if first is None:
+        return 0, True
+    start = truncate(first, resolution)
+    if start >= end:
+        return 0, True
+    max_buckets = _monitoring_setting('ROLLUP_MAX_BUCKETS_PER_RUN', {}).get(resolution, 360)
+    batch_end = min(end, start + step * max_buckets)
+
+    groups = {}
+    for name, key, tags, timestamp, count, total, minimum, maximum, sketch in _iter_source(source, start, batch_end):
+        group_key = (name, key, truncate(timestamp, resolution))
+        aggregate = groups.get(group_key)
+        if aggregate is None:
+            aggregate = groups[group_key] = Aggregate(tags)
+        aggregate.merge(count, total, minimum, maximum, sketch)
+
+    rows = [
+        MetricRollup(
+            resolution=resolution, metric_name=name, tags_key=key, tags=aggregate.tags,
+            bucket_start=bucket_start, count=aggregate.count, sum=aggregate.sum,
+            min=aggregate.min, max=aggregate.max, sketch=aggregate.sketch
+        )
+        for (name, key, bucket_start), aggregate in groups.items()
+    ]
+    MetricRollup.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['resolution', 'metric_name', 'tags_key', 'bucket_start'],
+        update_fields=['tags', 'count', 'sum', 'min', 'max', 'sketch']
+    )
+    return len(rows), batch_end >= end
+
+
+def _delete_before(queryset, batch_size=10000):
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += queryset.model.objects.filter(pk__in=ids).delete()[0]
+
+
+def apply_retention(now=None):
+    """Delete expired rows of each tier, never beyond what the next tier has absorbed"""
+    from .models import MetricRollup, SystemMetric
+
+    now = now or timezone.now()
+    retention = _monitoring_setting('ROLLUP_RETENTION_DAYS', {})
+    deleted = {}
+    for tier, next_tier in ((RAW, '1m'), ('1m', '1h'), ('1h', '1d'), ('1d', None)):
+        days = retention.get(tier)
+        if days is None:
+            continue
+        cutoff = now - timedelta(days=days)
+        if next_tier:
+            absorbed = tier_watermark(next_tier)
+            if absorbed is None:
+                continue
+            cutoff = min(cutoff, absorbed)
+        if tier == RAW:
+            queryset = SystemMetric.objects.filter(timestamp__lt=cutoff)
+        else:
+            queryset = MetricRollup.objects.filter(resolution=tier, bucket_start__lt=cutoff)
+        deleted[tier] = _delete_before(queryset)
+    return deleted
+
+
+# Queries
+
+def max_window():
+    """Longest series window: the longest retention, capped when a tier keeps data forever"""
+    retention = _monitoring_setting('ROLLUP_RETENTION_DAYS', {})
+    days = [retention.get(tier) for tier in [RAW] + TIERS]
+    if None in days:
+        return timedelta(days=_monitoring_setting('ROLLUP_MAX_WINDOW_DAYS', 3650))
+    return timedelta(days=max(days))
+
+
+def choose_tier(start, end, step=None, max_points=None, now=None):
+    """Coarsest tier with resolution <= step that still retains `start`"""
+    now = now or timezone.now()
+    max_points = max_points or _monitoring_setting('ROLLUP_MAX_POINTS', 500)
+    step = step or (end - start) / max_points
+    retention = _monitoring_setting('ROLLUP_RETENTION_DAYS', {})
+
+    candidates = [RAW] + TIERS
+    chosen = RAW
+    for tier in candidates:
+        if RESOLUTIONS[tier] <= step:
+            chosen = tier
+    for tier in candidates[candidates.index(chosen):]:
+        chosen = tier
+        days = retention.get(tier)
+        if days is None or start >= now - timedelta(days=days):
+            break
+    return chosen
+
+
+def metric_series(metric_name, start, end=None, step=None, max_points=None, tags=None):
+    """
+    Points for one metric over [start, end), merged across tag sets unless
+    `tags` is given. Returns {'resolution': tier, 'points': [...]}.
+    """
+    end = end or timezone.now()
+    resolution = choose_tier(start, end, step=step, max_points=max_points)
+
+    buckets = {}
+    cursor = start
+    tiers = [RAW] + TIERS
+    for tier in reversed(tiers[:tiers.index(resolution) + 1]):
+        if cursor >= end:
+            break
+        if tier == RAW:
+            tier_end = end
+        else:
+            tier_end = min(end, tier_watermark(tier, metric_name) or cursor)
+            if tier_end <= cursor:
+                continue
+        for _, _, _, timestamp, count, total, minimum, maximum, sketch in _iter_source(
+            tier, cursor, tier_end, metric_name=metric_name, tags=tags
+        ):
+            bucket = truncate(timestamp, resolution)
+            aggregate = buckets.get(bucket)
+            if aggregate is None:
+                aggregate = buckets[bucket] = Aggregate()
+            aggregate.merge(count, total, minimum, maximum, sketch)
+        cursor = tier_end
+
+    return {
+        'metric': metric_name,
+        'resolution': resolution,
+        'points': [buckets[bucket].point(bucket) for bucket in sorted(buckets)],
+    }
+
+
+def latest_value(metric_name):
+    from .models import SystemMetric
+
+    return SystemMetric.objects.filter(metric_name=metric_name).order_by('-timestamp').values_list(
+        'value', flat=True
+    ).first()
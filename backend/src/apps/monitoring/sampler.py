@@ -0,0 +1,207 @@
+"""
+Shared Monitoring Sampler
+One sampler per process (and, with Redis, one per cluster) collects system,
+database and Redis metrics once per tick and publishes them to the
+`monitoring_staff` channel group. MonitoringConsumer instances only relay,
+so sampling cost no longer grows with the number of open dashboards.
+
+- The sampler is an asyncio task on the ASGI event loop, started by the
+  first local consumer and stopped when the last one disconnects.
+- Collection runs in a worker thread; CPU usage uses psutil's non-blocking
+  form (utilisation since the previous tick) instead of a 100 ms sleep.
+- With Redis, processes that have consumers compete for a lease (a key with
+  a TTL of three ticks, renewed each tick); only the holder samples and
+  publishes, and another process takes over within one lease if it dies. Metrics then
+  describe the leader's host. Without Redis every such process samples.
+- Each published sample is also written to SystemMetric, which feeds the
+  rollup tiers (see apps.monitoring.rollups).
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+import psutil
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+GROUP_NAME = 'monitoring_staff'
+LEADER_KEY = 'nser:monitoring:sampler_leader'
+
+# KEYS: lease key; ARGV: token, lease ms. Returns 1 when the caller holds the lease.
+LEASE_LUA = """
+local holder = redis.call('GET', KEYS[1])
+if holder == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+if not holder then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+
+def _monitoring_setting(name, default):
+    return getattr(settings, 'MONITORING_SETTINGS', {}).get(name, default)
+
+
+def _database_stats():
+    from django.db import connection
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT count(*) FILTER (WHERE state = 'active'),
+                   count(*),
+                   pg_size_pretty(pg_database_size(current_database()))
+            FROM pg_stat_activity
+        """)
+        active_connections, total_connections, db_size = cursor.fetchone()
+    return {
+        'active_connections': active_connections,
+        'total_connections': total_connections,
+        'database_size': db_size
+    }
+
+
+def _redis_stats():
+    client = get_redis_client()
+    if client is None:
+        return {}
+    info = client.info()
+    hits, misses = info.get('keyspace_hits', 0), info.get('keyspace_misses', 0)
+    return {
+        'connected_clients': info.get('connected_clients', 0),
+        'used_memory_mb': round(info.get('used_memory', 0) / (1024**2), 2),
+        'keyspace_hits': hits,
+        'keyspace_misses': misses,
+        'hit_rate': round(hits / max(hits + misses, 1) * 100, 2)
+    }
+
+
+def collect_metrics():
+    """One blocking sample of system, database and Redis metrics"""
+    from django.db import close_old_connections
+
+    memory = psutil.virtual_memory()
+    disk = psutil.disk_usage('/')
+    network = psutil.net_io_counters()
+    metrics = {
+        'system': {
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'memory_percent': memory.percent,
+            'memory_used_gb': round(memory.used / (1024**3), 2),
+            'memory_total_gb': round(memory.total / (1024**3), 2),
+            'disk_percent': disk.percent,
+            'disk_used_gb': round(disk.used / (1024**3), 2),
+            'disk_total_gb': round(disk.total / (1024**3), 2),
+            'network_sent_mb': round(network.bytes_sent / (1024**2), 2),
+            'network_recv_mb': round(network.bytes_recv / (1024**2), 2)
+        },
+        'database': {},
+        'redis': {},
+        'host': socket.gethostname(),
+        'timestamp': timezone.now().isoformat()
+    }
+
+    close_old_connections()
+    try:
+        metrics['database'] = _database_stats()
+    except Exception as e:
+        logger.error(f"Failed to get database stats: {str(e)}")
+    try:
+        metrics['redis'] = _redis_stats()
+    except Exception as e:
+        logger.error(f"Failed to get Redis stats: {str(e)}")
+    return metrics
+
+
+def store_metrics(metrics):
+    """Persist the gauges of one sample as SystemMetric rows"""
+    from django.db import close_old_connections
+    from .models import SystemMetric
+    from .rollups import SYSTEM_METRICS
+
+    close_old_connections()
+    values = {
+        SYSTEM_METRICS['cpu']: metrics['system'].get('cpu_percent'),
+        SYSTEM_METRICS['memory']: metrics['system'].get('memory_percent'),
+        SYSTEM_METRICS['disk']: metrics['system'].get('disk_percent'),
+        SYSTEM_METRICS['network_sent_mb']: metrics['system'].get('network_sent_mb'),
+        SYSTEM_METRICS['network_recv_mb']: metrics['system'].get('network_recv_mb'),
+        SYSTEM_METRICS['database_connections']: metrics['database'].get('active_connections'),
+        SYSTEM_METRICS['redis_hit_rate']: metrics['redis'].get('hit_rate'),
+    }
+    SystemMetric.objects.bulk_create([
+        SystemMetric(metric_name=name, metric_type='gauge', value=value, tags={'host': metrics['host']})
+        for name, value in values.items() if value is not None
+    ])
+
+
+class MetricsSampler:
+    """Per-process sampling loop shared by all MonitoringConsumer instances"""
+
+    def __init__(self):
+        self.latest = None
+        self._subscribers = 0
+        self._task = None
+        self._script = None
+        self._token = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def subscribe(self):
+        self._subscribers += 1
+        if self._task is None or self._task.done():
+            psutil.cpu_percent(interval=None)  # prime the non-blocking CPU counter
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def unsubscribe(self):
+        self._subscribers = max(self._subscribers - 1, 0)
+        if self._subscribers == 0 and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def sample_now(self):
+        """Latest sample, collecting one off the event loop if none exists yet"""
+        if self.latest is None:
+            self.latest = await sync_to_async(collect_metrics, thread_sensitive=False)()
+        return self.latest
+
+    def _is_leader(self, interval):
+        client = get_redis_client()
+        if client is None:
+            return True
+        try:
+            if self._script is None:
+                self._script = client.register_script(LEASE_LUA)
+            return bool(self._script(keys=[LEADER_KEY], args=[self._token, int(interval * 3000)], client=client))
+        except Exception as e:
+            logger.warning(f"Sampler lease unavailable, sampling locally: {str(e)}")
+            return True
+
+    async def _run(self):
+        interval = _monitoring_setting('SAMPLER_INTERVAL_SECONDS', 5)
+        channel_layer = get_channel_layer()
+        while True:
+            try:
+                if await sync_to_async(self._is_leader, thread_sensitive=False)(interval):
+                    metrics = await sync_to_async(collect_metrics, thread_sensitive=False)()
+                    self.latest = metrics
+                    await channel_layer.group_send(GROUP_NAME, {'type': 'metrics_update', 'data': metrics})
+                    if _monitoring_setting('SAMPLER_STORE_METRICS', True):
+                        await sync_to_async(store_metrics, thread_sensitive=False)(metrics)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Monitoring sampler tick failed: {str(e)}")
+            await asyncio.sleep(interval)
+
+
+sampler = MetricsSampler()
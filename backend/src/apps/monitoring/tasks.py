@@ -0,0 +1,29 @@
+"""
+Monitoring Tasks Module
+Metric rollups and retention
+"""
+from celery import shared_task
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def compact_system_metrics(time_budget_seconds=240):
+    """Roll SystemMetric up into the 1m/1h/1d tiers, then apply tiered retention"""
+    from .rollups import TIERS, apply_retention, compact_tier
+    
+    deadline = time.monotonic() + time_budget_seconds
+    written = {}
+    for resolution in TIERS:
+        written[resolution] = 0
+        while True:
+            rows, caught_up = compact_tier(resolution)
+            written[resolution] += rows
+            if caught_up or time.monotonic() > deadline:
+                break
+    
+    deleted = apply_retention()
+    logger.info(f"Metric rollups written: {written}; expired rows deleted: {deleted}")
+    return {'written': written, 'deleted': deleted}
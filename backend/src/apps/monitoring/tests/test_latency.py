@@ -0,0 +1,57 @@
+"""
+Test cases for the API latency histograms
+"""
+import threading
+
+from apps.monitoring.latency import (
+    BOUNDS_MS, LatencyRecorder, count_of, parse_series, percentile, series_name, summarize
+)
+
+
+class TestHistogram:
+    """Bucketing and percentile math"""
+
+    def test_percentiles_within_bucket_resolution(self):
+        recorder = LatencyRecorder()
+        for ms in range(1, 101):
+            recorder.record('ExclusionLookupView|POST|200', ms)
+
+        counts = recorder.snapshot()['ExclusionLookupView|POST|200']
+        summary = summarize(counts)
+
+        assert summary['count'] == 100
+        assert summary['avg_ms'] == 50.5
+        for q, expected in ((0.50, 50), (0.95, 95), (0.99, 99)):
+            assert expected <= percentile(counts, q) <= expected * 1.07
+
+    def test_overflow_and_empty(self):
+        recorder = LatencyRecorder()
+        recorder.record('SlowView|GET|200', 10 ** 7)
+
+        counts = recorder.snapshot()['SlowView|GET|200']
+        assert percentile(counts, 0.99) == BOUNDS_MS[-1]
+        assert summarize([0] * len(counts))['p99_ms'] is None
+
+    def test_series_name_round_trip(self):
+        assert parse_series(series_name('ValidateBSTTokenView', 'POST', 429)) == {
+            'view': 'ValidateBSTTokenView', 'method': 'POST', 'status': '429'
+        }
+
+
+class TestRecorder:
+    """Thread-sharded recording"""
+
+    def test_threads_merge_without_losing_counts(self):
+        recorder = LatencyRecorder()
+
+        def work():
+            for _ in range(1000):
+                recorder.record('ValidateBSTTokenView|POST|200', 3.5)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert count_of(recorder.snapshot()['ValidateBSTTokenView|POST|200']) == 8000
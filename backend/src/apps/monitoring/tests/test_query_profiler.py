@@ -0,0 +1,51 @@
+"""
+Test cases for the sampling SQL query profiler
+"""
+from apps.monitoring.query_profiler import (
+    QueryProfile, fingerprint, profile_queries, recent_offenders, record_profile
+)
+
+
+def _run(profile, sql, times=1):
+    for _ in range(times):
+        profile(lambda *args: None, sql, [], False, {})
+
+
+class TestFingerprint:
+    """Statements differing only in literals share a fingerprint"""
+
+    def test_literals_and_in_lists_are_normalized(self):
+        assert fingerprint("SELECT * FROM users WHERE id = 42 AND name = 'O''Brien'") == \
+            fingerprint("SELECT * FROM users WHERE id = 7 AND name = 'x'")
+        assert fingerprint('SELECT * FROM t1 WHERE id IN (%s, %s, %s)') == 'SELECT * FROM t1 WHERE id IN (...)'
+
+    def test_multi_row_insert_collapsed(self):
+        assert fingerprint('INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s) RETURNING id') == \
+            'INSERT INTO t (a, b) VALUES (...) RETURNING id'
+
+
+class TestProfile:
+    """N+1 detection and the offender ring buffer"""
+
+    def test_repeated_statement_flagged_as_n_plus_one(self):
+        profile = QueryProfile('request', 'GET /api/v1/analytics/export/csv/')
+        _run(profile, 'SELECT * FROM nser_self_exclusion_records LIMIT 1000')
+        _run(profile, 'SELECT * FROM users WHERE id = %s', times=25)
+        profile.finish()
+
+        report = profile.report()
+        assert report['query_count'] == 26
+        assert report['n_plus_one'][0]['count'] == 25
+        assert profile.is_offender()
+
+    def test_offenders_are_buffered(self):
+        profile = QueryProfile('task', 'apps.nser.tasks.test_task')
+        _run(profile, 'SELECT * FROM operators WHERE id = %s', times=12)
+        profile.finish()
+        record_profile(profile)
+
+        assert any(report['name'] == 'apps.nser.tasks.test_task' for report in recent_offenders(kind='task'))
+
+    def test_not_sampled_when_disabled(self):
+        with profile_queries('request', 'GET /') as profile:
+            assert profile is None
@@ -0,0 +1,79 @@
+"""
+Test cases for sampled APIRequestLog ingestion
+"""
+import uuid
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.monitoring.models import APIRequestLog
+from apps.monitoring.request_log import APIRequestLogMiddleware, should_log
+from apps.monitoring.views import APILogStatisticsView
+from apps.users.models import User
+
+
+class TestSampling:
+    """Errors and slow requests are always kept, successes are sampled"""
+
+    def test_errors_and_slow_requests_always_logged(self):
+        assert all(should_log(500, 5) for _ in range(100))
+        assert all(should_log(200, 5000) for _ in range(100))
+
+    @override_settings(MONITORING_SETTINGS={'REQUEST_LOG_SUCCESS_SAMPLE_RATE': 0})
+    def test_successes_sampled(self):
+        assert not any(should_log(200, 5) for _ in range(100))
+
+
+class TestRecord:
+    """Record built from the request/response pair"""
+
+    def test_record_fields(self):
+        request = RequestFactory().post(
+            '/api/v1/nser/lookup/',
+            HTTP_X_FORWARDED_FOR='203.0.113.9, 10.0.0.1',
+            HTTP_X_REQUEST_ID='not-a-uuid'
+        )
+        request.user = AnonymousUser()
+        response = HttpResponse(status=503)
+
+        record = APIRequestLogMiddleware.build_record(request, response, 12.345)
+
+        assert record['ip_address'] == '203.0.113.9'
+        assert record['status_code'] == 503 and record['response_time_ms'] == 12.35
+        assert record['user_id'] is None and record['operator_id'] is None
+        assert record['request_id'] is not None
+
+    def test_invalid_client_ip_falls_back(self):
+        request = RequestFactory().get('/api/v1/health/', HTTP_X_FORWARDED_FOR='unknown')
+        record = APIRequestLogMiddleware.build_record(request, HttpResponse(), 1)
+
+        assert record['ip_address'] == '0.0.0.0' and record['error_message'] == ''
+
+
+@pytest.mark.django_db
+class TestStatisticsView:
+    """APILogStatisticsView scales sampled successes like estimate_totals"""
+
+    def test_estimated_totals(self, settings):
+        settings.MONITORING_SETTINGS = {'REQUEST_LOG_SUCCESS_SAMPLE_RATE': 0.5, 'REQUEST_LOG_SLOW_MS': 1000}
+        APIRequestLog.objects.bulk_create([
+            APIRequestLog(method='GET', path='/api/v1/nser/lookup/', status_code=status_code,
+                          response_time_ms=response_time_ms, ip_address='203.0.113.9', request_id=uuid.uuid4())
+            for status_code, response_time_ms in ((200, 10), (200, 20), (500, 50), (200, 2000))
+        ])
+        staff = User.objects.create_user(
+            phone_number='+254712353001', national_id='53000001', email='statistics@example.com', role='grak_officer'
+        )
+        request = APIRequestFactory().get('/api/v1/monitoring/logs/statistics/')
+        force_authenticate(request, user=staff)
+
+        data = APILogStatisticsView.as_view()(request).data['data']
+
+        # 2 unsampled rows plus 2 sampled successes at a 0.5 sample rate
+        assert (data['logged_requests'], data['total_requests']) == (4, 6)
+        assert (data['error_requests'], data['slow_requests']) == (1, 1)
+        assert data['success_rate'] == round(5 / 6, 4)
+        assert data['avg_response_time'] == round((50 + 2000 + 30 / 0.5) / 6, 2)
@@ -0,0 +1,165 @@
+"""
+Test cases for SystemMetric rollups
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.monitoring.models import MetricRollup, SystemMetric
+from apps.monitoring.rollups import (
+    Aggregate, _sketch_key, apply_retention, choose_tier, compact_tier, max_window, metric_series,
+    sketch_quantile, tags_key, tier_watermark, truncate
+)
+from apps.monitoring.views import _series_window
+
+NOW = datetime(2026, 10, 17, 12, 34, 56, tzinfo=dt_timezone.utc)
+
+
+def _aggregate(values):
+    aggregate = Aggregate()
+    for value in values:
+        aggregate.merge(1, value, value, value, {_sketch_key(value): 1})
+    return aggregate
+
+
+class TestSketch:
+    """Quantile sketch accuracy and mergeability"""
+
+    def test_quantiles_within_relative_accuracy(self):
+        aggregate = _aggregate(range(1, 1001))
+        for q, expected in ((0.5, 500), (0.95, 950), (0.99, 990)):
+            assert abs(sketch_quantile(aggregate.sketch, q) - expected) / expected <= 0.02
+
+    def test_merged_tiers_match_single_pass(self):
+        whole = _aggregate(range(1, 121))
+        merged = Aggregate()
+        for start in (1, 61):
+            part = _aggregate(range(start, start + 60))
+            merged.merge(part.count, part.sum, part.min, part.max, part.sketch)
+
+        assert merged.sketch == whole.sketch
+        assert merged.point(NOW) == whole.point(NOW)
+
+    def test_zero_and_negative_values(self):
+        aggregate = _aggregate([-5, 0, 0, 5])
+        assert sketch_quantile(aggregate.sketch, 0) < 0
+        assert sketch_quantile(aggregate.sketch, 0.5) == 0
+        assert aggregate.point(NOW)['min'] == -5
+
+
+class TestBuckets:
+    """Bucket alignment, tag keys and tier selection"""
+
+    def test_truncate(self):
+        assert truncate(NOW, '1m') == NOW.replace(second=0)
+        assert truncate(NOW, '1h') == NOW.replace(minute=0, second=0)
+        assert truncate(NOW, '1d') == NOW.replace(hour=0, minute=0, second=0)
+
+    def test_tags_key_is_canonical_and_bounded(self):
+        assert tags_key({'b': 1, 'a': 2}) == tags_key({'a': 2, 'b': 1})
+        assert len(tags_key({'host': 'x' * 200})) == 40
+
+    @override_settings(MONITORING_SETTINGS={
+        'ROLLUP_MAX_POINTS': 500,
+        'ROLLUP_RETENTION_DAYS': {'raw': 2, '1m': 14, '1h': 400, '1d': None},
+    })
+    def test_coarsest_tier_satisfying_the_window(self):
+        assert choose_tier(NOW - timedelta(minutes=30), NOW, now=NOW) == 'raw'
+        assert choose_tier(NOW - timedelta(days=1), NOW, now=NOW) == '1m'
+        assert choose_tier(NOW - timedelta(days=30), NOW, now=NOW) == '1h'
+        assert choose_tier(NOW - timedelta(days=365), NOW, now=NOW) == '1h'
+        assert choose_tier(NOW - timedelta(days=3 * 365), NOW, now=NOW) == '1d'
+        # Retention: 1m rows older than 14 days are gone, so use 1h
+        assert choose_tier(NOW - timedelta(days=20), NOW - timedelta(days=19), now=NOW) == '1h'
+
+
+class TestSeriesWindow:
+    """?hours= is clamped to what the tiers can answer"""
+
+    def _window(self, **params):
+        return _series_window(Request(APIRequestFactory().get('/api/v1/monitoring/metrics/system/', params)))
+
+    def test_unbounded_hours_are_clamped(self):
+        for hours in ('inf', '1e300', str(10 ** 12)):
+            start, end, _ = self._window(hours=hours)
+            assert end - start == max_window()
+
+    def test_invalid_hours_fall_back_to_the_default(self):
+        for hours in ('nan', '-5', '0', 'soon'):
+            start, end, _ = self._window(hours=hours)
+            assert end - start == timedelta(hours=1)
+
+    def test_step_is_bounded_by_the_window(self):
+        start, end, step = self._window(hours='2', step_seconds=str(10 ** 15))
+        assert step == end - start
+
+    @override_settings(MONITORING_SETTINGS={'ROLLUP_RETENTION_DAYS': {'raw': 2, '1m': 14, '1h': 400, '1d': 800}})
+    def test_window_is_the_longest_retention(self):
+        assert max_window() == timedelta(days=800)
+
+
+def _raw(timestamp, value=1.0, metric_name='system.cpu_percent'):
+    metric = SystemMetric.objects.create(metric_name=metric_name, metric_type='gauge', value=value)
+    SystemMetric.objects.filter(pk=metric.pk).update(timestamp=timestamp)
+
+
+def _rollups(resolution='1m'):
+    return {
+        row.bucket_start: (row.count, row.sum)
+        for row in MetricRollup.objects.filter(resolution=resolution)
+    }
+
+
+@pytest.mark.django_db
+class TestRollupsAgainstDatabase:
+    """Compaction, retention and tiered queries on stored rows"""
+
+    @pytest.fixture(autouse=True)
+    def tiers(self, settings):
+        settings.MONITORING_SETTINGS = {
+            'ROLLUP_RETENTION_DAYS': {'raw': 2, '1m': 14, '1h': 400, '1d': None},
+            'ROLLUP_MAX_BUCKETS_PER_RUN': {'1m': 360, '1h': 168, '1d': 90},
+        }
+
+    def test_compaction_is_idempotent_and_folds_late_rows(self):
+        minute = NOW.replace(second=0) - timedelta(minutes=5)
+        _raw(minute + timedelta(seconds=10), 10)
+        _raw(minute + timedelta(seconds=40), 20)
+        _raw(minute + timedelta(seconds=80), 30)
+
+        assert compact_tier('1m', now=NOW) == (2, True)
+        first = _rollups()
+        assert first == {minute: (2, 30.0), minute + timedelta(minutes=1): (1, 30.0)}
+
+        compact_tier('1m', now=NOW)
+        assert _rollups() == first
+
+        _raw(minute + timedelta(seconds=110), 5)  # late row for the last bucket written
+        compact_tier('1m', now=NOW)
+        assert _rollups() == {minute: (2, 30.0), minute + timedelta(minutes=1): (2, 35.0)}
+
+    def test_retention_keeps_raw_rows_not_yet_compacted(self):
+        _raw(NOW - timedelta(days=5))
+        _raw(NOW - timedelta(days=3))
+        # One run covers ROLLUP_MAX_BUCKETS_PER_RUN minutes: only the older row is absorbed
+        assert compact_tier('1m', now=NOW) == (1, False)
+
+        assert apply_retention(now=NOW) == {'raw': 1}
+        assert SystemMetric.objects.filter(timestamp__gte=tier_watermark('1m')).count() == 1
+
+    def test_series_reads_the_tail_from_finer_tiers(self):
+        now = timezone.now()
+        _raw(now - timedelta(minutes=50), 10)
+        _raw(now - timedelta(minutes=40), 20)
+        _raw(now - timedelta(minutes=10), 30)
+        compact_tier('1m', now=now - timedelta(minutes=45))
+        assert MetricRollup.objects.filter(resolution='1m').count() == 1
+
+        series = metric_series('system.cpu_percent', now - timedelta(hours=1), now, step=timedelta(minutes=1))
+
+        assert series['resolution'] == '1m'
+        assert [(point['count'], point['avg']) for point in series['points']] == [(1, 10.0), (1, 20.0), (1, 30.0)]
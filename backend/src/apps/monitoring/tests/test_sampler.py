@@ -0,0 +1,42 @@
+"""
+Test cases for the shared monitoring sampler
+"""
+import asyncio
+
+from apps.monitoring.sampler import MetricsSampler
+
+
+class TestSampler:
+    """One sampling loop per process, however many consumers are connected"""
+
+    def test_consumers_share_one_loop(self):
+        runs = []
+
+        class Sampler(MetricsSampler):
+            async def _run(self):
+                runs.append(1)
+                await asyncio.sleep(3600)
+
+        async def scenario():
+            sampler = Sampler()
+            for _ in range(20):
+                sampler.subscribe()
+            await asyncio.sleep(0)
+            task = sampler._task
+
+            for _ in range(19):
+                sampler.unsubscribe()
+            assert not task.cancelled() and sampler._task is task
+
+            sampler.unsubscribe()
+            await asyncio.sleep(0)
+            assert task.cancelled() and sampler._task is None
+
+        asyncio.run(scenario())
+        assert len(runs) == 1
+
+    def test_sample_now_reuses_latest_sample(self):
+        sampler = MetricsSampler()
+        sampler.latest = {'system': {'cpu_percent': 12.5}}
+
+        assert asyncio.run(sampler.sample_now()) == {'system': {'cpu_percent': 12.5}}
@@ -20,6 +20,7 @@ urlpatterns = [
     path('health/', views.HealthCheckView.as_view(), name='health'),
     path('health/liveness/', views.LivenessProbeView.as_view(), name='liveness'),
     path('health/readiness/', views.ReadinessProbeView.as_view(), name='readiness'),
+    path('health/replica/', views.ReplicaHealthProbeView.as_view(), name='replica_health'),
     path('health/detailed/', views.DetailedHealthCheckView.as_view(), name='detailed_health'),
     
     # System Status
@@ -6,12 +6,21 @@ from rest_framework import status, viewsets
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.conf import settings
+from django.db.models import Count, Q
+from django.http import HttpResponse
 from django.utils import timezone
+from datetime import timedelta
+import math
 
 from .models import SystemMetric, HealthCheck, Alert, APIRequestLog
+from .latency import latency_report, prometheus_exposition
+from .request_log import estimate_totals, sampled_aggregates
+from .query_profiler import recent_offenders
+from .rollups import SYSTEM_METRICS, latest_value, max_window, metric_series
 from .serializers import SystemMetricSerializer, HealthCheckSerializer, AlertSerializer, APIRequestLogSerializer
 from apps.api.permissions import IsGRAKStaff
-from apps.api.mixins import TimingMixin, SuccessResponseMixin
+from apps.api.mixins import TimingMixin, SuccessResponseMixin, ReplicaReadMixin
 
 
 class HealthCheckView(TimingMixin, APIView):
@@ -59,7 +68,7 @@ class MetricsView(TimingMixin, SuccessResponseMixin, APIView):
         return self.success_response(data=metrics)
 
 
-class SystemMetricViewSet(TimingMixin, viewsets.ReadOnlyModelViewSet):
+class SystemMetricViewSet(TimingMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """System metrics history"""
     serializer_class = SystemMetricSerializer
     permission_classes = [IsAuthenticated, IsGRAKStaff]
@@ -77,13 +86,13 @@ class AlertViewSet(TimingMixin, viewsets.ModelViewSet):
         return Alert.objects.order_by('-created_at')
 
 
-class APIRequestLogViewSet(TimingMixin, viewsets.ReadOnlyModelViewSet):
+class APIRequestLogViewSet(TimingMixin, ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """API request logs"""
     serializer_class = APIRequestLogSerializer
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get_queryset(self):
-        return APIRequestLog.objects.order_by('-timestamp')[:10000]
+        return APIRequestLog.objects.order_by('-created_at')[:10000]
 
 
 # Missing ViewSets
@@ -114,17 +123,39 @@ class ReadinessProbeView(TimingMixin, APIView):
         return Response({'status': 'ready'}, status=status.HTTP_200_OK)
 
 
+class ReplicaHealthProbeView(TimingMixin, APIView):
+    """
+    Read replica probe: lag (at most REPLICA_LAG_CHECK_SECONDS old) against
+    REPLICA_MAX_LAG_SECONDS.
+    503 while a configured replica is unreachable or behind (replica-safe
+    reads are then served by the primary).
+    """
+    permission_classes = []
+    
+    def get(self, request):
+        from apps.core.db_routing import replica_status
+        
+        replica = replica_status(refresh=True)
+        data = {key: value for key, value in replica.items() if key != 'error'}
+        healthy = replica['healthy'] or not replica['configured']
+        data['serving_reads'] = replica['healthy']
+        return Response(data, status=status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
 class DetailedHealthCheckView(TimingMixin, SuccessResponseMixin, APIView):
     """Detailed health check"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get(self, request):
+        from apps.core.db_routing import replica_status
+        
         health = {
             'status': 'healthy',
             'database': 'connected',
             'redis': 'connected',
             'celery': 'running',
-            'elasticsearch': 'connected'
+            'elasticsearch': 'connected',
+            'replica': replica_status()
         }
         return self.success_response(data=health)
 
@@ -160,18 +191,41 @@ class PrometheusMetricsView(TimingMixin, APIView):
     permission_classes = []
     
     def get(self, request):
-        metrics = "# HELP api_requests_total Total API requests\n"
-        metrics += "# TYPE api_requests_total counter\n"
-        metrics += "api_requests_total 0\n"
-        return Response(metrics, content_type='text/plain')
+        return HttpResponse(prometheus_exposition(), content_type='text/plain; version=0.0.4')
+
+
+def _series_window(request, default_hours=1):
+    """(start, end, step) from ?hours= / ?step_seconds= query parameters, clamped to the retention window"""
+    try:
+        hours = float(request.query_params.get('hours', default_hours))
+        step_seconds = int(request.query_params.get('step_seconds', 0))
+    except ValueError:
+        hours, step_seconds = default_hours, 0
+    if math.isnan(hours) or hours <= 0:
+        hours = default_hours
+    window = timedelta(hours=min(hours, max_window() / timedelta(hours=1)))
+    step_seconds = min(max(step_seconds, 0), int(window.total_seconds()))
+    end = timezone.now()
+    return end - window, end, timedelta(seconds=step_seconds) if step_seconds else None
 
 
 class SystemMetricsView(TimingMixin, SuccessResponseMixin, APIView):
-    """System metrics"""
+    """
+    System metrics
+    Latest value of each system gauge, or with ?metric= a series over ?hours=
+    read from the coarsest rollup tier that satisfies the window
+    """
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get(self, request):
-        return self.success_response(data={'cpu': 0, 'memory': 0})
+        metric = request.query_params.get('metric')
+        if metric:
+            start, end, step = _series_window(request)
+            return self.success_response(data=metric_series(metric, start, end, step=step))
+        
+        return self.success_response(data={
+            key: latest_value(metric_name) for key, metric_name in SYSTEM_METRICS.items()
+        })
 
 
 class ApplicationMetricsView(TimingMixin, SuccessResponseMixin, APIView):
@@ -199,11 +253,20 @@ class CacheMetricsView(TimingMixin, SuccessResponseMixin, APIView):
 
 
 class ResponseTimeMetricsView(TimingMixin, SuccessResponseMixin, APIView):
-    """Response time metrics"""
+    """
+    Response time metrics
+    Overall and per-view p50/p95/p99 over the last ?window= minutes, with SLO status
+    """
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get(self, request):
-        return self.success_response(data={'avg': 150, 'p95': 250, 'p99': 400})
+        try:
+            window = int(request.query_params.get('window', 0)) or None
+        except ValueError:
+            window = None
+        return self.success_response(
+            data=latency_report(window_minutes=window, view=request.query_params.get('view'))
+        )
 
 
 class ThroughputMetricsView(TimingMixin, SuccessResponseMixin, APIView):
@@ -223,11 +286,26 @@ class ErrorRateMetricsView(TimingMixin, SuccessResponseMixin, APIView):
 
 
 class SlowQueriesView(TimingMixin, SuccessResponseMixin, APIView):
-    """Slow database queries"""
+    """
+    Slow database queries
+    Worst sampled requests/tasks from the query profiler (?kind=request|task, ?order_by=sql_ms|query_count)
+    """
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get(self, request):
-        return self.success_response(data={'queries': []})
+        order_by = request.query_params.get('order_by', 'sql_ms')
+        if order_by not in ('sql_ms', 'query_count', 'duration_ms'):
+            order_by = 'sql_ms'
+        try:
+            limit = min(int(request.query_params.get('limit', 50)), 200)
+        except ValueError:
+            limit = 50
+        queries = recent_offenders(
+            limit=limit,
+            kind=request.query_params.get('kind'),
+            order_by=order_by
+        )
+        return self.success_response(data={'queries': queries, 'count': len(queries)})
 
 
 class ActiveAlertsView(TimingMixin, SuccessResponseMixin, APIView):
@@ -284,7 +362,7 @@ class SearchAPILogsView(TimingMixin, SuccessResponseMixin, APIView):
     
     def get(self, request):
         query = request.query_params.get('q', '')
-        logs = APIRequestLog.objects.filter(path__icontains=query).order_by('-timestamp')[:100]
+        logs = APIRequestLog.objects.filter(path__icontains=query).order_by('-created_at')[:100]
         return self.success_response(data=APIRequestLogSerializer(logs, many=True).data)
 
 
@@ -293,7 +371,7 @@ class APIErrorLogsView(TimingMixin, SuccessResponseMixin, APIView):
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get(self, request):
-        logs = APIRequestLog.objects.filter(status_code__gte=400).order_by('-timestamp')[:100]
+        logs = APIRequestLog.objects.filter(status_code__gte=400).order_by('-created_at')[:100]
         return self.success_response(data=APIRequestLogSerializer(logs, many=True).data)
 
 
@@ -302,7 +380,9 @@ class SlowAPIRequestsView(TimingMixin, SuccessResponseMixin, APIView):
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get(self, request):
-        logs = APIRequestLog.objects.filter(response_time__gte=1000).order_by('-response_time')[:100]
+        logs = APIRequestLog.objects.filter(
+            response_time_ms__gte=settings.MONITORING_SETTINGS.get('REQUEST_LOG_SLOW_MS', 1000)
+        ).order_by('-response_time_ms')[:100]
         return self.success_response(data=APIRequestLogSerializer(logs, many=True).data)
 
 
@@ -311,28 +391,55 @@ class APILogStatisticsView(TimingMixin, SuccessResponseMixin, APIView):
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get(self, request):
-        stats = {
-            'total_requests': APIRequestLog.objects.count(),
-            'success_rate': 0.99,
-            'avg_response_time': 150
-        }
-        return self.success_response(data=stats)
+        """
+        Last ?hours= (default 24) of logs. Sampled successes are scaled by the
+        sample rate to estimate totals; errors and slow requests are complete.
+        """
+        try:
+            hours = int(request.query_params.get('hours', 24))
+        except ValueError:
+            hours = 24
+        slow_ms = settings.MONITORING_SETTINGS.get('REQUEST_LOG_SLOW_MS', 1000)
+        
+        stats = APIRequestLog.objects.filter(
+            created_at__gte=timezone.now() - timedelta(hours=hours)
+        ).aggregate(slow=Count('id', filter=Q(response_time_ms__gte=slow_ms)), **sampled_aggregates())
+        totals = estimate_totals(stats)
+        
+        return self.success_response(data={
+            'hours': hours,
+            'logged_requests': stats['logged'],
+            'total_requests': totals['requests'],
+            'error_requests': totals['errors'],
+            'slow_requests': stats['slow'],
+            'success_rate': round(1 - totals['errors'] / totals['requests'], 4) if totals['requests'] else None,
+            'avg_response_time': totals['avg_response_time_ms'] if totals['requests'] else None,
+            'success_sample_rate': settings.MONITORING_SETTINGS.get('REQUEST_LOG_SUCCESS_SAMPLE_RATE', 0.05) or 1,
+        })
 
 
 class CPUUsageView(TimingMixin, SuccessResponseMixin, APIView):
-    """CPU usage"""
+    """CPU usage (latest sample plus ?hours= of history)"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get(self, request):
-        return self.success_response(data={'usage_percent': 45})
+        start, end, step = _series_window(request)
+        return self.success_response(data={
+            'usage_percent': latest_value(SYSTEM_METRICS['cpu']),
+            'history': metric_series(SYSTEM_METRICS['cpu'], start, end, step=step),
+        })
 
 
 class MemoryUsageView(TimingMixin, SuccessResponseMixin, APIView):
-    """Memory usage"""
+    """Memory usage (latest sample plus ?hours= of history)"""
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def get(self, request):
-        return self.success_response(data={'usage_percent': 60})
+        start, end, step = _series_window(request)
+        return self.success_response(data={
+            'usage_percent': latest_value(SYSTEM_METRICS['memory']),
+            'history': metric_series(SYSTEM_METRICS['memory'], start, end, step=step),
+        })
 
 
 class DiskUsageView(TimingMixin, SuccessResponseMixin, APIView):
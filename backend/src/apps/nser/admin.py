@@ -7,6 +7,7 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
 from django.utils import timezone
 from django.db.models import Q
+from apps.core.admin import ReplicaReadAdminMixin
 from .models import (
     SelfExclusionRecord, OperatorExclusionMapping, ExclusionAuditLog,
     ExclusionExtensionRequest, ExclusionStatistics
@@ -387,7 +388,7 @@ class OperatorExclusionMappingAdmin(admin.ModelAdmin):
 
 
 @admin.register(ExclusionAuditLog)
-class ExclusionAuditLogAdmin(admin.ModelAdmin):
+class ExclusionAuditLogAdmin(ReplicaReadAdminMixin, admin.ModelAdmin):
     """Immutable audit trail for all exclusion actions"""
     list_display = (
         'exclusion_reference', 'action_badge', 'performed_by_display',
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class NserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.nser'
+    
+    def ready(self):
+        import apps.nser.signals
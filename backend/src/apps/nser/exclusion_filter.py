@@ -0,0 +1,456 @@
+"""
+Exclusion Lookup Pre-Filter
+Per-worker Bloom filter over identifiers of currently active exclusions.
+
+Most operator lookups are for people who are NOT excluded. A Bloom filter
+never produces false negatives, so a "definitely not present" answer lets
+ExclusionLookupView return without touching Postgres or Redis; only probable
+hits fall through to the cache/database path.
+
+Consistency model:
+- Identifiers are keyed-hashed (BLAKE2b with SECRET_KEY), never stored raw.
+- New exclusions are added locally and appended to a Redis stream; every
+  worker replays the stream at most once per sync interval (default 1s).
+  This is well inside the 60s staleness the lookup cache already allows.
+- Terminated/expired exclusions cannot be removed from a Bloom filter; they
+  only count as stale entries (harmless false positives) until the next
+  rebuild. `rebuild_exclusion_filter` (command and nightly task) bumps a
+  generation key and every worker rebuilds from the database.
+- Whenever the filter is not built or cannot sync with Redis, it answers
+  "maybe" and the lookup falls back to the database (fail-safe).
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from apps.core.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'nser:exclusion_filter:generation'
+STREAM_KEY = 'nser:exclusion_filter:events'
+STATS_KEY = 'nser:exclusion_filter:stats'
+STREAM_MAXLEN = 100000
+
+
+def _prefilter_setting(name, default):
+    return getattr(settings, 'NSER_SETTINGS', {}).get(name, default)
+
+
+def normalize_identifier(kind, value):
+    """
+    Normalize an identifier exactly the way the lookup query compares it,
+    so the filter and the database can never disagree about a match.
+    """
+    if value in (None, ''):
+        return None
+    if kind == 'phone_number':
+        from apps.users.models import User
+        return str(User._meta.get_field('phone_number').get_prep_value(value))
+    return str(value)
+
+
+def hash_identifier(kind, value):
+    """Keyed hash of a normalized identifier (hex digest, safe to share via Redis)"""
+    normalized = normalize_identifier(kind, value)
+    if normalized is None:
+        return None
+    key = settings.SECRET_KEY.encode()[:64]
+    return hashlib.blake2b(f"{kind}:{normalized}".encode(), key=key, digest_size=16).hexdigest()
+
+
+def resolve_lookup_identifier(data):
+    """
+    Return the (kind, value) pair a lookup actually queries on.
+    Mirrors ExclusionLookupView: a BST token wins, otherwise the first of
+    phone_number, national_id and email.
+    """
+    if data.get('bst_token'):
+        return 'bst_token', data['bst_token']
+    for kind in ('phone_number', 'national_id', 'email'):
+        if data.get(kind):
+            return kind, data[kind]
+    return None, None
+
+
+class BloomFilter:
+    """
+    Plain bit-array Bloom filter using double hashing over a 128-bit digest.
+    """
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(1, int(capacity))
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.bits_set = 0
+        self.count = 0
+
+    def _positions(self, digest):
+        raw = bytes.fromhex(digest)
+        h1 = int.from_bytes(raw[:8], 'big')
+        h2 = int.from_bytes(raw[8:], 'big') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, digest):
+        for pos in self._positions(digest):
+            byte, mask = pos >> 3, 1 << (pos & 7)
+            if not self.bits[byte] & mask:
+                self.bits[byte] |= mask
+                self.bits_set += 1
+        self.count += 1
+
+    def __contains__(self, digest):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+    @property
+    def estimated_false_positive_rate(self):
+        """Theoretical FPR from the current fill ratio: (bits_set / m) ^ k"""
+        return (self.bits_set / self.num_bits) ** self.num_hashes
+
+    @property
+    def size_bytes(self):
+        return len(self.bits)
+
+
+class ExclusionPrefilter:
+    """
+    Process-local exclusion pre-filter kept in sync through Redis.
+    Use get_exclusion_prefilter() rather than instantiating directly.
+    """
+
+    def __init__(self):
+        self.enabled = _prefilter_setting('LOOKUP_PREFILTER_ENABLED', True)
+        self.capacity = _prefilter_setting('LOOKUP_PREFILTER_CAPACITY', 2000000)
+        self.error_rate = _prefilter_setting('LOOKUP_PREFILTER_ERROR_RATE', 0.001)
+        self.sync_interval = _prefilter_setting('LOOKUP_PREFILTER_SYNC_SECONDS', 1.0)
+
+        self._filter = None
+        self._generation = None
+        self._last_event_id = '0-0'
+        self._synced_at = 0.0
+        self._built_at = None
+        self._stale_entries = 0
+        self._pending_publish = []
+        self._write_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._rebuild_thread = None
+
+        # Local counters, flushed to Redis on each sync
+        self._counters = {'negatives': 0, 'positives': 0, 'false_positives': 0}
+        self._totals = dict(self._counters)
+
+    # ------------------------------------------------------------------
+    # Hot path
+    # ------------------------------------------------------------------
+
+    def might_be_excluded(self, kind, value):
+        """
+        False means the identifier is definitely not actively excluded.
+        True means "maybe" - the caller must consult the cache/database.
+        """
+        if not self.enabled or kind is None:
+            return True
+
+        self._maybe_sync()
+
+        bloom = self._filter
+        if bloom is None or not self._is_fresh():
+            return True
+
+        digest = hash_identifier(kind, value)
+        if digest is None or digest in bloom:
+            return True
+
+        self._counters['negatives'] += 1
+        return False
+
+    def record_outcome(self, is_excluded):
+        """Record the database verdict for a lookup the filter passed through"""
+        if self._filter is None:
+            return
+        if is_excluded:
+            self._counters['positives'] += 1
+        else:
+            self._counters['false_positives'] += 1
+
+    def _is_fresh(self):
+        # If Redis has been unreachable for several intervals we may have
+        # missed exclusions registered on other workers.
+        return (time.monotonic() - self._synced_at) < max(self.sync_interval * 5, 5)
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def add_identifiers(self, identifiers):
+        """
+        Add (kind, value) pairs for a newly active exclusion to this worker
+        and publish them to every other worker.
+        """
+        digests = [d for d in (hash_identifier(k, v) for k, v in identifiers) if d]
+        if not digests:
+            return
+        self._add_digests(digests)
+        self._publish(digests)
+
+    def note_removal(self):
+        """An exclusion stopped being active; its bits remain until rebuild"""
+        self._stale_entries += 1
+
+    def _add_digests(self, digests):
+        bloom = self._filter
+        if bloom is None:
+            return
+        with self._write_lock:
+            for digest in digests:
+                bloom.add(digest)
+
+    def _publish(self, digests):
+        client = get_redis_client()
+        if client is None:
+            return
+        try:
+            client.xadd(
+                STREAM_KEY, {'h': ','.join(digests)},
+                maxlen=STREAM_MAXLEN, approximate=True
+            )
+        except Exception as e:
+            # Retried on the next sync; the nightly rebuild is the backstop.
+            logger.error(f"Failed to publish exclusion filter update: {str(e)}")
+            self._pending_publish.extend(digests)
+
+    # ------------------------------------------------------------------
+    # Sync & rebuild
+    # ------------------------------------------------------------------
+
+    def _maybe_sync(self):
+        if time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self.sync()
+        finally:
+            self._sync_lock.release()
+
+    def sync(self):
+        """Replay new stream events, flush counters, and detect rebuild requests"""
+        client = get_redis_client()
+        if client is None:
+            return
+
+        counters, self._counters = self._counters, {k: 0 for k in self._counters}
+        try:
+            if self._pending_publish:
+                pending, self._pending_publish = self._pending_publish, []
+                self._publish(pending)
+
+            client.set(GENERATION_KEY, uuid.uuid4().hex, nx=True)
+            pipe = client.pipeline(transaction=False)
+            pipe.get(GENERATION_KEY)
+            pipe.xrange(STREAM_KEY, min='-', max='+', count=1)
+            pipe.xrange(STREAM_KEY, min=self._last_event_id, max='+', count=10000)
+            for field, amount in counters.items():
+                if amount:
+                    pipe.hincrby(STATS_KEY, field, amount)
+            generation, oldest, events = pipe.execute()[:3]
+        except Exception as e:
+            logger.warning(f"Exclusion filter sync failed: {str(e)}")
+            for field, amount in counters.items():
+                self._counters[field] += amount
+            return
+
+        for field, amount in counters.items():
+            self._totals[field] += amount
+        self._synced_at = time.monotonic()
+
+        generation = generation.decode() if isinstance(generation, bytes) else generation
+        trimmed = (
+            self._filter is not None and oldest and self._last_event_id != '0-0' and
+            _stream_id(oldest[0][0]) > _stream_id(self._last_event_id)
+        )
+        if self._filter is None or generation != self._generation or trimmed:
+            self._start_rebuild()
+            if self._filter is None:
+                return
+
+        digests = []
+        for event_id, fields in events:
+            event_id = event_id.decode() if isinstance(event_id, bytes) else event_id
+            if event_id == self._last_event_id:
+                continue
+            payload = fields.get(b'h') or fields.get('h') or b''
+            payload = payload.decode() if isinstance(payload, bytes) else payload
+            digests.extend(d for d in payload.split(',') if d)
+            self._last_event_id = event_id
+        self._add_digests(digests)
+
+    def _start_rebuild(self):
+        if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+            return
+        self._rebuild_thread = threading.Thread(
+            target=self._rebuild_safely, name='exclusion-filter-rebuild', daemon=True
+        )
+        self._rebuild_thread.start()
+
+    def _rebuild_safely(self):
+        try:
+            self.rebuild()
+        except Exception as e:
+            logger.error(f"Exclusion filter rebuild failed: {str(e)}")
+        finally:
+            from django.db import connection
+            connection.close()
+
+    def rebuild(self):
+        """
+        Build a fresh filter from the database and swap it in.
+        Stream position and generation are captured before the scan so that
+        exclusions created during the scan are replayed afterwards.
+        """
+        from .models import SelfExclusionRecord
+        from apps.bst.models import BSTToken
+
+        client = get_redis_client()
+        generation, start_id = None, '0-0'
+        if client is not None:
+            client.set(GENERATION_KEY, uuid.uuid4().hex, nx=True)
+            generation = client.get(GENERATION_KEY)
+            generation = generation.decode() if isinstance(generation, bytes) else generation
+            latest = client.xrevrange(STREAM_KEY, count=1)
+            if latest:
+                start_id = latest[0][0].decode() if isinstance(latest[0][0], bytes) else latest[0][0]
+
+        started = time.time()
+        digests = []
+        users = SelfExclusionRecord.objects.filter(is_active=True).values_list(
+            'user__phone_number', 'user__national_id', 'user__email'
+        ).iterator(chunk_size=5000)
+        for phone_number, national_id, email in users:
+            for kind, value in (('phone_number', phone_number), ('national_id', national_id), ('email', email)):
+                digest = hash_identifier(kind, value)
+                if digest:
+                    digests.append(digest)
+
+        tokens = BSTToken.objects.filter(
+            is_active=True, user__exclusions__is_active=True
+        ).values_list('token', flat=True).distinct().iterator(chunk_size=5000)
+        for token in tokens:
+            digest = hash_identifier('bst_token', token)
+            if digest:
+                digests.append(digest)
+
+        bloom = BloomFilter(max(self.capacity, len(digests) * 2), self.error_rate)
+        for digest in digests:
+            bloom.add(digest)
+
+        with self._write_lock:
+            self._filter = bloom
+            self._generation = generation
+            self._last_event_id = start_id
+            self._stale_entries = 0
+            self._built_at = time.time()
+        # Replay anything published while we were scanning
+        if client is not None:
+            with self._sync_lock:
+                self.sync()
+
+        logger.info(
+            f"Exclusion filter rebuilt: {len(digests)} identifiers, "
+            f"{bloom.size_bytes} bytes, {time.time() - started:.2f}s"
+        )
+        return bloom
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def stats(self):
+        """Local and cluster-wide filter statistics, including false-positive rate"""
+        bloom = self._filter
+        local = {k: self._totals[k] + self._counters[k] for k in self._counters}
+        data = {
+            'enabled': self.enabled,
+            'ready': bloom is not None and self._is_fresh(),
+            'generation': self._generation,
+            'built_at': self._built_at,
+            'entries': bloom.count if bloom else 0,
+            'stale_entries': self._stale_entries,
+            'size_bytes': bloom.size_bytes if bloom else 0,
+            'num_hashes': bloom.num_hashes if bloom else 0,
+            'estimated_false_positive_rate': bloom.estimated_false_positive_rate if bloom else None,
+            'worker': local,
+            'worker_observed_false_positive_rate': _observed_fpr(local),
+        }
+
+        client = get_redis_client()
+        if client is not None:
+            try:
+                raw = client.hgetall(STATS_KEY)
+                cluster = {k: int(raw.get(k.encode(), raw.get(k, 0)) or 0) for k in self._counters}
+                data['cluster'] = cluster
+                data['observed_false_positive_rate'] = _observed_fpr(cluster)
+            except Exception as e:
+                logger.warning(f"Could not read exclusion filter stats: {str(e)}")
+        return data
+
+    @staticmethod
+    def request_rebuild():
+        """Ask every worker to rebuild its filter on its next sync"""
+        client = get_redis_client()
+        if client is None:
+            return None
+        generation = uuid.uuid4().hex
+        client.set(GENERATION_KEY, generation)
+        return generation
+
+
+def _stream_id(value):
+    value = value.decode() if isinstance(value, bytes) else value
+    ms, _, seq = value.partition('-')
+    return int(ms), int(seq or 0)
+
+
+def _observed_fpr(counters):
+    # FPR = false positives / all lookups for people who were not excluded
+    denominator = counters['false_positives'] + counters['negatives']
+    if not denominator:
+        return None
+    return counters['false_positives'] / denominator
+
+
+_prefilter = None
+_prefilter_lock = threading.Lock()
+
+
+def get_exclusion_prefilter():
+    """Return this process's ExclusionPrefilter singleton"""
+    global _prefilter
+    if _prefilter is None:
+        with _prefilter_lock:
+            if _prefilter is None:
+                _prefilter = ExclusionPrefilter()
+    return _prefilter
+
+
+def exclusion_identifiers(user, tokens=None):
+    """(kind, value) pairs that identify an excluded user in lookups"""
+    identifiers = [
+        ('phone_number', user.phone_number),
+        ('national_id', user.national_id),
+        ('email', user.email),
+    ]
+    if tokens is None:
+        from apps.bst.models import BSTToken
+        tokens = BSTToken.objects.filter(user=user, is_active=True).values_list('token', flat=True)
+    identifiers.extend(('bst_token', token) for token in tokens)
+    return identifiers
@@ -0,0 +1,133 @@
+"""
+Exclusion Lookup Cache
+Lookup results cached per identifier, with a per-user key index so that
+invalidation deletes exact keys in a pipeline instead of SCANning Redis.
+
+Keys are `exclusion_lookup:{digest}` where digest is the keyed hash of the
+normalized identifier the lookup queried on, so every spelling of a phone
+number maps to one key and no raw PII ends up in Redis key names.
+
+For each resolved user we also keep `nser:exclusion_lookup_index:{user_id}`,
+a Redis set of the cache keys written for that user. Invalidation deletes
+the union of that set and the keys derived from the user's current
+identifiers (phone, national ID, email, active BST tokens).
+"""
+import logging
+
+from django.core.cache import cache
+
+from apps.core.redis_utils import get_redis_client
+from .exclusion_filter import hash_identifier, resolve_lookup_identifier
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_CACHE_TIMEOUT = 60  # seconds
+INDEX_TIMEOUT = 24 * 60 * 60  # index outlives the entries it points to
+
+
+def lookup_cache_key(data):
+    """Cache key for a validated lookup payload (single and bulk)"""
+    kind, value = resolve_lookup_identifier(data)
+    return identifier_cache_key(kind, value)
+
+
+def identifier_cache_key(kind, value):
+    digest = hash_identifier(kind, value)
+    return f"exclusion_lookup:{digest}" if digest else None
+
+
+def _index_key(user_id):
+    return f"nser:exclusion_lookup_index:{user_id}"
+
+
+def _uses_redis_cache():
+    return hasattr(cache, 'client') and hasattr(cache.client, 'get_client')
+
+
+def store_results(entries, timeout=LOOKUP_CACHE_TIMEOUT):
+    """
+    Cache lookup results in one pipeline.
+    `entries` is an iterable of (cache_key, result, user_id or None).
+    """
+    entries = [(key, result, user_id) for key, result, user_id in entries if key]
+    if not entries:
+        return
+
+    client = get_redis_client() if _uses_redis_cache() else None
+    if client is None:
+        cache.set_many({key: result for key, result, _ in entries}, timeout)
+        return
+
+    pipe = client.pipeline(transaction=False)
+    for key, result, user_id in entries:
+        cache.client.set(key, result, timeout, client=pipe)
+        if user_id:
+            index = _index_key(user_id)
+            pipe.sadd(index, cache.make_key(key))
+            pipe.expire(index, INDEX_TIMEOUT)
+    pipe.execute()
+
+
+def derived_cache_keys(phone_number, national_id, email, tokens=()):
+    """Cache keys a user's current identifiers map to"""
+    identifiers = [
+        ('phone_number', phone_number),
+        ('national_id', national_id),
+        ('email', email),
+    ]
+    identifiers.extend(('bst_token', token) for token in tokens)
+    return [key for key in (identifier_cache_key(k, v) for k, v in identifiers) if key]
+
+
+def invalidate_users(user_ids):
+    """
+    Delete every cached lookup result for the given users.
+    Two queries (users, tokens) and normally one Redis pipeline.
+    """
+    from apps.users.models import User
+    from apps.bst.models import BSTToken
+
+    user_ids = [user_id for user_id in set(user_ids) if user_id]
+    if not user_ids:
+        return 0
+
+    tokens = {}
+    for user_id, token in BSTToken.objects.filter(
+        user_id__in=user_ids, is_active=True
+    ).values_list('user_id', 'token'):
+        tokens.setdefault(user_id, []).append(token)
+
+    keys = []
+    for user_id, phone_number, national_id, email in User.objects.filter(
+        id__in=user_ids
+    ).values_list('id', 'phone_number', 'national_id', 'email'):
+        keys.extend(derived_cache_keys(
+            phone_number, national_id, email, tokens.get(user_id, ())
+        ))
+
+    client = get_redis_client() if _uses_redis_cache() else None
+    if client is None:
+        cache.delete_many(keys)
+        return len(keys)
+
+    indexes = [_index_key(user_id) for user_id in user_ids]
+    pipe = client.pipeline(transaction=False)
+    if keys:
+        pipe.delete(*[cache.make_key(key) for key in keys])
+    for index in indexes:
+        pipe.smembers(index)
+    pipe.delete(*indexes)
+    replies = pipe.execute()
+
+    # Keys cached under identifiers the user no longer has (e.g. old phone)
+    members = set()
+    for reply in replies[1 if keys else 0:-1]:
+        members.update(reply)
+    if members:
+        client.delete(*members)
+
+    return len(keys) + len(members)
+
+
+def invalidate_user(user_id):
+    return invalidate_users([user_id])
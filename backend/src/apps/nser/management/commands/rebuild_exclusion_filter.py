@@ -0,0 +1,35 @@
+"""
+Management command to rebuild the exclusion lookup pre-filter
+Usage: python manage.py rebuild_exclusion_filter [--stats]
+"""
+from django.core.management.base import BaseCommand
+
+from apps.nser.exclusion_filter import get_exclusion_prefilter
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the exclusion lookup Bloom filter on every worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Only print filter statistics, do not trigger a rebuild'
+        )
+
+    def handle(self, *args, **options):
+        prefilter = get_exclusion_prefilter()
+
+        if not options['stats']:
+            generation = prefilter.request_rebuild()
+            if generation:
+                self.stdout.write(self.style.SUCCESS(f'Rebuild requested (generation {generation})'))
+            else:
+                self.stdout.write(self.style.WARNING(
+                    'Redis is not configured - workers cannot be signalled; '
+                    'the pre-filter stays disabled and lookups use the database.'
+                ))
+            prefilter.rebuild()
+
+        for key, value in prefilter.stats().items():
+            self.stdout.write(f'{key}: {value}')
@@ -0,0 +1,612 @@
+"""
+Exclusion Propagation Engine
+Concurrent webhook fan-out of exclusions to licensed operators.
+
+- Operators, IntegrationConfig and active API keys are loaded up front
+  (one joined query + one prefetch) instead of two queries per operator.
+- Webhooks are POSTed concurrently from a process-wide bounded thread pool.
+  Each pool thread keeps its own requests.Session, so TCP/TLS connections
+  to every operator host are kept alive and reused across tasks.
+- OperatorExclusionMapping rows are created with one bulk_create and their
+  outcomes written back with one bulk_update.
+- Operators that opt in via IntegrationConfig.batch_exclusions get exclusions
+  buffered in a Redis list and flushed as one batched webhook call every
+  batch_max_wait_ms or batch_max_records, whichever comes first. Per-record
+  acknowledgements in the batch response are written back to the mappings.
+  A flush moves ids onto a processing list and removes them only once their
+  mappings are saved; if it fails, the mappings are marked failed for
+  retry_failed_propagations to resend.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from apps.core.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'GRAK-NSER/1.0'
+MAX_RESPONSE_BODY = 2000
+
+BATCH_BUFFER_KEY = 'nser:propagation_batch:{operator_id}'
+BATCH_PROCESSING_KEY = 'nser:propagation_batch_processing:{operator_id}'
+BATCH_TIMER_KEY = 'nser:propagation_batch_timer:{operator_id}'
+ACKNOWLEDGED_STATUSES = {'acknowledged', 'accepted', 'ok', 'success'}
+
+MAPPING_UPDATE_FIELDS = [
+    'notified_at', 'acknowledged_at', 'propagation_status', 'webhook_sent_at',
+    'webhook_response_code', 'webhook_response_body', 'last_error_message',
+    'error_count', 'retry_count', 'next_retry_at', 'is_compliant', 'updated_at',
+]
+
+
+def _nser_setting(name, default):
+    return getattr(settings, 'NSER_SETTINGS', {}).get(name, default)
+
+
+class WebhookDelivery:
+    """A single webhook POST to perform"""
+
+    def __init__(self, key, url, payload, headers, timeout):
+        self.key = key
+        self.url = url
+        self.payload = payload
+        self.headers = headers
+        self.timeout = timeout
+
+
+class WebhookResult:
+    """Outcome of a WebhookDelivery"""
+
+    def __init__(self, key, ok, status_code=None, body='', error='', timed_out=False, elapsed_ms=0):
+        self.key = key
+        self.ok = ok
+        self.status_code = status_code
+        self.body = body
+        self.error = error
+        self.timed_out = timed_out
+        self.elapsed_ms = elapsed_ms
+
+
+# ----------------------------------------------------------------------------
+# HTTP fan-out
+# ----------------------------------------------------------------------------
+
+_thread_state = threading.local()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_session():
+    """Per-thread keep-alive session (requests.Session is not thread-safe)"""
+    session = getattr(_thread_state, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=_nser_setting('PROPAGATION_HOST_POOLS', 200),
+            pool_maxsize=_nser_setting('PROPAGATION_CONNECTIONS_PER_HOST', 4),
+            max_retries=0,
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['User-Agent'] = USER_AGENT
+        _thread_state.session = session
+    return session
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=_nser_setting('PROPAGATION_CONCURRENCY', 32),
+                    thread_name_prefix='nser-propagation'
+                )
+    return _executor
+
+
+def _post(delivery: WebhookDelivery) -> WebhookResult:
+    started = time.time()
+    try:
+        response = _get_session().post(
+            delivery.url,
+            data=json.dumps(delivery.payload, default=str),
+            headers=delivery.headers,
+            timeout=delivery.timeout
+        )
+        elapsed_ms = int((time.time() - started) * 1000)
+        return WebhookResult(
+            delivery.key,
+            ok=200 <= response.status_code < 300,
+            status_code=response.status_code,
+            body=response.text[:MAX_RESPONSE_BODY],
+            error='' if response.ok else f"HTTP {response.status_code}",
+            elapsed_ms=elapsed_ms
+        )
+    except requests.exceptions.Timeout:
+        return WebhookResult(delivery.key, ok=False, error='Request timeout', timed_out=True,
+                             elapsed_ms=int((time.time() - started) * 1000))
+    except requests.exceptions.RequestException as e:
+        return WebhookResult(delivery.key, ok=False, error=str(e),
+                             elapsed_ms=int((time.time() - started) * 1000))
+
+
+def deliver_webhooks(deliveries: List[WebhookDelivery]) -> Dict[object, WebhookResult]:
+    """
+    POST all deliveries concurrently (bounded by PROPAGATION_CONCURRENCY).
+    Returns {delivery.key: WebhookResult}.
+    """
+    if not deliveries:
+        return {}
+    results = _get_executor().map(_post, deliveries)
+    return {result.key: result for result in results}
+
+
+# ----------------------------------------------------------------------------
+# Exclusion propagation
+# ----------------------------------------------------------------------------
+
+def build_exclusion_payload(exclusion):
+    """Webhook body describing an exclusion"""
+    user = exclusion.user
+    return {
+        'exclusion_id': str(exclusion.id),
+        'reference_number': exclusion.exclusion_reference,
+        'user': {
+            'national_id': user.national_id,
+            'phone_number': str(user.phone_number),
+            'full_name': user.get_full_name()
+        },
+        'exclusion_period': exclusion.exclusion_period,
+        'start_date': exclusion.effective_date.isoformat(),
+        'end_date': exclusion.expiry_date.isoformat() if exclusion.expiry_date else None,
+        'is_active': exclusion.is_active,
+        'timestamp': timezone.now().isoformat()
+    }
+
+
+def build_headers(api_key):
+    return {
+        'Content-Type': 'application/json',
+        'X-API-Key': api_key.api_key,
+        'X-API-Secret': api_key.api_secret,
+        'User-Agent': USER_AGENT
+    }
+
+
+def load_propagation_targets(operator_ids=None):
+    """
+    Active operators with integration config and active API keys, in two queries.
+    Returns (targets, skipped) where skipped maps operator id -> (operator, reason).
+    """
+    from apps.operators.models import Operator, APIKey
+
+    operators = Operator.objects.filter(license_status='active').select_related(
+        'integration_config'
+    ).prefetch_related(
+        Prefetch('api_keys', queryset=APIKey.objects.filter(is_active=True), to_attr='active_api_keys')
+    )
+    if operator_ids:
+        operators = operators.filter(id__in=operator_ids)
+
+    targets, skipped = [], {}
+    for operator in operators:
+        config = getattr(operator, 'integration_config', None)
+        if config is None or config.is_deleted or not config.webhook_url_exclusion:
+            skipped[operator.id] = (operator, 'No active integration configured')
+        elif not config.auto_propagate_exclusions:
+            continue
+        elif not operator.active_api_keys:
+            skipped[operator.id] = (operator, 'No active API key')
+        else:
+            targets.append(operator)
+    return targets, skipped
+
+
+def request_timeout(config):
+    return min(config.timeout_seconds or 5, _nser_setting('PROPAGATION_REQUEST_TIMEOUT_SECONDS', 5))
+
+
+def get_mappings(exclusion_ids, operators):
+    """
+    Existing-or-new OperatorExclusionMapping per (exclusion_id, operator_id),
+    using one bulk_create and one select.
+    """
+    from .models import OperatorExclusionMapping
+
+    operator_ids = [operator.id for operator in operators]
+    OperatorExclusionMapping.objects.bulk_create(
+        [
+            OperatorExclusionMapping(exclusion_id=exclusion_id, operator_id=operator_id)
+            for exclusion_id in exclusion_ids for operator_id in operator_ids
+        ],
+        ignore_conflicts=True
+    )
+    return {
+        (mapping.exclusion_id, mapping.operator_id): mapping
+        for mapping in OperatorExclusionMapping.objects.filter(
+            exclusion_id__in=exclusion_ids, operator_id__in=operator_ids
+        )
+    }
+
+
+def apply_result(mapping, result: Optional[WebhookResult] = None, error='', now=None):
+    """Update a mapping in memory from a webhook outcome (no save)"""
+    now = now or timezone.now()
+    if result is not None:
+        mapping.webhook_sent_at = now
+        mapping.notified_at = now
+        mapping.webhook_response_code = result.status_code
+        mapping.webhook_response_body = result.body
+        error = result.error
+
+    if result is not None and result.ok:
+        mapping.propagation_status = 'acknowledged'
+        mapping.acknowledged_at = now
+        mapping.is_compliant = True
+        mapping.last_error_message = ''
+        mapping.next_retry_at = None
+        return
+
+    # Same backoff as OperatorExclusionMapping.record_failure
+    mapping.error_count += 1
+    mapping.retry_count += 1
+    mapping.last_error_message = error
+    mapping.propagation_status = 'timeout' if result is not None and result.timed_out else 'failed'
+    if mapping.retry_count < mapping.max_retries:
+        mapping.next_retry_at = now + timedelta(seconds=min(2 ** mapping.retry_count, 256))
+    else:
+        mapping.next_retry_at = None
+
+
+def save_mappings(mappings):
+    from .models import OperatorExclusionMapping
+
+    now = timezone.now()
+    for mapping in mappings:
+        mapping.updated_at = now
+    OperatorExclusionMapping.objects.bulk_update(mappings, MAPPING_UPDATE_FIELDS, batch_size=500)
+
+
+def summarize_exclusions(exclusion_ids):
+    """Roll mapping outcomes up onto exclusions (one aggregate, one bulk_update, no signals)"""
+    from django.db.models import Count, Q
+    from .models import SelfExclusionRecord, OperatorExclusionMapping
+
+    totals = {
+        row['exclusion_id']: row
+        for row in OperatorExclusionMapping.objects.filter(
+            exclusion_id__in=exclusion_ids
+        ).values('exclusion_id').annotate(
+            total=Count('id'),
+            notified=Count('id', filter=Q(notified_at__isnull=False)),
+            acknowledged=Count('id', filter=Q(propagation_status='acknowledged')),
+        ).order_by()
+    }
+
+    now = timezone.now()
+    records, statuses = [], {}
+    for exclusion_id in exclusion_ids:
+        row = totals.get(exclusion_id, {'total': 0, 'notified': 0, 'acknowledged': 0})
+        if not row['total']:
+            status = 'pending'
+        elif row['acknowledged'] == row['total']:
+            status = 'completed'
+        elif row['acknowledged']:
+            status = 'partial'
+        else:
+            status = 'failed'
+        statuses[exclusion_id] = status
+        records.append(SelfExclusionRecord(
+            pk=exclusion_id,
+            propagation_status=status,
+            operators_notified=row['notified'],
+            operators_acknowledged=row['acknowledged'],
+            propagation_completed_at=now if status == 'completed' else None
+        ))
+
+    SelfExclusionRecord.objects.bulk_update(records, [
+        'propagation_status', 'operators_notified',
+        'operators_acknowledged', 'propagation_completed_at'
+    ])
+    return statuses
+
+
+def summarize_exclusion(exclusion_id):
+    return summarize_exclusions([exclusion_id])[exclusion_id]
+
+
+def propagate_exclusion(exclusion_id, operator_ids=None):
+    """
+    Propagate one exclusion to every active operator (or the given subset).
+    Operators that opted into batching are buffered instead of called.
+    Returns {'success': n, 'failed': n, 'skipped': n, 'batched': n, 'elapsed_ms': n}.
+    """
+    from .models import SelfExclusionRecord
+
+    started = time.time()
+    exclusion = SelfExclusionRecord.objects.select_related('user').get(id=exclusion_id)
+    targets, skipped = load_propagation_targets(operator_ids)
+
+    all_operators = targets + [operator for operator, _ in skipped.values()]
+    mappings = get_mappings([exclusion.id], all_operators)
+
+    batched = []
+    if get_redis_client() is not None:
+        batched = [operator for operator in targets if operator.integration_config.batch_exclusions]
+        targets = [operator for operator in targets if not operator.integration_config.batch_exclusions]
+
+    payload = build_exclusion_payload(exclusion)
+    deliveries = [
+        WebhookDelivery(
+            key=operator.id,
+            url=operator.integration_config.webhook_url_exclusion,
+            payload=payload,
+            headers=build_headers(operator.active_api_keys[0]),
+            timeout=request_timeout(operator.integration_config)
+        )
+        for operator in targets
+    ]
+    results = deliver_webhooks(deliveries)
+
+    now = timezone.now()
+    success_count = failed_count = 0
+    touched = []
+    for operator in targets:
+        result = results[operator.id]
+        mapping = mappings[(exclusion.id, operator.id)]
+        apply_result(mapping, result, now=now)
+        touched.append(mapping)
+        if result.ok:
+            success_count += 1
+        else:
+            failed_count += 1
+            logger.warning(f"Propagation to operator {operator.id} failed: {result.error}")
+    for operator_id, (operator, reason) in skipped.items():
+        mapping = mappings[(exclusion.id, operator_id)]
+        apply_result(mapping, error=reason, now=now)
+        touched.append(mapping)
+
+    # Batched operators' mappings are left for the flush to write
+    save_mappings(touched)
+    summarize_exclusion(exclusion.id)
+    for operator in batched:
+        enqueue_batched_exclusion(operator, exclusion.id)
+
+    elapsed_ms = int((time.time() - started) * 1000)
+    logger.info(
+        f"Propagation of {exclusion.exclusion_reference} complete: {success_count} success, "
+        f"{failed_count} failed, {len(skipped)} skipped, {len(batched)} batched in {elapsed_ms}ms"
+    )
+    return {
+        'success': success_count,
+        'failed': failed_count,
+        'skipped': len(skipped),
+        'batched': len(batched),
+        'elapsed_ms': elapsed_ms
+    }
+
+
+# ----------------------------------------------------------------------------
+# Micro-batched propagation
+# ----------------------------------------------------------------------------
+
+def enqueue_batched_exclusion(operator, exclusion_id):
+    """
+    Buffer an exclusion for a batching operator and make sure a flush is due:
+    immediately once batch_max_records are waiting, otherwise once per
+    batch_max_wait_ms window (the timer key makes only the first push schedule).
+    """
+    from .tasks import flush_propagation_batch
+
+    config = operator.integration_config
+    wait_ms = max(config.batch_max_wait_ms, 1)
+    client = get_redis_client()
+
+    pipe = client.pipeline(transaction=False)
+    pipe.rpush(BATCH_BUFFER_KEY.format(operator_id=operator.id), str(exclusion_id))
+    pipe.set(BATCH_TIMER_KEY.format(operator_id=operator.id), 1, nx=True, px=wait_ms)
+    buffered, timer_started = pipe.execute()
+
+    if buffered >= config.batch_max_records:
+        flush_propagation_batch.delay(str(operator.id))
+    elif timer_started:
+        flush_propagation_batch.apply_async(args=[str(operator.id)], countdown=wait_ms / 1000)
+
+
+def pop_batch(client, operator_id, max_records):
+    """
+    Move up to max_records buffered exclusion ids onto the operator's
+    processing list; returns (ids, remaining). The ids stay there until
+    release_batch, so a flush that dies midway does not lose them.
+    """
+    key = BATCH_BUFFER_KEY.format(operator_id=operator_id)
+    processing_key = BATCH_PROCESSING_KEY.format(operator_id=operator_id)
+    pipe = client.pipeline(transaction=False)
+    for _ in range(max_records):
+        pipe.lmove(key, processing_key, 'LEFT', 'RIGHT')
+    pipe.llen(key)
+    *items, remaining = pipe.execute()
+    ids = list(dict.fromkeys(
+        item.decode() if isinstance(item, bytes) else item for item in items if item is not None
+    ))
+    return ids, remaining
+
+
+def release_batch(client, operator_id, exclusion_ids):
+    """Drop ids from the processing list once their mappings are saved"""
+    processing_key = BATCH_PROCESSING_KEY.format(operator_id=operator_id)
+    pipe = client.pipeline(transaction=False)
+    for exclusion_id in exclusion_ids:
+        pipe.lrem(processing_key, 0, exclusion_id)
+    pipe.execute()
+
+
+def fail_batch(operator, exclusion_ids, error):
+    """Mark a batch's mappings failed so retry_failed_propagations resends them"""
+    now = timezone.now()
+    mappings = get_mappings(exclusion_ids, [operator])
+    for mapping in mappings.values():
+        apply_result(mapping, error=error, now=now)
+    save_mappings(list(mappings.values()))
+    summarize_exclusions(exclusion_ids)
+
+
+def parse_batch_acknowledgements(result, exclusion_ids):
+    """
+    Per-record outcome of a batched webhook call, as {exclusion_id: WebhookResult}.
+
+    Operators may answer with {"results": [{"exclusion_id": ..., "status": ...,
+    "error": ...}]}. A 2xx reply without "results" acknowledges the whole batch;
+    records missing from "results" are treated as failed.
+    """
+    if not result.ok:
+        return {exclusion_id: result for exclusion_id in exclusion_ids}
+
+    try:
+        acknowledgements = json.loads(result.body).get('results')
+    except (ValueError, AttributeError):
+        acknowledgements = None
+    if not isinstance(acknowledgements, list):
+        return {exclusion_id: result for exclusion_id in exclusion_ids}
+
+    by_id = {str(item.get('exclusion_id')): item for item in acknowledgements if isinstance(item, dict)}
+    outcomes = {}
+    for exclusion_id in exclusion_ids:
+        item = by_id.get(exclusion_id)
+        if item is None:
+            outcomes[exclusion_id] = WebhookResult(
+                exclusion_id, ok=False, status_code=result.status_code,
+                error='Not acknowledged in batch response'
+            )
+        elif str(item.get('status', '')).lower() in ACKNOWLEDGED_STATUSES:
+            outcomes[exclusion_id] = WebhookResult(
+                exclusion_id, ok=True, status_code=result.status_code,
+                body=json.dumps(item)[:MAX_RESPONSE_BODY]
+            )
+        else:
+            outcomes[exclusion_id] = WebhookResult(
+                exclusion_id, ok=False, status_code=result.status_code,
+                body=json.dumps(item)[:MAX_RESPONSE_BODY],
+                error=str(item.get('error') or item.get('status') or 'Rejected by operator')
+            )
+    return outcomes
+
+
+def flush_batch(operator_id):
+    """
+    Send one batched webhook with the operator's buffered exclusions.
+    Returns {'sent': n, 'acknowledged': n, 'failed': n, 'remaining': n}.
+    """
+    summary = {'sent': 0, 'acknowledged': 0, 'failed': 0, 'remaining': 0}
+    client = get_redis_client()
+    if client is None:
+        return summary
+
+    # Clear the timer first so any exclusion buffered from now on schedules
+    # its own flush instead of relying on this one
+    client.delete(BATCH_TIMER_KEY.format(operator_id=operator_id))
+
+    targets, skipped = load_propagation_targets([operator_id])
+    if targets:
+        operator, reason = targets[0], ''
+    elif skipped:
+        operator, reason = next(iter(skipped.values()))
+    else:
+        # Licence suspended or propagation switched off: keep the buffer
+        # for the periodic flush to deliver once the operator is active again
+        logger.warning(f"Holding batch buffer of inactive operator {operator_id}")
+        return summary
+
+    config = operator.integration_config
+    max_records = max(config.batch_max_records, 1) if config else 1000
+    exclusion_ids, summary['remaining'] = pop_batch(client, operator_id, max_records)
+    if not exclusion_ids:
+        return summary
+
+    try:
+        summary.update(_send_batch(operator, targets, reason, exclusion_ids))
+    except Exception as e:
+        try:
+            fail_batch(operator, exclusion_ids, f'Batch flush failed: {str(e)}')
+        except Exception as save_error:
+            # Left on the processing list and pending for the stale-pending sweep
+            logger.error(f"Could not mark batch to operator {operator_id} failed: {str(save_error)}")
+            raise e
+        release_batch(client, operator_id, exclusion_ids)
+        raise
+
+    release_batch(client, operator_id, exclusion_ids)
+    logger.info(
+        f"Batch propagation to operator {operator_id}: {summary['sent']} sent, "
+        f"{summary['acknowledged']} acknowledged, {summary['failed']} failed, "
+        f"{summary['remaining']} still buffered"
+    )
+    return summary
+
+
+def _send_batch(operator, targets, reason, exclusion_ids):
+    """Deliver one batch and save its mappings; returns the sent/acknowledged/failed counts"""
+    from .models import SelfExclusionRecord
+
+    counts = {'sent': 0, 'acknowledged': 0, 'failed': 0}
+    config = operator.integration_config
+    exclusions = list(SelfExclusionRecord.objects.select_related('user').filter(id__in=exclusion_ids))
+    mappings = get_mappings([exclusion.id for exclusion in exclusions], [operator])
+
+    outcomes = {}
+    if targets:
+        result = deliver_webhooks([WebhookDelivery(
+            key=operator.id,
+            url=config.webhook_url_exclusion,
+            payload={
+                'batch_id': str(uuid.uuid4()),
+                'count': len(exclusions),
+                'exclusions': [build_exclusion_payload(exclusion) for exclusion in exclusions],
+                'timestamp': timezone.now().isoformat()
+            },
+            headers=build_headers(operator.active_api_keys[0]),
+            timeout=request_timeout(config)
+        )])[operator.id]
+        outcomes = parse_batch_acknowledgements(result, [str(exclusion.id) for exclusion in exclusions])
+
+    now = timezone.now()
+    for exclusion in exclusions:
+        outcome = outcomes.get(str(exclusion.id))
+        apply_result(mappings[(exclusion.id, operator.id)], outcome, error=reason, now=now)
+        counts['sent'] += 1
+        counts['acknowledged' if outcome is not None and outcome.ok else 'failed'] += 1
+
+    save_mappings(list(mappings.values()))
+    summarize_exclusions([exclusion.id for exclusion in exclusions])
+    return counts
+
+
+def buffered_operator_ids():
+    """Operators with a non-empty batch buffer (for the periodic safety flush)"""
+    from apps.operators.models import IntegrationConfig
+
+    client = get_redis_client()
+    if client is None:
+        return []
+    operator_ids = [
+        str(operator_id) for operator_id in IntegrationConfig.objects.filter(
+            batch_exclusions=True
+        ).values_list('operator_id', flat=True)
+    ]
+    pipe = client.pipeline(transaction=False)
+    for operator_id in operator_ids:
+        pipe.llen(BATCH_BUFFER_KEY.format(operator_id=operator_id))
+    return [operator_id for operator_id, length in zip(operator_ids, pipe.execute()) if length]
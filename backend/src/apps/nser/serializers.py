@@ -3,6 +3,7 @@ NSER (Self-Exclusion) Serializers
 Comprehensive serializers for self-exclusion management
 """
 from rest_framework import serializers
+from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 from .models import (
@@ -434,14 +435,14 @@ class BulkExclusionLookupSerializer(serializers.Serializer):
     """Bulk exclusion lookup serializer"""
     lookups = serializers.ListField(
         child=ExclusionLookupSerializer(),
-        min_length=1,
-        max_length=100
+        min_length=1
     )
     
     def validate_lookups(self, value):
-        if len(value) > 100:
+        max_items = settings.NSER_SETTINGS.get('BULK_LOOKUP_MAX_ITEMS', 10000)
+        if len(value) > max_items:
             raise serializers.ValidationError(
-                "Maximum 100 lookups allowed per request."
+                f"Maximum {max_items} lookups allowed per request."
             )
         return value
 
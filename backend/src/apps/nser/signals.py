@@ -0,0 +1,83 @@
+"""
+NSER Signals
+Keep the exclusion lookup pre-filter and lookup cache in step with changes
+to exclusions, BST tokens and excluded users' identifiers
+"""
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.bst.models import BSTToken
+from apps.users.models import User
+from .models import SelfExclusionRecord
+from .exclusion_filter import get_exclusion_prefilter, exclusion_identifiers
+from .lookup_cache import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+USER_IDENTIFIER_FIELDS = {'phone_number', 'national_id', 'email'}
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or bool(set(update_fields) & fields)
+
+
+def _invalidate_on_commit(user_id):
+    def invalidate():
+        try:
+            invalidate_user(user_id)
+        except Exception as e:
+            logger.error(f"Failed to invalidate exclusion lookup cache for user {user_id}: {str(e)}")
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=SelfExclusionRecord)
+def update_prefilter_on_exclusion_save(sender, instance, **kwargs):
+    """Add newly active exclusions; count deactivated ones as stale"""
+    prefilter = get_exclusion_prefilter()
+    if instance.is_active:
+        identifiers = exclusion_identifiers(instance.user)
+        transaction.on_commit(lambda: prefilter.add_identifiers(identifiers))
+    elif _touches(kwargs.get('update_fields'), {'is_active', 'status'}):
+        prefilter.note_removal()
+
+
+@receiver(post_save, sender=SelfExclusionRecord)
+@receiver(post_delete, sender=SelfExclusionRecord)
+def invalidate_lookup_cache_on_exclusion_change(sender, instance, **kwargs):
+    """Activate/terminate/extend/renew/delete all change the lookup answer"""
+    _invalidate_on_commit(instance.user_id)
+
+
+@receiver(post_save, sender=BSTToken)
+def update_prefilter_on_token_save(sender, instance, **kwargs):
+    """New or reactivated tokens of excluded users must match lookups"""
+    if not instance.is_active or not _touches(kwargs.get('update_fields'), {'token', 'is_active'}):
+        return
+    if SelfExclusionRecord.objects.filter(user_id=instance.user_id, is_active=True).exists():
+        identifiers = [('bst_token', instance.token)]
+        transaction.on_commit(lambda: get_exclusion_prefilter().add_identifiers(identifiers))
+
+
+@receiver(post_save, sender=BSTToken)
+@receiver(post_delete, sender=BSTToken)
+def invalidate_lookup_cache_on_token_change(sender, instance, **kwargs):
+    """Rotated, revoked or compromised tokens change BST lookup answers"""
+    if kwargs.get('signal') is post_save and not _touches(
+        kwargs.get('update_fields'), {'token', 'is_active', 'status'}
+    ):
+        return  # e.g. last_used_at/lookup_count bumps on every validation
+    _invalidate_on_commit(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def update_prefilter_on_user_save(sender, instance, created, **kwargs):
+    """An excluded user's changed phone/ID/email must still match lookups"""
+    if created or not _touches(kwargs.get('update_fields'), USER_IDENTIFIER_FIELDS):
+        return
+    if SelfExclusionRecord.objects.filter(user_id=instance.pk, is_active=True).exists():
+        identifiers = exclusion_identifiers(instance, tokens=[])
+        transaction.on_commit(lambda: get_exclusion_prefilter().add_identifiers(identifiers))
+        _invalidate_on_commit(instance.pk)
@@ -11,142 +11,87 @@ logger = logging.getLogger(__name__)
 
 
 @shared_task(bind=True, max_retries=3)
-def propagate_exclusion_to_operators(self, exclusion_id):
+def propagate_exclusion_to_operators(self, exclusion_id, operator_ids=None):
     """
-    Propagate exclusion to all registered operators
+    Propagate exclusion to all registered operators (or the given subset)
     High priority - should complete within 5 seconds
     """
-    from .models import SelfExclusionRecord, OperatorExclusionMapping
-    from apps.operators.models import Operator, IntegrationConfig
-    import requests
-    import json
-    
+    from .propagation import propagate_exclusion
+
     try:
-        exclusion = SelfExclusionRecord.objects.get(id=exclusion_id)
-        operators = Operator.objects.filter(license_status='active')
-        
-        success_count = 0
-        failed_count = 0
-        
-        for operator in operators:
-            try:
-                # Create or update mapping
-                mapping, created = OperatorExclusionMapping.objects.update_or_create(
-                    exclusion=exclusion,
-                    operator=operator,
-                    defaults={
-                        'propagation_status': 'pending',
-                        'propagated_at': timezone.now()
-                    }
-                )
-                
-                # Get operator integration config
-                config = IntegrationConfig.objects.filter(
-                    operator=operator,
-                    is_active=True
-                ).first()
-                
-                if not config or not config.api_endpoint:
-                    raise ValueError("No active integration configured")
-                
-                # Prepare exclusion data
-                payload = {
-                    'exclusion_id': str(exclusion.id),
-                    'user': {
-                        'national_id': exclusion.user.national_id,
-                        'phone_number': exclusion.user.phone_number,
-                        'full_name': exclusion.user.get_full_name()
-                    },
-                    'start_date': exclusion.start_date.isoformat(),
-                    'end_date': exclusion.end_date.isoformat(),
-                    'exclusion_type': exclusion.exclusion_type,
-                    'is_active': exclusion.is_active,
-                    'timestamp': timezone.now().isoformat()
-                }
-                
-                # Get operator API key
-                api_key = operator.api_keys.filter(is_active=True).first()
-                if not api_key:
-                    raise ValueError("No active API key")
-                
-                headers = {
-                    'Content-Type': 'application/json',
-                    'X-API-Key': api_key.api_key,
-                    'X-API-Secret': api_key.api_secret,
-                    'User-Agent': 'GRAK-NSER/1.0'
-                }
-                
-                # Send to operator API
-                response = requests.post(
-                    f"{config.api_endpoint}/exclusions",
-                    json=payload,
-                    headers=headers,
-                    timeout=5  # 5 second timeout
-                )
-                
-                response.raise_for_status()
-                
-                # Update mapping
-                mapping.propagation_status = 'completed'
-                mapping.response_code = response.status_code
-                mapping.response_data = response.json() if response.text else {}
-                mapping.save()
-                
-                success_count += 1
-                logger.info(f"Successfully propagated to operator {operator.name}")
-                
-            except requests.exceptions.Timeout:
-                logger.error(f"Timeout propagating to operator {operator.id}")
-                failed_count += 1
-                if hasattr(mapping, 'id'):
-                    mapping.propagation_status = 'failed'
-                    mapping.error_message = 'Request timeout'
-                    mapping.save()
-                    
-            except requests.exceptions.RequestException as e:
-                logger.error(f"HTTP error propagating to operator {operator.id}: {str(e)}")
-                failed_count += 1
-                if hasattr(mapping, 'id'):
-                    mapping.propagation_status = 'failed'
-                    mapping.error_message = str(e)
-                    mapping.save()
-                    
-            except Exception as e:
-                logger.error(f"Failed to propagate to operator {operator.id}: {str(e)}")
-                failed_count += 1
-                if hasattr(mapping, 'id'):
-                    mapping.propagation_status = 'failed'
-                    mapping.error_message = str(e)
-                    mapping.save()
-        
-        logger.info(f"Propagation complete: {success_count} success, {failed_count} failed")
-        return {'success': success_count, 'failed': failed_count}
-        
+        return propagate_exclusion(exclusion_id, operator_ids=operator_ids)
     except Exception as exc:
         logger.error(f"Propagation task failed: {str(exc)}")
         raise self.retry(exc=exc, countdown=60)
 
 
+@shared_task(bind=True, max_retries=3)
+def flush_propagation_batch(self, operator_id):
+    """Send an operator's buffered exclusions as one batched webhook call"""
+    from .propagation import flush_batch
+
+    try:
+        result = flush_batch(operator_id)
+    except Exception as exc:
+        logger.error(f"Batch propagation to operator {operator_id} failed: {str(exc)}")
+        raise self.retry(exc=exc, countdown=5)
+
+    if result['remaining']:
+        flush_propagation_batch.delay(operator_id)
+    return result
+
+
+@shared_task
+def flush_propagation_buffers():
+    """Safety net: flush batch buffers whose scheduled flush was lost"""
+    from .propagation import buffered_operator_ids
+
+    operator_ids = buffered_operator_ids()
+    for operator_id in operator_ids:
+        flush_propagation_batch.delay(operator_id)
+    return {'flushed': len(operator_ids)}
+
+
 @shared_task
 def retry_failed_propagations():
-    """Retry failed exclusion propagations"""
+    """
+    Retry failed exclusion propagations whose backoff has elapsed, and
+    pending ones that no delivery has touched for PROPAGATION_PENDING_STALE_SECONDS
+    (e.g. a batch flush whose worker died before saving its outcome)
+    """
+    from django.conf import settings
+    from django.db.models import F, Q
     from .models import OperatorExclusionMapping
-    
-    failed_mappings = OperatorExclusionMapping.objects.filter(
-        propagation_status='failed'
-    ).select_related('exclusion', 'operator')
-    
+
+    now = timezone.now()
+    stale_seconds = getattr(settings, 'NSER_SETTINGS', {}).get('PROPAGATION_PENDING_STALE_SECONDS', 900)
+    due = OperatorExclusionMapping.objects.filter(
+        retry_count__lt=F('max_retries'),
+        exclusion__is_active=True
+    ).filter(
+        Q(propagation_status__in=['failed', 'timeout'])
+        & (Q(next_retry_at__isnull=True) | Q(next_retry_at__lte=now))
+        | Q(
+            propagation_status='pending',
+            updated_at__lte=now - timedelta(seconds=stale_seconds),
+            operator__license_status='active'
+        )
+    ).values_list('exclusion_id', 'operator_id')
+
+    # One task per exclusion, covering only the operators that failed
+    by_exclusion = {}
+    for exclusion_id, operator_id in due:
+        by_exclusion.setdefault(exclusion_id, []).append(str(operator_id))
+
     retried_count = 0
-    
-    for mapping in failed_mappings:
+    for exclusion_id, operator_ids in by_exclusion.items():
         try:
-            # Retry propagation
-            propagate_exclusion_to_operators.delay(str(mapping.exclusion.id))
-            retried_count += 1
+            propagate_exclusion_to_operators.delay(str(exclusion_id), operator_ids)
+            retried_count += len(operator_ids)
         except Exception as e:
-            logger.error(f"Failed to retry mapping {mapping.id}: {str(e)}")
-    
-    return {'retried': retried_count}
+            logger.error(f"Failed to retry propagation of {exclusion_id}: {str(e)}")
+
+    return {'retried': retried_count, 'exclusions': len(by_exclusion)}
 
 
 @shared_task
@@ -220,25 +165,41 @@ def process_auto_renewals():
 def deactivate_expired_exclusions():
     """Deactivate expired exclusions"""
     from .models import SelfExclusionRecord
-    
-    today = timezone.now().date()
+    from .lookup_cache import invalidate_users
     
     expired = SelfExclusionRecord.objects.filter(
-        end_date__lt=today,
+        expiry_date__lte=timezone.now(),
         is_active=True
     )
     
+    # Bulk update bypasses post_save, so invalidate cached lookups explicitly
+    user_ids = list(expired.order_by().values_list('user_id', flat=True).distinct())
     count = expired.update(is_active=False)
     
+    for start in range(0, len(user_ids), 1000):
+        invalidate_users(user_ids[start:start + 1000])
+    
     logger.info(f"Deactivated {count} expired exclusions")
     return {'deactivated': count}
 
 
+@shared_task
+def rebuild_exclusion_filter():
+    """
+    Ask every worker to rebuild its exclusion lookup pre-filter.
+    Runs after expiry deactivation so stale entries are dropped nightly.
+    """
+    from .exclusion_filter import get_exclusion_prefilter
+    
+    generation = get_exclusion_prefilter().request_rebuild()
+    logger.info(f"Requested exclusion filter rebuild (generation {generation})")
+    return {'generation': generation}
+
+
 @shared_task
 def generate_exclusion_statistics():
     """Generate daily exclusion statistics"""
     from .models import SelfExclusionRecord
-    from apps.analytics.models import DailyStatistics
     
     today = timezone.now().date()
     
@@ -251,15 +212,8 @@ def generate_exclusion_statistics():
         ).count()
     }
     
-    # Save to DailyStatistics
-    DailyStatistics.objects.update_or_create(
-        date=today,
-        defaults={
-            'total_exclusions': stats['total_active'],
-            'new_exclusions': stats['new_today']
-        }
-    )
-    
+    # DailyStatistics is built by apps.analytics.tasks.update_daily_facts
+    logger.info(f"Exclusion Stats: {stats}")
     return stats
 
 
@@ -355,28 +309,48 @@ def generate_compliance_report():
     return {'report_id': str(report.id)}
 
 
+def lookup_audit_event(operator_id, lookup_data, result, response_time_ms):
+    """
+    Audit event for an exclusion lookup
+    Operator ids are client-supplied; unknown ones are dropped when the buffer is written
+    """
+    from apps.compliance.audit_buffer import audit_event
+    
+    return audit_event(
+        action='exclusion_lookup',
+        resource_type='exclusion',
+        resource_id=result.get('exclusion_id') or '',
+        operator_id=operator_id or None,
+        metadata={
+            'lookup_data': lookup_data,
+            'result': result,
+            'response_time_ms': response_time_ms
+        }
+    )
+
+
 @shared_task
 def log_exclusion_lookup(operator_id, lookup_data, result, response_time_ms):
     """
     Log exclusion lookup for audit and analytics
-    Non-blocking async task
+    Kept for messages queued before lookups moved to the audit buffer
     """
-    from apps.compliance.models import AuditLog
+    from apps.compliance.audit_buffer import record_audit_events
     
-    try:
-        audit_log = AuditLog.objects.create(
-            action='exclusion_lookup',
-            operator_id=operator_id,
-            details={
-                'lookup_data': lookup_data,
-                'result': result,
-                'response_time_ms': response_time_ms,
-                'timestamp': timezone.now().isoformat()
-            },
-            status='completed'
-        )
-        logger.info(f"Logged exclusion lookup for operator {operator_id}")
-        return {'logged': True, 'log_id': str(audit_log.id)}
-    except Exception as e:
-        logger.error(f"Failed to log exclusion lookup: {str(e)}")
-        return {'logged': False, 'error': str(e)}
+    record_audit_events([lookup_audit_event(operator_id, lookup_data, result, response_time_ms)])
+    return {'logged': True}
+
+
+@shared_task
+def log_bulk_exclusion_lookup(lookups, results, response_time_ms):
+    """
+    Log a whole bulk lookup batch
+    Kept for messages queued before lookups moved to the audit buffer
+    """
+    from apps.compliance.audit_buffer import record_audit_events
+    
+    record_audit_events(
+        lookup_audit_event(lookup.get('operator_id'), lookup, result, response_time_ms)
+        for lookup, result in zip(lookups, results)
+    )
+    return {'logged': len(lookups)}
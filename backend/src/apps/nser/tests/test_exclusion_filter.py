@@ -0,0 +1,60 @@
+"""
+Test cases for the exclusion lookup pre-filter
+A definite "not excluded" answer must never hide a real exclusion
+"""
+
+from apps.nser.exclusion_filter import (
+    BloomFilter, ExclusionPrefilter, hash_identifier, resolve_lookup_identifier
+)
+
+
+class TestBloomFilter:
+    """Bloom filter correctness"""
+
+    def test_no_false_negatives(self):
+        """Every added identifier must be reported as present"""
+        bloom = BloomFilter(capacity=5000, error_rate=0.001)
+        digests = [hash_identifier('national_id', str(10000000 + i)) for i in range(5000)]
+        for digest in digests:
+            bloom.add(digest)
+
+        assert all(digest in bloom for digest in digests)
+
+    def test_false_positive_rate_within_bound(self):
+        """Observed FPR at capacity stays close to the configured rate"""
+        bloom = BloomFilter(capacity=5000, error_rate=0.01)
+        for i in range(5000):
+            bloom.add(hash_identifier('national_id', str(i)))
+
+        probes = [hash_identifier('national_id', f"absent-{i}") for i in range(20000)]
+        false_positives = sum(1 for digest in probes if digest in bloom)
+
+        assert false_positives / len(probes) < 0.02
+        assert bloom.estimated_false_positive_rate < 0.02
+
+    def test_hash_is_kind_scoped(self):
+        """The same value under different identifier kinds must not collide"""
+        assert hash_identifier('national_id', '12345678') != hash_identifier('email', '12345678')
+        assert hash_identifier('email', '') is None
+
+
+class TestExclusionPrefilter:
+    """Pre-filter behaviour around the lookup view"""
+
+    def test_resolve_lookup_identifier_matches_view_precedence(self):
+        """BST token wins, then phone, national ID, email"""
+        assert resolve_lookup_identifier({
+            'bst_token': 'BST-02-ABC-0001', 'national_id': '1'
+        }) == ('bst_token', 'BST-02-ABC-0001')
+        assert resolve_lookup_identifier({
+            'national_id': '1', 'email': 'a@example.com'
+        }) == ('national_id', '1')
+        assert resolve_lookup_identifier({}) == (None, None)
+
+    def test_unbuilt_filter_fails_open(self):
+        """Without a built filter every lookup must fall through to the database"""
+        prefilter = ExclusionPrefilter()
+        prefilter.sync_interval = 3600  # never attempt a Redis sync in this test
+        prefilter._synced_at = float('inf')
+
+        assert prefilter.might_be_excluded('national_id', '12345678') is True
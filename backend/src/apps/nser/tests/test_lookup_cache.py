@@ -0,0 +1,39 @@
+"""
+Test cases for exclusion lookup cache keys
+Invalidation relies on lookups and user identifiers deriving identical keys
+"""
+from apps.nser.lookup_cache import derived_cache_keys, identifier_cache_key, lookup_cache_key
+
+
+class TestLookupCacheKeys:
+    """Lookup cache key derivation"""
+
+    def test_phone_spellings_share_one_key(self):
+        """Formatting differences must not create keys invalidation cannot find"""
+        assert (
+            identifier_cache_key('phone_number', '+254712345678') ==
+            identifier_cache_key('phone_number', '+254 712 345 678')
+        )
+
+    def test_lookup_key_follows_lookup_precedence(self):
+        """A BST token lookup is cached under the token, not the phone number"""
+        data = {'phone_number': '+254712345678', 'bst_token': 'BST-02-ABC-0001'}
+        assert lookup_cache_key(data) == identifier_cache_key('bst_token', 'BST-02-ABC-0001')
+
+    def test_derived_keys_cover_every_lookup_identifier(self):
+        """Keys derived from a user match lookups by any of their identifiers"""
+        keys = derived_cache_keys(
+            phone_number='+254712345678', national_id='12345678',
+            email='user@example.com', tokens=['BST-02-ABC-0001']
+        )
+
+        for lookup in (
+            {'phone_number': '+254 712 345 678'},
+            {'national_id': '12345678'},
+            {'email': 'user@example.com'},
+            {'bst_token': 'BST-02-ABC-0001'},
+        ):
+            assert lookup_cache_key(lookup) in keys
+
+    def test_no_key_without_identifier(self):
+        assert lookup_cache_key({}) is None
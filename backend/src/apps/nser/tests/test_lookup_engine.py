@@ -0,0 +1,185 @@
+"""
+Test cases for the batched exclusion lookup engine
+Input order, pre-filter/cache/database paths and a query count independent of batch size
+"""
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+from rest_framework.test import APIRequestFactory
+
+from apps.bst.models import BSTToken
+from apps.nser import lookup_cache, lookup_engine, views
+from apps.nser.exclusion_filter import normalize_identifier
+from apps.nser.lookup_engine import BulkExclusionLookupEngine
+from apps.nser.models import SelfExclusionRecord
+from apps.nser.views import ExclusionLookupView
+from apps.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+class FakePrefilter:
+    """Passes through only the identifiers in `maybe` (or everything)"""
+
+    def __init__(self, maybe=None):
+        self.maybe = maybe
+        self.outcomes = []
+
+    def might_be_excluded(self, kind, value):
+        return self.maybe is None or (kind, normalize_identifier(kind, value)) in self.maybe
+
+    def record_outcome(self, is_excluded):
+        self.outcomes.append(is_excluded)
+
+
+def _user(index, **fields):
+    user = User.objects.create_user(
+        phone_number=f'+2547123450{index:02d}', national_id=f'3000{index:04d}',
+        email=f'user{index}@example.com', **fields
+    )
+    return user, BSTToken.objects.create(user=user, phone_number_hash=f'hash-{index}')
+
+
+def _exclude(user, token):
+    now = timezone.now()
+    return SelfExclusionRecord.objects.create(
+        user=user, bst_token=token, exclusion_reference=f'EXC-{token.pk.hex[:12]}',
+        exclusion_period='6_months', effective_date=now, expiry_date=now + timedelta(days=180),
+        status='active', is_active=True
+    )
+
+
+@pytest.fixture
+def cache():
+    shared = LocMemCache('nser-lookup-engine-tests', {})
+    shared.clear()
+    with mock.patch.object(lookup_engine, 'cache', shared), mock.patch.object(lookup_cache, 'cache', shared):
+        yield shared
+
+
+@pytest.fixture
+def people():
+    excluded, excluded_token = _user(1)
+    exclusion = _exclude(excluded, excluded_token)
+    clear, clear_token = _user(2)
+    return {
+        'excluded': excluded, 'excluded_token': excluded_token, 'exclusion': exclusion,
+        'clear': clear, 'clear_token': clear_token,
+    }
+
+
+def _run(lookups, prefilter=None):
+    prefilter = prefilter or FakePrefilter()
+    with mock.patch.object(lookup_engine, 'get_exclusion_prefilter', return_value=prefilter):
+        engine = BulkExclusionLookupEngine(build_response=ExclusionLookupView.build_lookup_response)
+    return engine.run(lookups)[0]
+
+
+class TestBulkExclusionLookupEngine:
+    """Batched results match single lookups, in input order"""
+
+    def test_input_order_with_mixed_identifiers(self, cache, people):
+        excluded, clear = people['excluded'], people['clear']
+        results = _run([
+            {'national_id': excluded.national_id},
+            {'phone_number': str(clear.phone_number)},
+            {'bst_token': people['excluded_token'].token},
+            {'email': 'nobody@example.com'},
+            {'email': excluded.email, 'phone_number': str(clear.phone_number)},  # phone wins over email
+            {'bst_token': people['clear_token'].token, 'national_id': excluded.national_id},  # token wins
+        ])
+
+        assert [result['is_excluded'] for result in results] == [True, False, True, False, False, False]
+        assert results[0]['exclusion_id'] == results[2]['exclusion_id'] == str(people['exclusion'].id)
+        assert results[0]['reference_number'] == people['exclusion'].exclusion_reference
+
+    def test_prefilter_negatives_skip_cache_and_database(self, cache, people, django_assert_num_queries):
+        excluded = people['excluded']
+        prefilter = FakePrefilter(maybe={('national_id', excluded.national_id)})
+        with django_assert_num_queries(2):  # users by national_id, exclusions
+            results = _run([
+                {'phone_number': str(people['clear'].phone_number)},
+                {'national_id': excluded.national_id},
+                {'email': 'nobody@example.com'},
+            ], prefilter)
+
+        assert [result.get('prefiltered', False) for result in results] == [True, False, True]
+        assert [result['is_excluded'] for result in results] == [False, True, False]
+        assert prefilter.outcomes == [True]
+
+    def test_database_misses_are_cached_for_the_next_batch(self, cache, people, django_assert_num_queries):
+        lookups = [{'national_id': people['excluded'].national_id}, {'email': people['clear'].email}]
+        first = _run(lookups)
+        assert not any(result.get('from_cache') for result in first)
+        assert cache.get(lookup_cache.lookup_cache_key(lookups[0]))['is_excluded'] is True
+
+        with django_assert_num_queries(0):
+            second = _run(lookups)
+        assert [result['from_cache'] for result in second] == [True, True]
+        assert [result['is_excluded'] for result in second] == [True, False]
+
+    def test_duplicates_are_resolved_once(self, cache, people, django_assert_num_queries):
+        phone = str(people['excluded'].phone_number)
+        spaced = f'{phone[:4]} {phone[4:7]} {phone[7:10]} {phone[10:]}'
+        with django_assert_num_queries(2):  # users by phone_number, exclusions
+            results = _run([{'phone_number': phone}, {'phone_number': spaced}, {'phone_number': phone}])
+
+        assert [result['is_excluded'] for result in results] == [True, True, True]
+        assert len({result['exclusion_id'] for result in results}) == 1
+
+    @pytest.mark.parametrize('repeat', [1, 20])
+    def test_query_count_does_not_grow_with_batch_size(self, cache, people, repeat, django_assert_num_queries):
+        lookups = []
+        for index in range(repeat):
+            lookups += [
+                {'national_id': f'9{index:07d}'},
+                {'phone_number': f'+2547220{index:05d}'},
+                {'email': f'unknown{index}@example.com'},
+                {'bst_token': f'BST-02-UNKNOWN-{index:04d}'},
+            ]
+        lookups.append({'national_id': people['excluded'].national_id})
+
+        # one User query per identifier type, one BSTToken query, one exclusion query
+        with django_assert_num_queries(5):
+            results = _run(lookups)
+
+        assert len(results) == 4 * repeat + 1
+        assert results[-1]['is_excluded'] is True
+        assert not any(result['is_excluded'] for result in results[:-1])
+
+
+class TestSingleAndBulkAgree:
+    """ExclusionLookupView and the engine pick the same record"""
+
+    def test_newest_of_several_active_exclusions(self, cache):
+        user, token = _user(30)
+        now = timezone.now()
+
+        def exclusion(pk, effective_date):
+            return SelfExclusionRecord.objects.create(
+                id=uuid.UUID(int=pk), user=user, bst_token=token, exclusion_reference=f'EXC-SEVERAL-{pk}',
+                exclusion_period='6_months', effective_date=effective_date, expiry_date=now + timedelta(days=180),
+                status='active', is_active=True
+            )
+
+        # The older record is created last and has the lower pk, so only effective_date picks the newer one
+        newer = exclusion(2, now)
+        exclusion(1, now - timedelta(days=30))
+
+        request = APIRequestFactory().post('/api/v1/nser/lookup/', {
+            'national_id': user.national_id, 'operator_id': str(user.pk)
+        }, format='json')
+        with mock.patch.object(views.ExclusionLookupView, 'permission_classes', []), \
+                mock.patch.object(views.ExclusionLookupView, 'log_lookup'), \
+                mock.patch.object(views, 'get_exclusion_prefilter', return_value=FakePrefilter()), \
+                mock.patch.object(views, 'cache', cache):
+            single = views.ExclusionLookupView.as_view()(request).data
+        cache.clear()
+        bulk, = _run([{'national_id': user.national_id}])
+
+        assert single['exclusion_id'] == bulk['exclusion_id'] == str(newer.id)
@@ -0,0 +1,305 @@
+"""
+Test cases for the exclusion propagation fan-out
+Runs webhook delivery against a local stub operator server, and batch
+flushes against the database with an in-memory Redis list store
+"""
+import json
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from django.db import DatabaseError
+from django.utils import timezone
+
+from apps.bst.models import BSTToken
+from apps.nser import propagation, tasks
+from apps.nser.models import OperatorExclusionMapping, SelfExclusionRecord
+from apps.nser.propagation import (
+    BATCH_BUFFER_KEY, BATCH_PROCESSING_KEY, WebhookDelivery, WebhookResult,
+    apply_result, deliver_webhooks, flush_batch, get_mappings, parse_batch_acknowledgements
+)
+from apps.operators.models import APIKey, IntegrationConfig, Operator
+from apps.users.models import User
+
+
+class StubOperatorHandler(BaseHTTPRequestHandler):
+    """/ok acknowledges, /error returns 500, /slow sleeps past the client timeout"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.received.append((self.path, json.loads(body), dict(self.headers)))
+
+        if self.path == '/slow':
+            time.sleep(0.5)
+        status = 500 if self.path == '/error' else 200
+        reply = b'{"received": true}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubOperatorHandler)
+    server.daemon_threads = True
+    server.received = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def _mapping():
+    return SimpleNamespace(error_count=0, retry_count=0, max_retries=9, acknowledged_at=None)
+
+
+class TestDeliverWebhooks:
+    """Concurrent webhook delivery"""
+
+    def test_outcomes_are_keyed_per_delivery(self, stub_server):
+        """Success, HTTP error and timeout are reported for the right operator"""
+        deliveries = [
+            WebhookDelivery('ok', _url(stub_server, '/ok'), {'n': 1}, {'X-API-Key': 'k1'}, 2),
+            WebhookDelivery('error', _url(stub_server, '/error'), {'n': 2}, {}, 2),
+            WebhookDelivery('slow', _url(stub_server, '/slow'), {'n': 3}, {}, 0.1),
+        ]
+        results = deliver_webhooks(deliveries)
+
+        assert results['ok'].ok and results['ok'].status_code == 200
+        assert not results['error'].ok and results['error'].status_code == 500
+        assert not results['slow'].ok and results['slow'].timed_out
+        path, payload, headers = next(r for r in stub_server.received if r[0] == '/ok')
+        assert payload == {'n': 1}
+        assert headers['X-API-Key'] == 'k1'
+
+    def test_deliveries_run_concurrently(self, stub_server):
+        """Ten slow operators take about one round-trip, not ten"""
+        deliveries = [
+            WebhookDelivery(i, _url(stub_server, '/slow'), {}, {}, 5) for i in range(10)
+        ]
+        started = time.time()
+        results = deliver_webhooks(deliveries)
+
+        assert all(result.ok for result in results.values())
+        assert time.time() - started < 2.5
+
+    def test_apply_result_records_failure_backoff(self):
+        """Failures bump counters and schedule a retry; success clears it"""
+        mapping = _mapping()
+        apply_result(mapping, WebhookResult('x', ok=False, error='Request timeout', timed_out=True))
+        assert mapping.propagation_status == 'timeout'
+        assert mapping.retry_count == 1 and mapping.next_retry_at is not None
+
+        apply_result(mapping, WebhookResult('x', ok=True, status_code=200))
+        assert mapping.propagation_status == 'acknowledged'
+        assert mapping.next_retry_at is None and mapping.is_compliant
+
+
+class TestBatchAcknowledgements:
+    """Per-record outcomes of a batched webhook call"""
+
+    def test_per_record_results_are_honoured(self):
+        """Accepted, rejected and missing records each get their own outcome"""
+        body = json.dumps({'results': [
+            {'exclusion_id': 'a', 'status': 'accepted'},
+            {'exclusion_id': 'b', 'status': 'rejected', 'error': 'Unknown customer'},
+        ]})
+        outcomes = parse_batch_acknowledgements(
+            WebhookResult('op', ok=True, status_code=200, body=body), ['a', 'b', 'c']
+        )
+
+        assert outcomes['a'].ok
+        assert not outcomes['b'].ok and outcomes['b'].error == 'Unknown customer'
+        assert not outcomes['c'].ok
+
+    def test_plain_success_acknowledges_whole_batch(self):
+        """A 2xx reply without per-record results acknowledges every record"""
+        outcomes = parse_batch_acknowledgements(
+            WebhookResult('op', ok=True, status_code=202, body=''), ['a', 'b']
+        )
+        assert all(outcome.ok for outcome in outcomes.values())
+
+    def test_failed_call_fails_whole_batch(self):
+        outcomes = parse_batch_acknowledgements(
+            WebhookResult('op', ok=False, status_code=503, error='HTTP 503'), ['a', 'b']
+        )
+        assert not any(outcome.ok for outcome in outcomes.values())
+
+
+class FakeRedis:
+    """The list commands a batch flush uses"""
+
+    def __init__(self):
+        self.lists = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.lists.pop(key, None)
+
+    def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(str(value).encode() for value in values)
+        return len(self.lists[key])
+
+    def lmove(self, source, destination, wherefrom, whereto):
+        items = self.lists.get(source)
+        if not items:
+            return None
+        item = items.pop(0)
+        self.lists.setdefault(destination, []).append(item)
+        return item
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def lrem(self, key, count, value):
+        items = self.lists.get(key, [])
+        self.lists[key] = [item for item in items if item != str(value).encode()]
+        return len(items) - len(self.lists[key])
+
+    def items(self, key):
+        return [item.decode() for item in self.lists.get(key, [])]
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((getattr(self.client, name), args, kwargs))
+
+    def execute(self):
+        return [method(*args, **kwargs) for method, args, kwargs in self.calls]
+
+
+def _operator(license_status='active'):
+    today = date.today()
+    operator = Operator.objects.create(
+        name='Batching Bets', registration_number='REG-1', operator_code='OP-1',
+        email='ops@example.com', phone='+254700000001', license_number='LIC-1',
+        license_type='online_betting', license_status=license_status,
+        license_issued_date=today, license_expiry_date=today + timedelta(days=365)
+    )
+    IntegrationConfig.objects.create(
+        operator=operator, webhook_url_exclusion='https://operator.example.com/exclusions',
+        batch_exclusions=True, batch_max_records=10
+    )
+    APIKey.objects.create(operator=operator, key_name='primary', api_key='key-1', api_secret='secret')
+    return operator
+
+
+def _exclusions(count):
+    now = timezone.now()
+    exclusions = []
+    for index in range(count):
+        user = User.objects.create_user(
+            phone_number=f'+2547123460{index:02d}', national_id=f'4000{index:04d}',
+            email=f'batch{index}@example.com'
+        )
+        token = BSTToken.objects.create(user=user, phone_number_hash=f'batch-hash-{index}')
+        exclusions.append(SelfExclusionRecord.objects.create(
+            user=user, bst_token=token, exclusion_reference=f'EXC-BATCH-{index}', exclusion_period='6_months',
+            effective_date=now, expiry_date=now + timedelta(days=180), status='active', is_active=True
+        ))
+    return exclusions
+
+
+@pytest.fixture
+def batch():
+    """A batching operator with two buffered exclusions and their pending mappings"""
+    operator = _operator()
+    exclusions = _exclusions(2)
+    get_mappings([exclusion.id for exclusion in exclusions], [operator])
+    client = FakeRedis()
+    client.rpush(BATCH_BUFFER_KEY.format(operator_id=operator.id), *(exclusion.id for exclusion in exclusions))
+    with mock.patch.object(propagation, 'get_redis_client', return_value=client):
+        yield SimpleNamespace(operator=operator, exclusions=exclusions, client=client)
+
+
+def _statuses(operator):
+    return set(OperatorExclusionMapping.objects.filter(operator=operator).values_list('propagation_status', flat=True))
+
+
+@pytest.mark.django_db
+class TestBatchFlush:
+    """Buffered ids are only dropped once their outcome is saved"""
+
+    def test_acknowledged_batch_is_released(self, batch):
+        result = WebhookResult(batch.operator.id, ok=True, status_code=202)
+        with mock.patch.object(propagation, 'deliver_webhooks', return_value={batch.operator.id: result}):
+            summary = flush_batch(str(batch.operator.id))
+
+        assert summary == {'sent': 2, 'acknowledged': 2, 'failed': 0, 'remaining': 0}
+        assert _statuses(batch.operator) == {'acknowledged'}
+        assert batch.client.items(BATCH_PROCESSING_KEY.format(operator_id=batch.operator.id)) == []
+
+    def test_failed_flush_marks_batch_for_retry(self, batch):
+        with mock.patch.object(propagation, 'deliver_webhooks', side_effect=RuntimeError('worker timeout')):
+            with pytest.raises(RuntimeError):
+                flush_batch(str(batch.operator.id))
+
+        mappings = OperatorExclusionMapping.objects.filter(operator=batch.operator)
+        assert {mapping.propagation_status for mapping in mappings} == {'failed'}
+        assert all(mapping.next_retry_at is not None for mapping in mappings)
+        assert batch.client.items(BATCH_PROCESSING_KEY.format(operator_id=batch.operator.id)) == []
+
+    def test_ids_survive_a_flush_that_cannot_save(self, batch):
+        processing_key = BATCH_PROCESSING_KEY.format(operator_id=batch.operator.id)
+        result = WebhookResult(batch.operator.id, ok=True, status_code=202)
+        with mock.patch.object(propagation, 'deliver_webhooks', return_value={batch.operator.id: result}), \
+                mock.patch.object(propagation, 'save_mappings', side_effect=DatabaseError('connection lost')):
+            with pytest.raises(DatabaseError):
+                flush_batch(str(batch.operator.id))
+
+        assert batch.client.items(processing_key) == [str(exclusion.id) for exclusion in batch.exclusions]
+        assert _statuses(batch.operator) == {'pending'}
+
+    def test_inactive_operator_keeps_its_buffer(self, batch):
+        Operator.objects.filter(pk=batch.operator.pk).update(license_status='suspended')
+        with mock.patch.object(propagation, 'deliver_webhooks') as deliver:
+            flush_batch(str(batch.operator.id))
+
+        deliver.assert_not_called()
+        assert batch.client.llen(BATCH_BUFFER_KEY.format(operator_id=batch.operator.id)) == 2
+
+
+@pytest.mark.django_db
+class TestRetryFailedPropagations:
+    """Failed mappings past their backoff and stale pending mappings are resent"""
+
+    def test_stale_pending_mappings_are_resent(self):
+        operator = _operator()
+        stale, fresh, failed = _exclusions(3)
+        mappings = get_mappings([stale.id, fresh.id, failed.id], [operator])
+        OperatorExclusionMapping.objects.filter(pk=mappings[(stale.id, operator.id)].pk).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        OperatorExclusionMapping.objects.filter(pk=mappings[(failed.id, operator.id)].pk).update(
+            propagation_status='failed', retry_count=1, next_retry_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        with mock.patch.object(tasks.propagate_exclusion_to_operators, 'delay') as delay:
+            result = tasks.retry_failed_propagations()
+
+        assert result == {'retried': 2, 'exclusions': 2}
+        assert sorted(call.args for call in delay.call_args_list) == sorted([
+            (str(stale.id), [str(operator.id)]), (str(failed.id), [str(operator.id)])
+        ])
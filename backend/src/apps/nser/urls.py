@@ -24,6 +24,7 @@ urlpatterns = [
     path('lookup/', views.ExclusionLookupView.as_view(), name='exclusion_lookup'),
     path('lookup/bulk/', views.BulkExclusionLookupView.as_view(), name='bulk_exclusion_lookup'),
     path('lookup/bst/', views.BSTExclusionLookupView.as_view(), name='bst_exclusion_lookup'),
+    path('lookup/filter-stats/', views.ExclusionFilterStatsView.as_view(), name='exclusion_filter_stats'),
     
     # Exclusion Management
     path('exclusions/<uuid:pk>/activate/', views.ActivateExclusionView.as_view(), name='activate_exclusion'),
@@ -33,8 +33,12 @@ from apps.api.permissions import (
     IsGRAKStaff, IsCitizen, CanLookupExclusion, IsOwnerOrGRAKStaff
 )
 from apps.api.mixins import (
-    TimingMixin, SuccessResponseMixin, CacheMixin, AuditLogMixin
+    TimingMixin, SuccessResponseMixin, CacheMixin, AuditLogMixin, RateLimitMixin
 )
+from .exclusion_filter import get_exclusion_prefilter, resolve_lookup_identifier
+from .lookup_engine import BulkExclusionLookupEngine
+from .lookup_cache import lookup_cache_key, store_results
+from apps.compliance.audit_buffer import record_audit_events
 
 
 class SelfExclusionViewSet(TimingMixin, AuditLogMixin, viewsets.ModelViewSet):
@@ -138,7 +142,7 @@ class RegisterExclusionView(TimingMixin, SuccessResponseMixin, AuditLogMixin, AP
         return request.META.get('REMOTE_ADDR')
 
 
-class ExclusionLookupView(TimingMixin, SuccessResponseMixin, CacheMixin, APIView):
+class ExclusionLookupView(TimingMixin, RateLimitMixin, SuccessResponseMixin, CacheMixin, APIView):
     """
     Real-time exclusion lookup (HIGH PERFORMANCE - Target <50ms)
     
@@ -167,59 +171,78 @@ class ExclusionLookupView(TimingMixin, SuccessResponseMixin, CacheMixin, APIView
         bst_token = serializer.validated_data.get('bst_token')
         operator_id = serializer.validated_data['operator_id']
         
+        # Bloom pre-filter: a definite "not excluded" skips Redis and Postgres
+        prefilter = get_exclusion_prefilter()
+        lookup_kind, lookup_value = resolve_lookup_identifier(serializer.validated_data)
+        if not prefilter.might_be_excluded(lookup_kind, lookup_value):
+            response_data = self.build_lookup_response(None, int((time.time() - start_time) * 1000))
+            response_data['prefiltered'] = True
+            self.log_lookup(operator_id, serializer.validated_data, response_data)
+            return Response(response_data, status=status.HTTP_200_OK)
+        
         # Try cache first (for repeated lookups)
-        cache_key = f"exclusion_lookup:{phone_number or national_id or email or bst_token}"
-        cached_result = cache.get(cache_key)
+        cache_key = lookup_cache_key(serializer.validated_data)
+        cached_result = cache.get(cache_key) if cache_key else None
         
         if cached_result:
+            prefilter.record_outcome(cached_result.get('is_excluded', False))
             cached_result['response_time_ms'] = int((time.time() - start_time) * 1000)
             cached_result['from_cache'] = True
             return Response(cached_result, status=status.HTTP_200_OK)
         
         # Database lookup with optimized query
         exclusion = None
+        user_id = None
         
         if bst_token:
             # Lookup via BST token
             from apps.bst.models import BSTToken
-            token = BSTToken.objects.filter(
-                token_string=bst_token,
+            user_id = BSTToken.objects.filter(
+                token=bst_token,
                 is_active=True
-            ).select_related('user').first()
-            
-            if token:
-                exclusion = SelfExclusionRecord.objects.filter(
-                    user=token.user,
-                    is_active=True
-                ).only(
-                    'id', 'exclusion_reference', 'exclusion_period',
-                    'effective_date', 'expiry_date'
-                ).first()
+            ).values_list('user_id', flat=True).first()
         else:
             # Direct lookup via user identifiers
             from apps.users.models import User
-            user = None
+            users = User.objects.none()
             
             if phone_number:
-                user = User.objects.filter(phone_number=phone_number).only('id').first()
+                users = User.objects.filter(phone_number=phone_number)
             elif national_id:
-                user = User.objects.filter(national_id=national_id).only('id').first()
+                users = User.objects.filter(national_id=national_id)
             elif email:
-                user = User.objects.filter(email=email).only('id').first()
-            
-            if user:
-                exclusion = SelfExclusionRecord.objects.filter(
-                    user=user,
-                    is_active=True
-                ).only(
-                    'id', 'exclusion_reference', 'exclusion_period',
-                    'effective_date', 'expiry_date'
-                ).first()
+                users = User.objects.filter(email=email)
+            user_id = users.values_list('id', flat=True).first()
+        
+        if user_id:
+            exclusion = SelfExclusionRecord.objects.filter(
+                user_id=user_id,
+                is_active=True
+            ).only(
+                'id', 'exclusion_reference', 'exclusion_period',
+                'effective_date', 'expiry_date'
+            ).order_by('-effective_date').first()
+        
+        prefilter.record_outcome(exclusion is not None)
         
         # Calculate response time
         response_time_ms = int((time.time() - start_time) * 1000)
+        response_data = self.build_lookup_response(exclusion, response_time_ms)
         
-        # Build response
+        # Cache the result (indexed per user so changes invalidate it exactly)
+        try:
+            store_results([(cache_key, response_data, user_id)], self.cache_timeout)
+        except Exception as e:
+            logger.warning(f'Failed to cache exclusion lookup: {str(e)}')
+        
+        # Log lookup (async to not impact performance)
+        self.log_lookup(operator_id, serializer.validated_data, response_data)
+        
+        return Response(response_data, status=status.HTTP_200_OK)
+    
+    @staticmethod
+    def build_lookup_response(exclusion, response_time_ms):
+        """Build the lookup response payload for an exclusion (or None)"""
         if exclusion:
             is_permanent = exclusion.exclusion_period == 'permanent'
             days_remaining = None
@@ -227,7 +250,7 @@ class ExclusionLookupView(TimingMixin, SuccessResponseMixin, CacheMixin, APIView
                 delta = exclusion.expiry_date - timezone.now()
                 days_remaining = max(0, delta.days)
             
-            response_data = {
+            return {
                 'is_excluded': True,
                 'exclusion_id': str(exclusion.id),
                 'reference_number': exclusion.exclusion_reference,
@@ -240,77 +263,81 @@ class ExclusionLookupView(TimingMixin, SuccessResponseMixin, CacheMixin, APIView
                 'lookup_timestamp': timezone.now().isoformat(),
                 'response_time_ms': response_time_ms
             }
-        else:
-            response_data = {
-                'is_excluded': False,
-                'exclusion_id': None,
-                'reference_number': None,
-                'exclusion_period': None,
-                'start_date': None,
-                'end_date': None,
-                'is_permanent': False,
-                'days_remaining': None,
-                'user_message': 'No active self-exclusion found. User may participate.',
-                'lookup_timestamp': timezone.now().isoformat(),
-                'response_time_ms': response_time_ms
-            }
         
-        # Cache the result
-        cache.set(cache_key, response_data, self.cache_timeout)
-        
-        # Log lookup (async to not impact performance)
-        # Wrapped in try-except to prevent Celery issues from blocking the response
+        return {
+            'is_excluded': False,
+            'exclusion_id': None,
+            'reference_number': None,
+            'exclusion_period': None,
+            'start_date': None,
+            'end_date': None,
+            'is_permanent': False,
+            'days_remaining': None,
+            'user_message': 'No active self-exclusion found. User may participate.',
+            'lookup_timestamp': timezone.now().isoformat(),
+            'response_time_ms': response_time_ms
+        }
+    
+    @staticmethod
+    def log_lookup(operator_id, lookup_data, response_data):
+        """Append the lookup to the buffered audit log (one Redis write)"""
+        # Wrapped in try-except so audit buffering never fails the lookup response
         try:
-            from .tasks import log_exclusion_lookup
-            log_exclusion_lookup.apply_async(
-                kwargs={
-                    'operator_id': str(operator_id),
-                    'lookup_data': serializer.validated_data,
-                    'result': response_data,
-                    'response_time_ms': response_time_ms
-                },
-                ignore_result=True  # Fire-and-forget to avoid waiting for result
-            )
+            from .tasks import lookup_audit_event
+            record_audit_events([lookup_audit_event(
+                str(operator_id),
+                {key: str(value) for key, value in lookup_data.items()},
+                response_data,
+                response_data['response_time_ms']
+            )])
         except Exception as e:
-            # Log Celery errors but don't fail the lookup response
-            logger.warning(f'Failed to queue exclusion lookup log: {str(e)}')
-        
-        return Response(response_data, status=status.HTTP_200_OK)
+            logger.warning(f'Failed to buffer exclusion lookup log: {str(e)}')
 
 
-class BulkExclusionLookupView(TimingMixin, SuccessResponseMixin, APIView):
+class BulkExclusionLookupView(TimingMixin, RateLimitMixin, SuccessResponseMixin, APIView):
     """
-    Bulk exclusion lookup (max 100 lookups)
+    Bulk exclusion lookup (max NSER_SETTINGS['BULK_LOOKUP_MAX_ITEMS'], default 10,000)
     
     POST /api/v1/nser/lookup/bulk/
+    
+    Batched: one MGET, one query per identifier type, one exclusion query,
+    one pipelined cache write and one audit task per call.
     """
     permission_classes = [CanLookupExclusion]
     
+    def get_throttle_cost(self, request):
+        """One token per lookup"""
+        items = request.data.get('lookups') if isinstance(request.data, dict) else None
+        return max(len(items), 1) if isinstance(items, list) else 1
+    
     def post(self, request):
         serializer = BulkExclusionLookupSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
         lookups = serializer.validated_data['lookups']
-        results = []
-        
-        # Process each lookup
-        for lookup_data in lookups:
-            # Reuse single lookup logic
-            lookup_serializer = ExclusionLookupSerializer(data=lookup_data)
-            if lookup_serializer.is_valid():
-                # Call lookup view internally
-                lookup_view = ExclusionLookupView()
-                lookup_view.request = request
-                response = lookup_view.post(request)
-                results.append(response.data)
-            else:
-                results.append({
-                    'error': True,
-                    'errors': lookup_serializer.errors
-                })
+        engine = BulkExclusionLookupEngine(
+            build_response=ExclusionLookupView.build_lookup_response,
+            cache_timeout=ExclusionLookupView.cache_timeout
+        )
+        results, response_time_ms = engine.run(lookups)
+        
+        # Whole batch appended to the audit buffer in one pipeline
+        try:
+            from .tasks import lookup_audit_event
+            record_audit_events(
+                lookup_audit_event(
+                    str(lookup.get('operator_id') or ''),
+                    {key: str(value) for key, value in lookup.items()},
+                    {'is_excluded': result['is_excluded'], 'exclusion_id': result['exclusion_id']},
+                    response_time_ms
+                )
+                for lookup, result in zip(lookups, results)
+            )
+        except Exception as e:
+            logger.warning(f'Failed to buffer bulk exclusion lookup log: {str(e)}')
         
         return self.success_response(
-            data={'results': results, 'total': len(results)}
+            data={'results': results, 'total': len(results), 'response_time_ms': response_time_ms}
         )
 
 
@@ -323,6 +350,18 @@ class BSTExclusionLookupView(ExclusionLookupView):
     pass  # Inherits all logic from ExclusionLookupView
 
 
+class ExclusionFilterStatsView(TimingMixin, SuccessResponseMixin, APIView):
+    """
+    Exclusion lookup pre-filter statistics (size, staleness, false-positive rate)
+    
+    GET /api/v1/nser/lookup/filter-stats/
+    """
+    permission_classes = [IsAuthenticated, IsGRAKStaff]
+    
+    def get(self, request):
+        return self.success_response(data=get_exclusion_prefilter().stats())
+
+
 class ActivateExclusionView(TimingMixin, SuccessResponseMixin, APIView):
     """
     Activate pending exclusion
@@ -390,8 +429,7 @@ class TerminateExclusionView(TimingMixin, SuccessResponseMixin, APIView):
         # Update operator mappings
         exclusion.operator_mappings.all().update(is_active=False)
         
-        # Clear cache
-        cache.delete_pattern(f"exclusion_lookup:*{exclusion.user.phone_number}*")
+        # Cached lookups are invalidated by the SelfExclusionRecord post_save hook
         
         return self.success_response(
             message='Exclusion terminated successfully'
@@ -740,16 +778,22 @@ class RetryFailedPropagationsView(TimingMixin, SuccessResponseMixin, APIView):
     permission_classes = [IsAuthenticated, IsGRAKStaff]
     
     def post(self, request):
+        from .tasks import propagate_exclusion_to_operators
+
         failed_mappings = OperatorExclusionMapping.objects.filter(
-            propagation_status='failed',
+            propagation_status__in=['failed', 'timeout'],
             retry_count__lt=3
-        )[:100]
-        
+        ).values_list('exclusion_id', 'operator_id')[:100]
+
+        # One fan-out task per exclusion instead of one per mapping
+        by_exclusion = {}
+        for exclusion_id, operator_id in failed_mappings:
+            by_exclusion.setdefault(exclusion_id, []).append(str(operator_id))
+
         count = 0
-        for mapping in failed_mappings:
-            from .tasks import propagate_to_single_operator
-            propagate_to_single_operator.delay(str(mapping.id))
-            count += 1
+        for exclusion_id, operator_ids in by_exclusion.items():
+            propagate_exclusion_to_operators.delay(str(exclusion_id), operator_ids)
+            count += len(operator_ids)
         
         return self.success_response(
             data={'retried_count': count},
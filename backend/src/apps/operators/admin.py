@@ -11,6 +11,7 @@ from .models import (
     Operator, OperatorLicense, APIKey, IntegrationConfig,
     ComplianceReport, OperatorAuditLog
 )
+from .api_key_auth import set_keys_active
 
 
 class OperatorLicenseInline(admin.TabularInline):
@@ -468,12 +469,12 @@ class APIKeyAdmin(admin.ModelAdmin):
     
     @admin.action(description=_('Activate selected keys'))
     def activate_keys(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = set_keys_active(queryset, True)
         self.message_user(request, _('%d keys activated') % updated)
     
     @admin.action(description=_('Revoke selected keys'))
     def revoke_keys(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = set_keys_active(queryset, False)
         self.message_user(request, _('%d keys revoked') % updated)
 
 
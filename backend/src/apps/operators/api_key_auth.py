@@ -0,0 +1,136 @@
+"""
+API Key Authentication Cache
+Resolves an X-API-Key header to its APIKey (with operator) without touching
+Postgres on the hot path.
+
+- Keys are looked up by `key_hash` (SHA-256 of the raw key); raw keys never
+  appear in cache key names.
+- Tier 1 is a small per-process LRU with a short TTL: zero I/O per request.
+- Tier 2 is the shared Django cache (Redis), so a fresh worker costs one
+  cache round-trip instead of one query.
+- Unknown keys are cached negatively, so guessing keys cannot hammer the DB.
+- Saving or deleting an APIKey (rotate, revoke, admin edits) or its Operator
+  drops the Redis entry immediately; other processes' local copies expire
+  within API_KEY_LOCAL_TTL_SECONDS. Bulk (de)activation goes through
+  `set_keys_active`, since queryset.update() sends no post_save. Expiry (`expires_at`) is re-checked on
+  every request, so it is always exact.
+"""
+import copy
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.local_cache import LocalTTLCache
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'api_key_auth:{key_hash}'
+NOT_FOUND = 'not_found'
+
+
+def _operator_setting(name, default):
+    return getattr(settings, 'OPERATOR_SETTINGS', {}).get(name, default)
+
+
+def hash_api_key(raw_key):
+    return hashlib.sha256(raw_key.encode()).hexdigest()
+
+
+_local_cache = LocalTTLCache(
+    max_entries=_operator_setting('API_KEY_LOCAL_CACHE_SIZE', 1024),
+    ttl_seconds=_operator_setting('API_KEY_LOCAL_TTL_SECONDS', 10)
+)
+
+
+def _load(key_hash):
+    """Two-tier cache read, falling back to one indexed query"""
+    from .models import APIKey
+
+    value = _local_cache.get(key_hash)
+    if value is not None:
+        return value
+
+    cache_key = CACHE_KEY.format(key_hash=key_hash)
+    try:
+        value = cache.get(cache_key)
+    except Exception as e:
+        logger.warning(f"API key cache read failed: {str(e)}")
+        value = None
+
+    if value is None:
+        value = APIKey.objects.select_related('operator').filter(
+            key_hash=key_hash, is_active=True
+        ).first() or NOT_FOUND
+        timeout = (
+            _operator_setting('API_KEY_NEGATIVE_TTL_SECONDS', 30) if value == NOT_FOUND
+            else _operator_setting('API_KEY_CACHE_TTL_SECONDS', 300)
+        )
+        try:
+            cache.set(cache_key, value, timeout)
+        except Exception as e:
+            logger.warning(f"API key cache write failed: {str(e)}")
+
+    _local_cache.set(key_hash, value)
+    return value
+
+
+def authenticate_api_key(raw_key):
+    """
+    Active, unexpired APIKey for a raw header value, or None.
+    The returned instance is a private copy; its `operator` is loaded.
+    """
+    if not raw_key:
+        return None
+
+    key = _load(hash_api_key(raw_key))
+    if key == NOT_FOUND:
+        return None
+    if key.expires_at and key.expires_at < timezone.now():
+        return None
+    return copy.copy(key)
+
+
+def invalidate_api_key(key_hash):
+    """Drop a key from this process and from the shared cache"""
+    if not key_hash:
+        return
+    _local_cache.delete(key_hash)
+    try:
+        cache.delete(CACHE_KEY.format(key_hash=key_hash))
+    except Exception as e:
+        logger.warning(f"API key cache invalidation failed: {str(e)}")
+
+
+def invalidate_api_keys(key_hashes):
+    """invalidate_api_key for many keys, with one cache round-trip"""
+    key_hashes = [key_hash for key_hash in key_hashes if key_hash]
+    for key_hash in key_hashes:
+        _local_cache.delete(key_hash)
+    try:
+        cache.delete_many([CACHE_KEY.format(key_hash=key_hash) for key_hash in key_hashes])
+    except Exception as e:
+        logger.warning(f"API key cache invalidation failed: {str(e)}")
+
+
+def invalidate_operator_keys(operator_id):
+    """Drop every key of an operator (e.g. licence status changed)"""
+    from .models import APIKey
+
+    invalidate_api_keys(APIKey.objects.filter(operator_id=operator_id).values_list('key_hash', flat=True))
+
+
+def set_keys_active(queryset, is_active):
+    """
+    queryset.update(is_active=...) for APIKeys, plus the cache invalidation
+    the post_save receiver does for single saves (now and after commit).
+    Returns the number of keys updated.
+    """
+    key_hashes = list(queryset.values_list('key_hash', flat=True))
+    updated = queryset.update(is_active=is_active)
+    invalidate_api_keys(key_hashes)
+    transaction.on_commit(lambda: invalidate_api_keys(key_hashes))
+    return updated
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operators', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='integrationconfig',
+            name='batch_exclusions',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='integrationconfig',
+            name='batch_max_records',
+            field=models.PositiveIntegerField(default=100),
+        ),
+        migrations.AddField(
+            model_name='integrationconfig',
+            name='batch_max_wait_ms',
+            field=models.PositiveIntegerField(default=1000),
+        ),
+    ]
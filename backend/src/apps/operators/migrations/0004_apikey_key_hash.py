@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:08
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def backfill_key_hash(apps, schema_editor):
+    APIKey = apps.get_model('operators', 'APIKey')
+    keys = list(APIKey.objects.only('id', 'api_key'))
+    for key in keys:
+        key.key_hash = hashlib.sha256(key.api_key.encode()).hexdigest()
+    APIKey.objects.bulk_update(keys, ['key_hash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operators', '0003_integrationconfig_batch_exclusions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apikey',
+            name='key_hash',
+            field=models.CharField(editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_key_hash, migrations.RunPython.noop),
+    ]
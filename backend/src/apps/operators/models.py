@@ -12,6 +12,7 @@ from apps.core.models import (
     BaseModel, TimeStampedModel, UUIDModel, GeoLocationModel,
     StatusChoices, CountryChoices, BaseModelManager, generate_reference_number
 )
+from .api_key_auth import hash_api_key
 
 
 class Operator(BaseModel, GeoLocationModel):
@@ -92,6 +93,7 @@ class APIKey(BaseModel):
     operator = models.ForeignKey('Operator', on_delete=models.CASCADE, related_name='api_keys')
     key_name = models.CharField(max_length=100)
     api_key = models.CharField(max_length=255, unique=True, db_index=True)
+    key_hash = models.CharField(max_length=64, unique=True, null=True, editable=False)  # SHA-256 of api_key
     api_secret = models.CharField(max_length=255)
     
     # Permissions
@@ -122,6 +124,7 @@ class APIKey(BaseModel):
         if not self.api_key:
             self.api_key = f"pk_{'live' if not kwargs.get('test_mode') else 'test'}_{secrets.token_urlsafe(32)}"
             self.api_secret = f"sk_{'live' if not kwargs.get('test_mode') else 'test'}_{secrets.token_urlsafe(48)}"
+        self.key_hash = hash_api_key(self.api_key)
         super().save(*args, **kwargs)
 
 
@@ -144,6 +147,11 @@ class IntegrationConfig(BaseModel):
     require_screening_on_register = models.BooleanField(default=True)
     screening_frequency_days = models.PositiveIntegerField(default=90)
     
+    # Batched propagation (opt-in): one webhook call per batch of exclusions
+    batch_exclusions = models.BooleanField(default=False)
+    batch_max_records = models.PositiveIntegerField(default=100)
+    batch_max_wait_ms = models.PositiveIntegerField(default=1000)
+    
     # API Settings
     api_version = models.CharField(max_length=10, default='v1')
     timeout_seconds = models.PositiveIntegerField(default=30)
@@ -134,7 +134,8 @@ class IntegrationConfigSerializer(serializers.ModelSerializer):
             'webhook_url_compliance', 'webhook_secret_masked',
             'callback_success_url', 'callback_failure_url',
             'auto_propagate_exclusions', 'require_screening_on_register',
-            'screening_frequency_days', 'api_version',
+            'screening_frequency_days', 'batch_exclusions',
+            'batch_max_records', 'batch_max_wait_ms', 'api_version',
             'timeout_seconds', 'retry_attempts',
             'notification_email', 'notification_phone',
             'metadata', 'created_at', 'updated_at'
@@ -1,11 +1,13 @@
 """
 Operators Signals
-Auto-create user accounts for operators
+Auto-create user accounts for operators; keep the API key auth cache fresh
 """
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import Operator
+from .models import Operator, APIKey
+from .api_key_auth import invalidate_api_key, invalidate_operator_keys
 
 User = get_user_model()
 
@@ -58,3 +60,19 @@ def create_operator_user(sender, instance, created, **kwargs):
                 user.set_password(password)
                 user.save()
                 print(f"Updated password for operator user: {user.email}")
+
+
+@receiver(post_save, sender=APIKey)
+@receiver(post_delete, sender=APIKey)
+def invalidate_api_key_cache(sender, instance, **kwargs):
+    """Rotate, revoke, expiry or scope changes must reach authentication"""
+    key_hash = instance.key_hash
+    invalidate_api_key(key_hash)
+    transaction.on_commit(lambda: invalidate_api_key(key_hash))
+
+
+@receiver(post_save, sender=Operator)
+def invalidate_operator_api_keys(sender, instance, created, **kwargs):
+    """Cached keys carry their operator (licence status, name)"""
+    if not created:
+        transaction.on_commit(lambda: invalidate_operator_keys(instance.pk))
@@ -0,0 +1,157 @@
+"""
+Test cases for cached API key authentication
+Steady-state authentication must not touch the database
+"""
+from datetime import date, timedelta
+from unittest import mock
+
+import pytest
+from django.contrib import admin
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+from apps.core.local_cache import LocalTTLCache
+from apps.operators import api_key_auth
+from apps.operators.admin import APIKeyAdmin
+from apps.operators.api_key_auth import (
+    _local_cache, authenticate_api_key, hash_api_key, invalidate_api_key, set_keys_active
+)
+from apps.operators.models import APIKey, Operator
+
+
+def _cached_key(raw_key, **fields):
+    key = APIKey(api_key=raw_key, key_name='test', operator=Operator(name='Op'), **fields)
+    _local_cache.set(hash_api_key(raw_key), key)
+    return key
+
+
+class TestLocalTTLCache:
+    """Per-process LRU tier"""
+
+    def test_evicts_least_recently_used(self):
+        lru = LocalTTLCache(max_entries=2, ttl_seconds=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        assert lru.get('a') == 1
+        assert lru.get('b') is None
+        assert lru.get('c') == 3
+
+    def test_entries_expire(self):
+        lru = LocalTTLCache(max_entries=2, ttl_seconds=0)
+        lru.set('a', 1)
+        assert lru.get('a') is None
+
+
+class TestAuthenticateAPIKey:
+    """Hot-path resolution from a pre-filled local tier"""
+
+    def test_local_hit_needs_no_query(self):
+        cached = _cached_key('pk_live_hit', can_lookup=True)
+        key = authenticate_api_key('pk_live_hit')
+
+        assert key.can_lookup and key.operator.name == 'Op'
+        assert key is not cached  # callers get a private copy
+
+    def test_expired_key_is_rejected(self):
+        _cached_key('pk_live_expired', expires_at=timezone.now() - timedelta(seconds=1))
+        assert authenticate_api_key('pk_live_expired') is None
+
+    def test_invalidation_drops_local_entry(self):
+        _cached_key('pk_live_revoked')
+        invalidate_api_key(hash_api_key('pk_live_revoked'))
+        assert _local_cache.get(hash_api_key('pk_live_revoked')) is None
+
+    def test_missing_header(self):
+        assert authenticate_api_key('') is None
+        assert authenticate_api_key(None) is None
+
+
+@pytest.fixture
+def shared_cache():
+    shared = LocMemCache('api-key-auth-tests', {})
+    shared.clear()
+    _local_cache.clear()
+    with mock.patch.object(api_key_auth, 'cache', shared):
+        yield shared
+    _local_cache.clear()
+
+
+@pytest.fixture
+def operator():
+    today = date.today()
+    return Operator.objects.create(
+        name='Keyed Bets', registration_number='REG-K', operator_code='OP-K', email='keys@example.com',
+        phone='+254700000003', license_number='LIC-K', license_type='online_betting',
+        license_issued_date=today, license_expiry_date=today + timedelta(days=365)
+    )
+
+
+def _key(operator, name='primary'):
+    return APIKey.objects.create(operator=operator, key_name=name, api_key=f'pk_live_{name}', api_secret='secret')
+
+
+@pytest.mark.django_db
+class TestAuthenticateAgainstDatabase:
+    """Cold loads, warm hits and invalidation on every way a key stops working"""
+
+    def test_warm_cache_needs_no_queries(self, shared_cache, operator, django_assert_num_queries):
+        key = _key(operator)
+        with django_assert_num_queries(1):
+            assert authenticate_api_key(key.api_key).operator.name == 'Keyed Bets'
+        with django_assert_num_queries(0):
+            assert authenticate_api_key(key.api_key).pk == key.pk
+            _local_cache.clear()  # another process: served from Redis
+            assert authenticate_api_key(key.api_key).pk == key.pk
+
+        with django_assert_num_queries(1):
+            assert authenticate_api_key('pk_live_guess') is None
+        with django_assert_num_queries(0):
+            assert authenticate_api_key('pk_live_guess') is None  # cached negatively
+
+    def test_revoke(self, shared_cache, operator, django_capture_on_commit_callbacks):
+        key = _key(operator)
+        authenticate_api_key(key.api_key)
+        with django_capture_on_commit_callbacks(execute=True):
+            key.is_active = False
+            key.revoked_at = timezone.now()
+            key.save()
+        assert authenticate_api_key(key.api_key) is None
+
+    def test_rotate(self, shared_cache, operator, django_capture_on_commit_callbacks):
+        old = _key(operator)
+        authenticate_api_key(old.api_key)
+        with django_capture_on_commit_callbacks(execute=True):
+            old.is_active = False
+            old.save()
+            new = _key(operator, 'rotated')
+        assert authenticate_api_key(old.api_key) is None
+        assert authenticate_api_key(new.api_key).pk == new.pk
+
+    def test_delete(self, shared_cache, operator, django_capture_on_commit_callbacks):
+        key = _key(operator)
+        authenticate_api_key(key.api_key)
+        with django_capture_on_commit_callbacks(execute=True):
+            key.delete()
+        assert authenticate_api_key(key.api_key) is None
+
+    def test_bulk_revoke_and_activate(self, shared_cache, operator, django_capture_on_commit_callbacks):
+        keys = [_key(operator, 'first'), _key(operator, 'second')]
+        for key in keys:
+            authenticate_api_key(key.api_key)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert set_keys_active(operator.api_keys.all(), False) == 2
+        assert all(authenticate_api_key(key.api_key) is None for key in keys)
+
+        model_admin = APIKeyAdmin(APIKey, admin.site)
+        with mock.patch.object(model_admin, 'message_user'), django_capture_on_commit_callbacks(execute=True):
+            model_admin.activate_keys(mock.Mock(), APIKey.objects.filter(pk=keys[0].pk))
+        assert authenticate_api_key(keys[0].api_key).pk == keys[0].pk
+        assert authenticate_api_key(keys[1].api_key) is None
+
+        with mock.patch.object(model_admin, 'message_user'), django_capture_on_commit_callbacks(execute=True):
+            model_admin.revoke_keys(mock.Mock(), APIKey.objects.filter(pk=keys[0].pk))
+        assert authenticate_api_key(keys[0].api_key) is None
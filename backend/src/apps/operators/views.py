@@ -13,6 +13,7 @@ from datetime import timedelta
 import secrets
 
 from .models import Operator, OperatorLicense, APIKey, IntegrationConfig, ComplianceReport, OperatorAuditLog
+from .api_key_auth import authenticate_api_key, set_keys_active
 from .serializers import (
     OperatorListSerializer, OperatorDetailSerializer,
     OperatorLicenseSerializer, APIKeySerializer, APIKeyDetailSerializer,
@@ -65,7 +66,7 @@ class OperatorViewSet(TimingMixin, viewsets.ModelViewSet):
         operator.save()
         
         # Deactivate all API keys
-        operator.api_keys.update(is_active=False)
+        set_keys_active(operator.api_keys.all(), False)
         
         return Response({'message': 'Operator suspended'})
     
@@ -228,7 +229,8 @@ class APIKeyViewSet(TimingMixin, viewsets.ModelViewSet):
             can_lookup=old_key.can_lookup,
             can_register=old_key.can_register,
             can_screen=old_key.can_screen,
-            rate_limit=old_key.rate_limit,
+            rate_limit_per_second=old_key.rate_limit_per_second,
+            rate_limit_per_day=old_key.rate_limit_per_day,
             expires_at=old_key.expires_at
         )
         
@@ -631,7 +633,7 @@ class SuspendOperatorView(TimingMixin, SuccessResponseMixin, APIView):
         operator.save()
         
         # Deactivate API keys
-        operator.api_keys.update(is_active=False)
+        set_keys_active(operator.api_keys.all(), False)
         
         return self.success_response(message='Operator suspended')
 
@@ -750,7 +752,8 @@ class RotateAPIKeyView(TimingMixin, SuccessResponseMixin, APIView):
             can_lookup=old_key.can_lookup,
             can_register=old_key.can_register,
             can_screen=old_key.can_screen,
-            rate_limit=old_key.rate_limit
+            rate_limit_per_second=old_key.rate_limit_per_second,
+            rate_limit_per_day=old_key.rate_limit_per_day
         )
         
         return self.success_response(
@@ -796,7 +799,7 @@ class ValidateAPIKeyView(TimingMixin, SuccessResponseMixin, APIView):
     def post(self, request):
         api_key = request.data.get('api_key')
         
-        key = APIKey.objects.filter(api_key=api_key, is_active=True).first()
+        key = authenticate_api_key(api_key)
         
         if key:
             return self.success_response(
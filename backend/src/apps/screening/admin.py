@@ -7,9 +7,10 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
 from django.utils import timezone
 from .models import (
-    AssessmentSession, AssessmentQuestion, AssessmentResponse, RiskScore,
-    BehavioralProfile
+    AssessmentSession, AssessmentQuestion, AssessmentResponse, RiskBand,
+    RiskScore, BehavioralProfile
 )
+from . import question_bank, scoring
 
 
 class AssessmentResponseInline(admin.TabularInline):
@@ -231,14 +232,21 @@ class AssessmentQuestionAdmin(admin.ModelAdmin):
         )
     assessment_type_badge.short_description = _('Type')
     
+    def _invalidate(self, queryset):
+        assessment_types = set(queryset.values_list('assessment_type', flat=True))
+        scoring.invalidate(*assessment_types)
+        question_bank.invalidate(*assessment_types)
+    
     @admin.action(description=_('Activate selected questions'))
     def activate_questions(self, request, queryset):
         updated = queryset.update(is_active=True)
+        self._invalidate(queryset)
         self.message_user(request, _('%d questions activated') % updated)
     
     @admin.action(description=_('Deactivate selected questions'))
     def deactivate_questions(self, request, queryset):
         updated = queryset.update(is_active=False)
+        self._invalidate(queryset)
         self.message_user(request, _('%d questions deactivated') % updated)
 
 
@@ -286,6 +294,14 @@ class AssessmentResponseAdmin(admin.ModelAdmin):
         return False
 
 
+@admin.register(RiskBand)
+class RiskBandAdmin(admin.ModelAdmin):
+    """Score bands used to classify assessment totals"""
+    list_display = ('assessment_type', 'min_score', 'risk_level', 'should_self_exclude', 'reassess_after_days')
+    list_filter = ('assessment_type', 'risk_level', 'should_self_exclude')
+    ordering = ('assessment_type', 'min_score')
+
+
 @admin.register(RiskScore)
 class RiskScoreAdmin(admin.ModelAdmin):
     """Historical risk score tracking"""
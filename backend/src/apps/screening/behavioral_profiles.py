@@ -0,0 +1,219 @@
+"""
+Behavioral Profiles
+Incremental recomputation: only users with new activity are re-analysed,
+so the nightly cost follows the day's activity rather than the population.
+
+- New assessments, risk scores, BST activity (BSTMapping.record_activity)
+  and logins add the user to the Redis set DIRTY_KEY, after commit.
+- `update_behavioral_profiles` moves that set aside (DIRTY_KEY ->
+  PROCESSING_KEY, merged with any leftover from a failed run), walks it
+  with SSCAN in PROFILE_BATCH_SIZE batches and deletes it when done.
+  Users marked during the run land in the fresh set for the next run.
+- Each batch is a handful of grouped queries for all its users, then one
+  bulk_update (existing profiles) and one bulk_create (new ones).
+- Without Redis, the dirty set is derived from activity timestamps newer
+  than the last analysis (max BehavioralProfile.last_analyzed_at).
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from apps.core.redis_utils import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+DIRTY_KEY = 'nser:screening:profiles:dirty'
+PROCESSING_KEY = 'nser:screening:profiles:processing'
+
+HIGH_RISK_LEVELS = ('high', 'severe', 'critical')
+MULTI_OPERATOR_THRESHOLD = 3  # active BST mappings with distinct operators
+REASSESSMENT_WINDOW_DAYS = 30
+REASSESSMENT_THRESHOLD = 3  # assessments started within the window
+MAX_DAILY_FREQUENCY = Decimal('9999.99')  # betting_frequency_daily max_digits=6
+UPDATE_FIELDS = ['overall_risk_score', 'betting_frequency_daily', 'anomaly_flags', 'last_analyzed_at', 'updated_at']
+
+
+def _screening_setting(name, default):
+    return getattr(settings, 'SCREENING_SETTINGS', {}).get(name, default)
+
+
+# Marking
+
+def _add_dirty(user_ids):
+    client = get_redis_client()
+    if client is None:
+        return
+    try:
+        client.sadd(DIRTY_KEY, *user_ids)
+    except Exception as e:
+        logger.warning(f"Failed to mark behavioral profiles dirty: {str(e)}")
+
+
+def mark_dirty(*user_ids):
+    """Queue users for the next profile run once the current transaction commits"""
+    user_ids = [str(user_id) for user_id in user_ids if user_id]
+    if user_ids:
+        transaction.on_commit(lambda: _add_dirty(user_ids))
+
+
+# Dirty set
+
+def _claim(client):
+    """Move the dirty set aside for this run (keeping a failed run's leftovers)"""
+    pipe = client.pipeline(transaction=True)
+    pipe.sunionstore(PROCESSING_KEY, [PROCESSING_KEY, DIRTY_KEY])
+    pipe.delete(DIRTY_KEY)
+    return pipe.execute()[0]
+
+
+def _redis_batches(client, batch_size):
+    cursor = 0
+    while True:
+        cursor, members = client.sscan(PROCESSING_KEY, cursor, count=batch_size)
+        if members:
+            yield [member.decode() if isinstance(member, bytes) else member for member in members]
+        if cursor == 0:
+            return
+
+
+def changed_since(since):
+    """Filter for users with activity after `since` (the no-Redis dirty set)"""
+    from apps.bst.models import BSTMapping
+    from .models import AssessmentSession, RiskScore
+
+    return (
+        Q(pk__in=AssessmentSession.objects.filter(started_at__gt=since).values('user_id'))
+        | Q(pk__in=AssessmentSession.objects.filter(completed_at__gt=since).values('user_id'))
+        | Q(pk__in=RiskScore.objects.filter(created_at__gt=since).values('user_id'))
+        | Q(pk__in=BSTMapping.objects.filter(last_seen_at__gt=since).values('bst_token__user_id'))
+        | Q(last_login_at__gt=since)
+    )
+
+
+def _derived_batches(batch_size):
+    from apps.users.models import User
+    from .models import BehavioralProfile
+
+    since = BehavioralProfile.objects.aggregate(last=Max('last_analyzed_at'))['last']
+    user_ids = User.objects.filter(is_active=True)
+    if since is not None:
+        user_ids = user_ids.filter(changed_since(since))
+    user_ids = user_ids.order_by('pk').values_list('pk', flat=True)
+
+    batch = []
+    for user_id in user_ids.iterator(chunk_size=batch_size):
+        batch.append(user_id)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Recomputation
+
+def _flags(risk, activity, assessments):
+    flags = []
+    if risk and risk['risk_level'] in HIGH_RISK_LEVELS:
+        flags.append('high_risk')
+    if activity and activity['operators'] >= MULTI_OPERATOR_THRESHOLD:
+        flags.append('multi_operator')
+    if assessments >= REASSESSMENT_THRESHOLD:
+        flags.append('frequent_reassessment')
+    return flags
+
+
+def _daily_frequency(activity, now):
+    if not activity or not activity['interactions']:
+        return Decimal('0')
+    days = max((now - activity['first_seen']).days, 1)
+    return min(Decimal(activity['interactions']) / days, MAX_DAILY_FREQUENCY).quantize(Decimal('0.01'))
+
+
+def recompute_batch(user_ids, now=None):
+    """Recompute the profiles of one batch of users; returns profiles written"""
+    from apps.bst.models import BSTMapping
+    from apps.users.models import User
+    from .models import AssessmentSession, BehavioralProfile, RiskScore
+
+    now = now or timezone.now()
+    user_ids = list(User.objects.filter(pk__in=user_ids, is_active=True).values_list('pk', flat=True))
+    if not user_ids:
+        return 0
+
+    risk = {
+        row['user_id']: row
+        for row in RiskScore.objects.filter(user_id__in=user_ids, is_current=True)
+        .order_by('user_id', '-score_date').distinct('user_id')
+        .values('user_id', 'risk_score', 'risk_level')
+    }
+    activity = {
+        row['bst_token__user_id']: row
+        for row in BSTMapping.objects.filter(bst_token__user_id__in=user_ids, is_active=True)
+        .values('bst_token__user_id')
+        .annotate(operators=Count('operator', distinct=True), interactions=Sum('interaction_count'),
+                  first_seen=Min('first_seen_at'))
+        .order_by()
+    }
+    assessments = {
+        row['user_id']: row['count']
+        for row in AssessmentSession.objects.filter(
+            user_id__in=user_ids, started_at__gte=now - timedelta(days=REASSESSMENT_WINDOW_DAYS)
+        ).values('user_id').annotate(count=Count('id')).order_by()
+    }
+    profiles = {profile.user_id: profile for profile in BehavioralProfile.objects.filter(user_id__in=user_ids)}
+
+    updated, created = [], []
+    for user_id in user_ids:
+        profile = profiles.get(user_id)
+        if profile is None:
+            profile = BehavioralProfile(user_id=user_id)
+            created.append(profile)
+        else:
+            updated.append(profile)
+        user_risk, user_activity = risk.get(user_id), activity.get(user_id)
+        profile.overall_risk_score = user_risk['risk_score'] if user_risk else Decimal('0')
+        profile.betting_frequency_daily = _daily_frequency(user_activity, now)
+        profile.anomaly_flags = _flags(user_risk, user_activity, assessments.get(user_id, 0))
+        profile.last_analyzed_at = now
+        profile.updated_at = now
+
+    with transaction.atomic():
+        if updated:
+            BehavioralProfile.objects.bulk_update(updated, UPDATE_FIELDS)
+        if created:
+            # ignore_conflicts: a profile created concurrently is picked up next run
+            BehavioralProfile.objects.bulk_create(created, ignore_conflicts=True)
+    return len(updated) + len(created)
+
+
+def update_profiles(batch_size=None):
+    """Recompute every dirty profile; returns counts"""
+    batch_size = batch_size or _screening_setting('PROFILE_BATCH_SIZE', 1000)
+    now = timezone.now()
+    client = get_redis_client()
+
+    if client is not None:
+        try:
+            dirty = _claim(client)
+        except Exception as e:
+            logger.warning(f"Profile dirty set unavailable, deriving it from activity: {str(e)}")
+            client = None
+
+    batches = _redis_batches(client, batch_size) if client is not None else _derived_batches(batch_size)
+    updated = processed = 0
+    for batch in batches:
+        processed += len(batch)
+        updated += recompute_batch(batch, now)
+
+    if client is not None:
+        client.delete(PROCESSING_KEY)
+    else:
+        dirty = processed
+    logger.info(f"Recomputed {updated} behavioral profiles ({dirty} users marked dirty)")
+    return {'updated': updated, 'dirty': dirty}
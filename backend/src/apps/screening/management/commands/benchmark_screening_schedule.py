@@ -0,0 +1,105 @@
+"""
+Management command to benchmark the quarterly screening scheduler
+Usage: python manage.py benchmark_screening_schedule [--sizes 1000,10000,100000] [--legacy-max 10000]
+
+For each size, synthetic verified users are inserted and the scheduler is
+timed, inside a transaction that is rolled back afterwards. Run it against
+a development or staging database: eligible users already in the database
+are scheduled too (and rolled back), so they add to every row.
+"""
+import time
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.screening.scheduling import checkpoint_key, eligible_users, schedule_quarterly
+
+BENCHMARK_RUN_DATE = date(1970, 1, 1)  # keeps the checkpoint away from real runs
+PHONE_PREFIX = '+25410'  # not an allocated mobile range
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _create_users(count):
+    from apps.core.models import VerificationStatusChoices
+    from apps.users.models import User
+
+    User.objects.bulk_create([
+        User(
+            phone_number=f'{PHONE_PREFIX}{index:07d}', password='!', is_active=True,
+            is_phone_verified=True, is_id_verified=True,
+            verification_status=VerificationStatusChoices.VERIFIED
+        )
+        for index in range(count)
+    ], batch_size=5000)
+
+
+def _legacy_loop():
+    """The previous implementation: an exists() and an INSERT per user"""
+    from apps.screening.models import ScreeningSchedule
+
+    now = timezone.now()
+    scheduled = 0
+    for user in eligible_users():
+        if not ScreeningSchedule.objects.filter(user=user, status='pending', due_date__gte=now).exists():
+            ScreeningSchedule.objects.create(
+                user=user, schedule_type='quarterly', due_date=now + timedelta(days=90), status='pending'
+            )
+            scheduled += 1
+    return scheduled
+
+
+class Command(BaseCommand):
+    help = 'Time the quarterly screening scheduler against the number of users (rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1000,10000,100000',
+            help='Comma-separated synthetic user counts'
+        )
+        parser.add_argument('--chunk-size', type=int, help='Users per keyset page')
+        parser.add_argument(
+            '--legacy-max',
+            type=int,
+            default=10000,
+            help='Also time the per-user loop up to this many users (0 to skip)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be comma-separated integers')
+        if max(sizes) >= 10 ** 7:
+            raise CommandError('Sizes must be below 10,000,000')
+
+        self.stdout.write(f"{'users':>10} {'method':>10} {'scheduled':>10} {'queries':>8} {'seconds':>9} {'users/s':>10}")
+        for size in sizes:
+            self._run(size, 'set-based', lambda: schedule_quarterly(
+                run_date=BENCHMARK_RUN_DATE, chunk_size=options['chunk_size'], restart=True
+            )['scheduled'])
+            if size <= options['legacy_max']:
+                self._run(size, 'per-user', _legacy_loop)
+        cache.delete(checkpoint_key(BENCHMARK_RUN_DATE))
+
+    def _run(self, size, method, schedule):
+        try:
+            with transaction.atomic():
+                _create_users(size)
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    scheduled = schedule()
+                    elapsed = time.perf_counter() - started
+                raise _Rollback
+        except _Rollback:
+            pass
+        self.stdout.write(
+            f"{size:>10} {method:>10} {scheduled:>10} {len(queries):>8} {elapsed:>9.2f} {scheduled / max(elapsed, 1e-9):>10.0f}"
+        )
@@ -0,0 +1,72 @@
+"""
+Management command to import scored paper-survey assessments
+Usage: python manage.py import_paper_assessments answers.csv [--chunk-size 1000]
+
+The CSV has one row per answer with the columns
+session_reference, user_id, assessment_type, question_id, response_value,
+and each session's rows next to each other. Every session is scored and
+completed by scoring.score_sessions, a chunk of sessions at a time; a
+session_reference that already exists is re-scored from the file's answers.
+"""
+import csv
+import itertools
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.screening.scoring import ALIASES, ScoringError, score_sessions
+
+COLUMNS = ('session_reference', 'user_id', 'assessment_type', 'question_id', 'response_value')
+
+
+def _sessions(rows):
+    """(session_reference, first row, answers) per run of rows with the same reference"""
+    for reference, group in itertools.groupby(rows, key=lambda row: row['session_reference']):
+        group = list(group)
+        yield reference, group[0], [(row['question_id'], row['response_value']) for row in group]
+
+
+def _scored(chunk):
+    from apps.screening.models import AssessmentSession
+
+    stored = AssessmentSession.objects.in_bulk([reference for reference, _, _ in chunk], field_name='session_reference')
+    scored = []
+    for reference, row, answers in chunk:
+        session = stored.get(reference) or AssessmentSession(
+            session_reference=reference,
+            user_id=row['user_id'],
+            assessment_type=ALIASES.get(row['assessment_type'], row['assessment_type']),
+            metadata={'source': 'paper'}
+        )
+        scored.append((session, answers))
+    return scored
+
+
+class Command(BaseCommand):
+    help = 'Score and store paper-survey assessments from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with one row per answer')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Sessions scored per transaction')
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        with open(options['path'], newline='', encoding='utf-8') as fileobj:
+            reader = csv.DictReader(fileobj)
+            missing = set(COLUMNS) - set(reader.fieldnames or ())
+            if missing:
+                raise CommandError(f"Missing columns: {', '.join(sorted(missing))}")
+
+            sessions = _sessions(reader)
+            imported = 0
+            while True:
+                chunk = list(itertools.islice(sessions, chunk_size))
+                if not chunk:
+                    break
+                try:
+                    score_sessions(_scored(chunk))
+                except ScoringError as e:
+                    raise CommandError(f"Sessions {chunk[0][0]}..{chunk[-1][0]}: {str(e)}")
+                imported += len(chunk)
+                self.stdout.write(f'{imported} sessions scored')
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {imported} sessions'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('screening', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='screeningschedule',
+            index=models.Index(fields=['user', 'status', 'due_date'], name='schedule_user_status_due_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-17 22:44
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('screening', '0003_schedule_user_status_due_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RiskBand',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, help_text='Timestamp when the record was created', verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, help_text='Timestamp when the record was last updated', verbose_name='updated at')),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, help_text='Globally unique identifier', primary_key=True, serialize=False)),
+                ('assessment_type', models.CharField(choices=[('liebet', 'Lie/Bet (2-Question Screen)'), ('pgsi', 'PGSI (Problem Gambling Severity Index)'), ('dsm5', 'DSM-5 (Diagnostic and Statistical Manual)'), ('behavioral', 'Behavioral Pattern Analysis'), ('custom', 'Custom Assessment')], db_index=True, max_length=20)),
+                ('min_score', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('risk_level', models.CharField(choices=[('none', 'No Risk'), ('low', 'Low Risk'), ('mild', 'Mild Risk'), ('moderate', 'Moderate Risk'), ('high', 'High Risk'), ('severe', 'Severe Risk'), ('critical', 'Critical Risk'), ('blacklisted', 'Blacklisted')], max_length=20)),
+                ('should_self_exclude', models.BooleanField(default=False)),
+                ('reassess_after_days', models.PositiveSmallIntegerField(default=90)),
+            ],
+            options={
+                'db_table': 'screening_risk_bands',
+                'ordering': ['assessment_type', 'min_score'],
+                'unique_together': {('assessment_type', 'min_score')},
+            },
+        ),
+    ]
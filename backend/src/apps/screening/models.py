@@ -74,6 +74,23 @@ class AssessmentResponse(BaseModel):
         unique_together = [['session', 'question']]
 
 
+class RiskBand(TimeStampedModel, UUIDModel):
+    """Score band of an instrument: raw scores from min_score up to the next band"""
+    assessment_type = models.CharField(max_length=20, choices=AssessmentTypeChoices.choices, db_index=True)
+    min_score = models.DecimalField(max_digits=6, decimal_places=2)
+    risk_level = models.CharField(max_length=20, choices=RiskLevelChoices.choices)
+    should_self_exclude = models.BooleanField(default=False)
+    reassess_after_days = models.PositiveSmallIntegerField(default=90)
+    
+    class Meta:
+        db_table = 'screening_risk_bands'
+        ordering = ['assessment_type', 'min_score']
+        unique_together = [['assessment_type', 'min_score']]
+    
+    def __str__(self):
+        return f"{self.assessment_type} >= {self.min_score}: {self.risk_level}"
+
+
 class RiskScore(BaseModel):
     """Historical risk scores"""
     user = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='risk_scores', db_index=True)
@@ -117,4 +134,8 @@ class ScreeningSchedule(BaseModel):
     class Meta:
         db_table = 'screening_schedules'
         ordering = ['due_date']
+        indexes = [
+            # Scheduler anti-join: does the user have an upcoming pending schedule?
+            models.Index(fields=['user', 'status', 'due_date'], name='schedule_user_status_due_idx'),
+        ]
 
@@ -0,0 +1,145 @@
+"""
+Question Bank Cache
+Serialized, immutable question banks per instrument for the assessment
+flow (start, questions-by-type, next question), so stepping through an
+assessment does not query AssessmentQuestion.
+
+1. Per-process LRU/TTL, keyed by assessment type
+2. Shared Django cache (Redis): a version counter per instrument and one
+   immutable entry per version
+3. One AssessmentQuestion query to build a missing version
+
+Editing a question (save, delete or the admin actions) bumps the
+instrument's version after commit and publishes the instrument on a Redis
+channel that evicts it from every process. A bank built from an older
+version can only ever be stored under that older key, so a slow rebuild
+never overwrites a newer bank.
+
+The next question is picked in memory from the bank's ordered ids and the
+session's answered set.
+"""
+import logging
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.core.local_cache import InvalidationListener, LocalTTLCache
+from .scoring import ALIASES
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'nser:screening:question_bank:invalidate'
+DEFAULT_LANGUAGE = 'en'
+
+QuestionBank = namedtuple('QuestionBank', ['assessment_type', 'version', 'ids', 'payloads'])
+
+
+def _screening_setting(name, default):
+    return getattr(settings, 'SCREENING_SETTINGS', {}).get(name, default)
+
+
+_local_cache = LocalTTLCache(max_entries=32, ttl_seconds=_screening_setting('QUESTION_BANK_LOCAL_TTL_SECONDS', 300))
+_listener = InvalidationListener(INVALIDATION_CHANNEL, _local_cache)
+
+
+def version_cache_key(assessment_type):
+    return f"screening:question_bank:{assessment_type}:version"
+
+
+def bank_cache_key(assessment_type, version):
+    return f"screening:question_bank:{assessment_type}:{version}"
+
+
+def build_bank(assessment_type, version):
+    """Serialize the instrument's active questions once per language"""
+    from apps.core.models import LanguageChoices
+    from .models import AssessmentQuestion
+    from .serializers import AssessmentQuestionSerializer
+
+    questions = list(AssessmentQuestion.objects.filter(
+        assessment_type=assessment_type, is_active=True
+    ).order_by('question_number'))
+    base = AssessmentQuestionSerializer(questions, many=True).data
+    payloads = {
+        language: tuple(
+            dict(data, question_text=getattr(question, f'question_text_{language}', question.question_text_en))
+            for question, data in zip(questions, base)
+        )
+        for language in LanguageChoices.values
+    }
+    return QuestionBank(assessment_type, version, tuple(str(question.id) for question in questions), payloads)
+
+
+def _current_version(assessment_type):
+    key = version_cache_key(assessment_type)
+    version = cache.get(key)
+    if version is None:
+        # add() so concurrent first readers agree on one version
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def get_bank(assessment_type):
+    """The instrument's question bank through the two tiers"""
+    assessment_type = ALIASES.get(assessment_type, assessment_type)
+    _listener.ensure_started()
+    bank = _local_cache.get(assessment_type)
+    if bank is not None:
+        return bank
+
+    try:
+        version = _current_version(assessment_type)
+        bank = cache.get(bank_cache_key(assessment_type, version))
+    except Exception as e:
+        logger.warning(f"Question bank cache read failed: {str(e)}")
+        version, bank = None, None
+
+    if bank is None:
+        bank = build_bank(assessment_type, version)
+        if version is not None:
+            try:
+                cache.set(bank_cache_key(assessment_type, version), bank,
+                          _screening_setting('QUESTION_BANK_CACHE_TTL_SECONDS', 86400))
+            except Exception as e:
+                logger.warning(f"Question bank cache write failed: {str(e)}")
+    _local_cache.set(assessment_type, bank)
+    return bank
+
+
+def _bump(assessment_types):
+    for assessment_type in assessment_types:
+        try:
+            cache.incr(version_cache_key(assessment_type))
+        except ValueError:
+            pass  # no version yet: the next reader starts one
+        except Exception as e:
+            logger.warning(f"Question bank version bump failed: {str(e)}")
+    _listener.publish(assessment_types)
+
+
+def invalidate(*assessment_types):
+    """Start a new bank version for these instruments once the current transaction commits"""
+    assessment_types = sorted({
+        ALIASES.get(assessment_type, assessment_type) for assessment_type in assessment_types if assessment_type
+    })
+    if assessment_types:
+        transaction.on_commit(lambda: _bump(assessment_types))
+
+
+def questions(bank, language=DEFAULT_LANGUAGE):
+    """Serialized questions, in order, in the given language"""
+    return list(bank.payloads.get(language) or bank.payloads[DEFAULT_LANGUAGE])
+
+
+def next_question(bank, answered_ids, language=DEFAULT_LANGUAGE):
+    """First question not in `answered_ids`, or None when all are answered"""
+    answered_ids = {str(question_id) for question_id in answered_ids}
+    payload = bank.payloads.get(language) or bank.payloads[DEFAULT_LANGUAGE]
+    for index, question_id in enumerate(bank.ids):
+        if question_id not in answered_ids:
+            return payload[index]
+    return None
@@ -0,0 +1,272 @@
+"""
+ML Risk Model
+Offline training and in-process serving of the assessment risk model.
+
+Training (`train`, run weekly by `train_ml_model`):
+- Completed, classified sessions are read ML_TRAINING_CHUNK_SIZE at a time
+  in primary key order (keyset pagination); each chunk's responses become a dense
+  float32 matrix with one column per (assessment_type, question_number).
+- The model is a logistic regression fitted incrementally
+  (SGDClassifier(loss='log_loss').partial_fit per chunk), so memory is
+  bounded by ML_TRAINING_CHUNK_SIZE rather than the number of sessions.
+- Each chunk is scored before it is learned from (progressive
+  validation); the accuracy over all but the first chunk is reported.
+- The model, its feature columns and metrics are pickled to
+  default_storage as ML_MODEL_PATH/<version>.pkl, and ML_MODEL_PATH/latest.json
+  points at the newest version.
+
+Serving (`predict_users`, `predict_answers`):
+- Each process keeps the latest artifact in memory, re-reading the pointer
+  at most every ML_MODEL_REFRESH_SECONDS.
+- A request is turned into one feature matrix and one predict_proba call,
+  whatever the number of users in it.
+
+numpy and scikit-learn are imported lazily so the rest of the screening app
+works where they are not installed (see ModelUnavailable).
+"""
+import json
+import logging
+import os
+import pickle
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from apps.core.local_cache import LocalTTLCache
+
+logger = logging.getLogger(__name__)
+
+HIGH_RISK_LEVELS = ('high', 'severe', 'critical', 'blacklisted')
+POINTER_KEY = 'latest'
+TOP_FACTORS = 3
+
+
+class ModelUnavailable(Exception):
+    """No trained model can be served (none trained yet, or ML libraries missing)"""
+
+
+def _screening_setting(name, default):
+    return getattr(settings, 'SCREENING_SETTINGS', {}).get(name, default)
+
+
+# Artifacts are immutable per version; only the pointer is refreshed
+_local_cache = LocalTTLCache(max_entries=3, ttl_seconds=86400)
+
+
+def _model_path(name):
+    return f"{_screening_setting('ML_MODEL_PATH', 'ml_models/risk')}/{name}"
+
+
+# Features
+
+def feature_columns():
+    """(assessment_type, question_number) -> matrix column, over every question ever asked"""
+    from .models import AssessmentQuestion
+
+    keys = AssessmentQuestion.objects.order_by('assessment_type', 'question_number').values_list(
+        'assessment_type', 'question_number'
+    ).distinct()
+    return {key: column for column, key in enumerate(keys)}
+
+
+def column_names(columns):
+    return [f'{assessment_type}_q{number}' for (assessment_type, number) in columns]
+
+
+def _labelled_sessions(chunk_size):
+    """Chunks of (session_id, risk_level) of completed sessions, in pk order"""
+    from .models import AssessmentSession
+
+    sessions = AssessmentSession.objects.filter(
+        status='completed', risk_level__isnull=False
+    ).order_by('pk').values_list('pk', 'risk_level')
+    cursor = None
+    while True:
+        window = sessions if cursor is None else sessions.filter(pk__gt=cursor)
+        chunk = list(window[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        cursor = chunk[-1][0]
+
+
+def _response_rows(session_ids):
+    """(session_id, assessment_type, question_number, score) of these sessions' responses"""
+    from .models import AssessmentResponse
+
+    return AssessmentResponse.objects.filter(session_id__in=session_ids).values_list(
+        'session_id', 'question__assessment_type', 'question__question_number', 'score'
+    ).iterator()
+
+
+def feature_matrix(session_ids, columns, rows=None):
+    """Dense float32 matrix, one row per session in `session_ids`"""
+    import numpy as np
+
+    index = {session_id: row for row, session_id in enumerate(session_ids)}
+    matrix = np.zeros((len(session_ids), len(columns)), dtype=np.float32)
+    for session_id, assessment_type, number, score in (rows if rows is not None else _response_rows(session_ids)):
+        column = columns.get((assessment_type, number))
+        if column is not None:
+            matrix[index[session_id], column] = score
+    return matrix
+
+
+# Training
+
+def train(chunk_size=None):
+    """Fit and store a new model version; returns its metadata"""
+    from sklearn.linear_model import SGDClassifier
+    from apps.core.models import RiskLevelChoices
+
+    chunk_size = chunk_size or _screening_setting('ML_TRAINING_CHUNK_SIZE', 5000)
+    columns = feature_columns()
+    if not columns:
+        raise ModelUnavailable('No assessment questions to build features from')
+
+    classes = list(RiskLevelChoices.values)
+    model = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=0)
+    samples = evaluated = correct = 0
+    for chunk in _labelled_sessions(chunk_size):
+        session_ids = [session_id for session_id, _ in chunk]
+        labels = [risk_level for _, risk_level in chunk]
+        matrix = feature_matrix(session_ids, columns)
+        if samples:
+            correct += int((model.predict(matrix) == labels).sum())
+            evaluated += len(labels)
+        model.partial_fit(matrix, labels, classes=classes)
+        samples += len(labels)
+
+    if not samples:
+        raise ModelUnavailable('No completed assessments to train on')
+
+    trained_at = timezone.now()
+    version = trained_at.strftime('v%Y%m%d%H%M%S')
+    metadata = {
+        'version': version,
+        'trained_at': trained_at.isoformat(),
+        'samples': samples,
+        'features': len(columns),
+        'progressive_accuracy': round(correct / evaluated, 4) if evaluated else None,
+    }
+    save_artifact(dict(metadata, model=model, columns=list(columns), classes=list(model.classes_)))
+    logger.info(f"Trained risk model {version} on {samples} sessions ({len(columns)} features)")
+    return metadata
+
+
+def _replace(name, content):
+    """Overwrite a storage file so readers see the old or the new content, never no file"""
+    try:
+        target = default_storage.path(name)
+    except NotImplementedError:
+        # Remote storages (S3) replace the object in a single PUT
+        default_storage.save(name, content)
+        return
+    # Local storages never overwrite: write alongside, then rename over the old file
+    temporary = default_storage.save(f'{name}.tmp', content)
+    os.replace(default_storage.path(temporary), target)
+
+
+def save_artifact(artifact):
+    """Store an artifact and point latest.json at it"""
+    name = default_storage.save(_model_path(f"{artifact['version']}.pkl"), ContentFile(pickle.dumps(artifact)))
+    _replace(_model_path('latest.json'), ContentFile(json.dumps({'version': artifact['version'], 'name': name})))
+    _local_cache.delete(POINTER_KEY)
+    return name
+
+
+# Serving
+
+def load_model():
+    """The latest artifact, cached in this process"""
+    pointer = _local_cache.get(POINTER_KEY)
+    if pointer is None:
+        try:
+            with default_storage.open(_model_path('latest.json')) as fileobj:
+                pointer = json.loads(fileobj.read())
+        except (FileNotFoundError, OSError):
+            raise ModelUnavailable('No risk model has been trained yet')
+        _local_cache.set(POINTER_KEY, pointer, _screening_setting('ML_MODEL_REFRESH_SECONDS', 300))
+
+    artifact = _local_cache.get(pointer['version'])
+    if artifact is None:
+        try:
+            with default_storage.open(pointer['name']) as fileobj:
+                artifact = pickle.loads(fileobj.read())
+        except ImportError as e:
+            raise ModelUnavailable(f'ML libraries are not installed: {str(e)}')
+        _local_cache.set(pointer['version'], artifact)
+    return artifact
+
+
+def _predictions(artifact, matrix):
+    """One predict_proba call for every row of the matrix"""
+    model, classes = artifact['model'], artifact['classes']
+    names = column_names(artifact['columns'])
+    probabilities = model.predict_proba(matrix)
+    high_risk = [index for index, risk_level in enumerate(classes) if risk_level in HIGH_RISK_LEVELS]
+    contributions = matrix[:, None, :] * model.coef_[None, :, :]
+
+    predictions = []
+    for row, class_probabilities in enumerate(probabilities):
+        predicted = int(class_probabilities.argmax())
+        weights = contributions[row, predicted]
+        factors = [
+            {'factor': names[column], 'weight': round(float(weights[column]), 4)}
+            for column in weights.argsort()[::-1][:TOP_FACTORS] if weights[column] > 0
+        ]
+        predictions.append({
+            'predicted_risk_score': round(float(class_probabilities[high_risk].sum()), 4),
+            'predicted_risk_level': classes[predicted],
+            'confidence_score': round(float(class_probabilities[predicted]), 4),
+            'contributing_factors': factors,
+            'model_version': artifact['version'],
+        })
+    return predictions
+
+
+def predict_users(user_ids):
+    """Predictions from each user's latest completed assessment; None for users without one"""
+    from .models import AssessmentSession
+
+    artifact = load_model()
+    latest = dict(
+        AssessmentSession.objects.filter(user_id__in=user_ids, status='completed')
+        .order_by('user_id', '-completed_at').distinct('user_id').values_list('user_id', 'pk')
+    )
+    session_ids = list(latest.values())
+    by_session = {}
+    if session_ids:
+        columns = {tuple(key): column for column, key in enumerate(artifact['columns'])}
+        by_session = dict(zip(session_ids, _predictions(artifact, feature_matrix(session_ids, columns))))
+    return {user_id: by_session.get(latest.get(user_id)) for user_id in user_ids}
+
+
+def predict_answers(answers):
+    """
+    Prediction for one set of (question_id, response_value) answers, scored by
+    the scoring engine; raises ScoringError for an invalid or unknown question.
+    """
+    from .models import AssessmentQuestion
+    from .scoring import ScoringError, get_instrument, question_key
+
+    artifact = load_model()
+    values = {question_key(question_id): response_value for question_id, response_value in answers}
+    questions = {
+        str(question_id): (assessment_type, number)
+        for question_id, assessment_type, number in AssessmentQuestion.objects.filter(
+            id__in=list(values)
+        ).values_list('id', 'assessment_type', 'question_number')
+    }
+    unknown = [question_id for question_id in values if question_id not in questions]
+    if unknown:
+        raise ScoringError(f"Unknown question {unknown[0]}")
+
+    rows = [
+        (None, assessment_type, number, get_instrument(assessment_type).score(question_id, values[question_id]))
+        for question_id, (assessment_type, number) in questions.items()
+    ]
+    columns = {tuple(key): column for column, key in enumerate(artifact['columns'])}
+    return _predictions(artifact, feature_matrix([None], columns, rows))[0]
@@ -0,0 +1,161 @@
+"""
+Quarterly Screening Scheduler
+Set-based replacement for the per-user loop behind
+`schedule_quarterly_screenings` (an exists() query and an INSERT per
+citizen).
+
+- One anti-join (NOT EXISTS) selects eligible users without a future
+  pending ScreeningSchedule, SCHEDULE_CHUNK_SIZE at a time in primary key
+  order (keyset pagination: `pk > last`, no OFFSET scans).
+- Each chunk is inserted with bulk_create(batch_size=SCHEDULE_BATCH_SIZE)
+  in its own transaction, so work done is never rolled back by a later
+  failure.
+- After each chunk the run's checkpoint (cursor, counts, progress) is
+  stored in the cache. A retried or re-started run on the same day resumes
+  after the cursor; the anti-join keeps reruns idempotent regardless.
+- The checkpoint doubles as the progress metric (see `progress()`); the
+  totals of a finished run are also written as SystemMetric gauges.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_KEY = 'screening:quarterly:checkpoint:{run_date}'
+CHECKPOINT_TIMEOUT = 2 * 86400
+SCHEDULE_TYPE = 'quarterly'
+METRICS = {
+    'scheduled': 'screening.schedule.created',
+    'duration_seconds': 'screening.schedule.duration_seconds',
+}
+
+
+def _screening_setting(name, default):
+    return getattr(settings, 'SCREENING_SETTINGS', {}).get(name, default)
+
+
+def eligible_users():
+    """Active, fully verified users (User.is_verified, as columns)"""
+    from apps.core.models import VerificationStatusChoices
+    from apps.users.models import User
+
+    return User.objects.filter(
+        is_active=True,
+        is_deleted=False,
+        is_phone_verified=True,
+        is_id_verified=True,
+        verification_status=VerificationStatusChoices.VERIFIED
+    )
+
+
+def unscheduled_users(now=None):
+    """Eligible users with no pending schedule due from now on (anti-join)"""
+    from .models import ScreeningSchedule
+
+    now = now or timezone.now()
+    upcoming = ScreeningSchedule.objects.filter(
+        user=OuterRef('pk'), status='pending', due_date__gte=now, is_deleted=False
+    )
+    return eligible_users().filter(~Exists(upcoming))
+
+
+# Checkpoints
+
+def checkpoint_key(run_date):
+    return CHECKPOINT_KEY.format(run_date=run_date.isoformat())
+
+
+def progress(run_date=None):
+    """Checkpoint of the run for run_date (default today), or None"""
+    return cache.get(checkpoint_key(run_date or timezone.localdate()))
+
+
+def _save(checkpoint):
+    cache.set(checkpoint_key(checkpoint['run_date']), checkpoint, CHECKPOINT_TIMEOUT)
+
+
+def _record_metrics(checkpoint):
+    from apps.monitoring.models import SystemMetric
+
+    try:
+        SystemMetric.objects.bulk_create([
+            SystemMetric(
+                metric_name=name, metric_type='gauge', value=checkpoint[field],
+                tags={'run_date': checkpoint['run_date'].isoformat()}
+            )
+            for field, name in METRICS.items()
+        ])
+    except Exception as e:
+        logger.warning(f"Failed to record screening schedule metrics: {str(e)}")
+
+
+# Scheduling
+
+def schedule_chunk(user_ids, due_date, batch_size=None):
+    """Create one pending quarterly schedule per user; returns rows created"""
+    from .models import ScreeningSchedule
+
+    batch_size = batch_size or _screening_setting('SCHEDULE_BATCH_SIZE', 1000)
+    with transaction.atomic():
+        created = ScreeningSchedule.objects.bulk_create([
+            ScreeningSchedule(user_id=user_id, schedule_type=SCHEDULE_TYPE, due_date=due_date, status='pending')
+            for user_id in user_ids
+        ], batch_size=batch_size)
+    return len(created)
+
+
+def schedule_quarterly(run_date=None, chunk_size=None, restart=False):
+    """
+    Schedule a screening for every eligible user without an upcoming one.
+    Resumes today's checkpoint unless `restart`; returns the final checkpoint.
+    """
+    run_date = run_date or timezone.localdate()
+    chunk_size = chunk_size or _screening_setting('SCHEDULE_CHUNK_SIZE', 5000)
+    now = timezone.now()
+    due_date = now + timedelta(days=_screening_setting('MANDATORY_SCREENING_INTERVAL_DAYS', 90))
+
+    checkpoint = None if restart else progress(run_date)
+    if checkpoint and checkpoint['status'] == 'done':
+        return checkpoint
+    if checkpoint is None:
+        checkpoint = {
+            'run_date': run_date, 'status': 'running', 'cursor': None, 'chunks': 0, 'scheduled': 0,
+            'total': unscheduled_users(now).count(), 'duration_seconds': 0.0, 'started_at': now.isoformat(),
+        }
+    else:
+        checkpoint['status'] = 'running'
+        logger.info(f"Resuming quarterly screening scheduling after {checkpoint['cursor']}")
+    _save(checkpoint)
+
+    pending = unscheduled_users(now).order_by('pk').values_list('pk', flat=True)
+    started = time.monotonic() - checkpoint['duration_seconds']
+    while True:
+        window = pending if checkpoint['cursor'] is None else pending.filter(pk__gt=checkpoint['cursor'])
+        user_ids = list(window[:chunk_size])
+        if not user_ids:
+            break
+
+        checkpoint['scheduled'] += schedule_chunk(user_ids, due_date)
+        checkpoint['chunks'] += 1
+        checkpoint['cursor'] = str(user_ids[-1])
+        checkpoint['duration_seconds'] = round(time.monotonic() - started, 3)
+        checkpoint['progress'] = round(checkpoint['scheduled'] * 100 / max(checkpoint['total'], 1), 1)
+        _save(checkpoint)
+        logger.debug(f"Quarterly screenings: {checkpoint['scheduled']}/{checkpoint['total']} scheduled")
+
+    checkpoint.update(status='done', progress=100.0, finished_at=timezone.now().isoformat(),
+                      duration_seconds=round(time.monotonic() - started, 3))
+    _save(checkpoint)
+    _record_metrics(checkpoint)
+    logger.info(
+        f"Scheduled {checkpoint['scheduled']} quarterly screenings in "
+        f"{checkpoint['chunks']} chunks ({checkpoint['duration_seconds']}s)"
+    )
+    return checkpoint
@@ -0,0 +1,302 @@
+"""
+Risk Scoring Engine
+Scores assessment responses from a compiled per-instrument lookup table
+instead of a question query and an options scan per response.
+
+- `get_instrument(assessment_type)` compiles the instrument's active
+  questions into a (question_id, normalized value) -> score table and loads
+  its score bands. Compiled instruments are kept per process and evicted
+  everywhere (Redis pub/sub) when a question or band is edited.
+- Bands come from RiskBand rows; an instrument without rows uses
+  DEFAULT_BANDS (the published Lie/Bet, PGSI and DSM-5 cut-offs).
+- `save_responses` scores a batch in one pass and upserts it with a single
+  bulk_create(update_conflicts=True).
+- `complete_session` totals a session's stored responses and records the
+  result; `score_sessions` does the same for many complete answer sets at
+  once (paper-survey imports, see `manage.py import_paper_assessments`), in
+  a fixed number of queries.
+"""
+import logging
+import uuid
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.core.local_cache import InvalidationListener, LocalTTLCache
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'nser:screening:scoring:invalidate'
+
+Band = namedtuple('Band', ['min_score', 'risk_level', 'should_self_exclude', 'reassess_after_days'])
+
+NO_RISK = Band(Decimal('0'), 'none', False, 90)
+DEFAULT_BANDS = {
+    'liebet': (
+        NO_RISK,
+        Band(Decimal('1'), 'high', True, 30),
+    ),
+    'pgsi': (
+        NO_RISK,
+        Band(Decimal('1'), 'low', False, 90),
+        Band(Decimal('3'), 'moderate', False, 90),
+        Band(Decimal('8'), 'high', True, 30),
+    ),
+    'dsm5': (
+        NO_RISK,
+        Band(Decimal('2'), 'mild', False, 90),
+        Band(Decimal('4'), 'moderate', False, 90),
+        Band(Decimal('6'), 'severe', True, 30),
+    ),
+}
+
+# Sessions started through the Lie/Bet endpoints are stored as 'lie_bet'
+ALIASES = {'lie_bet': 'liebet'}
+
+# Scores of questions without explicit response_options
+FREQUENCY_SCORES = {'never': 0, 'sometimes': 1, 'most_of_time': 2, 'almost_always': 3}
+
+RESPONSE_UPDATE_FIELDS = ['response_value', 'score', 'answered_at', 'updated_at']
+SESSION_SCORE_FIELDS = [
+    'raw_score', 'risk_level', 'should_self_exclude', 'status',
+    'completed_at', 'next_assessment_due', 'updated_at'
+]
+
+
+class ScoringError(ValueError):
+    """A response that cannot be scored against its instrument"""
+
+
+def _screening_setting(name, default):
+    return getattr(settings, 'SCREENING_SETTINGS', {}).get(name, default)
+
+
+_local_cache = LocalTTLCache(max_entries=32, ttl_seconds=_screening_setting('SCORING_CACHE_TTL_SECONDS', 300))
+_listener = InvalidationListener(INVALIDATION_CHANNEL, _local_cache)
+
+
+def normalize(value):
+    return str(value).strip().lower()
+
+
+def question_key(question_id):
+    """Canonical string form of a question id (any UUID spelling)"""
+    try:
+        return str(uuid.UUID(str(question_id)))
+    except ValueError:
+        raise ScoringError(f"Invalid question id: {question_id}")
+
+
+def _option_scores(question):
+    """Normalized response value -> score for one question"""
+    if question.response_type == 'yes_no':
+        scores = {'yes': question.max_score, 'no': 0}
+    elif question.response_type == 'frequency':
+        scores = dict(FREQUENCY_SCORES)
+    else:
+        scores = {}
+    options = (question.response_options or {}).get('options', [])
+    for option in options:
+        scores[normalize(option['value'])] = option.get('score', 0)
+    return {value: Decimal(str(score)) for value, score in scores.items()}
+
+
+class Instrument:
+    """An assessment type compiled for scoring"""
+
+    def __init__(self, assessment_type, questions, bands):
+        self.assessment_type = assessment_type
+        self.questions = {str(question.id): question for question in questions}
+        self.table = {
+            (question_id, value): score
+            for question_id, question in self.questions.items()
+            for value, score in _option_scores(question).items()
+        }
+        self.bands = sorted(bands, key=lambda band: band.min_score) or [NO_RISK]
+        self._floors = [band.min_score for band in self.bands]
+
+    def score(self, question_id, response_value):
+        """Score of one response; values outside the options score 0"""
+        return self.table.get((question_id, normalize(response_value)), Decimal('0'))
+
+    def classify(self, total):
+        """The band the total falls in (totals below the first band get the first band)"""
+        return self.bands[max(bisect_right(self._floors, Decimal(total)) - 1, 0)]
+
+
+# Compilation and caching
+
+def compile_instrument(assessment_type):
+    from .models import AssessmentQuestion, RiskBand
+
+    questions = AssessmentQuestion.objects.filter(
+        assessment_type=assessment_type, is_active=True
+    ).order_by('question_number')
+    bands = [
+        Band(band.min_score, band.risk_level, band.should_self_exclude, band.reassess_after_days)
+        for band in RiskBand.objects.filter(assessment_type=assessment_type)
+    ] or DEFAULT_BANDS.get(assessment_type, ())
+    return Instrument(assessment_type, list(questions), bands)
+
+
+def get_instrument(assessment_type):
+    """Compiled instrument for an assessment type, from the per-process cache"""
+    assessment_type = ALIASES.get(assessment_type, assessment_type)
+    _listener.ensure_started()
+    instrument = _local_cache.get(assessment_type)
+    if instrument is None:
+        instrument = compile_instrument(assessment_type)
+        _local_cache.set(assessment_type, instrument)
+    return instrument
+
+
+def invalidate(*assessment_types):
+    """Recompile these instruments everywhere once the current transaction commits"""
+    assessment_types = sorted({
+        ALIASES.get(assessment_type, assessment_type) for assessment_type in assessment_types if assessment_type
+    })
+    if assessment_types:
+        transaction.on_commit(lambda: _listener.publish(assessment_types))
+
+
+# Responses
+
+def build_responses(session, answers, instrument, now):
+    """
+    Scored, unsaved AssessmentResponses for (question_id, response_value)
+    pairs; a repeated question keeps its last answer.
+    """
+    from .models import AssessmentResponse
+
+    responses = {}
+    for question_id, response_value in answers:
+        question_id = question_key(question_id)
+        question = instrument.questions.get(question_id)
+        if question is None:
+            raise ScoringError(f"Question {question_id} is not an active {instrument.assessment_type} question")
+        responses[question_id] = AssessmentResponse(
+            session=session, question=question, response_value=response_value,
+            score=instrument.score(question_id, response_value), answered_at=now, updated_at=now
+        )
+    return list(responses.values())
+
+
+def _upsert(responses):
+    from .models import AssessmentResponse
+
+    AssessmentResponse.objects.bulk_create(
+        responses, update_conflicts=True,
+        unique_fields=['session', 'question'], update_fields=RESPONSE_UPDATE_FIELDS
+    )
+
+
+def save_responses(session, answers, now=None):
+    """Score and upsert a session's answers in one statement; returns the stored responses"""
+    from .models import AssessmentResponse
+
+    now = now or timezone.now()
+    responses = build_responses(session, answers, get_instrument(session.assessment_type), now)
+    if not responses:
+        return responses
+    _upsert(responses)
+
+    # A conflicting row keeps its own id and created_at, not the ones built here
+    question_ids = [response.question_id for response in responses]
+    stored = {
+        response.question_id: response
+        for response in AssessmentResponse.objects.filter(
+            session=session, question_id__in=question_ids
+        ).select_related('question')
+    }
+    return [stored[question_id] for question_id in question_ids]
+
+
+# Completion
+
+def _apply_band(session, total, band, now):
+    session.raw_score = total
+    session.risk_level = band.risk_level
+    session.should_self_exclude = band.should_self_exclude
+    session.status = 'completed'
+    session.completed_at = now
+    session.next_assessment_due = now + timedelta(days=band.reassess_after_days)
+    session.updated_at = now
+
+
+def _risk_score(session, total, band, now):
+    from .models import RiskScore
+
+    return RiskScore(
+        user_id=session.user_id, bst_token_id=session.bst_token_id, score_date=now,
+        risk_level=band.risk_level, risk_score=total, score_source=session.assessment_type,
+        is_current=True
+    )
+
+
+def complete_session(session, now=None):
+    """Total the session's responses, classify it and record the risk score"""
+    from .models import RiskScore
+
+    now = now or timezone.now()
+    instrument = get_instrument(session.assessment_type)
+    total = session.responses.aggregate(total=Sum('score'))['total'] or Decimal('0')
+    band = instrument.classify(total)
+
+    with transaction.atomic():
+        _apply_band(session, total, band, now)
+        session.save(update_fields=SESSION_SCORE_FIELDS)
+        RiskScore.objects.filter(user_id=session.user_id, is_current=True).update(is_current=False)
+        risk_score = _risk_score(session, total, band, now)
+        risk_score.save()
+    return band, risk_score
+
+
+def score_sessions(scored, now=None):
+    """
+    Score and complete many sessions at once. `scored` is a list of
+    (session, answers) with each session's complete answer set; unsaved
+    sessions are inserted, stored ones updated. Returns the bands, in order.
+    """
+    from .behavioral_profiles import mark_dirty
+    from .models import AssessmentSession, RiskScore
+
+    now = now or timezone.now()
+    instruments = {}
+    responses, risk_scores, bands = [], [], []
+    for session, answers in scored:
+        instrument = instruments.get(session.assessment_type)
+        if instrument is None:
+            instrument = instruments[session.assessment_type] = get_instrument(session.assessment_type)
+        session_responses = build_responses(session, answers, instrument, now)
+        total = sum((response.score for response in session_responses), Decimal('0'))
+        band = instrument.classify(total)
+        _apply_band(session, total, band, now)
+        responses.extend(session_responses)
+        risk_scores.append(_risk_score(session, total, band, now))
+        bands.append(band)
+
+    new_sessions = [session for session, _ in scored if session._state.adding]
+    stored_sessions = [session for session, _ in scored if not session._state.adding]
+    user_ids = {session.user_id for session, _ in scored}
+    with transaction.atomic():
+        if new_sessions:
+            AssessmentSession.objects.bulk_create(new_sessions)
+        if stored_sessions:
+            AssessmentSession.objects.bulk_update(stored_sessions, SESSION_SCORE_FIELDS)
+        if responses:
+            _upsert(responses)
+        RiskScore.objects.filter(user_id__in=user_ids, is_current=True).update(is_current=False)
+        # A user with several sessions in the batch keeps only the last as current
+        latest = {risk_score.user_id: risk_score for risk_score in risk_scores}
+        for risk_score in risk_scores:
+            risk_score.is_current = latest[risk_score.user_id] is risk_score
+        RiskScore.objects.bulk_create(risk_scores)
+    # bulk writes skip the post_save receivers that mark profiles
+    mark_dirty(*user_ids)
+    return bands
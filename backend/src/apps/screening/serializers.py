@@ -3,6 +3,7 @@ Screening & Risk Assessment Serializers
 Lie/Bet, PGSI, DSM-5 assessments with ML predictions
 """
 from rest_framework import serializers
+from django.conf import settings
 from django.utils import timezone
 from .models import (
     AssessmentSession, AssessmentQuestion, AssessmentResponse,
@@ -391,13 +392,31 @@ class RiskScoreCalculationResponseSerializer(serializers.Serializer):
 class MLRiskPredictionSerializer(serializers.Serializer):
     """ML risk prediction serializer"""
     user_id = serializers.UUIDField(required=False)
+    user_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        min_length=1,
+        max_length=getattr(settings, 'SCREENING_SETTINGS', {}).get('ML_PREDICTION_MAX_USERS', 500)
+    )
     behavioral_data = serializers.JSONField(required=False)
-    assessment_responses = serializers.JSONField(required=False)
+    assessment_responses = serializers.ListField(
+        child=serializers.DictField(),
+        required=False,
+        min_length=1
+    )
+    
+    def validate_assessment_responses(self, value):
+        for response in value:
+            if 'question_id' not in response or 'response_value' not in response:
+                raise serializers.ValidationError(
+                    "Each response must include 'question_id' and 'response_value'."
+                )
+        return value
     
     def validate(self, attrs):
-        if not attrs.get('user_id') and not attrs.get('behavioral_data'):
+        if not attrs.get('user_id') and not attrs.get('user_ids') and not attrs.get('assessment_responses'):
             raise serializers.ValidationError(
-                "Either user_id or behavioral_data is required."
+                "One of user_id, user_ids or assessment_responses is required."
             )
         return attrs
 
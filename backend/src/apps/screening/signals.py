@@ -0,0 +1,48 @@
+"""
+Screening Signals
+Mark users whose behavioral profile needs recomputing
+(see apps.screening.behavioral_profiles), and recompile scoring instruments
+and question banks whose questions or bands change (see apps.screening.scoring
+and apps.screening.question_bank)
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.users.models import User
+from . import question_bank, scoring
+from .behavioral_profiles import mark_dirty
+from .models import AssessmentQuestion, AssessmentSession, RiskBand, RiskScore
+
+
+@receiver(post_save, sender=AssessmentSession)
+def assessment_changed(sender, instance, created, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if created or update_fields is None or {'status', 'risk_level', 'completed_at'} & set(update_fields):
+        mark_dirty(instance.user_id)
+
+
+@receiver(post_save, sender=RiskScore)
+def risk_score_recorded(sender, instance, created, **kwargs):
+    if created:
+        mark_dirty(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def user_logged_in(sender, instance, created, **kwargs):
+    update_fields = kwargs.get('update_fields')
+    if not created and update_fields is not None and 'last_login_at' in update_fields:
+        mark_dirty(instance.pk)
+
+
+@receiver(post_save, sender=AssessmentQuestion)
+@receiver(post_delete, sender=AssessmentQuestion)
+@receiver(post_save, sender=RiskBand)
+@receiver(post_delete, sender=RiskBand)
+def instrument_changed(sender, instance, **kwargs):
+    scoring.invalidate(instance.assessment_type)
+
+
+@receiver(post_save, sender=AssessmentQuestion)
+@receiver(post_delete, sender=AssessmentQuestion)
+def question_changed(sender, instance, **kwargs):
+    question_bank.invalidate(instance.assessment_type)
@@ -10,36 +10,29 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-@shared_task
-def schedule_quarterly_screenings():
-    """Schedule quarterly screenings for all users"""
-    from .models import ScreeningSchedule
-    from apps.users.models import User
-    
-    users = User.objects.filter(is_active=True, is_verified=True)
-    scheduled_count = 0
-    
-    for user in users:
-        try:
-            # Check if already scheduled
-            existing = ScreeningSchedule.objects.filter(
-                user=user,
-                status='scheduled',
-                scheduled_date__gte=timezone.now().date()
-            ).exists()
-            
-            if not existing:
-                ScreeningSchedule.objects.create(
-                    user=user,
-                    assessment_type='pgsi',
-                    scheduled_date=timezone.now().date() + timedelta(days=90),
-                    status='scheduled'
-                )
-                scheduled_count += 1
-        except Exception as e:
-            logger.error(f"Failed to schedule screening for user {user.id}: {str(e)}")
+@shared_task(bind=True, max_retries=3)
+def schedule_quarterly_screenings(self, restart=False):
+    """
+    Schedule quarterly screenings for all eligible users: set-based and
+    chunked, resuming today's checkpoint on retry (see scheduling.py)
+    """
+    from django.conf import settings
+    from .scheduling import schedule_quarterly
+    
+    if not settings.SCREENING_SETTINGS.get('QUARTERLY_SCREENING_ENABLED', True):
+        return {'scheduled': 0, 'skipped': True}
     
-    return {'scheduled': scheduled_count}
+    try:
+        checkpoint = schedule_quarterly(restart=restart)
+    except Exception as exc:
+        logger.error(f"Quarterly screening scheduling failed, will resume: {str(exc)}")
+        raise self.retry(exc=exc, countdown=60)
+    
+    return {
+        'scheduled': checkpoint['scheduled'],
+        'chunks': checkpoint['chunks'],
+        'duration_seconds': checkpoint['duration_seconds']
+    }
 
 
 @shared_task
@@ -74,33 +67,11 @@ def send_screening_reminders():
 
 @shared_task
 def train_ml_model():
-    """Train ML risk prediction model"""
-    from .models import AssessmentSession, RiskScore
+    """Train and store a new ML risk prediction model (see risk_model.py)"""
+    from .risk_model import train
     
     try:
-        # Gather training data
-        completed_sessions = AssessmentSession.objects.filter(
-            status='completed'
-        ).prefetch_related('responses')
-        
-        # Prepare training data (placeholder)
-        training_data = []
-        labels = []
-        
-        for session in completed_sessions:
-            features = [r.score for r in session.responses.all()]
-            label = session.risk_level
-            
-            training_data.append(features)
-            labels.append(label)
-        
-        # Train model (placeholder)
-        # model = train_sklearn_model(training_data, labels)
-        # save_model(model)
-        
-        logger.info(f"Trained model on {len(training_data)} samples")
-        return {'samples': len(training_data)}
-        
+        return train()
     except Exception as e:
         logger.error(f"Failed to train ML model: {str(e)}")
         return {'error': str(e)}
@@ -108,28 +79,10 @@ def train_ml_model():
 
 @shared_task
 def update_behavioral_profiles():
-    """Update behavioral profiles for all users"""
-    from .models import BehavioralProfile
-    from apps.users.models import User
-    
-    users = User.objects.filter(is_active=True)
-    updated_count = 0
-    
-    for user in users:
-        try:
-            profile, created = BehavioralProfile.objects.get_or_create(user=user)
-            
-            # Update profile data
-            # Analyze user behavior patterns
-            
-            profile.last_updated = timezone.now()
-            profile.save()
-            
-            updated_count += 1
-        except Exception as e:
-            logger.error(f"Failed to update profile for user {user.id}: {str(e)}")
+    """Recompute behavioral profiles of users with new activity (see behavioral_profiles.py)"""
+    from .behavioral_profiles import update_profiles
     
-    return {'updated': updated_count}
+    return update_profiles()
 
 
 @shared_task
@@ -0,0 +1,197 @@
+"""
+Test cases for incremental behavioral profile updates
+Dirty-set handling and the per-user derivations with Redis and the database
+mocked, then batch recomputation and the no-Redis fallback against the database
+"""
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+
+from apps.bst.models import BSTMapping, BSTToken
+from apps.operators.models import Operator
+from apps.screening import behavioral_profiles
+from apps.screening.behavioral_profiles import DIRTY_KEY, PROCESSING_KEY
+from apps.screening.models import BehavioralProfile, RiskScore
+from apps.users.models import User
+
+NOW = datetime(2026, 10, 17, 3, 30, tzinfo=dt_timezone.utc)
+
+
+class FakeSetRedis:
+    """The set commands update_profiles uses"""
+
+    def __init__(self, **sets):
+        self.sets = {key: set(members) for key, members in sets.items()}
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def sunionstore(self, destination, keys):
+        members = set().union(*(self.sets.get(key, set()) for key in keys))
+        self.sets[destination] = members
+        self.pending = len(members)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.sets.pop(key, None)
+
+    def execute(self):
+        return [self.pending, 1]
+
+    def sscan(self, key, cursor, count):
+        members = sorted(self.sets.get(key, set()))
+        page = members[cursor:cursor + count]
+        next_cursor = cursor + count if cursor + count < len(members) else 0
+        return next_cursor, [member.encode() for member in page]
+
+
+class TestUpdateProfiles:
+    """Only dirty users are recomputed, in batches"""
+
+    def _update(self, client, batch_size=2):
+        batches = []
+        with mock.patch.object(behavioral_profiles, 'get_redis_client', return_value=client), \
+                mock.patch.object(behavioral_profiles, 'recompute_batch',
+                                  side_effect=lambda batch, now: batches.append(batch) or len(batch)):
+            result = behavioral_profiles.update_profiles(batch_size=batch_size)
+        return result, batches
+
+    def test_recomputes_dirty_users_in_batches(self):
+        client = FakeSetRedis(**{DIRTY_KEY: {'u1', 'u2', 'u3'}})
+        result, batches = self._update(client)
+
+        assert batches == [['u1', 'u2'], ['u3']]
+        assert result == {'updated': 3, 'dirty': 3}
+        assert client.sets == {}
+
+    def test_leftovers_of_a_failed_run_are_included(self):
+        client = FakeSetRedis(**{DIRTY_KEY: {'u2'}, PROCESSING_KEY: {'u1'}})
+        result, batches = self._update(client, batch_size=10)
+
+        assert batches == [['u1', 'u2']]
+
+    def test_nothing_dirty(self):
+        result, batches = self._update(FakeSetRedis())
+        assert batches == [] and result['updated'] == 0
+
+
+class TestMarkDirty:
+    """Marks are applied after commit"""
+
+    def test_marks_after_commit(self):
+        client = mock.Mock()
+        with mock.patch.object(behavioral_profiles, 'get_redis_client', return_value=client), \
+                mock.patch('django.db.transaction.on_commit', side_effect=lambda callback: callback()):
+            behavioral_profiles.mark_dirty('u1', None, 'u2')
+
+        client.sadd.assert_called_once_with(DIRTY_KEY, 'u1', 'u2')
+
+
+class TestDerivations:
+    """Profile fields from one user's aggregates"""
+
+    def test_flags(self):
+        activity = {'operators': 3, 'interactions': 10, 'first_seen': NOW}
+        assert behavioral_profiles._flags({'risk_level': 'severe'}, activity, 3) == [
+            'high_risk', 'multi_operator', 'frequent_reassessment'
+        ]
+        assert behavioral_profiles._flags({'risk_level': 'low'}, None, 0) == []
+
+    def test_daily_frequency(self):
+        activity = {'operators': 1, 'interactions': 45, 'first_seen': NOW - timedelta(days=10)}
+        assert behavioral_profiles._daily_frequency(activity, NOW) == Decimal('4.50')
+        assert behavioral_profiles._daily_frequency(None, NOW) == Decimal('0')
+
+
+def _user(index):
+    return User.objects.create_user(
+        phone_number=f'+2547123510{index:02d}', national_id=f'5100{index:04d}', email=f'profiled{index}@example.com'
+    )
+
+
+def _operator(index):
+    today = date.today()
+    return Operator.objects.create(
+        name=f'Profiled Bets {index}', registration_number=f'REG-P{index}', operator_code=f'OP-P{index}',
+        email=f'profiled-op{index}@example.com', phone=f'+2547000051{index:02d}', license_number=f'LIC-P{index}',
+        license_type='online_betting', license_issued_date=today, license_expiry_date=today + timedelta(days=365)
+    )
+
+
+@pytest.mark.django_db
+class TestRecomputeBatch:
+    """Grouped aggregates and bulk writes for one batch"""
+
+    def test_creates_and_updates_profiles(self):
+        risky, quiet = _user(1), _user(2)
+        RiskScore.objects.create(user=risky, risk_level='severe', risk_score=Decimal('21.00'), score_source='pgsi')
+        token = BSTToken.objects.create(user=risky, phone_number_hash='profile-hash-1')
+        for index in range(3):
+            BSTMapping.objects.create(bst_token=token, operator=_operator(index), interaction_count=10)
+        BehavioralProfile.objects.create(user=quiet, overall_risk_score=Decimal('9.00'), anomaly_flags=['high_risk'])
+        now = timezone.now() + timedelta(days=10)
+
+        assert behavioral_profiles.recompute_batch([risky.pk, quiet.pk], now=now) == 2
+
+        profile = BehavioralProfile.objects.get(user=risky)
+        assert profile.overall_risk_score == Decimal('21.00')
+        assert profile.betting_frequency_daily == Decimal('3.00')  # 30 interactions over 10 days
+        assert profile.anomaly_flags == ['high_risk', 'multi_operator']
+        assert profile.last_analyzed_at == now
+
+        profile = BehavioralProfile.objects.get(user=quiet)
+        assert profile.overall_risk_score == Decimal('0')
+        assert profile.anomaly_flags == []
+
+    def test_only_current_risk_scores_count(self):
+        user = _user(3)
+        RiskScore.objects.create(user=user, risk_level='critical', risk_score=Decimal('25.00'),
+                                 score_source='pgsi', is_current=False)
+        RiskScore.objects.create(user=user, risk_level='low', risk_score=Decimal('2.00'), score_source='pgsi')
+
+        behavioral_profiles.recompute_batch([user.pk])
+
+        profile = BehavioralProfile.objects.get(user=user)
+        assert profile.overall_risk_score == Decimal('2.00')
+        assert 'high_risk' not in profile.anomaly_flags
+
+
+@pytest.mark.django_db
+class TestUpdateProfilesWithoutRedis:
+    """The dirty set is derived from activity newer than the last analysis"""
+
+    def test_derives_dirty_users_from_activity(self):
+        first, second = _user(4), _user(5)
+        with mock.patch.object(behavioral_profiles, 'get_redis_client', return_value=None):
+            behavioral_profiles.update_profiles(batch_size=1)
+            assert BehavioralProfile.objects.filter(user__in=[first, second]).count() == 2
+
+            RiskScore.objects.create(user=second, risk_level='high', risk_score=Decimal('12.00'), score_source='pgsi')
+            result = behavioral_profiles.update_profiles()
+
+        assert result == {'updated': 1, 'dirty': 1}
+        assert BehavioralProfile.objects.get(user=second).anomaly_flags == ['high_risk']
+        assert BehavioralProfile.objects.get(user=first).anomaly_flags == []
+
+
+@pytest.mark.django_db
+class TestRecordActivity:
+    """BST activity marks the token's user dirty"""
+
+    def test_marks_user_without_loading_the_token(self, django_assert_num_queries, django_capture_on_commit_callbacks):
+        user = _user(6)
+        token = BSTToken.objects.create(user=user, phone_number_hash='profile-hash-6')
+        mapping = BSTMapping.objects.create(bst_token=token, operator=_operator(6))
+        mapping = BSTMapping.objects.get(pk=mapping.pk)
+
+        client = mock.Mock()
+        with mock.patch.object(behavioral_profiles, 'get_redis_client', return_value=client), \
+                django_capture_on_commit_callbacks(execute=True):
+            with django_assert_num_queries(1):
+                mapping.record_activity('bet', user_id=user.pk)
+
+        client.sadd.assert_called_once_with(DIRTY_KEY, str(user.pk))
+        assert BSTMapping.objects.get(pk=mapping.pk).interaction_count == 1
@@ -0,0 +1,181 @@
+"""
+Test cases for the question bank cache
+Two-tier lookup, versioned invalidation and in-memory next question with the
+database mocked, then banks built from stored questions and the views using them
+"""
+from unittest import mock
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.screening import question_bank
+from apps.screening.models import AssessmentQuestion, AssessmentSession
+from apps.screening.question_bank import QuestionBank
+from apps.screening.serializers import AssessmentQuestionSerializer
+from apps.screening.views import NextQuestionView, QuestionsByTypeView
+from apps.users.models import User
+
+cache = LocMemCache('screening-question-bank-tests', {})
+
+
+def _bank(assessment_type, version):
+    ids = ('q1', 'q2', 'q3')
+    return QuestionBank(assessment_type, version, ids, {
+        'en': tuple({'id': question_id, 'question_text': f'{question_id} en'} for question_id in ids),
+        'sw': tuple({'id': question_id, 'question_text': f'{question_id} sw'} for question_id in ids),
+    })
+
+
+class TestGetBank:
+    """Built once, shared through Redis, rebuilt after an edit"""
+
+    def setup_method(self):
+        cache.clear()
+        question_bank._local_cache.clear()
+
+    def _get(self, assessment_type='pgsi'):
+        with mock.patch.object(question_bank, 'cache', cache), \
+                mock.patch.object(question_bank, 'build_bank', side_effect=_bank) as build_bank:
+            bank = question_bank.get_bank(assessment_type)
+        return bank, build_bank.call_count
+
+    def test_built_once(self):
+        first, builds = self._get()
+        assert builds == 1
+
+        assert self._get() == (first, 0)  # this process
+        question_bank._local_cache.clear()
+        assert self._get() == (first, 0)  # another process, via Redis
+
+    def test_alias(self):
+        bank, _ = self._get('lie_bet')
+        assert bank.assessment_type == 'liebet'
+
+    def test_edit_starts_new_version(self):
+        old, _ = self._get()
+        with mock.patch.object(question_bank, 'cache', cache), \
+                mock.patch('django.db.transaction.on_commit', side_effect=lambda callback: callback()), \
+                mock.patch.object(question_bank._listener, 'publish') as publish:
+            question_bank.invalidate('pgsi', None)
+        publish.assert_called_once_with(['pgsi'])
+
+        question_bank._local_cache.clear()  # done by the listener in every process
+        new, builds = self._get()
+        assert builds == 1 and new.version == old.version + 1
+        assert cache.get(question_bank.bank_cache_key('pgsi', old.version)) == old  # never overwritten
+
+    def test_cache_unavailable(self):
+        broken = mock.Mock(get=mock.Mock(side_effect=ConnectionError('down')))
+        with mock.patch.object(question_bank, 'cache', broken), \
+                mock.patch.object(question_bank, 'build_bank', side_effect=_bank):
+            assert question_bank.get_bank('dsm5').version is None
+
+
+class TestNextQuestion:
+    """Picked in memory from the answered set"""
+
+    def test_first_unanswered_in_order(self):
+        bank = _bank('pgsi', 1)
+        assert question_bank.next_question(bank, [])['id'] == 'q1'
+        assert question_bank.next_question(bank, ['q1', 'q3'])['id'] == 'q2'
+        assert question_bank.next_question(bank, ['q1', 'q2', 'q3']) is None
+
+    def test_language(self):
+        bank = _bank('pgsi', 1)
+        assert question_bank.next_question(bank, ['q1'], 'sw')['question_text'] == 'q2 sw'
+        assert question_bank.questions(bank, 'fr')[0]['question_text'] == 'q1 en'
+
+
+def _question(number, assessment_type='pgsi', **fields):
+    return AssessmentQuestion.objects.create(
+        question_code=f'{assessment_type.upper()}-BANK-{number}', assessment_type=assessment_type,
+        question_number=number, question_text_en=f'Question {number}', response_type='frequency', max_score=3,
+        **fields
+    )
+
+
+@pytest.mark.django_db
+class TestBankAgainstDatabase:
+    """Banks built from stored questions"""
+
+    @pytest.fixture(autouse=True)
+    def shared_cache(self):
+        cache.clear()
+        question_bank._local_cache.clear()
+        with mock.patch.object(question_bank, 'cache', cache):
+            yield
+        question_bank._local_cache.clear()
+
+    @pytest.fixture
+    def user(self):
+        return User.objects.create_user(
+            phone_number='+254712352001', national_id='52000001', email='banked@example.com'
+        )
+
+    def test_builds_active_questions_in_order(self):
+        second = _question(2)
+        first = _question(1, question_text_sw='Swali 1')
+        _question(3, is_active=False)
+
+        bank = question_bank.get_bank('pgsi')
+
+        assert bank.ids == (str(first.id), str(second.id))
+        # Same text as AssessmentQuestionSerializer gives a Swahili reader (blank translations stay blank)
+        reader = mock.Mock(user=mock.Mock(language='sw'))
+        assert question_bank.questions(bank, 'sw') == AssessmentQuestionSerializer(
+            [first, second], many=True, context={'request': reader}
+        ).data
+        assert [payload['question_text'] for payload in question_bank.questions(bank, 'sw')] == ['Swali 1', '']
+        assert [payload['question_text'] for payload in question_bank.questions(bank)] == ['Question 1', 'Question 2']
+        assert question_bank.questions(bank)[0]['question_code'] == 'PGSI-BANK-1'
+
+    def test_next_question_uses_the_warm_bank(self, user):
+        first, second = _question(1), _question(2)
+        session = AssessmentSession.objects.create(user=user, assessment_type='pgsi', session_reference='S-BANK-1')
+        session.responses.create(question=first, response_value='never', score=0)
+        question_bank.get_bank('pgsi')
+
+        request = APIRequestFactory().post('/api/v1/screening/questions/next/', {'session_id': str(session.id)})
+        force_authenticate(request, user=user)
+        with CaptureQueriesContext(connection) as queries:
+            response = NextQuestionView.as_view()(request)
+
+        assert response.status_code == 200
+        assert response.data['data']['id'] == str(second.id)
+        assert not any('screening_assessment_questions' in query['sql'] for query in queries.captured_queries)
+
+    def test_question_save_rebuilds_the_bank(self, django_capture_on_commit_callbacks):
+        question = _question(1)
+        old = question_bank.get_bank('pgsi')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            question.question_text_en = 'Reworded'
+            question.save()
+            added = _question(2)
+
+        new = question_bank.get_bank('pgsi')
+        assert new.version > old.version
+        assert new.ids == (str(question.id), str(added.id))
+        assert question_bank.questions(new)[0]['question_text'] == 'Reworded'
+
+    def test_unknown_type_is_rejected_before_the_cache(self, user):
+        request = APIRequestFactory().get('/api/v1/screening/questions/type/bogus/')
+        force_authenticate(request, user=user)
+
+        response = QuestionsByTypeView.as_view()(request, assessment_type='bogus')
+
+        assert response.status_code == 400
+        assert cache.get(question_bank.version_cache_key('bogus')) is None
+
+    def test_alias_is_accepted(self, user):
+        _question(1, assessment_type='liebet')
+        request = APIRequestFactory().get('/api/v1/screening/questions/type/lie_bet/')
+        force_authenticate(request, user=user)
+
+        response = QuestionsByTypeView.as_view()(request, assessment_type='lie_bet')
+
+        assert response.status_code == 200
+        assert [payload['question_code'] for payload in response.data['data']] == ['LIEBET-BANK-1']
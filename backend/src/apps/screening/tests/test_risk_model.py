@@ -0,0 +1,176 @@
+"""
+Test cases for the ML risk model pipeline
+Chunked training, artifact storage and batched inference, with the database mocked
+except for answer scoring (training tests are skipped where numpy/scikit-learn are
+not installed)
+"""
+import uuid
+from unittest import mock
+
+import pytest
+from django.core.files.storage import FileSystemStorage
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.screening import risk_model, scoring
+from apps.screening.models import AssessmentQuestion
+from apps.screening.risk_model import ModelUnavailable
+from apps.screening.scoring import ScoringError
+from apps.screening.views import MLRiskPredictionView
+from apps.users.models import User
+
+COLUMNS = {('liebet', 1): 0, ('liebet', 2): 1}
+
+
+def _sessions(count):
+    """(session_id, risk_level) pairs and their responses: both answers 'yes' means high risk"""
+    sessions, rows = [], []
+    for index in range(count):
+        session_id = uuid.uuid4()
+        answers = (index % 2, (index // 2) % 2)
+        sessions.append((session_id, 'high' if sum(answers) else 'none'))
+        rows.extend((session_id, 'liebet', number, score) for number, score in enumerate(answers, start=1))
+    return sessions, rows
+
+
+@pytest.fixture
+def storage(tmp_path):
+    risk_model._local_cache.clear()
+    with mock.patch.object(risk_model, 'default_storage', FileSystemStorage(location=str(tmp_path))) as storage:
+        yield storage
+    risk_model._local_cache.clear()
+
+
+def _train(sessions, rows, chunk_size):
+    chunks = [sessions[start:start + chunk_size] for start in range(0, len(sessions), chunk_size)]
+    widths = []
+
+    def response_rows(session_ids):
+        widths.append(len(session_ids))
+        wanted = set(session_ids)
+        return [row for row in rows if row[0] in wanted]
+
+    with mock.patch.object(risk_model, 'feature_columns', return_value=COLUMNS), \
+            mock.patch.object(risk_model, '_labelled_sessions', return_value=iter(chunks)), \
+            mock.patch.object(risk_model, '_response_rows', side_effect=response_rows):
+        return risk_model.train(chunk_size=chunk_size), widths
+
+
+class TestLoadModel:
+    """Serving without a trained model"""
+
+    def test_no_model_trained(self, storage):
+        with pytest.raises(ModelUnavailable):
+            risk_model.load_model()
+
+
+class TestSaveArtifact:
+    """Replacing the latest.json pointer"""
+
+    def test_pointer_is_never_missing(self, storage):
+        risk_model.save_artifact({'version': 'v1'})
+        pointer = 'ml_models/risk/latest.json'
+        seen = []
+
+        def check(method):
+            def checked(*args, **kwargs):
+                seen.append(storage.exists(pointer))
+                return method(*args, **kwargs)
+            return checked
+
+        with mock.patch.object(storage, 'save', check(storage.save)), \
+                mock.patch.object(storage, 'delete', check(storage.delete)), \
+                mock.patch.object(risk_model.os, 'replace', check(risk_model.os.replace)):
+            risk_model.save_artifact({'version': 'v2'})
+
+        assert seen and all(seen)
+        assert risk_model.load_model()['version'] == 'v2'
+        assert sorted(storage.listdir('ml_models/risk')[1]) == ['latest.json', 'v1.pkl', 'v2.pkl']
+
+
+class TestTraining:
+    """Incremental fit over chunks, versioned artifact"""
+
+    def test_trains_chunk_by_chunk_and_stores_artifact(self, storage):
+        pytest.importorskip('sklearn')
+        sessions, rows = _sessions(400)
+        metadata, widths = _train(sessions, rows, chunk_size=50)
+
+        assert widths == [50] * 8  # never more than one chunk in memory
+        assert metadata['samples'] == 400 and metadata['features'] == 2
+        assert metadata['progressive_accuracy'] > 0.5
+
+        artifact = risk_model.load_model()
+        assert artifact['version'] == metadata['version']
+        assert artifact['columns'] == list(COLUMNS)
+        assert storage.exists(f"ml_models/risk/{metadata['version']}.pkl")
+
+    def test_nothing_to_train_on(self, storage):
+        pytest.importorskip('sklearn')
+        with pytest.raises(ModelUnavailable):
+            _train([], [], chunk_size=10)
+
+
+class TestPrediction:
+    """One predict_proba call per request"""
+
+    def test_batched_predictions(self, storage):
+        np = pytest.importorskip('numpy')
+        pytest.importorskip('sklearn')
+        sessions, rows = _sessions(400)
+        _train(sessions, rows, chunk_size=100)
+        artifact = risk_model.load_model()
+
+        matrix = np.array([[1, 1], [0, 0]], dtype=np.float32)
+        with mock.patch.object(artifact['model'], 'predict_proba', wraps=artifact['model'].predict_proba) as predict_proba:
+            high, low = risk_model._predictions(artifact, matrix)
+
+        predict_proba.assert_called_once()
+        assert high['predicted_risk_level'] == 'high'
+        assert high['predicted_risk_score'] > low['predicted_risk_score']
+        assert {factor['factor'] for factor in high['contributing_factors']} <= {'liebet_q1', 'liebet_q2'}
+        assert high['model_version'] == artifact['version']
+
+
+@pytest.mark.django_db
+class TestPredictAnswers:
+    """Answers are matched to questions whatever the UUID spelling"""
+
+    @pytest.fixture
+    def questions(self, storage):
+        pytest.importorskip('sklearn')
+        scoring._local_cache.clear()
+        questions = [
+            AssessmentQuestion.objects.create(
+                question_code=f'LIEBET-{number}', assessment_type='liebet', question_number=number,
+                question_text_en=f'Question {number}'
+            )
+            for number in (1, 2)
+        ]
+        _train(*_sessions(400), chunk_size=100)
+        yield questions
+        scoring._local_cache.clear()
+
+    def test_uuid_spellings_are_normalized(self, questions):
+        first, second = questions
+        prediction = risk_model.predict_answers([
+            (str(first.id).upper(), 'yes'), (first.id.hex, 'yes'), (second.id.hex.upper(), 'yes')
+        ])
+        assert prediction['predicted_risk_level'] == 'high'
+
+    def test_invalid_and_unknown_questions(self, questions):
+        with pytest.raises(ScoringError):
+            risk_model.predict_answers([('not-a-uuid', 'yes')])
+        with pytest.raises(ScoringError):
+            risk_model.predict_answers([(str(questions[0].id), 'yes'), (str(uuid.uuid4()), 'yes')])
+
+    def test_view_returns_400(self, questions):
+        staff = User.objects.create_user(
+            phone_number='+254712345999', national_id='59990001', email='officer@example.com', role='grak_officer'
+        )
+        request = APIRequestFactory().post('/api/v1/screening/ml-predict/', {
+            'assessment_responses': [{'question_id': 'not-a-uuid', 'response_value': 'yes'}]
+        }, format='json')
+        force_authenticate(request, user=staff)
+
+        response = MLRiskPredictionView.as_view()(request)
+        assert response.status_code == 400
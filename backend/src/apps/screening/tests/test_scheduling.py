@@ -0,0 +1,146 @@
+"""
+Test cases for the quarterly screening scheduler
+Keyset chunking and checkpoint resume with the database calls mocked,
+then whole runs against real users
+"""
+from datetime import date, timedelta
+from unittest import mock
+
+import pytest
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils import timezone
+
+from apps.core.models import VerificationStatusChoices
+from apps.screening import scheduling
+from apps.screening.models import ScreeningSchedule
+from apps.users.models import User
+
+RUN_DATE = date(2026, 10, 17)
+cache = LocMemCache('screening-scheduling-tests', {})
+
+
+class FakePending:
+    """Stands in for the ordered values_list of unscheduled user ids"""
+
+    def __init__(self, ids, cursor=None):
+        self.ids = sorted(ids)
+        self.cursor = cursor
+        self.windows = []
+
+    def filter(self, pk__gt):
+        return FakePending(self.ids, pk__gt).tracking(self.windows)
+
+    def tracking(self, windows):
+        self.windows = windows
+        return self
+
+    def __getitem__(self, window):
+        remaining = [pk for pk in self.ids if self.cursor is None or pk > self.cursor]
+        self.windows.append(self.cursor)
+        return remaining[window]
+
+
+def _run(ids, created, chunk_size=2, **kwargs):
+    pending = FakePending(ids)
+    unscheduled = mock.Mock()
+    unscheduled.return_value.count.return_value = len(ids)
+    unscheduled.return_value.order_by.return_value.values_list.return_value = pending
+    with mock.patch.object(scheduling, 'unscheduled_users', unscheduled), \
+            mock.patch.object(scheduling, 'schedule_chunk', side_effect=lambda user_ids, due: created.extend(user_ids) or len(user_ids)), \
+            mock.patch.object(scheduling, '_record_metrics'), \
+            mock.patch.object(scheduling, 'cache', cache):
+        return scheduling.schedule_quarterly(run_date=RUN_DATE, chunk_size=chunk_size, **kwargs), pending
+
+
+class TestScheduleQuarterly:
+    """Chunked, resumable scheduling"""
+
+    def setup_method(self):
+        cache.clear()
+
+    def test_schedules_everyone_in_keyset_chunks(self):
+        created = []
+        checkpoint, pending = _run(['a', 'b', 'c', 'd', 'e'], created)
+
+        assert created == ['a', 'b', 'c', 'd', 'e']
+        assert pending.windows == [None, 'b', 'd', 'e']  # pk > last id, no offsets
+        assert checkpoint['status'] == 'done'
+        assert (checkpoint['scheduled'], checkpoint['chunks'], checkpoint['total']) == (5, 3, 5)
+        assert cache.get(scheduling.checkpoint_key(RUN_DATE))['progress'] == 100.0
+
+    def test_resumes_after_checkpoint(self):
+        cache.set(scheduling.checkpoint_key(RUN_DATE), {
+            'run_date': RUN_DATE, 'status': 'running', 'cursor': 'b', 'chunks': 1, 'scheduled': 2,
+            'total': 4, 'duration_seconds': 1.0, 'started_at': '2026-10-17T02:00:00+03:00',
+        })
+        created = []
+        checkpoint, _ = _run(['a', 'b', 'c', 'd'], created)
+
+        assert created == ['c', 'd']
+        assert checkpoint['scheduled'] == 4 and checkpoint['chunks'] == 2
+
+    def test_finished_run_is_not_repeated(self):
+        _run(['a'], [])
+        created = []
+        _run(['a', 'b'], created)
+        assert created == []
+
+        _run(['a', 'b'], created, restart=True)
+        assert created == ['a', 'b']
+
+    def test_anti_join_query(self):
+        sql = str(scheduling.unscheduled_users().query).upper()
+        assert 'NOT EXISTS' in sql
+        assert 'SCREENING_SCHEDULES' in sql
+
+
+def _user(index, verified=True):
+    user = User.objects.create_user(
+        phone_number=f'+25471235{index:02d}0', national_id=f'5035{index:04d}', email=f'scheduled{index}@example.com'
+    )
+    if verified:
+        User.objects.filter(pk=user.pk).update(
+            is_phone_verified=True, is_id_verified=True, verification_status=VerificationStatusChoices.VERIFIED
+        )
+    return user
+
+
+@pytest.mark.django_db
+class TestScheduleQuarterlyAgainstDatabase:
+    """The anti-join and bulk insert on real users"""
+
+    def setup_method(self):
+        cache.clear()
+
+    def test_schedules_only_verified_users_without_an_upcoming_screening(self):
+        unscheduled = [_user(index) for index in range(3)]
+        booked = _user(3)
+        ScreeningSchedule.objects.create(
+            user=booked, schedule_type='quarterly', due_date=timezone.now() + timedelta(days=30), status='pending'
+        )
+        overdue = _user(4)
+        ScreeningSchedule.objects.create(
+            user=overdue, schedule_type='quarterly', due_date=timezone.now() - timedelta(days=1), status='pending'
+        )
+        unverified = _user(5, verified=False)
+
+        with mock.patch.object(scheduling, 'cache', cache):
+            checkpoint = scheduling.schedule_quarterly(run_date=RUN_DATE, chunk_size=2)
+
+        assert checkpoint['status'] == 'done'
+        assert checkpoint['scheduled'] == checkpoint['total'] == 4
+        for user in unscheduled + [overdue]:
+            assert user.screening_schedules.filter(status='pending', due_date__gte=timezone.now()).count() == 1
+        assert booked.screening_schedules.count() == 1
+        assert not unverified.screening_schedules.exists()
+
+    def test_second_run_creates_nothing(self):
+        for index in range(3):
+            _user(10 + index)
+
+        with mock.patch.object(scheduling, 'cache', cache):
+            scheduling.schedule_quarterly(run_date=RUN_DATE)
+            checkpoint = scheduling.schedule_quarterly(run_date=RUN_DATE, restart=True)
+
+        assert checkpoint['scheduled'] == checkpoint['total'] == 0
+        assert ScreeningSchedule.objects.count() == 3
@@ -0,0 +1,232 @@
+"""
+Test cases for the risk scoring engine
+Compiled lookup tables and band classification in memory; response upserts,
+session completion and batch scoring against the database
+"""
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+
+from apps.screening import scoring
+from apps.screening.models import AssessmentQuestion, AssessmentResponse, AssessmentSession, RiskScore
+from apps.screening.scoring import DEFAULT_BANDS, Instrument, ScoringError
+from apps.users.models import User
+
+NOW = datetime(2026, 10, 17, 3, 30, tzinfo=dt_timezone.utc)
+
+
+def _question(number, response_type='yes_no', options=None, max_score=1, assessment_type='pgsi'):
+    return AssessmentQuestion(
+        id=uuid.uuid4(), question_code=f'{assessment_type}-{number}', assessment_type=assessment_type,
+        question_number=number, response_type=response_type, max_score=max_score,
+        response_options={'options': options} if options else {}
+    )
+
+
+def _pgsi(count=3):
+    questions = [_question(number, 'frequency') for number in range(1, count + 1)]
+    return Instrument('pgsi', questions, DEFAULT_BANDS['pgsi']), questions
+
+
+def _session(assessment_type='pgsi'):
+    return AssessmentSession(
+        id=uuid.uuid4(), user_id=uuid.uuid4(), assessment_type=assessment_type,
+        session_reference=f'S-{uuid.uuid4().hex[:8]}'
+    )
+
+
+class TestInstrument:
+    """Lookup table and bands"""
+
+    def test_table_scores(self):
+        options = [{'value': 'A', 'score': 2}, {'value': 'b', 'score': 0.5}]
+        yes_no, custom = _question(1, max_score=2), _question(2, 'choice', options)
+        instrument = Instrument('custom', [yes_no, custom], ())
+
+        assert instrument.score(str(yes_no.id), ' Yes ') == Decimal('2')
+        assert instrument.score(str(custom.id), 'a') == Decimal('2')
+        assert instrument.score(str(custom.id), 'B') == Decimal('0.5')
+        assert instrument.score(str(custom.id), 'unlisted') == Decimal('0')
+
+    def test_options_override_type_defaults(self):
+        question = _question(1, 'frequency', [{'value': 'sometimes', 'score': 2}])
+        instrument = Instrument('pgsi', [question], ())
+        assert instrument.score(str(question.id), 'sometimes') == Decimal('2')
+        assert instrument.score(str(question.id), 'almost_always') == Decimal('3')
+
+    @pytest.mark.parametrize('assessment_type,total,level,exclude', [
+        ('liebet', 0, 'none', False), ('liebet', 2, 'high', True),
+        ('pgsi', 0, 'none', False), ('pgsi', 2, 'low', False), ('pgsi', 3, 'moderate', False),
+        ('pgsi', 7, 'moderate', False), ('pgsi', 8, 'high', True), ('pgsi', 27, 'high', True),
+        ('dsm5', 1, 'none', False), ('dsm5', 3, 'mild', False), ('dsm5', 5, 'moderate', False),
+        ('dsm5', 6, 'severe', True),
+    ])
+    def test_default_bands_match_published_cut_offs(self, assessment_type, total, level, exclude):
+        band = Instrument(assessment_type, [], DEFAULT_BANDS[assessment_type]).classify(total)
+        assert (band.risk_level, band.should_self_exclude) == (level, exclude)
+
+    def test_instrument_without_bands(self):
+        assert Instrument('behavioral', [], ()).classify(12).risk_level == 'none'
+
+
+class TestInstrumentCache:
+    """Compiled once per process, recompiled after invalidation"""
+
+    def setup_method(self):
+        scoring._local_cache.clear()
+
+    def test_compiled_once(self):
+        instrument, _ = _pgsi()
+        with mock.patch.object(scoring, 'compile_instrument', return_value=instrument) as compile_instrument:
+            assert scoring.get_instrument('pgsi') is instrument
+            assert scoring.get_instrument('pgsi') is instrument
+        compile_instrument.assert_called_once_with('pgsi')
+
+    def test_alias_shares_instrument(self):
+        with mock.patch.object(scoring, 'compile_instrument', side_effect=lambda t: Instrument(t, [], ())) as compile_instrument:
+            assert scoring.get_instrument('lie_bet').assessment_type == 'liebet'
+            scoring.get_instrument('liebet')
+        compile_instrument.assert_called_once_with('liebet')
+
+    def test_invalidate_after_commit(self):
+        scoring._local_cache.set('pgsi', object())
+        with mock.patch('django.db.transaction.on_commit', side_effect=lambda callback: callback()), \
+                mock.patch.object(scoring._listener, 'publish') as publish:
+            scoring.invalidate('pgsi', 'pgsi', None, 'lie_bet')
+        publish.assert_called_once_with(['liebet', 'pgsi'])
+
+
+class TestUnknownQuestion:
+    """Answers outside the instrument are rejected before anything is written"""
+
+    @pytest.mark.parametrize('question_id', ['not-a-uuid', uuid.uuid4()])
+    def test_unknown_question(self, question_id):
+        instrument, _ = _pgsi()
+        with mock.patch.object(scoring, 'get_instrument', return_value=instrument), \
+                pytest.raises(ScoringError):
+            scoring.save_responses(_session(), [(question_id, 'never')], now=NOW)
+
+
+@pytest.fixture
+def pgsi_questions():
+    scoring._local_cache.clear()
+    questions = [
+        AssessmentQuestion.objects.create(
+            question_code=f'PGSI-{number}', assessment_type='pgsi', question_number=number,
+            question_text_en=f'Question {number}', response_type='frequency', max_score=3
+        )
+        for number in (1, 2, 3)
+    ]
+    yield questions
+    scoring._local_cache.clear()
+
+
+def _user(index):
+    return User.objects.create_user(
+        phone_number=f'+2547123480{index:02d}', national_id=f'8000{index:04d}', email=f'scored{index}@example.com'
+    )
+
+
+def _stored_session(user, reference):
+    return AssessmentSession.objects.create(user=user, session_reference=reference, assessment_type='pgsi')
+
+
+@pytest.mark.django_db
+class TestSaveResponses:
+    """One pass, one upsert, stored rows returned"""
+
+    def test_scores_in_answer_order_keeping_last_answer(self, pgsi_questions):
+        session = _stored_session(_user(1), 'S-ORDER')
+        first, second, _ = pgsi_questions
+        responses = scoring.save_responses(session, [
+            (first.id, 'sometimes'), (str(second.id).upper(), 'almost_always'), (first.id, 'most_of_time')
+        ], now=NOW)
+
+        assert [(response.question, response.score) for response in responses] == [
+            (first, Decimal('2')), (second, Decimal('3'))
+        ]
+        assert AssessmentResponse.objects.filter(session=session).count() == 2
+
+    def test_reanswer_returns_the_stored_row(self, pgsi_questions):
+        session = _stored_session(_user(2), 'S-REANSWER')
+        question = pgsi_questions[0]
+        original, = scoring.save_responses(session, [(question.id, 'sometimes')])
+        changed, = scoring.save_responses(session, [(question.id, 'almost_always')])
+
+        stored = AssessmentResponse.objects.get(session=session, question=question)
+        assert changed.id == original.id == stored.id
+        assert changed.created_at == stored.created_at
+        assert (stored.response_value, stored.score) == ('almost_always', Decimal('3'))
+
+
+@pytest.mark.django_db
+class TestCompleteSession:
+    """Stored responses totalled, banded and recorded as the current risk score"""
+
+    def test_band_and_current_risk_score(self, pgsi_questions):
+        user = _user(3)
+        earlier = RiskScore.objects.create(
+            user=user, risk_level='low', risk_score=1, score_source='pgsi', is_current=True
+        )
+        session = _stored_session(user, 'S-COMPLETE')
+        scoring.save_responses(session, [(question.id, 'almost_always') for question in pgsi_questions])
+
+        band, risk_score = scoring.complete_session(session, now=NOW)
+
+        session.refresh_from_db()
+        assert (band.risk_level, band.should_self_exclude) == ('high', True)
+        assert (session.status, session.raw_score, session.risk_level) == ('completed', Decimal('9'), 'high')
+        assert list(RiskScore.objects.filter(user=user, is_current=True)) == [risk_score]
+        earlier.refresh_from_db()
+        assert not earlier.is_current
+
+
+@pytest.mark.django_db
+class TestScoreSessions:
+    """Many complete answer sets in a fixed number of statements"""
+
+    def test_new_and_stored_sessions(self, pgsi_questions, django_assert_max_num_queries):
+        first_user, second_user = _user(4), _user(5)
+        stored = _stored_session(second_user, 'S-STORED')
+        scoring.save_responses(stored, [(pgsi_questions[0].id, 'almost_always')])
+        first = AssessmentSession(user=first_user, session_reference='S-NEW-1', assessment_type='pgsi')
+        second = AssessmentSession(user=first_user, session_reference='S-NEW-2', assessment_type='pgsi')
+        scored = [
+            (first, [(question.id, 'almost_always') for question in pgsi_questions]),
+            (second, [(pgsi_questions[0].id, 'sometimes')]),
+            (stored, [(pgsi_questions[0].id, 'never')]),
+        ]
+
+        with mock.patch('apps.screening.behavioral_profiles.mark_dirty') as mark_dirty, \
+                django_assert_max_num_queries(8):
+            bands = scoring.score_sessions(scored, now=NOW)
+
+        assert [band.risk_level for band in bands] == ['high', 'low', 'none']
+        assert dict(AssessmentSession.objects.values_list('session_reference', 'raw_score')) == {
+            'S-NEW-1': Decimal('9'), 'S-NEW-2': Decimal('1'), 'S-STORED': Decimal('0')
+        }
+        assert AssessmentResponse.objects.get(session=stored).response_value == 'never'
+        assert AssessmentResponse.objects.count() == 5
+        # a user with two sessions in the batch keeps only the last as current
+        assert list(RiskScore.objects.filter(is_current=True).order_by('risk_score').values_list(
+            'user_id', 'risk_score'
+        )) == [(second_user.id, Decimal('0')), (first_user.id, Decimal('1'))]
+        assert set(mark_dirty.call_args.args) == {first_user.id, second_user.id}
+
+    def test_import_command(self, pgsi_questions, tmp_path):
+        user = _user(6)
+        rows = ['session_reference,user_id,assessment_type,question_id,response_value']
+        rows += [f'P-1,{user.id},pgsi,{question.id},almost_always' for question in pgsi_questions]
+        rows += [f'P-2,{user.id},pgsi,{pgsi_questions[0].id},never']
+        path = tmp_path / 'answers.csv'
+        path.write_text('\n'.join(rows) + '\n')
+
+        call_command('import_paper_assessments', str(path), '--chunk-size', '1', stdout=mock.Mock())
+
+        sessions = dict(AssessmentSession.objects.values_list('session_reference', 'risk_level'))
+        assert sessions == {'P-1': 'high', 'P-2': 'none'}
+        assert AssessmentSession.objects.get(session_reference='P-1').metadata == {'source': 'paper'}
@@ -7,6 +7,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import action
+from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
 
@@ -22,10 +23,19 @@ from .serializers import (
     SubmitResponseSerializer, BatchSubmitResponsesSerializer,
     CalculateRiskScoreSerializer, MLRiskPredictionSerializer
 )
+from . import question_bank
+from .risk_model import ModelUnavailable, predict_answers, predict_users
+from .scoring import ALIASES, ScoringError, complete_session, save_responses
+from apps.core.models import AssessmentTypeChoices
 from apps.api.permissions import IsGRAKStaff, CanScreenUser
 from apps.api.mixins import TimingMixin, SuccessResponseMixin
 
 
+def _language(request):
+    """Question language of the requesting user (as AssessmentQuestionSerializer picks it)"""
+    return getattr(request.user, 'language', question_bank.DEFAULT_LANGUAGE)
+
+
 class AssessmentSessionViewSet(TimingMixin, viewsets.ModelViewSet):
     """Assessment session CRUD"""
     permission_classes = [IsAuthenticated]
@@ -63,16 +73,13 @@ class StartAssessmentView(TimingMixin, SuccessResponseMixin, APIView):
             status='in_progress'
         )
         
-        # Get questions for this assessment type
-        questions = AssessmentQuestion.objects.filter(
-            assessment_type=session.assessment_type,
-            is_active=True
-        ).order_by('question_number')
+        # Questions for this assessment type, from the cached question bank
+        bank = question_bank.get_bank(session.assessment_type)
         
         return self.success_response(
             data={
                 'session': AssessmentSessionDetailSerializer(session).data,
-                'questions': AssessmentQuestionSerializer(questions, many=True, context={'request': request}).data
+                'questions': question_bank.questions(bank, _language(request))
             },
             message='Assessment started',
             status_code=status.HTTP_201_CREATED
@@ -96,28 +103,13 @@ class SubmitResponseView(TimingMixin, SuccessResponseMixin, APIView):
                 status_code=status.HTTP_403_FORBIDDEN
             )
         
-        question = AssessmentQuestion.objects.get(id=serializer.validated_data['question_id'])
-        
-        # Calculate score based on response
-        response_value = serializer.validated_data['response_value']
-        score = 0
-        
-        if question.response_options and 'options' in question.response_options:
-            for option in question.response_options['options']:
-                if option['value'] == response_value:
-                    score = option.get('score', 0)
-                    break
-        
-        # Create or update response
-        response, created = AssessmentResponse.objects.update_or_create(
-            session=session,
-            question=question,
-            defaults={
-                'response_value': response_value,
-                'score': score,
-                'answered_at': timezone.now()
-            }
-        )
+        try:
+            response, = save_responses(session, [(
+                serializer.validated_data['question_id'],
+                serializer.validated_data['response_value']
+            )])
+        except ScoringError as e:
+            return self.error_response(message=str(e), status_code=status.HTTP_400_BAD_REQUEST)
         
         return self.success_response(
             data=AssessmentResponseSerializer(response).data,
@@ -142,31 +134,14 @@ class BatchSubmitResponsesView(TimingMixin, SuccessResponseMixin, APIView):
                 status_code=status.HTTP_403_FORBIDDEN
             )
         
-        responses_data = serializer.validated_data['responses']
-        created_responses = []
-        
-        for resp_data in responses_data:
-            question = AssessmentQuestion.objects.get(id=resp_data['question_id'])
-            response_value = resp_data['response_value']
-            
-            # Calculate score
-            score = 0
-            if question.response_options and 'options' in question.response_options:
-                for option in question.response_options['options']:
-                    if option['value'] == response_value:
-                        score = option.get('score', 0)
-                        break
-            
-            response, _ = AssessmentResponse.objects.update_or_create(
-                session=session,
-                question=question,
-                defaults={
-                    'response_value': response_value,
-                    'score': score,
-                    'answered_at': timezone.now()
-                }
-            )
-            created_responses.append(response)
+        # Scored in one pass from the compiled instrument, upserted in one statement
+        try:
+            created_responses = save_responses(session, [
+                (resp_data['question_id'], resp_data['response_value'])
+                for resp_data in serializer.validated_data['responses']
+            ])
+        except ScoringError as e:
+            return self.error_response(message=str(e), status_code=status.HTTP_400_BAD_REQUEST)
         
         return self.success_response(
             data={
@@ -194,81 +169,18 @@ class CalculateRiskScoreView(TimingMixin, SuccessResponseMixin, APIView):
                 status_code=status.HTTP_403_FORBIDDEN
             )
         
-        # Calculate total score
-        responses = session.responses.all()
-        total_score = sum(r.score for r in responses)
-        
-        # Determine risk level based on assessment type
-        risk_level = 'none'
-        should_self_exclude = False
-        
-        if session.assessment_type == 'lie_bet':
-            if total_score >= 1:
-                risk_level = 'high'
-                should_self_exclude = True
-        elif session.assessment_type == 'pgsi':
-            if total_score == 0:
-                risk_level = 'none'
-            elif total_score <= 2:
-                risk_level = 'low'
-            elif total_score <= 7:
-                risk_level = 'moderate'
-            else:
-                risk_level = 'high'
-                should_self_exclude = True
-        elif session.assessment_type == 'dsm5':
-            if total_score <= 1:
-                risk_level = 'none'
-            elif total_score <= 3:
-                risk_level = 'mild'
-            elif total_score <= 5:
-                risk_level = 'moderate'
-            else:
-                risk_level = 'severe'
-                should_self_exclude = True
-        
-        # Update session
-        session.raw_score = total_score
-        session.risk_level = risk_level
-        session.should_self_exclude = should_self_exclude
-        session.status = 'completed'
-        session.completed_at = timezone.now()
-        
-        # Calculate next assessment date
-        from datetime import timedelta
-        if risk_level in ['high', 'severe']:
-            session.next_assessment_due = timezone.now().date() + timedelta(days=30)
-        else:
-            session.next_assessment_due = timezone.now().date() + timedelta(days=90)
-        
-        session.save()
-        
-        # Create risk score record
-        risk_score = RiskScore.objects.create(
-            user=session.user,
-            bst_token_id=session.bst_token_id,
-            score_date=timezone.now().date(),
-            risk_level=risk_level,
-            risk_score=total_score,
-            score_source=session.assessment_type,
-            is_current=True
-        )
-        
-        # Mark previous scores as not current
-        RiskScore.objects.filter(
-            user=session.user,
-            is_current=True
-        ).exclude(id=risk_score.id).update(is_current=False)
+        # Total, band and risk score from the compiled instrument (bands in RiskBand)
+        band, risk_score = complete_session(session)
         
         return self.success_response(
             data={
                 'session_id': str(session.id),
-                'raw_score': float(total_score),
-                'risk_level': risk_level,
-                'risk_score': float(total_score),
-                'should_self_exclude': should_self_exclude,
+                'raw_score': float(session.raw_score),
+                'risk_level': band.risk_level,
+                'risk_score': float(risk_score.risk_score),
+                'should_self_exclude': band.should_self_exclude,
                 'ml_prediction': None,
-                'recommendations': self._get_recommendations(risk_level),
+                'recommendations': self._get_recommendations(band.risk_level),
                 'next_assessment_due': str(session.next_assessment_due)
             },
             message='Risk score calculated'
@@ -295,22 +207,48 @@ class MLRiskPredictionView(TimingMixin, SuccessResponseMixin, APIView):
         serializer = MLRiskPredictionSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # Placeholder for ML prediction
-        # In production, this would call actual ML model
-        prediction = {
-            'predicted_risk_score': 0.65,
-            'predicted_risk_level': 'moderate',
-            'confidence_score': 0.82,
-            'contributing_factors': [
-                {'factor': 'betting_frequency', 'weight': 0.35},
-                {'factor': 'loss_chasing', 'weight': 0.28},
-                {'factor': 'late_night_betting', 'weight': 0.22}
-            ],
-            'model_version': 'v1.0.0',
-            'prediction_timestamp': timezone.now().isoformat()
-        }
+        if not getattr(settings, 'SCREENING_SETTINGS', {}).get('ENABLE_ML_PREDICTIONS', True):
+            return self.error_response(
+                message='ML predictions are disabled',
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
         
-        return self.success_response(data=prediction)
+        data = serializer.validated_data
+        now = timezone.now().isoformat()
+        try:
+            if data.get('assessment_responses'):
+                prediction = predict_answers([
+                    (response['question_id'], response['response_value'])
+                    for response in data['assessment_responses']
+                ])
+                return self.success_response(data=dict(prediction, prediction_timestamp=now))
+            
+            # All requested users are scored in one batch
+            user_ids = data.get('user_ids') or [data['user_id']]
+            predictions = predict_users(user_ids)
+        except ModelUnavailable as e:
+            return self.error_response(
+                message=str(e),
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        except ScoringError as e:
+            return self.error_response(message=str(e), status_code=status.HTTP_400_BAD_REQUEST)
+        
+        if 'user_ids' not in data:
+            prediction = predictions[data['user_id']]
+            if prediction is None:
+                return self.error_response(
+                    message='User has no completed assessment',
+                    status_code=status.HTTP_404_NOT_FOUND
+                )
+            return self.success_response(data=dict(prediction, prediction_timestamp=now))
+        
+        return self.success_response(data={
+            'predictions': [
+                dict(prediction or {}, user_id=str(user_id), prediction_timestamp=now)
+                for user_id, prediction in predictions.items()
+            ]
+        })
 
 
 class MyAssessmentsView(TimingMixin, generics.ListAPIView):
@@ -434,34 +372,16 @@ class RespondToQuestionView(TimingMixin, SuccessResponseMixin, APIView):
         
         # Get session and verify ownership
         session = AssessmentSession.objects.get(id=session_id, user=request.user)
-        question = AssessmentQuestion.objects.get(id=question_id)
         
-        # Verify question belongs to assessment type
-        if question.assessment_type != session.assessment_type:
+        # Only questions of the session's instrument can be scored
+        try:
+            response_obj, = save_responses(session, [(question_id, response_value)])
+        except ScoringError:
             return Response({
                 'success': False,
                 'error': {'question_id': 'Question does not belong to this assessment type'}
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Calculate score based on response
-        score = 0
-        if question.response_type == 'yes_no':
-            score = question.max_score if response_value.lower() == 'yes' else 0
-        elif question.response_type == 'frequency':
-            # PGSI scoring: never=0, sometimes=1, most_of_time=2, almost_always=3
-            score_map = {'never': 0, 'sometimes': 1, 'most_of_time': 2, 'almost_always': 3}
-            score = score_map.get(response_value, 0)
-        
-        # Create or update response
-        response_obj, created = AssessmentResponse.objects.update_or_create(
-            session=session,
-            question=question,
-            defaults={
-                'response_value': response_value,
-                'score': score
-            }
-        )
-        
         return self.success_response(
             data=AssessmentResponseSerializer(response_obj).data,
             message='Response recorded successfully'
@@ -519,15 +439,12 @@ class StartLieBetAssessmentView(TimingMixin, SuccessResponseMixin, APIView):
             started_at=timezone.now()
         )
         
-        questions = AssessmentQuestion.objects.filter(
-            assessment_type='lie_bet',
-            is_active=True
-        ).order_by('question_number')
+        bank = question_bank.get_bank('lie_bet')
         
         return self.success_response(
             data={
                 'session': AssessmentSessionDetailSerializer(session).data,
-                'questions': AssessmentQuestionSerializer(questions, many=True, context={'request': request}).data
+                'questions': question_bank.questions(bank, _language(request))
             },
             status_code=status.HTTP_201_CREATED
         )
@@ -548,15 +465,12 @@ class StartPGSIAssessmentView(TimingMixin, SuccessResponseMixin, APIView):
             started_at=timezone.now()
         )
         
-        questions = AssessmentQuestion.objects.filter(
-            assessment_type='pgsi',
-            is_active=True
-        ).order_by('question_number')
+        bank = question_bank.get_bank('pgsi')
         
         return self.success_response(
             data={
                 'session': AssessmentSessionDetailSerializer(session).data,
-                'questions': AssessmentQuestionSerializer(questions, many=True, context={'request': request}).data
+                'questions': question_bank.questions(bank, _language(request))
             },
             status_code=status.HTTP_201_CREATED
         )
@@ -577,15 +491,12 @@ class StartDSM5AssessmentView(TimingMixin, SuccessResponseMixin, APIView):
             started_at=timezone.now()
         )
         
-        questions = AssessmentQuestion.objects.filter(
-            assessment_type='dsm5',
-            is_active=True
-        ).order_by('question_number')
+        bank = question_bank.get_bank('dsm5')
         
         return self.success_response(
             data={
                 'session': AssessmentSessionDetailSerializer(session).data,
-                'questions': AssessmentQuestionSerializer(questions, many=True, context={'request': request}).data
+                'questions': question_bank.questions(bank, _language(request))
             },
             status_code=status.HTTP_201_CREATED
         )
@@ -596,14 +507,15 @@ class QuestionsByTypeView(TimingMixin, SuccessResponseMixin, APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request, assessment_type):
-        questions = AssessmentQuestion.objects.filter(
-            assessment_type=assessment_type,
-            is_active=True
-        ).order_by('question_number')
+        # Validated before get_bank so arbitrary path segments never create cache keys
+        if ALIASES.get(assessment_type, assessment_type) not in AssessmentTypeChoices.values:
+            return self.error_response(
+                message='Unknown assessment type',
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        bank = question_bank.get_bank(assessment_type)
         
-        return self.success_response(
-            data=AssessmentQuestionSerializer(questions, many=True, context={'request': request}).data
-        )
+        return self.success_response(data=question_bank.questions(bank, _language(request)))
 
 
 class NextQuestionView(TimingMixin, SuccessResponseMixin, APIView):
@@ -612,18 +524,16 @@ class NextQuestionView(TimingMixin, SuccessResponseMixin, APIView):
     
     def post(self, request):
         session_id = request.data.get('session_id')
-        session = AssessmentSession.objects.get(pk=session_id, user=request.user)
+        session = AssessmentSession.objects.only('id', 'assessment_type').get(pk=session_id, user=request.user)
         
+        # Picked in memory from the cached bank and the answered set
         answered = session.responses.values_list('question_id', flat=True)
-        next_question = AssessmentQuestion.objects.filter(
-            assessment_type=session.assessment_type,
-            is_active=True
-        ).exclude(id__in=answered).order_by('question_number').first()
+        next_question = question_bank.next_question(
+            question_bank.get_bank(session.assessment_type), answered, _language(request)
+        )
         
         if next_question:
-            return self.success_response(
-                data=AssessmentQuestionSerializer(next_question, context={'request': request}).data
-            )
+            return self.success_response(data=next_question)
         
         return self.success_response(data=None, message='Assessment complete')
 
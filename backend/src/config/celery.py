@@ -41,6 +41,13 @@ app.conf.beat_schedule = {
         'options': {'priority': 8}
     },
     
+    # Rebuild Exclusion Lookup Pre-Filter - Daily at 1:45 AM
+    'rebuild-exclusion-filter': {
+        'task': 'apps.nser.tasks.rebuild_exclusion_filter',
+        'schedule': crontab(hour=1, minute=45),
+        'options': {'priority': 8}
+    },
+    
     # Process Auto-Renewals - Daily at 2:30 AM
     'process-auto-renewals': {
         'task': 'apps.nser.tasks.process_auto_renewals',
@@ -111,6 +118,48 @@ app.conf.beat_schedule = {
         'options': {'priority': 10}  # Highest priority
     },
     
+    # Flush Batched Exclusion Propagations - Every minute
+    'flush-propagation-buffers': {
+        'task': 'apps.nser.tasks.flush_propagation_buffers',
+        'schedule': crontab(minute='*'),
+        'options': {'priority': 10}
+    },
+    
+    # Drain Buffered Audit Logs - Every 10 seconds
+    'flush-audit-log-buffer': {
+        'task': 'apps.compliance.tasks.flush_audit_log_buffer',
+        'schedule': 10.0,
+        'options': {'priority': 8, 'expires': 60}
+    },
+    
+    # Roll Up System Metrics (1m/1h/1d tiers) and Apply Retention - Every 5 minutes
+    'compact-system-metrics': {
+        'task': 'apps.monitoring.tasks.compact_system_metrics',
+        'schedule': crontab(minute='*/5'),
+        'options': {'priority': 5, 'expires': 300}
+    },
+    
+    # Reconcile the Dashboard Snapshot - Every 10 minutes
+    'reconcile-dashboard-snapshot': {
+        'task': 'apps.analytics.tasks.reconcile_dashboard_snapshot',
+        'schedule': crontab(minute='*/10'),
+        'options': {'priority': 5, 'expires': 600}
+    },
+    
+    # Rebuild Daily Fact Tables (today, plus any missed days) - Hourly at :20
+    'update-daily-facts': {
+        'task': 'apps.analytics.tasks.update_daily_facts',
+        'schedule': crontab(minute=20),
+        'options': {'priority': 6, 'expires': 3600}
+    },
+    
+    # Delete Expired Data Export Files - Daily at 4 AM
+    'cleanup-exports': {
+        'task': 'apps.analytics.tasks.cleanup_exports',
+        'schedule': crontab(hour=4, minute=0),
+        'options': {'priority': 8}
+    },
+    
     # Send Scheduled Notifications - Every 5 minutes
     'send-scheduled-notifications': {
         'task': 'apps.notifications.tasks.send_scheduled_notifications',
@@ -1,37 +1,49 @@
 """
 Database Router for Read Replicas
-Routes read queries to replica databases for improved performance
+Routes declared replica-safe reads to the replica while it is healthy and
+caught up (see apps.core.db_routing); everything else uses the primary
 """
+from apps.core.db_routing import PRIMARY, REPLICA, current_state, monitor, replica_configured
+
+
 class ReplicaRouter:
     """
     A router to control database operations on models.
-    Routes all read operations to replica database.
-    Routes all write operations to primary database.
+    Replica-safe reads go to the replica while it is usable; all writes,
+    and reads after a write in the same unit of work, go to the primary.
     """
-    
+
     def db_for_read(self, model, **hints):
         """
-        Attempts to read from replica database
+        Reads from the replica only when declared safe and nothing pins the primary
         """
-        return 'replica'
-    
+        state = current_state()
+        if state is None or not state.replica_depth or state.wrote or state.pinned:
+            return PRIMARY
+        if not replica_configured() or not monitor.is_usable():
+            return PRIMARY
+        return REPLICA
+
     def db_for_write(self, model, **hints):
         """
-        Attempts to write to primary database
+        Writes go to the primary and pin the unit of work to it
         """
-        return 'default'
-    
+        state = current_state()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
     def allow_relation(self, obj1, obj2, **hints):
         """
         Allow relations if both objects are in the same database pool
         """
-        db_set = {'default', 'replica'}
+        db_set = {PRIMARY, REPLICA}
         if obj1._state.db in db_set and obj2._state.db in db_set:
             return True
         return None
-    
+
     def allow_migrate(self, db, app_label, model_name=None, **hints):
         """
         Make sure migrations only happen on primary database
         """
-        return db == 'default'
+        return db == PRIMARY
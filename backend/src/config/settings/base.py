@@ -73,15 +73,18 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.monitoring.request_log.APIRequestLogMiddleware',  # sampled, batched APIRequestLog
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware should be as high as possible
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.db_routing.PrimaryPinningMiddleware',  # read-your-writes when a replica is configured
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.middleware.locale.LocaleMiddleware',
+    'apps.monitoring.query_profiler.QueryProfilerMiddleware',  # no-op unless QUERY_PROFILER_ENABLED
 ]
 
 # CORS Settings are defined in development.py and production.py
@@ -134,6 +137,18 @@ DATABASES['default'].update({
 DATABASES['default'].setdefault('OPTIONS', {})
 DATABASES['default']['OPTIONS'].setdefault('connect_timeout', 10)
 
+# Read replica (optional): serves only reads views declare replica-safe,
+# while its lag is within REPLICA_SETTINGS - see apps/core/db_routing.py
+if env('DATABASE_REPLICA_URL', default=''):
+    DATABASES['replica'] = env.db('DATABASE_REPLICA_URL')
+    DATABASES['replica'].update({
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {'connect_timeout': 3},  # an unreachable replica must fail fast
+        'TEST': {'MIRROR': 'default'},
+    })
+
+DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
 
@@ -412,6 +427,22 @@ NSER_SETTINGS = {
     'AUTO_RENEW_PERMANENT': True,
     'PROPAGATION_TIMEOUT_SECONDS': 30,
     'MAX_PROPAGATION_RETRIES': 3,
+    'PROPAGATION_CONCURRENCY': 32,  # concurrent webhook POSTs per worker process
+    'PROPAGATION_REQUEST_TIMEOUT_SECONDS': 5,
+    'PROPAGATION_CONNECTIONS_PER_HOST': 4,
+    'PROPAGATION_PENDING_STALE_SECONDS': 900,  # pending mappings older than this are resent
+    'LOOKUP_PREFILTER_ENABLED': True,
+    'LOOKUP_PREFILTER_CAPACITY': 2000000,  # identifiers (phone/ID/email/BST)
+    'LOOKUP_PREFILTER_ERROR_RATE': 0.001,
+    'LOOKUP_PREFILTER_SYNC_SECONDS': 1.0,
+    'BULK_LOOKUP_MAX_ITEMS': 10000,
+}
+
+OPERATOR_SETTINGS = {
+    'API_KEY_LOCAL_CACHE_SIZE': 1024,  # per process
+    'API_KEY_LOCAL_TTL_SECONDS': 10,  # bounds revocation lag in other processes
+    'API_KEY_CACHE_TTL_SECONDS': 300,
+    'API_KEY_NEGATIVE_TTL_SECONDS': 30,
 }
 
 BST_SETTINGS = {
@@ -419,17 +450,96 @@ BST_SETTINGS = {
     'TOKEN_EXPIRY_YEARS': 10,
     'ENABLE_TOKEN_ROTATION': True,
     'ROTATION_INTERVAL_MONTHS': 12,
+    'VALIDATION_LOCAL_CACHE_SIZE': 50000,  # tokens per process
+    'VALIDATION_LOCAL_TTL_SECONDS': 30,  # pub/sub evicts sooner on rotate/compromise
+    'VALIDATION_CACHE_TTL_SECONDS': 120,
+    'VALIDATION_LOG_FLUSH_SECONDS': 1.0,
+    'BULK_VALIDATE_MAX_TOKENS': 10000,
+    'BULK_VALIDATE_CHUNK_SIZE': 2000,  # tokens per MGET / IN query; larger requests are streamed
 }
 
 SCREENING_SETTINGS = {
     'QUARTERLY_SCREENING_ENABLED': True,
     'HIGH_RISK_THRESHOLD': 70,
     'MANDATORY_SCREENING_INTERVAL_DAYS': 90,
+    'SCHEDULE_CHUNK_SIZE': 5000,  # users per keyset page of the quarterly scheduler
+    'SCHEDULE_BATCH_SIZE': 1000,  # rows per INSERT
+    'PROFILE_BATCH_SIZE': 1000,  # dirty users recomputed per bulk_update
+    'SCORING_CACHE_TTL_SECONDS': 300,  # compiled instruments kept per process (also evicted on edits)
+    'QUESTION_BANK_LOCAL_TTL_SECONDS': 300,  # per-process question banks (also evicted on edits)
+    'QUESTION_BANK_CACHE_TTL_SECONDS': 86400,  # versioned banks in Redis
     'ENABLE_ML_PREDICTIONS': True,
+    'ML_TRAINING_CHUNK_SIZE': 5000,  # sessions per partial_fit; bounds training memory
+    'ML_MODEL_PATH': 'ml_models/risk',  # in default_storage
+    'ML_MODEL_REFRESH_SECONDS': 300,  # how often each process checks for a newer model
+    'ML_PREDICTION_MAX_USERS': 500,
 }
 
 COMPLIANCE_SETTINGS = {
     'AUDIT_LOG_RETENTION_DAYS': 2555,  # 7 years
     'ENABLE_AUDIT_LOGGING': True,
     'DATA_RETENTION_DEFAULT_DAYS': 2555,
+    'AUDIT_BUFFER_ENABLED': True,  # Redis stream; direct inserts when off or without Redis
+    'AUDIT_BUFFER_BATCH_SIZE': 5000,
+    'AUDIT_BUFFER_MAX_LENGTH': 2000000,  # beyond this producers help drain (backpressure)
+    'AUDIT_BUFFER_CLAIM_IDLE_SECONDS': 60,
+}
+
+MONITORING_SETTINGS = {
+    'LATENCY_SUB_BUCKETS': 16,  # histogram buckets per doubling (~6% resolution)
+    'LATENCY_FLUSH_SECONDS': 5.0,  # per-process push to Redis
+    'LATENCY_WINDOW_MINUTES': 5,  # window for reported percentiles
+    'LATENCY_WINDOW_RETENTION_MINUTES': 60,
+    'LATENCY_SLOS_MS': {  # p99 targets
+        'ExclusionLookupView': 50,
+        'BSTExclusionLookupView': 50,
+        'ValidateBSTTokenView': 20,
+    },
+    'QUERY_PROFILER_ENABLED': False,  # per-request / per-task SQL profiling
+    'QUERY_PROFILER_SAMPLE_RATE': 0.01,
+    'QUERY_PROFILER_N_PLUS_ONE_THRESHOLD': 10,  # identical statements per unit of work
+    'QUERY_PROFILER_MAX_QUERIES': 50,  # profiles above any threshold are kept
+    'QUERY_PROFILER_MAX_SQL_MS': 500,
+    'QUERY_PROFILER_BUFFER_SIZE': 200,
+    'REQUEST_LOG_ENABLED': True,
+    'REQUEST_LOG_PATH_PREFIXES': ('/api/',),
+    'REQUEST_LOG_SUCCESS_SAMPLE_RATE': 0.05,  # errors and slow requests are always kept
+    'REQUEST_LOG_SLOW_MS': 1000,
+    'REQUEST_LOG_FLUSH_SECONDS': 2.0,
+    'REQUEST_LOG_BATCH_SIZE': 1000,
+    'REQUEST_LOG_MAX_QUEUE': 50000,  # per process; oldest records dropped beyond this
+    'ROLLUP_SKETCH_ACCURACY': 0.01,  # relative error of rollup percentiles
+    'ROLLUP_RETENTION_DAYS': {'raw': 2, '1m': 14, '1h': 400, '1d': None},  # None keeps forever
+    'ROLLUP_MAX_BUCKETS_PER_RUN': {'1m': 360, '1h': 168, '1d': 90},
+    'ROLLUP_CHUNK_SIZE': 5000,
+    'ROLLUP_MAX_POINTS': 500,  # default points per series query
+    'ROLLUP_MAX_WINDOW_DAYS': 3650,  # longest series query when a tier keeps data forever
+    'SAMPLER_INTERVAL_SECONDS': 5,  # shared MonitoringConsumer sampler tick
+    'SAMPLER_STORE_METRICS': True,  # also write each sample to SystemMetric
+}
+
+REPLICA_SETTINGS = {
+    'REPLICA_MAX_LAG_SECONDS': 5,  # replica-safe reads fall back to the primary above this
+    'REPLICA_LAG_CHECK_SECONDS': 5,  # per-process lag probe interval
+    'REPLICA_RETRY_SECONDS': 30,  # after the replica could not be reached
+    'REPLICA_PIN_SECONDS': 10,  # client reads stay on the primary this long after a write
+}
+
+ANALYTICS_SETTINGS = {
+    'DASHBOARD_RECOUNT_DEBOUNCE_SECONDS': 10,  # coalesce state-change recounts per counter
+    'DASHBOARD_DAILY_TTL_DAYS': 9,  # per-day counters feeding today's and 7-day figures
+    'FACTS_CATCHUP_DAYS': 7,  # hourly fact builds re-cover at most this many missed days
+    'FACTS_BACKFILL_CHUNK_DAYS': 31,
+    'FACTS_CACHE_SECONDS': 86400,  # series caches are versioned; this only bounds memory
+    'COMPLIANT_SCORE': 80,  # OperatorStatistics.compliance_score counted as compliant
+    'EXPORT_SYNC_MAX_ROWS': 200000,  # larger exports run as background jobs
+    'EXPORT_CHUNK_SIZE': 2000,  # server-side cursor fetch size
+    'EXPORT_CSV_BATCH_ROWS': 500,  # rows per streamed chunk
+    'EXPORT_RETENTION_HOURS': 24,  # job state and files of background exports
+    'PDF_MAX_ROWS': 10000,  # PDF table exports; CSV/Excel carry the full data
+    'PDF_SYNC_MAX_ROWS': 1000,  # larger PDF exports run as report jobs
+    'REPORT_CACHE_HOURS': 6,  # identical report requests reuse a job this recent
+    'REPORT_STALE_MINUTES': 60,  # queued/running jobs older than this are not reused
+    'REPORT_PROGRESS_STEP': 5,  # percent between progress writes
+    'REPORT_TOP_OPERATORS': 50,
 }
@@ -65,25 +65,14 @@ DATABASES['default']['OPTIONS'] = {
 # Disable ATOMIC_REQUESTS for better performance (manual transaction management)
 DATABASES['default']['ATOMIC_REQUESTS'] = False
 
-# CRITICAL: Force remove replica database configuration for cPanel deployment
-# cPanel doesn't support multiple databases - only use 'default'
+# Read replica - only when DATABASE_REPLICA_URL is set (see base.py).
+# cPanel shared hosting has a single database, so it stays unset there and
+# the router sends everything to 'default'.
 if 'replica' in DATABASES:
-    del DATABASES['replica']
-    
-DATABASES = {'default': DATABASES['default']}
-
-# CRITICAL: Disable database routers completely
-# No read replicas on cPanel shared hosting
-DATABASE_ROUTERS = []
-
-# Read replicas - Disabled for cPanel deployment (shared hosting)
-# Uncomment and configure if you have a dedicated replica database
-# DATABASES['replica'] = {
-#     **DATABASES['default'],
-#     'NAME': env('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
-#     'HOST': env('DB_REPLICA_HOST', default=DATABASES['default']['HOST']),
-# }
-# DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+    DATABASES['replica']['OPTIONS'] = {
+        'connect_timeout': 3,
+        'options': '-c statement_timeout=30000',
+    }
 
 # Cache Configuration - Auto-detect Redis availability
 # Uses Redis if REDIS_URL is set, falls back to local memory otherwise